@@ -0,0 +1,242 @@
+"""
+Account 360 overview queries
+
+Everything the account page needs (the account, paged contacts, deals and
+leads, per-stage deal totals and recent activity) is loaded with a fixed set
+of queries: related rows are sliced in the database, owners come in through
+select_related and section counts are annotated onto the account itself.
+"""
+
+from datetime import timedelta
+
+from django.db.models import (
+    CharField,
+    Count,
+    F,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce, Concat
+
+from apps.contacts.models import Contact
+from apps.leads.models import Lead
+
+# Per-section page size defaults and hard caps
+DEFAULT_SECTION_LIMIT = 10
+MAX_SECTION_LIMIT = 100
+DEFAULT_ACTIVITY_LIMIT = 20
+MAX_ACTIVITY_LIMIT = 100
+
+SECTIONS = ("contacts", "deals", "leads")
+
+# auto_now_add and auto_now are stamped separately, so "never edited" rows
+# differ by a few microseconds rather than being equal
+CREATED_WINDOW = timedelta(seconds=1)
+
+
+def _count_subquery(queryset, field):
+    """Correlated COUNT(*) of related rows pointing at the outer account"""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def annotate_section_counts(queryset):
+    """
+    Annotate contact_count and lead_count onto an Account queryset
+    """
+    return queryset.annotate(
+        contact_count=_count_subquery(Contact.objects.all(), "account"),
+        lead_count=_count_subquery(Lead.objects.all(), "company"),
+    )
+
+
+def _full_name(user):
+    return user.get_full_name() if user else None
+
+
+def _page(rows, total, limit, offset):
+    """Wrap a limit+1 slice as a page, using the extra row to detect more results"""
+    return {
+        "results": rows[:limit],
+        "count": total,
+        "limit": limit,
+        "offset": offset,
+        "has_more": len(rows) > limit,
+    }
+
+
+def _contacts_page(account, limit, offset):
+    contacts = account.contacts.only(
+        "contact_id",
+        "first_name",
+        "last_name",
+        "email",
+        "phone",
+        "title",
+        "account_id",
+        "tenant_id",
+    ).order_by("last_name", "first_name", "contact_id")[offset : offset + limit + 1]
+
+    rows = [
+        {
+            "contact_id": contact.contact_id,
+            "first_name": contact.first_name,
+            "last_name": contact.last_name,
+            "email": contact.email,
+            "phone": contact.phone,
+            "title": contact.title,
+        }
+        for contact in contacts
+    ]
+    return _page(rows, account.contact_count, limit, offset)
+
+
+def _deals_page(account, total, limit, offset):
+    deals = account.deals.select_related("owner").order_by("-close_date", "-deal_id")[
+        offset : offset + limit + 1
+    ]
+
+    rows = [
+        {
+            "deal_id": deal.deal_id,
+            "deal_name": deal.deal_name,
+            "stage": deal.stage,
+            "amount": str(deal.amount),
+            "close_date": deal.close_date,
+            "owner": _full_name(deal.owner),
+        }
+        for deal in deals
+    ]
+    return _page(rows, total, limit, offset)
+
+
+def _leads_page(account, limit, offset):
+    leads = account.leads.select_related("lead_owner").order_by(
+        "-created_at", "-lead_id"
+    )[offset : offset + limit + 1]
+
+    rows = [
+        {
+            "lead_id": lead.lead_id,
+            "first_name": lead.first_name,
+            "last_name": lead.last_name,
+            "email": lead.email,
+            "phone": lead.phone,
+            "lead_status": lead.lead_status,
+            "score": lead.score,
+            "owner": _full_name(lead.lead_owner),
+        }
+        for lead in leads
+    ]
+    return _page(rows, account.lead_count, limit, offset)
+
+
+def _deal_stage_totals(account):
+    """Deal count and amount per stage, in one GROUP BY"""
+    rows = (
+        account.deals.order_by()
+        .values("stage")
+        .annotate(
+            deal_count=Count("deal_id"),
+            total_amount=Sum("amount"),
+        )
+        .order_by("stage")
+    )
+
+    return [
+        {
+            "stage": row["stage"],
+            "deal_count": row["deal_count"],
+            "total_amount": str(row["total_amount"] or 0),
+        }
+        for row in rows
+    ]
+
+
+def _recent_activity(account, limit):
+    """Most recently touched contacts, deals and leads as one UNION query"""
+    columns = ("kind", "object_id", "label", "created_at", "updated_at")
+
+    contacts = (
+        account.contacts.order_by()
+        .annotate(
+            kind=Value("contact", output_field=CharField()),
+            object_id=F("contact_id"),
+            label=Concat(
+                "first_name", Value(" "), "last_name", output_field=CharField()
+            ),
+        )
+        .values_list(*columns)
+    )
+    deals = (
+        account.deals.order_by()
+        .annotate(
+            kind=Value("deal", output_field=CharField()),
+            object_id=F("deal_id"),
+            label=F("deal_name"),
+        )
+        .values_list(*columns)
+    )
+    leads = (
+        account.leads.order_by()
+        .annotate(
+            kind=Value("lead", output_field=CharField()),
+            object_id=F("lead_id"),
+            label=Concat(
+                "first_name", Value(" "), "last_name", output_field=CharField()
+            ),
+        )
+        .values_list(*columns)
+    )
+
+    activity = contacts.union(deals, leads, all=True).order_by("-updated_at")[:limit]
+
+    return [
+        {
+            "type": kind,
+            "id": object_id,
+            "label": label,
+            "action": (
+                "created" if updated_at - created_at < CREATED_WINDOW else "updated"
+            ),
+            "timestamp": updated_at,
+        }
+        for kind, object_id, label, created_at, updated_at in activity
+    ]
+
+
+def build_account_overview(account, limits, offsets, activity_limit):
+    """
+    Assemble the account 360 payload.
+
+    Args:
+        account: Account instance loaded through annotate_section_counts
+        limits (dict): Page size per section ('contacts', 'deals', 'leads')
+        offsets (dict): Page offset per section
+        activity_limit (int): Number of recent activity entries
+
+    Returns:
+        dict: contacts, deals, leads pages plus deal_stage_totals and recent_activity
+    """
+    stage_totals = _deal_stage_totals(account)
+    deal_count = sum(row["deal_count"] for row in stage_totals)
+
+    return {
+        "contacts": _contacts_page(account, limits["contacts"], offsets["contacts"]),
+        "deals": _deals_page(account, deal_count, limits["deals"], offsets["deals"]),
+        "leads": _leads_page(account, limits["leads"], offsets["leads"]),
+        "deal_stage_totals": stage_totals,
+        "recent_activity": _recent_activity(account, activity_limit),
+    }
@@ -4,11 +4,12 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from apps.core.utils import rate_limit
+from apps.core.utils import get_int_param, rate_limit
 
 # Removed cache_page import - caching disabled for immediate data updates
 from apps.tenant_core.permissions import HasTenantPermission, IsTenantUser
 
+from . import overview as overview_queries
 from .models import Account
 from .serializers import (
     AccountCreateSerializer,
@@ -29,6 +30,11 @@ class AccountViewSet(viewsets.ModelViewSet):
         Return accounts filtered by current tenant
         The TenantAccountManager automatically handles tenant isolation
         """
+        if self.action == 'overview':
+            # Load everything the account serializer touches plus section counts up front
+            return overview_queries.annotate_section_counts(
+                Account.objects.select_related('tenant', 'owner', 'parent_account', 'created_by', 'updated_by')
+            )
         return Account.objects.all()
 
     def get_serializer_class(self):
@@ -148,6 +154,43 @@ class AccountViewSet(viewsets.ModelViewSet):
             'count': len(leads_data)
         })
 
+    @action(detail=True, methods=['get'])
+    def overview(self, request, pk=None):
+        """
+        Get the account with paged contacts, deals and leads, per-stage deal
+        totals and recent activity in one response
+
+        Query params:
+            contacts_limit / deals_limit / leads_limit: page size per section
+            contacts_offset / deals_offset / leads_offset: page offset per section
+            activity_limit: number of recent activity entries
+        """
+        try:
+            limits = {
+                section: get_int_param(
+                    request, f'{section}_limit',
+                    overview_queries.DEFAULT_SECTION_LIMIT, maximum=overview_queries.MAX_SECTION_LIMIT
+                )
+                for section in overview_queries.SECTIONS
+            }
+            offsets = {
+                section: get_int_param(request, f'{section}_offset', 0, minimum=0)
+                for section in overview_queries.SECTIONS
+            }
+            activity_limit = get_int_param(
+                request, 'activity_limit',
+                overview_queries.DEFAULT_ACTIVITY_LIMIT, maximum=overview_queries.MAX_ACTIVITY_LIMIT
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        account = self.get_object()
+
+        return Response({
+            'account': AccountSerializer(account).data,
+            **overview_queries.build_account_overview(account, limits, offsets, activity_limit),
+        })
+
     @action(detail=False, methods=['get'])
     def summary(self, request):
         """
@@ -0,0 +1,218 @@
+"""
+Org chart queries over Contact.reports_to
+
+Both directions of the reporting hierarchy (management chain above a contact
+and the reportee tree below it) are resolved with recursive CTEs, so a chart
+of any depth costs a single database round trip.
+"""
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import Contact
+
+# Defaults and hard caps for org chart traversal
+DEFAULT_DEPTH = 3
+MAX_DEPTH = 10
+DEFAULT_BREADTH = 25
+MAX_BREADTH = 100
+DEFAULT_MAX_NODES = 500
+MAX_NODES = 2000
+MAX_CHAIN_DEPTH = 50
+
+ORG_CHART_SQL = """
+WITH RECURSIVE chain AS (
+    SELECT c.contact_id, c.reports_to_id, c.first_name, c.last_name,
+           c.email, c.phone, c.title,
+           0 AS depth, ARRAY[c.contact_id] AS path
+    FROM contact c
+    WHERE c.contact_id = %(root_id)s AND c.tenant_id = %(tenant_id)s
+  UNION ALL
+    SELECT m.contact_id, m.reports_to_id, m.first_name, m.last_name,
+           m.email, m.phone, m.title,
+           ch.depth + 1, ch.path || m.contact_id
+    FROM contact m
+    JOIN chain ch ON m.contact_id = ch.reports_to_id
+    WHERE m.tenant_id = %(tenant_id)s
+      AND ch.depth < %(chain_depth)s
+      AND NOT m.contact_id = ANY(ch.path)
+),
+tree AS (
+    SELECT r.contact_id, r.reports_to_id, r.first_name, r.last_name,
+           r.email, r.phone, r.title,
+           1 AS depth, ARRAY[%(root_id)s, r.contact_id] AS path
+    FROM (
+        SELECT * FROM contact c
+        WHERE c.reports_to_id = %(root_id)s AND c.tenant_id = %(tenant_id)s
+        ORDER BY c.last_name, c.first_name, c.contact_id
+        LIMIT %(breadth)s
+    ) r
+  UNION ALL
+    SELECT child.contact_id, child.reports_to_id, child.first_name, child.last_name,
+           child.email, child.phone, child.title,
+           t.depth + 1, t.path || child.contact_id
+    FROM tree t
+    CROSS JOIN LATERAL (
+        SELECT * FROM contact c
+        WHERE c.reports_to_id = t.contact_id AND c.tenant_id = %(tenant_id)s
+        ORDER BY c.last_name, c.first_name, c.contact_id
+        LIMIT %(breadth)s
+    ) child
+    WHERE t.depth < %(depth)s
+      AND NOT child.contact_id = ANY(t.path)
+)
+SELECT 'chain' AS kind, contact_id, reports_to_id, first_name, last_name,
+       email, phone, title, depth,
+       (SELECT COUNT(*) FROM contact x
+            WHERE x.reports_to_id = chain.contact_id AND x.tenant_id = %(tenant_id)s) AS reportee_count
+FROM chain
+UNION ALL
+SELECT kind, contact_id, reports_to_id, first_name, last_name,
+       email, phone, title, depth, reportee_count
+FROM (
+    SELECT 'tree' AS kind, contact_id, reports_to_id, first_name, last_name,
+           email, phone, title, depth,
+           (SELECT COUNT(*) FROM contact x
+                WHERE x.reports_to_id = tree.contact_id AND x.tenant_id = %(tenant_id)s) AS reportee_count
+    FROM tree
+    ORDER BY depth, path
+    LIMIT %(max_nodes)s
+) limited_tree
+"""
+
+SUBTREE_CONTAINS_SQL = """
+WITH RECURSIVE subtree AS (
+    SELECT c.contact_id, ARRAY[c.contact_id] AS path
+    FROM contact c
+    WHERE c.reports_to_id = %(root_id)s AND c.tenant_id = %(tenant_id)s
+  UNION ALL
+    SELECT c.contact_id, s.path || c.contact_id
+    FROM contact c
+    JOIN subtree s ON c.reports_to_id = s.contact_id
+    WHERE c.tenant_id = %(tenant_id)s
+      AND NOT c.contact_id = ANY(s.path)
+)
+SELECT EXISTS (SELECT 1 FROM subtree WHERE contact_id = %(candidate_id)s)
+"""
+
+
+def _node(row):
+    return {
+        "contact_id": row["contact_id"],
+        "reports_to": row["reports_to_id"],
+        "first_name": row["first_name"],
+        "last_name": row["last_name"],
+        "email": row["email"],
+        "phone": row["phone"],
+        "title": row["title"],
+        "depth": row["depth"],
+        "reportee_count": row["reportee_count"],
+    }
+
+
+def get_org_chart(
+    contact, depth=DEFAULT_DEPTH, breadth=DEFAULT_BREADTH, max_nodes=DEFAULT_MAX_NODES
+):
+    """
+    Return the management chain and the nested reportee tree for a contact.
+
+    Args:
+        contact: Root Contact instance (already tenant-scoped)
+        depth (int): Number of reportee levels to descend
+        breadth (int): Maximum direct reports returned per node
+        max_nodes (int): Hard cap on the number of reportee nodes
+
+    Returns:
+        dict: management_chain (closest manager first), reportees (nested tree),
+              node_count and truncated flag
+    """
+    params = {
+        "root_id": contact.contact_id,
+        "tenant_id": contact.tenant_id,
+        "depth": depth,
+        "breadth": breadth,
+        "max_nodes": max_nodes,
+        "chain_depth": MAX_CHAIN_DEPTH,
+    }
+
+    with connection.cursor() as cursor:
+        cursor.execute(ORG_CHART_SQL, params)
+        columns = [col[0] for col in cursor.description]
+        rows = [dict(zip(columns, row, strict=True)) for row in cursor.fetchall()]
+
+    management_chain = []
+    tree_rows = []
+    root_reportee_count = 0
+    for row in rows:
+        if row["kind"] == "tree":
+            tree_rows.append(row)
+        elif row["depth"] == 0:
+            root_reportee_count = row["reportee_count"]
+        else:
+            management_chain.append(_node(row))
+    management_chain.sort(key=lambda node: node["depth"])
+
+    # Assemble the nested tree; rows arrive ordered by depth so parents come first
+    nodes = {contact.contact_id: {"reportees": []}}
+    truncated = len(tree_rows) >= max_nodes
+    for row in tree_rows:
+        parent = nodes.get(row["reports_to_id"])
+        if parent is None:
+            continue
+        node = _node(row)
+        node["reportees"] = []
+        parent["reportees"].append(node)
+        nodes[row["contact_id"]] = node
+
+        # Children beyond the breadth/depth limits are reported via reportee_count
+        if node["reportee_count"] > 0 and (
+            row["depth"] >= depth or node["reportee_count"] > breadth
+        ):
+            truncated = True
+
+    root_reportees = nodes[contact.contact_id]["reportees"]
+    if root_reportee_count > len(root_reportees):
+        truncated = True
+
+    return {
+        "management_chain": management_chain,
+        "reportees": root_reportees,
+        "node_count": len(tree_rows),
+        "truncated": truncated,
+    }
+
+
+def is_in_subtree(contact, candidate):
+    """
+    Check whether candidate reports (directly or indirectly) to contact
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            SUBTREE_CONTAINS_SQL,
+            {
+                "root_id": contact.contact_id,
+                "tenant_id": contact.tenant_id,
+                "candidate_id": candidate.contact_id,
+            },
+        )
+        return cursor.fetchone()[0]
+
+
+def reassign_reports(contact, new_manager, user=None):
+    """
+    Repoint every direct report of contact to new_manager in a single UPDATE.
+
+    Indirect reports keep pointing at their own managers, so the whole
+    subtree moves along with its top level.
+
+    Returns:
+        int: Number of direct reports reassigned
+    """
+    return Contact.objects.filter(
+        tenant_id=contact.tenant_id,
+        reports_to=contact,
+    ).update(
+        reports_to=new_manager,
+        updated_by=user,
+        updated_at=timezone.now(),
+    )
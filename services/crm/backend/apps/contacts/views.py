@@ -4,11 +4,12 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from apps.core.utils import rate_limit
+from apps.core.utils import get_int_param, parse_int, rate_limit
 
 # Removed cache_page import - caching disabled for immediate data updates
 from apps.tenant_core.permissions import HasTenantPermission, IsTenantUser
 
+from . import org_chart as org_chart_queries
 from .models import Contact
 from .serializers import (
     ContactCreateSerializer,
@@ -145,6 +146,74 @@ class ContactViewSet(viewsets.ModelViewSet):
             'count': len(reportees_data)
         })
 
+    @action(detail=True, methods=['get'])
+    def org_chart(self, request, pk=None):
+        """
+        Get the management chain and reportee tree for a contact
+
+        Query params:
+            depth: reportee levels to descend (default 3, max 10)
+            breadth: direct reports per node (default 25, max 100)
+            max_nodes: total reportee nodes (default 500, max 2000)
+        """
+        contact = self.get_object()
+
+        try:
+            depth = get_int_param(request, 'depth', org_chart_queries.DEFAULT_DEPTH, maximum=org_chart_queries.MAX_DEPTH)
+            breadth = get_int_param(request, 'breadth', org_chart_queries.DEFAULT_BREADTH, maximum=org_chart_queries.MAX_BREADTH)
+            max_nodes = get_int_param(request, 'max_nodes', org_chart_queries.DEFAULT_MAX_NODES, maximum=org_chart_queries.MAX_NODES)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        chart = org_chart_queries.get_org_chart(contact, depth=depth, breadth=breadth, max_nodes=max_nodes)
+
+        return Response({
+            'contact_id': contact.contact_id,
+            'contact_name': f"{contact.first_name} {contact.last_name}",
+            'title': contact.title,
+            'depth': depth,
+            'breadth': breadth,
+            **chart,
+        })
+
+    @action(detail=True, methods=['post'])
+    def reassign_reports(self, request, pk=None):
+        """
+        Move every report of this contact (and their whole subtree) to a new manager
+        """
+        contact = self.get_object()
+
+        if 'new_manager_id' not in request.data:
+            return Response({
+                'error': 'new_manager_id is required (use null to detach reports)'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        new_manager = None
+        new_manager_id = request.data.get('new_manager_id')
+        if new_manager_id is not None:
+            try:
+                new_manager_id = parse_int(new_manager_id, 'new_manager_id')
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            new_manager = self.get_queryset().filter(contact_id=new_manager_id).first()
+            if not new_manager:
+                return Response({
+                    'error': 'New manager not found'
+                }, status=status.HTTP_404_NOT_FOUND)
+
+            if new_manager.contact_id == contact.contact_id or org_chart_queries.is_in_subtree(contact, new_manager):
+                return Response({
+                    'error': 'New manager cannot be this contact or one of its reportees.'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+        reassigned = org_chart_queries.reassign_reports(contact, new_manager, user=request.user)
+
+        return Response({
+            'contact_id': contact.contact_id,
+            'new_manager_id': new_manager.contact_id if new_manager else None,
+            'reassigned_count': reassigned,
+        })
+
     @action(detail=True, methods=['get'])
     def deals(self, request, pk=None):
         """
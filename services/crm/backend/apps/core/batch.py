@@ -0,0 +1,213 @@
+"""
+Multiplexed batch execution for the /api/batch/ endpoint
+
+Each sub-request is resolved against the regular URLconf and dispatched
+straight to the existing view, skipping the middleware stack. The outer
+request has already resolved the tenant and authenticated the user, so
+sub-requests reuse both: the tenant is copied over and the user is
+attached as a forced authentication, which DRF honours without decoding
+the JWT again. View-level permission checks still run per sub-request,
+since every view has its own required permissions.
+"""
+
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connection
+from django.http import Http404
+from django.urls import Resolver404, resolve
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+BATCH_PATH = "/api/batch/"
+ALLOWED_METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE")
+SAFE_METHODS = ("GET",)
+
+
+class BatchValidationError(Exception):
+    """Raised when the batch payload itself is malformed"""
+
+
+def get_batch_limits():
+    """Return (max_requests, max_workers) from settings"""
+    return (
+        getattr(settings, "BATCH_API_MAX_REQUESTS", 20),
+        getattr(settings, "BATCH_API_MAX_WORKERS", 4),
+    )
+
+
+def parse_batch(payload):
+    """
+    Validate the batch payload and normalise each sub-request.
+
+    Args:
+        payload: Request body, {"requests": [{"id", "method", "path", "params", "body"}], "parallel": bool}
+
+    Returns:
+        tuple: (list of normalised sub-request dicts, parallel flag)
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get("requests"), list):
+        raise BatchValidationError('Body must be an object with a "requests" list')
+
+    items = payload["requests"]
+    max_requests, _ = get_batch_limits()
+    if not items:
+        raise BatchValidationError("requests cannot be empty")
+    if len(items) > max_requests:
+        raise BatchValidationError(
+            f"A batch can contain at most {max_requests} requests"
+        )
+
+    sub_requests = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise BatchValidationError(f"requests[{index}] must be an object")
+
+        method = str(item.get("method", "GET")).upper()
+        if method not in ALLOWED_METHODS:
+            raise BatchValidationError(
+                f"requests[{index}]: unsupported method {method}"
+            )
+
+        url = urlsplit(str(item.get("path", "")))
+        path = url.path
+        if not path.startswith("/api/"):
+            raise BatchValidationError(f"requests[{index}]: path must start with /api/")
+        if path.rstrip("/") == BATCH_PATH.rstrip("/"):
+            raise BatchValidationError(f"requests[{index}]: batches cannot be nested")
+
+        params = item.get("params") or {}
+        if not isinstance(params, dict):
+            raise BatchValidationError(f"requests[{index}]: params must be an object")
+        query_string = "&".join(
+            filter(None, [url.query, urlencode(params, doseq=True)])
+        )
+
+        sub_requests.append(
+            {
+                "id": item.get("id", index),
+                "method": method,
+                "path": path,
+                "query_string": query_string,
+                "body": item.get("body"),
+            }
+        )
+
+    return sub_requests, bool(payload.get("parallel"))
+
+
+def _build_sub_request(request, sub):
+    """Create a Django request for a sub-request that inherits the outer request's context"""
+    body = b""
+    if sub["body"] is not None:
+        body = json.dumps(sub["body"]).encode("utf-8")
+
+    environ = {
+        key: value for key, value in request.META.items() if isinstance(value, str)
+    }
+    environ.update(
+        {
+            "REQUEST_METHOD": sub["method"],
+            "PATH_INFO": sub["path"],
+            "SCRIPT_NAME": "",
+            "QUERY_STRING": sub["query_string"],
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.url_scheme": request.scheme,
+        }
+    )
+
+    django_request = WSGIRequest(environ)
+    django_request.tenant = getattr(request, "tenant", None)
+    if hasattr(request, "urlconf"):
+        django_request.urlconf = request.urlconf
+    django_request.user = request.user
+
+    # DRF's Request uses these instead of running the authentication classes
+    django_request._force_auth_user = request.user
+    django_request._force_auth_token = request.auth
+    return django_request
+
+
+def _response_body(response):
+    """Extract a JSON-serialisable body from a view response"""
+    if isinstance(response, Response):
+        return response.data
+    content = getattr(response, "content", b"")
+    if not content:
+        return None
+    try:
+        return json.loads(content)
+    except ValueError:
+        return content.decode(response.charset or "utf-8", errors="replace")
+
+
+def execute_sub_request(request, sub):
+    """
+    Dispatch one sub-request to its view and return the batch item result
+    """
+    django_request = _build_sub_request(request, sub)
+    try:
+        match = resolve(sub["path"], urlconf=getattr(request, "urlconf", None))
+    except Resolver404:
+        return {"id": sub["id"], "status": 404, "body": {"error": "Not found"}}
+
+    try:
+        response = match.func(django_request, *match.args, **match.kwargs)
+    except Http404:
+        return {"id": sub["id"], "status": 404, "body": {"error": "Not found"}}
+    except PermissionDenied:
+        return {"id": sub["id"], "status": 403, "body": {"error": "Access denied"}}
+    except Exception as e:
+        logger.exception(f"Batch sub-request {sub['method']} {sub['path']} failed: {e}")
+        return {
+            "id": sub["id"],
+            "status": 500,
+            "body": {"error": "Internal server error"},
+        }
+
+    return {
+        "id": sub["id"],
+        "status": response.status_code,
+        "body": _response_body(response),
+    }
+
+
+def _execute_in_worker(request, sub):
+    """Run a sub-request on a pool thread with its own tenant-scoped connection"""
+    tenant = getattr(request, "tenant", None)
+    try:
+        if tenant is not None:
+            connection.set_tenant(tenant)
+        return execute_sub_request(request, sub)
+    finally:
+        connection.close()
+
+
+def execute_batch(request, sub_requests, parallel=False):
+    """
+    Execute sub-requests and return their results in request order.
+
+    Batches made only of GETs may run on a thread pool when parallel is set;
+    anything that writes runs sequentially so ordering between items holds.
+    """
+    _, max_workers = get_batch_limits()
+    read_only = all(sub["method"] in SAFE_METHODS for sub in sub_requests)
+
+    if parallel and read_only and max_workers > 1 and len(sub_requests) > 1:
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(sub_requests))
+        ) as pool:
+            return list(
+                pool.map(lambda sub: _execute_in_worker(request, sub), sub_requests)
+            )
+
+    return [execute_sub_request(request, sub) for sub in sub_requests]
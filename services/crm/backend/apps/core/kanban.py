@@ -0,0 +1,220 @@
+"""
+Kanban board queries shared by the deal and lead boards
+
+A board splits a queryset into columns by one field. The first page of every
+column, plus each column's total and sum, come back in a single query:
+
+    ROW_NUMBER() OVER (PARTITION BY column ORDER BY ...)
+    COUNT(*) / SUM(...) OVER (PARTITION BY column)
+
+filtered to row_number <= limit. Loading more cards for one column is a
+keyset query driven by that column's opaque cursor, so columns page
+independently of each other.
+"""
+
+import base64
+import datetime
+import json
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import CharField, Count, F, Q, Sum, Value, Window
+from django.db.models.functions import Coalesce, RowNumber
+
+DEFAULT_CARD_LIMIT = 20
+MAX_CARD_LIMIT = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised when a column cursor cannot be decoded"""
+
+
+def _cursor_value(value):
+    # Full-precision isoformat (DjangoJSONEncoder truncates microseconds,
+    # which would break keyset equality on timestamps)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Unsupported cursor value: {type(value).__name__}")
+
+
+def encode_cursor(values):
+    """Encode the ordering values of the last card into an opaque cursor"""
+    raw = json.dumps(values, default=_cursor_value, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor, size):
+    """Decode a cursor back into a list of ordering values"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor("Invalid cursor")
+    return values
+
+
+def _field_names(ordering):
+    return [field.lstrip("-") for field in ordering]
+
+
+def _order_expressions(ordering):
+    return [
+        F(field[1:]).desc() if field.startswith("-") else F(field).asc()
+        for field in ordering
+    ]
+
+
+def _cursor_values(model, ordering, values):
+    """
+    Convert decoded cursor values to the Python types of their ordering fields.
+
+    Raises:
+        InvalidCursor: If a value is not a scalar or does not fit its field
+    """
+    converted = []
+    for name, value in zip(_field_names(ordering), values, strict=True):
+        if value is None or isinstance(value, (dict, list)):
+            raise InvalidCursor("Invalid cursor")
+        try:
+            converted.append(model._meta.get_field(name).to_python(value))
+        except (ValidationError, TypeError, ValueError) as e:
+            raise InvalidCursor("Invalid cursor") from e
+    return converted
+
+
+def _after_cursor(ordering, values):
+    """Keyset condition selecting rows strictly after the cursor position"""
+    condition = Q()
+    equal_so_far = Q()
+    for field, value in zip(ordering, values, strict=True):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        condition |= equal_so_far & Q(**{f"{name}__{lookup}": value})
+        equal_so_far &= Q(**{name: value})
+    return condition
+
+
+def _with_column(queryset, column_field):
+    # NULL and blank values share one "" column
+    return queryset.order_by().annotate(
+        board_column=Coalesce(column_field, Value(""), output_field=CharField())
+    )
+
+
+def _cursor_for(row, ordering):
+    return encode_cursor([row[name] for name in _field_names(ordering)])
+
+
+def get_board(
+    queryset,
+    column_field,
+    ordering,
+    card_fields,
+    build_card,
+    sum_field=None,
+    limit=DEFAULT_CARD_LIMIT,
+    column_order=(),
+):
+    """
+    Return the first page of every column with column totals in one query.
+
+    Args:
+        queryset: Tenant-scoped queryset to split into columns
+        column_field (str): Field the board is grouped by (e.g. 'stage')
+        ordering (list): Card order within a column; must end with a unique field
+        card_fields (list): Fields passed to values() for card rendering
+        build_card (callable): Turns a values() row into the card payload
+        sum_field (str): Optional field summed per column
+        limit (int): Cards returned per column
+        column_order (iterable): Preferred column order; others follow alphabetically
+
+    Returns:
+        list: Columns with value, total, sum, cards, has_more and next_cursor
+    """
+    partition = [F("board_column")]
+    windows = {
+        "board_position": Window(
+            RowNumber(), partition_by=partition, order_by=_order_expressions(ordering)
+        ),
+        "column_total": Window(Count("pk"), partition_by=partition),
+    }
+    if sum_field:
+        windows["column_sum"] = Window(Sum(sum_field), partition_by=partition)
+
+    fields = list(dict.fromkeys([*card_fields, *_field_names(ordering)]))
+    rows = (
+        _with_column(queryset, column_field)
+        .annotate(**windows)
+        .filter(board_position__lte=limit)
+        .values(*fields, "board_column", "board_position", *windows)
+        .order_by("board_column", "board_position")
+    )
+
+    columns = {}
+    for row in rows:
+        column = columns.get(row["board_column"])
+        if column is None:
+            column = columns[row["board_column"]] = {
+                "value": row["board_column"],
+                "total": row["column_total"],
+                "cards": [],
+            }
+            if sum_field:
+                column["sum"] = str(row["column_sum"] or 0)
+        column["cards"].append(build_card(row))
+        column["last_row"] = row
+
+    for column in columns.values():
+        last_row = column.pop("last_row")
+        column["has_more"] = column["total"] > len(column["cards"])
+        column["next_cursor"] = (
+            _cursor_for(last_row, ordering) if column["has_more"] else None
+        )
+
+    preferred = {value: index for index, value in enumerate(column_order)}
+    return sorted(
+        columns.values(),
+        key=lambda column: (
+            preferred.get(column["value"], len(preferred)),
+            column["value"],
+        ),
+    )
+
+
+def get_column_page(
+    queryset,
+    column_field,
+    column_value,
+    ordering,
+    card_fields,
+    build_card,
+    cursor=None,
+    limit=DEFAULT_CARD_LIMIT,
+):
+    """
+    Return the next page of cards for a single column.
+
+    Raises:
+        InvalidCursor: If cursor is malformed
+    """
+    rows = _with_column(queryset, column_field).filter(board_column=column_value)
+    if cursor:
+        values = _cursor_values(
+            queryset.model, ordering, decode_cursor(cursor, len(ordering))
+        )
+        rows = rows.filter(_after_cursor(ordering, values))
+
+    fields = list(dict.fromkeys([*card_fields, *_field_names(ordering)]))
+    rows = list(rows.order_by(*ordering).values(*fields)[: limit + 1])
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "value": column_value,
+        "cards": [build_card(row) for row in rows],
+        "has_more": has_more,
+        "next_cursor": _cursor_for(rows[-1], ordering) if has_more else None,
+    }
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-19 06:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_user_avatar"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tenantemailmapping",
+            name="subscription_id",
+            field=models.CharField(blank=True, max_length=255, null=True, unique=True),
+        ),
+    ]
@@ -57,6 +57,8 @@ class User(AbstractUser):
 class TenantEmailMapping(models.Model):
     email = models.EmailField(unique=True, db_index=True)
     tenant = models.ForeignKey(Client, on_delete=models.CASCADE)
+    # Outlook webhooks carry only the Graph subscription id, not the mailbox
+    subscription_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
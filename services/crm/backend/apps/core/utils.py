@@ -66,6 +66,57 @@ def create_audit_log(user, action, model_name, object_id, changes=None, request=
     return AuditLog.objects.create(**audit_data)
 
 
+def get_int_param(request, name, default, minimum=1, maximum=None):
+    """
+    Parse an integer query param.
+
+    Args:
+        request: DRF request object
+        name (str): Query param name
+        default (int): Value used when the param is missing or empty
+        minimum (int): Smallest accepted value
+        maximum (int, optional): Larger values are capped to this
+
+    Returns:
+        int: Parsed value
+
+    Raises:
+        ValueError: If the value is not an integer or is below minimum
+    """
+    raw_value = request.query_params.get(name)
+    if raw_value in (None, ''):
+        return default
+    return parse_int(raw_value, name, minimum=minimum, maximum=maximum)
+
+
+def parse_int(raw_value, name, minimum=1, maximum=None):
+    """
+    Parse an integer from a query param or request body value.
+
+    Args:
+        raw_value: String from the query string, or a JSON body value
+        name (str): Field name used in error messages
+        minimum (int): Smallest accepted value
+        maximum (int, optional): Larger values are capped to this
+
+    Returns:
+        int: Parsed value
+
+    Raises:
+        ValueError: If the value is not an integer or is below minimum
+    """
+    # JSON true/false and 1.5 would otherwise pass int() silently
+    if isinstance(raw_value, (bool, float)):
+        raise ValueError(f'{name} must be an integer')
+    try:
+        value = int(raw_value)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f'{name} must be an integer') from e
+    if value < minimum:
+        raise ValueError(f'{name} cannot be negative' if minimum == 0 else f'{name} must be at least {minimum}')
+    return value if maximum is None else min(value, maximum)
+
+
 def rate_limit(max_requests=5, window_minutes=1, key_func=None):
     """Simple rate limiting decorator"""
     def decorator(view_func):
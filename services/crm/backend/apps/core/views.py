@@ -7,6 +7,9 @@ from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.tenant_core.permissions import IsTenantUser
+
+from . import batch
 from .authentication import JWTTokenGenerator
 from .models import Client, Domain
 from .serializers import (
@@ -313,3 +316,26 @@ class DashboardStatsView(APIView):
         except Exception as e:
             logger.error(f"Dashboard stats error: {e}")
             return handle_safe_error("Dashboard stats error", status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class BatchView(APIView):
+    """
+    Execute several API requests in one round trip
+
+    Body: {"requests": [{"id", "method", "path", "params", "body"}, ...], "parallel": false}
+    The tenant and user are resolved once for the whole batch; each item
+    gets its own status code in the response.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsTenantUser]
+
+    def post(self, request):
+        try:
+            sub_requests, parallel = batch.parse_batch(request.data)
+        except batch.BatchValidationError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = batch.execute_batch(request, sub_requests, parallel=parallel)
+        return Response({
+            "responses": results,
+            "count": len(results),
+        })
@@ -0,0 +1,191 @@
+"""
+JWT authentication for WebSocket connections
+
+JWTAuthMiddleware authenticates the handshake with the same rules that
+JWTAuthentication applies to HTTP requests:
+- the tenant comes from the Host header (Domain -> Client), never from the
+  client, and inactive tenants are refused;
+- the access token comes from the `token` query parameter (browsers can't
+  set headers on a WebSocket) or an `Authorization: Bearer` header;
+- the token must be an access token for that tenant's schema, and the user
+  must be active and belong to the tenant.
+
+The result is a WebSocketIdentity in scope["identity"], plus scope["user"]
+and scope["tenant"]. It lives as long as the socket, so frames never cause
+an auth lookup. Consumers call recheck_identity every
+WS_AUTH_RECHECK_SECONDS (one query) to catch a disabled user or a revoked
+membership, and close the socket once the token expires.
+
+Successful handshakes are cached per token for WS_AUTH_CACHE_SECONDS, so a
+reconnect storm after a deploy doesn't query the database once per socket.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs
+
+import jwt
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django_tenants.utils import get_public_schema_name, remove_www, schema_context
+
+from .authentication import BEARER_PREFIX
+from .models import Domain
+
+User = get_user_model()
+
+CACHE_MAX_ENTRIES = 10_000
+
+
+class WebSocketIdentity:
+    """Authenticated user and tenant for the life of one socket."""
+
+    def __init__(self, user, tenant, expires_at=None):
+        self.user = user
+        self.tenant = tenant
+        self.expires_at = expires_at  # token exp, epoch seconds
+
+    def seconds_left(self):
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.time()
+
+    def is_expired(self):
+        left = self.seconds_left()
+        return left is not None and left <= 0
+
+
+def _headers(scope):
+    return {name.lower(): value for name, value in scope.get("headers") or []}
+
+
+def handshake_host(scope):
+    host = _headers(scope).get(b"host", b"").decode("latin-1")
+    return remove_www(host.split(":")[0].lower())
+
+
+def handshake_token(scope):
+    query = parse_qs(scope.get("query_string", b"").decode())
+    token = query.get("token", [None])[0]
+    if token:
+        return token
+    auth = _headers(scope).get(b"authorization", b"").decode("latin-1")
+    if auth.startswith(BEARER_PREFIX):
+        return auth[len(BEARER_PREFIX) :]
+    return None
+
+
+def authenticate_handshake(hostname, token):
+    """
+    Validate a handshake token for the tenant serving hostname.
+
+    Returns:
+        WebSocketIdentity | None: None when the token or tenant is not valid
+    """
+    if not token:
+        return None
+    try:
+        payload = jwt.decode(
+            token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
+        )
+    except jwt.InvalidTokenError:
+        return None
+    if payload.get("type") != "access" or not payload.get("user_id"):
+        return None
+
+    with schema_context(get_public_schema_name()):
+        domain = Domain.objects.select_related("tenant").filter(domain=hostname).first()
+        tenant = domain.tenant if domain else None
+        if (
+            tenant is None
+            or not tenant.is_active
+            or tenant.schema_name == get_public_schema_name()
+        ):
+            return None
+        token_schema = payload.get("tenant_schema")
+        if token_schema and token_schema != tenant.schema_name:
+            return None
+        user = User.objects.filter(
+            id=payload["user_id"], is_active=True, tenants=tenant
+        ).first()
+
+    if user is None:
+        return None
+    return WebSocketIdentity(user, tenant, payload.get("exp"))
+
+
+class _IdentityCache:
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            identity, cached_until = entry
+            if cached_until < time.monotonic() or identity.is_expired():
+                del self.entries[key]
+                return None
+            return identity
+
+    def set(self, key, identity, ttl):
+        with self.lock:
+            self.entries[key] = (identity, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > CACHE_MAX_ENTRIES:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_cache = _IdentityCache()
+
+
+@database_sync_to_async
+def get_identity(hostname, token):
+    """authenticate_handshake, cached per (host, token)."""
+    if not token:
+        return None
+    ttl = getattr(settings, "WS_AUTH_CACHE_SECONDS", 30)
+    key = (hostname, hashlib.sha256(token.encode()).hexdigest())
+    identity = _cache.get(key) if ttl else None
+    if identity is None:
+        identity = authenticate_handshake(hostname, token)
+        if identity is not None and ttl:
+            _cache.set(key, identity, ttl)
+    return identity
+
+
+@database_sync_to_async
+def recheck_identity(identity):
+    """True while the user is still active and a member of an active tenant."""
+    with schema_context(get_public_schema_name()):
+        return User.objects.filter(
+            pk=identity.user.pk,
+            is_active=True,
+            tenants=identity.tenant,
+            tenants__is_active=True,
+        ).exists()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """Populate scope identity/user/tenant from the handshake JWT."""
+
+    async def __call__(self, scope, receive, send):
+        identity = await get_identity(handshake_host(scope), handshake_token(scope))
+        scope = dict(
+            scope,
+            identity=identity,
+            user=identity.user if identity else AnonymousUser(),
+            tenant=identity.tenant if identity else None,
+        )
+        return await super().__call__(scope, receive, send)
@@ -6,12 +6,39 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from apps.core.utils import rate_limit
+from apps.core import kanban
+from apps.core.utils import get_int_param, rate_limit
 from apps.tenant_core.permissions import HasTenantPermission, IsTenantUser
 
 from .models import Lead
 from .serializers import LeadCreateSerializer, LeadListSerializer, LeadSerializer
 
+# Kanban board: statuses in funnel order, newest leads first within a column
+LEAD_STATUS_ORDER = ['New', 'Contacted', 'Qualified', 'Proposal', 'Closed']
+LEAD_BOARD_ORDERING = ['-created_at', '-lead_id']
+LEAD_CARD_FIELDS = [
+    'lead_id', 'first_name', 'last_name', 'title', 'email', 'lead_status', 'score', 'company_id',
+    'company_name', 'company__account_name', 'lead_owner_id', 'lead_owner__first_name',
+    'lead_owner__last_name',
+]
+
+
+def _lead_card(row):
+    owner_name = f"{row['lead_owner__first_name'] or ''} {row['lead_owner__last_name'] or ''}".strip()
+    return {
+        'lead_id': row['lead_id'],
+        'full_name': f"{row['first_name']} {row['last_name']}",
+        'title': row['title'],
+        'email': row['email'],
+        'lead_status': row['lead_status'],
+        'score': row['score'],
+        'company_id': row['company_id'],
+        'company_name': row['company__account_name'] or row['company_name'],
+        'lead_owner': row['lead_owner_id'],
+        'lead_owner_name': owner_name or None,
+        'created_at': row['created_at'],
+    }
+
 
 class LeadViewSet(viewsets.ModelViewSet):
     """
@@ -23,7 +50,7 @@ class LeadViewSet(viewsets.ModelViewSet):
         """
         Return required permissions based on action
         """
-        if self.action in ['list', 'retrieve', 'summary', 'company_info', 'by_company', 'by_status']:
+        if self.action in ['list', 'retrieve', 'summary', 'company_info', 'by_company', 'by_status', 'board']:
             # View permissions - allow various viewing roles
             return ['all', 'manage_leads', 'view_customers', 'view_only', 'manage_contacts', 'manage_accounts']
         elif self.action in ['create']:
@@ -384,6 +411,38 @@ class LeadViewSet(viewsets.ModelViewSet):
             'count': leads.count()
         })
 
+    @action(detail=False, methods=['get'])
+    def board(self, request):
+        """
+        Get the lead board: the first cards of every status with status totals
+
+        Query params:
+            limit: cards per column
+            column + cursor: load the next page of a single status
+        """
+        leads = self.get_queryset()
+        column = request.query_params.get('column')
+
+        try:
+            limit = get_int_param(request, 'limit', kanban.DEFAULT_CARD_LIMIT, maximum=kanban.MAX_CARD_LIMIT)
+            if column is not None:
+                return Response(kanban.get_column_page(
+                    leads, 'lead_status', column, LEAD_BOARD_ORDERING, LEAD_CARD_FIELDS, _lead_card,
+                    cursor=request.query_params.get('cursor'), limit=limit,
+                ))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        columns = kanban.get_board(
+            leads, 'lead_status', LEAD_BOARD_ORDERING, LEAD_CARD_FIELDS, _lead_card,
+            limit=limit, column_order=LEAD_STATUS_ORDER,
+        )
+        return Response({
+            'columns': columns,
+            'limit': limit,
+            'total_leads': sum(column['total'] for column in columns),
+        })
+
     @action(detail=True, methods=['post'])
     def convert(self, request, pk=None):
         """
@@ -0,0 +1,257 @@
+"""
+Weighted pipeline forecasting for deals
+
+The database collapses a tenant's deals into (stage, owner, close month)
+groups with a single projected GROUP BY query; the forecast itself is then
+computed with vectorized NumPy operations over those column arrays.
+compute_forecast works equally on raw per-deal arrays (see
+benchmarks/bench_forecast.py).
+"""
+
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import Deal, StageProbability
+
+User = get_user_model()
+
+CLOSED_WON = "Closed Won"
+CLOSED_LOST = "Closed Lost"
+CLOSED_STAGES = (CLOSED_WON, CLOSED_LOST)
+
+# Fallback win probabilities (percent) when a tenant has not configured a stage,
+# in Deal.STAGE_CHOICES order so the keys are the stage values deals store.
+# Stages missing from both this map and the tenant configuration count as 0%.
+DEFAULT_STAGE_PROBABILITIES = {
+    stage: Decimal(percent)
+    for (stage, _label), percent in zip(
+        Deal.STAGE_CHOICES, (10, 20, 30, 40, 50, 75, 100, 0), strict=True
+    )
+}
+
+
+def get_stage_probabilities(tenant):
+    """
+    Return stage -> probability (percent) for a tenant, defaults merged with overrides
+    """
+    probabilities = dict(DEFAULT_STAGE_PROBABILITIES)
+    overrides = StageProbability.objects.filter(tenant=tenant).values_list(
+        "stage", "probability"
+    )
+    probabilities.update(dict(overrides))
+    return probabilities
+
+
+def load_pipeline_arrays(queryset):
+    """
+    Fetch deals as column arrays grouped by (stage, owner, close month).
+
+    Args:
+        queryset: Tenant-scoped Deal queryset (filters are preserved)
+
+    Returns:
+        dict: stage_codes, stage_labels, owner_codes, owner_labels,
+              close_month (datetime64[M]), amount (float64 sums) and
+              count (deals per group)
+    """
+    rows = list(
+        queryset.order_by()
+        .annotate(close_month=TruncMonth("close_date"))
+        .values_list("stage", "owner_id", "close_month")
+        .annotate(total_amount=Sum("amount"), deal_count=Count("deal_id"))
+    )
+
+    stage_index = {}
+    owner_index = {}
+    size = len(rows)
+    stage_codes = np.empty(size, dtype=np.int64)
+    owner_codes = np.empty(size, dtype=np.int64)
+    close_month = np.empty(size, dtype="datetime64[M]")
+    amount = np.empty(size, dtype=np.float64)
+    count = np.empty(size, dtype=np.int64)
+
+    for i, (stage, owner_id, month, total_amount, deal_count) in enumerate(rows):
+        stage_codes[i] = stage_index.setdefault(stage, len(stage_index))
+        owner_codes[i] = owner_index.setdefault(owner_id, len(owner_index))
+        close_month[i] = np.datetime64(month.strftime("%Y-%m"), "M")
+        amount[i] = float(total_amount or 0)
+        count[i] = deal_count
+
+    return {
+        "stage_codes": stage_codes,
+        "stage_labels": list(stage_index),
+        "owner_codes": owner_codes,
+        "owner_labels": list(owner_index),
+        "close_month": close_month,
+        "amount": amount,
+        "count": count,
+    }
+
+
+def _period_rows(keys, labels, count, amount, weighted, won):
+    """Aggregate per-row values into sorted period buckets"""
+    periods, inverse = np.unique(keys, return_inverse=True)
+    size = len(periods)
+    sums = {
+        "deal_count": np.bincount(inverse, weights=count, minlength=size),
+        "amount": np.bincount(inverse, weights=amount, minlength=size),
+        "weighted_amount": np.bincount(inverse, weights=weighted, minlength=size),
+        "closed_won_amount": np.bincount(inverse, weights=won, minlength=size),
+    }
+    return [
+        {
+            "period": labels(period),
+            "deal_count": int(sums["deal_count"][i]),
+            "amount": round(float(sums["amount"][i]), 2),
+            "weighted_amount": round(float(sums["weighted_amount"][i]), 2),
+            "closed_won_amount": round(float(sums["closed_won_amount"][i]), 2),
+        }
+        for i, period in enumerate(periods)
+    ]
+
+
+def _month_label(month_number):
+    year, month = divmod(int(month_number), 12)
+    return f"{1970 + year:04d}-{month + 1:02d}"
+
+
+def _quarter_label(quarter_number):
+    year, quarter = divmod(int(quarter_number), 4)
+    return f"{1970 + year:04d}-Q{quarter + 1}"
+
+
+def compute_forecast(arrays, probabilities):
+    """
+    Compute weighted pipeline, period buckets and owner breakdown.
+
+    Args:
+        arrays (dict): Column arrays as produced by load_pipeline_arrays.
+            count may be omitted for raw per-deal arrays.
+        probabilities (dict): stage -> win probability in percent
+
+    Returns:
+        dict: totals, by_stage, monthly, quarterly and by_owner sections
+    """
+    stage_codes = arrays["stage_codes"]
+    stage_labels = arrays["stage_labels"]
+    owner_codes = arrays["owner_codes"]
+    amount = arrays["amount"]
+    count = arrays.get("count")
+    if count is None:
+        count = np.ones(len(amount), dtype=np.int64)
+
+    # Per-stage lookup tables, then broadcast to rows with a single take()
+    stage_probability = np.array(
+        [float(probabilities.get(stage, 0)) / 100.0 for stage in stage_labels],
+        dtype=np.float64,
+    )
+    stage_is_won = np.array([stage == CLOSED_WON for stage in stage_labels], dtype=bool)
+    stage_is_open = np.array(
+        [stage not in CLOSED_STAGES for stage in stage_labels], dtype=bool
+    )
+
+    is_open = stage_is_open[stage_codes]
+    is_won = stage_is_won[stage_codes]
+    probability = stage_probability[stage_codes]
+
+    open_amount = np.where(is_open, amount, 0.0)
+    weighted = open_amount * probability
+    won_amount = np.where(is_won, amount, 0.0)
+    open_count = np.where(is_open, count, 0)
+
+    # Stage breakdown
+    stage_size = len(stage_labels)
+    stage_count = np.bincount(stage_codes, weights=count, minlength=stage_size)
+    stage_amount = np.bincount(stage_codes, weights=amount, minlength=stage_size)
+    stage_weighted = np.bincount(
+        stage_codes, weights=amount * probability, minlength=stage_size
+    )
+    by_stage = sorted(
+        (
+            {
+                "stage": stage,
+                "probability": round(float(stage_probability[i]) * 100, 2),
+                "is_open": bool(stage_is_open[i]),
+                "deal_count": int(stage_count[i]),
+                "amount": round(float(stage_amount[i]), 2),
+                "weighted_amount": round(float(stage_weighted[i]), 2),
+            }
+            for i, stage in enumerate(stage_labels)
+        ),
+        key=lambda row: (row["probability"], row["stage"]),
+    )
+
+    # Period buckets (open pipeline plus closed-won revenue per period)
+    month_number = arrays["close_month"].astype("datetime64[M]").astype(np.int64)
+    counted = np.where(is_open | is_won, count, 0)
+    monthly = _period_rows(
+        month_number, _month_label, counted, open_amount, weighted, won_amount
+    )
+    quarterly = _period_rows(
+        month_number // 3, _quarter_label, counted, open_amount, weighted, won_amount
+    )
+
+    # Owner breakdown
+    owner_labels = arrays["owner_labels"]
+    owner_size = len(owner_labels)
+    owner_count = np.bincount(owner_codes, weights=open_count, minlength=owner_size)
+    owner_amount = np.bincount(owner_codes, weights=open_amount, minlength=owner_size)
+    owner_weighted = np.bincount(owner_codes, weights=weighted, minlength=owner_size)
+    owner_won = np.bincount(owner_codes, weights=won_amount, minlength=owner_size)
+    by_owner = sorted(
+        (
+            {
+                "owner_id": owner_id,
+                "open_deal_count": int(owner_count[i]),
+                "amount": round(float(owner_amount[i]), 2),
+                "weighted_amount": round(float(owner_weighted[i]), 2),
+                "closed_won_amount": round(float(owner_won[i]), 2),
+            }
+            for i, owner_id in enumerate(owner_labels)
+        ),
+        key=lambda row: row["weighted_amount"],
+        reverse=True,
+    )
+
+    return {
+        "totals": {
+            "deal_count": int(count.sum()),
+            "open_deal_count": int(open_count.sum()),
+            "pipeline_value": round(float(open_amount.sum()), 2),
+            "weighted_pipeline": round(float(weighted.sum()), 2),
+            "closed_won_value": round(float(won_amount.sum()), 2),
+        },
+        "by_stage": by_stage,
+        "monthly": monthly,
+        "quarterly": quarterly,
+        "by_owner": by_owner,
+    }
+
+
+def build_forecast(queryset, tenant):
+    """
+    Run the full forecast for a tenant-scoped Deal queryset
+    """
+    probabilities = get_stage_probabilities(tenant)
+    forecast = compute_forecast(load_pipeline_arrays(queryset), probabilities)
+
+    # Resolve owner names for the (small) set of owners in one query
+    owner_ids = [row["owner_id"] for row in forecast["by_owner"] if row["owner_id"]]
+    owner_names = {
+        user_id: f"{first_name} {last_name}".strip()
+        for user_id, first_name, last_name in User.objects.filter(
+            id__in=owner_ids
+        ).values_list("id", "first_name", "last_name")
+    }
+    for row in forecast["by_owner"]:
+        row["owner_name"] = owner_names.get(row["owner_id"])
+
+    forecast["stage_probabilities"] = {
+        stage: float(probability)
+        for stage, probability in sorted(probabilities.items())
+    }
+    return forecast
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.15 on 2026-10-19 04:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_user_avatar"),
+        ("opportunities", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StageProbability",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("stage", models.CharField(max_length=100)),
+                ("probability", models.DecimalField(decimal_places=2, max_digits=5)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        db_column="tenant_id",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="deal_stage_probabilities",
+                        to="core.client",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Stage Probability",
+                "verbose_name_plural": "Stage Probabilities",
+                "db_table": "deal_stage_probability",
+                "ordering": ["stage"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("tenant", "stage"),
+                        name="uniq_stage_probability_tenant_stage",
+                    )
+                ],
+            },
+        ),
+    ]
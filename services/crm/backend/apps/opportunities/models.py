@@ -32,6 +32,19 @@ class TenantDealManager(models.Manager):
 class Deal(models.Model):
     """Django ORM model for the DEAL table with account name and owner alias."""
 
+    # Pipeline stages offered by the deal form, in pipeline order. Not enforced
+    # on the field: imported and converted deals may carry other stage names.
+    STAGE_CHOICES = [
+        ('Prospecting', 'Prospecting'),
+        ('Qualification', 'Qualification'),
+        ('Need Analysis', 'Need Analysis'),
+        ('Value Proposition', 'Value Proposition'),
+        ('Proposal', 'Proposal'),
+        ('Negotiation', 'Negotiation'),
+        ('Closed Won', 'Closed Won'),
+        ('Closed Lost', 'Closed Lost'),
+    ]
+
     deal_id = models.AutoField(primary_key=True)
 
     tenant = models.ForeignKey(
@@ -123,6 +136,37 @@ class Deal(models.Model):
         return f"{self.deal_name} ({self.stage})"
 
 
+class StageProbability(models.Model):
+    """Per-tenant win probability (0-100) for a deal stage, used by the forecast."""
+
+    tenant = models.ForeignKey(
+        'core.Client',
+        on_delete=models.CASCADE,
+        related_name='deal_stage_probabilities',
+        db_column='tenant_id',
+    )
+    stage = models.CharField(max_length=100)
+    probability = models.DecimalField(max_digits=5, decimal_places=2)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Same tenant isolation as deals
+    objects = TenantDealManager()
+
+    class Meta:
+        db_table = 'deal_stage_probability'
+        verbose_name = 'Stage Probability'
+        verbose_name_plural = 'Stage Probabilities'
+        ordering = ['stage']
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'stage'], name='uniq_stage_probability_tenant_stage'),
+        ]
+
+    def __str__(self):
+        return f"{self.stage}: {self.probability}%"
+
+
 class DealForm(forms.ModelForm):
     """Form for creating and updating Deal instances, including account name and owner alias."""
 
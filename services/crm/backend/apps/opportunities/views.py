@@ -1,4 +1,6 @@
-from datetime import timedelta
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
 
 # Removed cache_page import - caching disabled for immediate data updates
 from django.db.models import Avg, Count, Sum
@@ -9,10 +11,16 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from apps.core.utils import rate_limit
-from apps.tenant_core.permissions import HasTenantPermission, IsTenantUser
+from apps.core import kanban
+from apps.core.utils import get_int_param, rate_limit
+from apps.tenant_core.permissions import (
+    HasTenantPermission,
+    IsTenantUser,
+    TenantManagerRequired,
+)
 
-from .models import Deal
+from . import forecast as forecasting
+from .models import Deal, StageProbability
 from .serializers import (
     DealCreateSerializer,
     DealListSerializer,
@@ -20,6 +28,28 @@ from .serializers import (
     DealSummarySerializer,
 )
 
+# Kanban board cards: soonest closing first, deal_id keeps the keyset unique
+DEAL_BOARD_ORDERING = ['close_date', 'deal_id']
+DEAL_CARD_FIELDS = [
+    'deal_id', 'deal_name', 'stage', 'amount', 'close_date', 'account_id', 'account_name',
+    'account__account_name', 'owner_id', 'owner__first_name', 'owner__last_name', 'deal_owner_alias',
+]
+
+
+def _deal_card(row):
+    owner_name = f"{row['owner__first_name'] or ''} {row['owner__last_name'] or ''}".strip()
+    return {
+        'deal_id': row['deal_id'],
+        'deal_name': row['deal_name'],
+        'stage': row['stage'],
+        'amount': str(row['amount']),
+        'close_date': row['close_date'],
+        'account_id': row['account_id'],
+        'account_name': row['account__account_name'] or row['account_name'],
+        'owner_id': row['owner_id'],
+        'owner': owner_name or row['deal_owner_alias'],
+    }
+
 
 class DealViewSet(viewsets.ModelViewSet):
     """
@@ -37,6 +67,16 @@ class DealViewSet(viewsets.ModelViewSet):
             'tenant', 'account', 'owner', 'created_by', 'updated_by', 'primary_contact'
         )
 
+    def get_permissions(self):
+        """
+        Stage probabilities weight every forecast in the tenant, so only
+        managers and admins may change them
+        """
+        permissions = super().get_permissions()
+        if self.action == 'stage_probabilities' and self.request.method == 'PUT':
+            permissions.append(TenantManagerRequired())
+        return permissions
+
     def get_serializer_class(self):
         """
         Return appropriate serializer based on action
@@ -134,6 +174,38 @@ class DealViewSet(viewsets.ModelViewSet):
             'total_deals': deals.count()
         })
 
+    @action(detail=False, methods=['get'])
+    def board(self, request):
+        """
+        Get the deal pipeline board: the first cards of every stage with stage totals
+
+        Query params:
+            limit: cards per column
+            column + cursor: load the next page of a single stage
+        """
+        deals = self.get_queryset()
+        column = request.query_params.get('column')
+
+        try:
+            limit = get_int_param(request, 'limit', kanban.DEFAULT_CARD_LIMIT, maximum=kanban.MAX_CARD_LIMIT)
+            if column is not None:
+                return Response(kanban.get_column_page(
+                    deals, 'stage', column, DEAL_BOARD_ORDERING, DEAL_CARD_FIELDS, _deal_card,
+                    cursor=request.query_params.get('cursor'), limit=limit,
+                ))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        columns = kanban.get_board(
+            deals, 'stage', DEAL_BOARD_ORDERING, DEAL_CARD_FIELDS, _deal_card,
+            sum_field='amount', limit=limit, column_order=[stage for stage, _ in Deal.STAGE_CHOICES],
+        )
+        return Response({
+            'columns': columns,
+            'limit': limit,
+            'total_deals': sum(column['total'] for column in columns),
+        })
+
     @action(detail=False, methods=['get'])
     def by_account(self, request):
         """
@@ -220,6 +292,86 @@ class DealViewSet(viewsets.ModelViewSet):
         serializer = DealSummarySerializer(summary_data)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def forecast(self, request):
+        """
+        Get the weighted pipeline forecast with monthly, quarterly and owner breakdowns
+
+        Query params:
+            date_from / date_to: close date window (YYYY-MM-DD, inclusive)
+            owner: restrict to a single owner id
+        """
+        deals = self.get_queryset()
+
+        try:
+            date_from = request.query_params.get('date_from')
+            if date_from:
+                deals = deals.filter(close_date__gte=datetime.strptime(date_from, '%Y-%m-%d').date())
+            date_to = request.query_params.get('date_to')
+            if date_to:
+                deals = deals.filter(close_date__lte=datetime.strptime(date_to, '%Y-%m-%d').date())
+        except ValueError:
+            return Response({
+                'error': 'date_from and date_to must use the YYYY-MM-DD format'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        owner = request.query_params.get('owner')
+        if owner:
+            try:
+                owner = str(uuid.UUID(owner))
+            except ValueError:
+                return Response({
+                    'error': 'owner must be a user id'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            deals = deals.filter(owner_id=owner)
+
+        forecast = forecasting.build_forecast(deals, request.tenant)
+        forecast['filters'] = {
+            'date_from': date_from,
+            'date_to': date_to,
+            'owner': owner,
+        }
+        return Response(forecast)
+
+    @action(detail=False, methods=['get', 'put'])
+    def stage_probabilities(self, request):
+        """
+        Get or update the tenant's per-stage win probabilities used by the forecast
+        """
+        if request.method == 'PUT':
+            probabilities = request.data.get('probabilities')
+            if not isinstance(probabilities, dict) or not probabilities:
+                return Response({
+                    'error': 'probabilities must be a non-empty mapping of stage to percent'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            rows = []
+            for stage, value in probabilities.items():
+                try:
+                    probability = Decimal(str(value))
+                except InvalidOperation:
+                    probability = None
+                if not stage or probability is None or not probability.is_finite() or not (0 <= probability <= 100):
+                    return Response({
+                        'error': f'Invalid probability for stage "{stage}". Use a number between 0 and 100.'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                rows.append(StageProbability(tenant=request.tenant, stage=stage[:100], probability=probability))
+
+            StageProbability.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['tenant', 'stage'],
+                update_fields=['probability', 'updated_at'],
+            )
+
+        probabilities = forecasting.get_stage_probabilities(request.tenant)
+        return Response({
+            'stage_probabilities': {
+                stage: float(probability) for stage, probability in sorted(probabilities.items())
+            },
+            'tenant': request.tenant.name if request.tenant else None,
+        })
+
     @action(detail=True, methods=['get'])
     def contacts(self, request, pk=None):
         """
@@ -1,48 +1,152 @@
+import asyncio
 import json
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+from django_tenants.utils import schema_context
 from urllib.parse import parse_qs
 
+from apps.core.ws_auth import recheck_identity
+from .services.event_log import get_event_log
+from .services.realtime import inbox_group, member_inbox_ids, user_group
+
+# Close codes: the client should refresh its token / stop retrying
+CLOSE_UNAUTHENTICATED = 4401
+CLOSE_FORBIDDEN = 4403
+
+
+@database_sync_to_async
+def load_inbox_ids(tenant, user_id):
+    """Inbox ids of a user's TeamMember assignments in a tenant."""
+    with schema_context(tenant.schema_name):
+        return set(member_inbox_ids(user_id))
+
+
+def _parse_seq(value):
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
 
 class InboxConsumer(AsyncWebsocketConsumer):
     async def connect(self):
+        self.inbox_ids = set()
+        self.pending_events = []
+        self.flush_task = None
+        self.auth_task = None
+        self.replayed_through = 0
+        self.group_name = None
+        self.user_group_name = None
+
+        # Set by JWTAuthMiddleware from the handshake token and host
+        self.identity = self.scope.get("identity")
+        if self.identity is None:
+            # Accept first so the client sees the close code and refreshes
+            await self.accept()
+            await self.close(code=CLOSE_UNAUTHENTICATED)
+            return
+
         try:
-            # Extract tenant ID and optional user_id from query string
-            query_string = self.scope.get("query_string", b"").decode()
-            query_params = parse_qs(query_string)
-            tenant_id = query_params.get("tenant", [None])[0]
-            user_id = query_params.get("user_id", [None])[0]
-
-            # Tenant group
-            self.group_name = f"tenant_{tenant_id}" if tenant_id else "tenant_default"
+            query_params = parse_qs(self.scope.get("query_string", b"").decode())
+            resume_from = _parse_seq(query_params.get("resume_from", [None])[0])
+
+            self.tenant = self.identity.tenant
+            self.tenant_id, self.user_id = self.tenant.id, self.identity.user.id
+
+            # Tenant and per-user groups
+            self.group_name = f"tenant_{self.tenant_id}"
             await self.channel_layer.group_add(self.group_name, self.channel_name)
+            self.user_group_name = user_group(self.user_id)
+            await self.channel_layer.group_add(self.user_group_name, self.channel_name)
 
-            # Optional per-user group
-            self.user_group_name = None
-            if user_id:
-                self.user_group_name = f"user_{user_id}"
-                await self.channel_layer.group_add(self.user_group_name, self.channel_name)
+            # Per-inbox groups for message deltas
+            await self.join_inbox_groups()
 
             await self.accept()
+            self.auth_task = asyncio.ensure_future(self.watch_auth())
 
-            # Send system acknowledgment
+            # Send system acknowledgment, with the current event sequence
             await self.send(text_data=json.dumps({
                 "type": "system",
-                "message": f"Connected to tenant group: {self.group_name}, user_group: {self.user_group_name}"
+                "message": f"Connected to tenant group: {self.group_name}, user_group: {self.user_group_name}",
+                "seq": await sync_to_async(get_event_log().last_seq)(self.tenant_id),
             }))
+
+            if resume_from is not None:
+                await self.replay(resume_from)
         except Exception as e:
             await self.close()
 
     async def disconnect(self, close_code):
         try:
-            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            for task in (self.flush_task, self.auth_task):
+                if task and task is not asyncio.current_task():
+                    task.cancel()
+            if self.group_name:
+                await self.channel_layer.group_discard(self.group_name, self.channel_name)
             if self.user_group_name:
                 await self.channel_layer.group_discard(self.user_group_name, self.channel_name)
+            for inbox_id in self.inbox_ids:
+                await self.channel_layer.group_discard(inbox_group(self.tenant_id, inbox_id), self.channel_name)
         except Exception:
             pass
 
+    async def watch_auth(self):
+        """
+        Keep the handshake identity honest without touching frames: close at
+        token expiry, and recheck user/tenant status every
+        WS_AUTH_RECHECK_SECONDS with a single query.
+        """
+        interval = settings.WS_AUTH_RECHECK_SECONDS
+        while True:
+            left = self.identity.seconds_left()
+            await asyncio.sleep(interval if left is None else max(0, min(interval, left)))
+            if self.identity.is_expired():
+                await self.close(code=CLOSE_UNAUTHENTICATED)
+                return
+            if not await recheck_identity(self.identity):
+                await self.close(code=CLOSE_FORBIDDEN)
+                return
+
+    async def join_inbox_groups(self):
+        inbox_ids = await load_inbox_ids(self.tenant, self.user_id)
+        for inbox_id in inbox_ids - self.inbox_ids:
+            await self.channel_layer.group_add(inbox_group(self.tenant_id, inbox_id), self.channel_name)
+        for inbox_id in self.inbox_ids - inbox_ids:
+            await self.channel_layer.group_discard(inbox_group(self.tenant_id, inbox_id), self.channel_name)
+        self.inbox_ids = inbox_ids
+
+    async def replay(self, after_seq):
+        """
+        Send the events this socket's inboxes missed since after_seq, or
+        resync_required when the log can't cover the gap. Groups are joined
+        before the log is read, so nothing falls between replay and live
+        delivery; live events the replay already covered are dropped.
+        """
+        log = get_event_log()
+        limit = settings.INBOX_WS_REPLAY_MAX_EVENTS
+        events = await sync_to_async(log.read_since)(self.tenant_id, after_seq, limit)
+        if events is None:
+            last = await sync_to_async(log.last_seq)(self.tenant_id)
+            self.replayed_through = last
+            await self.send(text_data=json.dumps({"type": "resync_required", "seq": last}))
+            return
+
+        self.replayed_through = events[-1]["seq"] if events else after_seq
+        await self.send(text_data=json.dumps({
+            "type": "inbox_replay",
+            "events": [event for event in events if event.get("inboxId") in self.inbox_ids],
+            "seq": self.replayed_through,
+        }))
+
     async def receive(self, text_data=None, bytes_data=None):
         try:
             data = json.loads(text_data)
+            if data.get("type") == "resume":
+                await self.replay(_parse_seq(data.get("from")) or 0)
+                return
             message = data.get("message", "")
             # Broadcast to tenant group
             await self.channel_layer.group_send(
@@ -72,19 +176,32 @@ class InboxConsumer(AsyncWebsocketConsumer):
             "message": event["message"]
         }))
 
-    async def new_conversation(self, event):
-        await self.send(text_data=json.dumps({
-            "type": "new_conversation",
-            "message": {
-                "conversation": event["message"]["conversation"]
-            }
-        }))
+    # Message deltas, merged over INBOX_WS_COALESCE_MS into one frame
+    async def inbox_events(self, event):
+        self.pending_events.extend(
+            e for e in event["events"] if e.get("seq") is None or e["seq"] > self.replayed_through
+        )
+        if not self.pending_events:
+            return
+        if self.flush_task is None:
+            self.flush_task = asyncio.ensure_future(self.flush_events())
 
-    async def new_message(self, event):
-        await self.send(text_data=json.dumps({
-            "type": "new_message",
-            "message": event["message"]
-        }))
+    async def flush_events(self):
+        await asyncio.sleep(settings.INBOX_WS_COALESCE_MS / 1000)
+        events, self.pending_events = self.pending_events, []
+        self.flush_task = None
+        seq = max((e["seq"] for e in events if e.get("seq") is not None), default=None)
+        if len(events) > settings.INBOX_WS_MAX_EVENTS_PER_FRAME:
+            # Mail storm: tell the client to refetch rather than replay
+            await self.send(text_data=json.dumps({
+                "type": "inbox_events", "overflow": True, "count": len(events), "seq": seq
+            }))
+        else:
+            await self.send(text_data=json.dumps({"type": "inbox_events", "events": events, "seq": seq}))
+
+    # TeamMember inbox assignments changed
+    async def inbox_membership(self, event):
+        await self.join_inbox_groups()
 
     # Notification handler for per-user or broadcast notifications
     async def notification_message(self, event):
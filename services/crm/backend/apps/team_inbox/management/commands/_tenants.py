@@ -0,0 +1,13 @@
+from django_tenants.utils import get_public_schema_name
+
+from apps.core.models import Client
+
+
+def active_tenants(schema_names=None):
+    """Active tenant clients (public schema excluded), optionally limited to schema_names."""
+    tenants = Client.objects.filter(is_active=True).exclude(
+        schema_name=get_public_schema_name()
+    )
+    if schema_names:
+        tenants = tenants.filter(schema_name__in=schema_names)
+    return list(tenants.order_by("schema_name"))
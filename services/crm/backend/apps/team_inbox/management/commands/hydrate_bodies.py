@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django_tenants.utils import schema_context
+
+from ...services.body_hydration import hydrate_pending
+from ._tenants import active_tenants
+
+
+class Command(BaseCommand):
+    help = "Fetch bodies of messages ingested metadata-first (lazy_bodies inboxes), newest first, at low priority."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Make a single pass over all tenants and exit.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Messages per tenant per pass (INBOX_HYDRATE_BATCH_SIZE).",
+        )
+        parser.add_argument(
+            "--sleep", type=float, default=10.0, help="Sleep between passes (seconds)."
+        )
+        parser.add_argument(
+            "--tenant",
+            action="append",
+            dest="tenants",
+            help="Limit to schema name (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            hydrated = failed = 0
+            for tenant in active_tenants(options["tenants"]):
+                with schema_context(tenant.schema_name):
+                    done, errors = hydrate_pending(limit=options["batch_size"])
+                hydrated += done
+                failed += errors
+
+            if hydrated or failed:
+                self.stdout.write(
+                    f"Hydrated {hydrated} message bodies ({failed} failed)"
+                )
+
+            if options["once"]:
+                break
+            # Always pause: live ingest has priority over the provider quota
+            time.sleep(options["sleep"])
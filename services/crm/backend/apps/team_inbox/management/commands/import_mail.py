@@ -0,0 +1,113 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django_tenants.utils import schema_context
+
+from ...models import Inbox
+from ...services.mail_import import format_report, import_archive, process_mail_imports
+from ._tenants import active_tenants
+
+
+class Command(BaseCommand):
+    help = (
+        "Import an MBOX/EML archive into an inbox (import_mail PATH --tenant SCHEMA --inbox ID), "
+        "or run uploaded imports (import_mail --queued)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", nargs="?", help="MBOX, EML, gzip or zip archive to import."
+        )
+        parser.add_argument(
+            "--inbox", help="Inbox id or name the archive is imported into."
+        )
+        parser.add_argument(
+            "--queued",
+            action="store_true",
+            help="Run imports uploaded through the API.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Parser processes (default INBOX_IMPORT_WORKERS).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Messages per write (default INBOX_IMPORT_BATCH_SIZE).",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="With --queued: make a single pass and exit.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=10.0,
+            help="With --queued: idle sleep between passes.",
+        )
+        parser.add_argument(
+            "--tenant",
+            action="append",
+            dest="tenants",
+            help="Limit to schema name (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        if options["queued"]:
+            return self.run_queued(options)
+        if not options["path"] or not options["inbox"]:
+            raise CommandError("Give an archive PATH and --inbox, or --queued")
+        tenants = active_tenants(options["tenants"])
+        if len(tenants) != 1:
+            raise CommandError("Name exactly one tenant with --tenant")
+
+        tenant = tenants[0]
+        with schema_context(tenant.schema_name):
+            inbox = self.find_inbox(options["inbox"])
+            with open(options["path"], "rb") as archive:
+                report = import_archive(
+                    archive,
+                    inbox,
+                    tenant,
+                    workers=options["workers"],
+                    batch_size=options["batch_size"],
+                    progress=self.show_progress,
+                )
+        self.stdout.write(f"Imported into {inbox.name}: {format_report(report)}")
+
+    def find_inbox(self, value):
+        try:
+            return Inbox.objects.get(pk=uuid.UUID(value))
+        except (ValueError, Inbox.DoesNotExist):
+            pass
+        inbox = Inbox.objects.filter(name=value).first()
+        if inbox is None:
+            raise CommandError(f"No inbox {value!r}")
+        return inbox
+
+    def show_progress(self, report):
+        if self.verbosity > 1:
+            self.stdout.write(format_report(report))
+
+    def run_queued(self, options):
+        while True:
+            done = failed = 0
+            for tenant in active_tenants(options["tenants"]):
+                with schema_context(tenant.schema_name):
+                    ran, errors = process_mail_imports(
+                        tenant, workers=options["workers"]
+                    )
+                done += ran
+                failed += errors
+
+            if done or failed:
+                self.stdout.write(f"Ran {done} mail imports ({failed} failed)")
+
+            if options["once"]:
+                break
+            if not done:
+                time.sleep(options["sleep"])
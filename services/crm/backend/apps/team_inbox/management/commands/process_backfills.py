@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django_tenants.utils import schema_context
+
+from ...services.backfill import process_backfills
+from ._tenants import active_tenants
+
+
+class Command(BaseCommand):
+    help = "Import existing mail for newly connected mailboxes (resumable; run several workers for more throughput)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Make a single pass over all tenants and exit.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10,
+            help="Max work units per tenant per pass.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=5.0,
+            help="Idle sleep between passes (seconds).",
+        )
+        parser.add_argument(
+            "--tenant",
+            action="append",
+            dest="tenants",
+            help="Limit to schema name (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            units = failed = 0
+            for tenant in active_tenants(options["tenants"]):
+                with schema_context(tenant.schema_name):
+                    done, errors = process_backfills(
+                        tenant, limit=options["batch_size"]
+                    )
+                units += done
+                failed += errors
+
+            if units or failed:
+                self.stdout.write(f"Ran {units} backfill work units ({failed} failed)")
+
+            if options["once"]:
+                break
+            if not units:
+                time.sleep(options["sleep"])
@@ -0,0 +1,67 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django_tenants.utils import schema_context
+
+from ...services import ingest_queue
+from ._tenants import active_tenants
+
+
+class Command(BaseCommand):
+    help = "Drain the mailbox ingest queue for every tenant (run several workers for more throughput)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Make a single pass over all tenants and exit.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=50, help="Max jobs per tenant per pass."
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2.0,
+            help="Idle sleep between passes (seconds).",
+        )
+        parser.add_argument(
+            "--tenant",
+            action="append",
+            dest="tenants",
+            help="Limit to schema name (repeatable).",
+        )
+        parser.add_argument(
+            "--stats",
+            action="store_true",
+            help="Print queue depth/lag metrics and exit.",
+        )
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            for tenant in active_tenants(options["tenants"]):
+                with schema_context(tenant.schema_name):
+                    metrics = ingest_queue.queue_metrics()
+                self.stdout.write(f"{tenant.schema_name}: {json.dumps(metrics)}")
+            return
+
+        while True:
+            processed = failed = 0
+            for tenant in active_tenants(options["tenants"]):
+                with schema_context(tenant.schema_name):
+                    done, errors = ingest_queue.process_available_jobs(
+                        tenant, limit=options["batch_size"]
+                    )
+                processed += done
+                failed += errors
+
+            if processed or failed:
+                self.stdout.write(
+                    f"Processed {processed} ingest jobs ({failed} failed)"
+                )
+
+            if options["once"]:
+                break
+            if not processed:
+                time.sleep(options["sleep"])
@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django_tenants.utils import schema_context
+
+from ...services import outbox
+from ...services.smtp_pool import get_smtp_pool
+from ._tenants import active_tenants
+
+
+class Command(BaseCommand):
+    help = "Send queued outgoing mail for every tenant over reused SMTP sessions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Make a single pass over all tenants and exit.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Max messages per tenant per pass.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=1.0,
+            help="Idle sleep between passes (seconds).",
+        )
+        parser.add_argument(
+            "--tenant",
+            action="append",
+            dest="tenants",
+            help="Limit to schema name (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        if not outbox.outbox_configured():
+            raise CommandError(
+                "Outgoing mail is disabled: set SMTP_SERVER and SMTP_USER"
+            )
+        pool = get_smtp_pool()
+        try:
+            while True:
+                sent = failed = 0
+                for tenant in active_tenants(options["tenants"]):
+                    with schema_context(tenant.schema_name):
+                        done, errors = outbox.process_outbox(
+                            tenant, limit=options["batch_size"], pool=pool
+                        )
+                    sent += done
+                    failed += errors
+
+                if sent or failed:
+                    self.stdout.write(f"Sent {sent} emails ({failed} failed)")
+
+                if options["once"]:
+                    break
+                if not sent:
+                    time.sleep(options["sleep"])
+        finally:
+            pool.close()
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django_tenants.utils import schema_context
+
+from ...services.notifications import purge_notifications
+from ._tenants import active_tenants
+
+
+class Command(BaseCommand):
+    help = "Delete expired notifications for every tenant (run daily)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--read-days", type=int, help="Keep read notifications this many days."
+        )
+        parser.add_argument(
+            "--unread-days", type=int, help="Keep unread notifications this many days."
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=5000, help="Rows per DELETE."
+        )
+        parser.add_argument(
+            "--tenant",
+            action="append",
+            dest="tenants",
+            help="Limit to schema name (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for tenant in active_tenants(options["tenants"]):
+            with schema_context(tenant.schema_name):
+                deleted = purge_notifications(
+                    read_days=options["read_days"],
+                    unread_days=options["unread_days"],
+                    batch_size=options["batch_size"],
+                )
+            if deleted:
+                self.stdout.write(
+                    f"{tenant.schema_name}: deleted {deleted} notifications"
+                )
+            total += deleted
+        self.stdout.write(f"Deleted {total} expired notifications")
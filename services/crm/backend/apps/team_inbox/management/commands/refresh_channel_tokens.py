@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django_tenants.utils import schema_context
+
+from ...services.provider_clients import refresh_expiring_tokens
+from ._tenants import active_tenants
+
+
+class Command(BaseCommand):
+    help = "Refresh channel OAuth tokens ahead of expiry for every tenant (run one instance)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Make a single pass over all tenants and exit.",
+        )
+        parser.add_argument(
+            "--interval", type=float, default=60.0, help="Seconds between passes."
+        )
+        parser.add_argument(
+            "--margin",
+            type=int,
+            help="Refresh tokens expiring within this many seconds.",
+        )
+        parser.add_argument(
+            "--tenant",
+            action="append",
+            dest="tenants",
+            help="Limit to schema name (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            refreshed = failed = 0
+            for tenant in active_tenants(options["tenants"]):
+                with schema_context(tenant.schema_name):
+                    done, errors = refresh_expiring_tokens(margin=options["margin"])
+                refreshed += done
+                failed += errors
+
+            if refreshed or failed:
+                self.stdout.write(f"Refreshed {refreshed} tokens ({failed} failed)")
+
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
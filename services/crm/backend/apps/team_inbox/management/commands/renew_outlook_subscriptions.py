@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django_tenants.utils import schema_context
+
+from ...services.outlook_sync import renew_outlook_subscriptions
+from ._tenants import active_tenants
+
+
+class Command(BaseCommand):
+    help = "Renew Outlook webhook subscriptions ahead of expiry for every tenant (run one instance)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Make a single pass over all tenants and exit.",
+        )
+        parser.add_argument(
+            "--interval", type=float, default=300.0, help="Seconds between passes."
+        )
+        parser.add_argument(
+            "--margin",
+            type=int,
+            help="Renew subscriptions expiring within this many minutes.",
+        )
+        parser.add_argument(
+            "--tenant",
+            action="append",
+            dest="tenants",
+            help="Limit to schema name (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            renewed = failed = 0
+            for tenant in active_tenants(options["tenants"]):
+                with schema_context(tenant.schema_name):
+                    done, errors = renew_outlook_subscriptions(
+                        margin_minutes=options["margin"]
+                    )
+                renewed += done
+                failed += errors
+
+            if renewed or failed:
+                self.stdout.write(
+                    f"Renewed {renewed} Outlook subscriptions ({failed} failed)"
+                )
+
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
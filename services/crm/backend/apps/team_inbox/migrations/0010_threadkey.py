@@ -0,0 +1,47 @@
+# Generated by Django 5.1.15 on 2026-10-19 04:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("team_inbox", "0009_ingestjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ThreadKey",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("message_id", "Message-ID"),
+                            ("thread", "Provider thread"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("key", models.CharField(max_length=255)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "conversation",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="thread_keys",
+                        to="team_inbox.conversation",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("kind", "key"), name="uniq_thread_key"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+from django.db import migrations
+
+BATCH_SIZE = 2000
+MAX_KEY_LENGTH = 255
+
+
+def backfill_thread_keys(apps, schema_editor):
+    """Index existing conversation thread ids and message/reference ids."""
+    Conversation = apps.get_model("team_inbox", "Conversation")
+    Message = apps.get_model("team_inbox", "Message")
+    ThreadKey = apps.get_model("team_inbox", "ThreadKey")
+
+    def flush(rows):
+        ThreadKey.objects.bulk_create(rows.values(), ignore_conflicts=True)
+        rows.clear()
+
+    def add(rows, kind, key, conversation_id):
+        key = (key or "").strip()
+        if key and len(key) <= MAX_KEY_LENGTH:
+            rows.setdefault(
+                (kind, key),
+                ThreadKey(kind=kind, key=key, conversation_id=conversation_id),
+            )
+
+    rows = {}
+    conversations = Conversation.objects.order_by("created_at").values_list(
+        "id", "thread_id"
+    )
+    for conversation_id, thread_id in conversations.iterator(chunk_size=BATCH_SIZE):
+        add(rows, "thread", thread_id, conversation_id)
+        if len(rows) >= BATCH_SIZE:
+            flush(rows)
+    flush(rows)
+
+    messages = (
+        Message.objects.filter(conversation__isnull=False)
+        .order_by("timestamp")
+        .values_list("conversation_id", "message_id", "thread_id", "references")
+    )
+    for conversation_id, message_id, thread_id, references in messages.iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        add(rows, "thread", thread_id, conversation_id)
+        add(rows, "message_id", message_id, conversation_id)
+        for ref in references if isinstance(references, list) else []:
+            add(
+                rows,
+                "message_id",
+                ref if isinstance(ref, str) else None,
+                conversation_id,
+            )
+        if len(rows) >= BATCH_SIZE:
+            flush(rows)
+    flush(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("team_inbox", "0010_threadkey"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_thread_keys, migrations.RunPython.noop),
+    ]
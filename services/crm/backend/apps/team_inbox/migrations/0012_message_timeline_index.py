@@ -0,0 +1,22 @@
+# Generated by Django 5.1.15 on 2026-10-19 04:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("team_inbox", "0011_backfill_thread_keys"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["conversation", "-timestamp", "-created_at"],
+                name="idx_message_conv_timeline",
+            ),
+        ),
+    ]
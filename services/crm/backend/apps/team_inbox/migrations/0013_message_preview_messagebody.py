@@ -0,0 +1,38 @@
+# Generated by Django 5.1.15 on 2026-10-19 04:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("team_inbox", "0012_message_timeline_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="preview",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.CreateModel(
+            name="MessageBody",
+            fields=[
+                (
+                    "message",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="body",
+                        serialize=False,
+                        to="team_inbox.message",
+                    ),
+                ),
+                ("codec", models.CharField(max_length=10)),
+                ("content", models.BinaryField()),
+                ("html_content", models.BinaryField(blank=True, null=True)),
+                ("raw_size", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,79 @@
+import zlib
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+# Codec logic is inlined rather than imported from services/body_store.py so
+# later changes there cannot change what this migration writes. Existing
+# bodies are compressed with stdlib zlib; every row records its codec, so the
+# app reads them back whatever INBOX_BODY_CODEC is set to.
+CODEC_NONE = "none"
+CODEC_ZLIB = "zlib"
+COMPRESS_MIN_BYTES = 256
+ZLIB_LEVEL = 6
+PREVIEW_LENGTH = 255
+
+
+def encode_body(content, html_content):
+    raw_content = (content or "").encode("utf-8", "surrogatepass")
+    raw_html = (
+        html_content.encode("utf-8", "surrogatepass")
+        if html_content is not None
+        else None
+    )
+    raw_size = len(raw_content) + len(raw_html or b"")
+
+    if raw_size < COMPRESS_MIN_BYTES:
+        return CODEC_NONE, raw_content, raw_html, raw_size
+    compressed_html = (
+        zlib.compress(raw_html, ZLIB_LEVEL) if raw_html is not None else None
+    )
+    return CODEC_ZLIB, zlib.compress(raw_content, ZLIB_LEVEL), compressed_html, raw_size
+
+
+def make_preview(text):
+    return " ".join((text or "").split())[:PREVIEW_LENGTH]
+
+
+def move_message_bodies(apps, schema_editor):
+    """Compress existing bodies into MessageBody and fill Message.preview."""
+    Message = apps.get_model("team_inbox", "Message")
+    MessageBody = apps.get_model("team_inbox", "MessageBody")
+
+    def flush(bodies, previews):
+        MessageBody.objects.bulk_create(bodies, ignore_conflicts=True)
+        Message.objects.bulk_update(previews, ["preview"])
+        bodies.clear()
+        previews.clear()
+
+    bodies, previews = [], []
+    messages = Message.objects.order_by("pk").values_list(
+        "pk", "content", "html_content"
+    )
+    for pk, content, html_content in messages.iterator(chunk_size=BATCH_SIZE):
+        codec, content_bytes, html_bytes, raw_size = encode_body(content, html_content)
+        bodies.append(
+            MessageBody(
+                message_id=pk,
+                codec=codec,
+                content=content_bytes,
+                html_content=html_bytes,
+                raw_size=raw_size,
+            )
+        )
+        previews.append(Message(pk=pk, preview=make_preview(content)))
+        if len(bodies) >= BATCH_SIZE:
+            flush(bodies, previews)
+    flush(bodies, previews)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("team_inbox", "0013_message_preview_messagebody"),
+    ]
+
+    operations = [
+        migrations.RunPython(move_message_bodies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.15 on 2026-10-19 04:30
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("team_inbox", "0014_move_message_bodies"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="message",
+            name="content",
+        ),
+        migrations.RemoveField(
+            model_name="message",
+            name="html_content",
+        ),
+    ]
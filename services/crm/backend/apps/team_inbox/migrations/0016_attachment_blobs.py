@@ -0,0 +1,30 @@
+# Generated by Django 5.1.15 on 2026-10-19 04:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("team_inbox", "0015_remove_message_body_columns"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="attachment",
+            name="sha256",
+            field=models.CharField(
+                blank=True, db_index=True, default="", max_length=64
+            ),
+        ),
+        migrations.AddField(
+            model_name="message",
+            name="raw_mime_sha256",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.AlterField(
+            model_name="attachment",
+            name="file_url",
+            field=models.URLField(blank=True, default=""),
+        ),
+    ]
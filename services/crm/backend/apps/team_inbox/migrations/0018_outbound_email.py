@@ -0,0 +1,86 @@
+# Generated by Django 5.1.15 on 2026-10-19 04:44
+
+import uuid
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("team_inbox", "0017_notification_user_read_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="delivery_status",
+            field=models.CharField(
+                blank=True,
+                choices=[("queued", "Queued"), ("sent", "Sent"), ("failed", "Failed")],
+                max_length=10,
+                null=True,
+            ),
+        ),
+        migrations.CreateModel(
+            name="OutboundEmail",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("envelope_from", models.CharField(max_length=255)),
+                ("recipients", models.JSONField(default=list)),
+                ("mime", models.BinaryField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("sending", "Sending"),
+                            ("sent", "Sent"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("last_error", models.TextField(blank=True, null=True)),
+                (
+                    "available_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("locked_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "message",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="outbound_emails",
+                        to="team_inbox.message",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "available_at"],
+                        name="idx_outbound_status_avail",
+                    ),
+                    models.Index(fields=["sent_at"], name="idx_outbound_sent_at"),
+                ],
+            },
+        ),
+    ]
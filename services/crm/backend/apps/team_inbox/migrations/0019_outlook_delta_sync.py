@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-19 04:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("team_inbox", "0018_outbound_email"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="channelaccount",
+            name="delta_link",
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="channelaccount",
+            name="subscription_expires_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
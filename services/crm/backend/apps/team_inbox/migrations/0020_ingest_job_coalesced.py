@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-19 04:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("team_inbox", "0019_outlook_delta_sync"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ingestjob",
+            name="coalesced",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
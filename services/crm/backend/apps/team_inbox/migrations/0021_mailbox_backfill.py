@@ -0,0 +1,88 @@
+# Generated by Django 5.1.15 on 2026-10-19 04:55
+
+import uuid
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("team_inbox", "0020_ingest_job_coalesced"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MailboxBackfill",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("after", models.DateField(blank=True, null=True)),
+                ("before", models.DateField(blank=True, null=True)),
+                ("page_token", models.TextField(blank=True, null=True)),
+                ("pages", models.PositiveIntegerField(default=0)),
+                ("messages_listed", models.PositiveIntegerField(default=0)),
+                ("messages_stored", models.PositiveIntegerField(default=0)),
+                ("estimated_total", models.PositiveIntegerField(blank=True, null=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("paused", "Paused"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("last_error", models.TextField(blank=True, null=True)),
+                (
+                    "available_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("locked_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "channel_account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="backfills",
+                        to="team_inbox.channelaccount",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "available_at"],
+                        name="idx_backfill_status_avail",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(
+                            ("status__in", ["pending", "running", "paused"])
+                        ),
+                        fields=("channel_account",),
+                        name="uniq_backfill_active_account",
+                    )
+                ],
+            },
+        ),
+    ]
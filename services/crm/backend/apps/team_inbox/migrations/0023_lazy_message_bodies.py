@@ -0,0 +1,50 @@
+# Generated by Django 5.1.15 on 2026-10-19 05:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("team_inbox", "0022_mail_import"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="inbox",
+            name="lazy_bodies",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="message",
+            name="body_pending",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="message",
+            name="channel_account",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="team_inbox.channelaccount",
+            ),
+        ),
+        migrations.AddField(
+            model_name="message",
+            name="provider_message_id",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                condition=models.Q(("body_pending", True)),
+                fields=["-timestamp"],
+                name="idx_message_body_pending",
+            ),
+        ),
+    ]
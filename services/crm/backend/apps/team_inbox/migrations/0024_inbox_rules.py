@@ -0,0 +1,77 @@
+# Generated by Django 5.1.15 on 2026-10-19 05:18
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("team_inbox", "0023_lazy_message_bodies"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InboxRule",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                ("position", models.PositiveIntegerField(default=0)),
+                ("is_active", models.BooleanField(default=True)),
+                ("match_all", models.BooleanField(default=True)),
+                ("conditions", models.JSONField(blank=True, default=list)),
+                ("assign_to", models.CharField(blank=True, max_length=255, null=True)),
+                (
+                    "set_priority",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("low", "Low"),
+                            ("normal", "Normal"),
+                            ("high", "High"),
+                            ("urgent", "Urgent"),
+                        ],
+                        default="",
+                        max_length=10,
+                    ),
+                ),
+                ("archive", models.BooleanField(default=False)),
+                ("mark_spam", models.BooleanField(default=False)),
+                ("stop_processing", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "add_tags",
+                    models.ManyToManyField(
+                        blank=True, related_name="+", to="team_inbox.tag"
+                    ),
+                ),
+                (
+                    "inbox",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rules",
+                        to="team_inbox.inbox",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["position", "created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["inbox", "position"], name="idx_inbox_rule_position"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.1.15 on 2026-10-19 05:42
+
+import zlib
+
+from django.db import migrations, models
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+BATCH_SIZE = 500
+SEARCH_CHARS = 20000
+
+
+def decompress(codec, data):
+    # Inlined from services/body_store.py so later changes there cannot change this migration
+    data = bytes(data)
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError(
+                "zstandard is required to read zstd-compressed message bodies"
+            )
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == "zlib":
+        data = zlib.decompress(data)
+    return data.decode("utf-8", "surrogatepass")
+
+
+def fill_search_text(apps, schema_editor):
+    """Store the whitespace-collapsed plain body of existing messages for search."""
+    MessageBody = apps.get_model("team_inbox", "MessageBody")
+
+    batch = []
+    bodies = MessageBody.objects.order_by("pk").only("pk", "codec", "content")
+    for body in bodies.iterator(chunk_size=BATCH_SIZE):
+        body.search_text = " ".join(decompress(body.codec, body.content).split())[
+            :SEARCH_CHARS
+        ]
+        batch.append(body)
+        if len(batch) >= BATCH_SIZE:
+            MessageBody.objects.bulk_update(batch, ["search_text"])
+            batch = []
+    MessageBody.objects.bulk_update(batch, ["search_text"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("team_inbox", "0024_inbox_rules"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="messagebody",
+            name="search_text",
+            field=models.TextField(blank=True, default=""),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,8 @@ from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
+from .services.body_store import decompress, encode_body, make_preview, make_search_text
+
 
 class TeamMember(models.Model):
     """
@@ -33,6 +35,8 @@ class Inbox(models.Model):
     
     name = models.CharField(max_length=100)
     description = models.TextField(null=True, blank=True)  # optional field
+    # Ingest headers and snippet only; bodies are fetched on open or by hydrate_bodies
+    lazy_bodies = models.BooleanField(default=False)
     
     # removed email, since "channels" will carry identifiers now
     
@@ -63,6 +67,9 @@ class ChannelAccount(models.Model):
 
     last_history_id = models.CharField(max_length=255, null=True, blank=True)
     subscription_id = models.CharField(max_length=255, null=True, blank=True)  # ← new for Outlook
+    subscription_expires_at = models.DateTimeField(null=True, blank=True)
+    # Outlook sync checkpoint: Graph @odata.nextLink mid catch-up, else @odata.deltaLink
+    delta_link = models.TextField(null=True, blank=True)
 
     def __str__(self):
         return f"{self.identifier} ({self.provider})"
@@ -74,6 +81,230 @@ class ChannelAccount(models.Model):
         return timezone.now() >= expiry_time
 
 
+class IngestJob(models.Model):
+    """
+    Queued mailbox sync recorded by a provider webhook and drained by the
+    ingest workers (see services/ingest_queue.py).
+    """
+    STATUS_PENDING = "pending"
+    STATUS_PROCESSING = "processing"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_PROCESSING, "Processing"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    channel_account = models.ForeignKey(
+        "ChannelAccount",
+        on_delete=models.CASCADE,
+        related_name="ingest_jobs"
+    )
+    provider = models.CharField(max_length=50)
+    history_id = models.CharField(max_length=255, null=True, blank=True)
+    payload = models.JSONField(default=dict, blank=True)
+    # Provider delivery id (e.g. Pub/Sub messageId) so redelivered pushes are recorded once
+    dedup_key = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    # Further notifications folded into this job while it was pending
+    coalesced = models.PositiveIntegerField(default=0)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(null=True, blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["status", "available_at"], name="idx_ingest_job_status_avail"),
+            models.Index(fields=["channel_account", "status", "created_at"], name="idx_ingest_job_account"),
+        ]
+        constraints = [
+            # At most one job per mailbox in flight, which keeps per-mailbox ordering
+            models.UniqueConstraint(
+                fields=["channel_account"],
+                condition=models.Q(status="processing"),
+                name="uniq_ingest_job_processing_account",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.provider} ingest {self.id} ({self.status})"
+
+
+class OutboundEmail(models.Model):
+    """
+    Composed outgoing mail waiting for the outbox workers
+    (see services/outbox.py).
+    """
+    STATUS_PENDING = "pending"
+    STATUS_SENDING = "sending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENDING, "Sending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Outgoing Message this delivers; null for system mail such as invitations
+    message = models.ForeignKey(
+        "Message",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="outbound_emails"
+    )
+    envelope_from = models.CharField(max_length=255)
+    recipients = models.JSONField(default=list)
+    mime = models.BinaryField()  # cleared once sent
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(null=True, blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["status", "available_at"], name="idx_outbound_status_avail"),
+            models.Index(fields=["sent_at"], name="idx_outbound_sent_at"),
+        ]
+
+    def __str__(self):
+        return f"outbound {self.id} ({self.status})"
+
+
+class MailboxBackfill(models.Model):
+    """
+    Import of a mailbox's existing mail, in page-sized steps that resume
+    from page_token (see services/backfill.py).
+    """
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_PAUSED = "paused"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_PAUSED, "Paused"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+    ACTIVE_STATUSES = [STATUS_PENDING, STATUS_RUNNING, STATUS_PAUSED]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    channel_account = models.ForeignKey(
+        "ChannelAccount",
+        on_delete=models.CASCADE,
+        related_name="backfills"
+    )
+    # Optional received-date window; both open means the whole mailbox
+    after = models.DateField(null=True, blank=True)
+    before = models.DateField(null=True, blank=True)
+
+    # Gmail pageToken or Graph @odata.nextLink of the next page to import
+    page_token = models.TextField(null=True, blank=True)
+    pages = models.PositiveIntegerField(default=0)
+    messages_listed = models.PositiveIntegerField(default=0)
+    messages_stored = models.PositiveIntegerField(default=0)
+    estimated_total = models.PositiveIntegerField(null=True, blank=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(null=True, blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["status", "available_at"], name="idx_backfill_status_avail"),
+        ]
+        constraints = [
+            # One unfinished backfill per mailbox
+            models.UniqueConstraint(
+                fields=["channel_account"],
+                condition=models.Q(status__in=["pending", "running", "paused"]),
+                name="uniq_backfill_active_account",
+            ),
+        ]
+
+    def __str__(self):
+        return f"backfill {self.id} ({self.status})"
+
+
+class MailImport(models.Model):
+    """
+    Upload of an MBOX/EML archive into an inbox. The archive waits in the
+    blob store until an import worker runs it (see services/mail_import.py).
+    """
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    inbox = models.ForeignKey(
+        "Inbox",
+        on_delete=models.CASCADE,
+        related_name="mail_imports"
+    )
+    filename = models.CharField(max_length=255, blank=True, default="")
+    archive_sha256 = models.CharField(max_length=64)  # uploaded archive, in the blob store
+    archive_size = models.BigIntegerField(default=0)
+
+    messages_parsed = models.PositiveIntegerField(default=0)
+    messages_stored = models.PositiveIntegerField(default=0)
+    messages_failed = models.PositiveIntegerField(default=0)
+    seconds = models.FloatField(default=0)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    last_error = models.TextField(null=True, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="idx_mail_import_status"),
+        ]
+
+    def __str__(self):
+        return f"mail import {self.id} ({self.status})"
+
+
 class Tag(models.Model):
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -152,6 +383,63 @@ class Conversation(models.Model):
         return self.subject
 
 
+class InboxRule(models.Model):
+    """
+    Triage rule run on incoming mail at ingest (see services/inbox_rules.py).
+
+    conditions is a list of {"field": ..., "values": [...]}. A condition
+    holds when any of its values matches; the rule matches when all of its
+    conditions hold (match_all) or any of them does. A rule without
+    conditions matches every message. Matching rules apply their actions in
+    position order, later rules overriding assign_to and set_priority.
+    """
+    FIELD_SENDER = "sender"          # exact From address
+    FIELD_DOMAIN = "domain"          # From domain, subdomains included
+    FIELD_SUBJECT = "subject"        # whole words or phrases, case-insensitive
+    FIELD_BODY = "body"              # same, on the plain-text body
+    FIELD_RECIPIENTS = "recipients"  # To/Cc address, or a domain
+    FIELD_CHOICES = [
+        (FIELD_SENDER, "Sender"),
+        (FIELD_DOMAIN, "Sender domain"),
+        (FIELD_SUBJECT, "Subject keywords"),
+        (FIELD_BODY, "Body keywords"),
+        (FIELD_RECIPIENTS, "Recipients"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    inbox = models.ForeignKey(
+        "Inbox",
+        on_delete=models.CASCADE,
+        related_name="rules"
+    )
+    name = models.CharField(max_length=100)
+    position = models.PositiveIntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+
+    match_all = models.BooleanField(default=True)
+    conditions = models.JSONField(default=list, blank=True)
+
+    # Actions
+    add_tags = models.ManyToManyField("Tag", blank=True, related_name="+")
+    assign_to = models.CharField(max_length=255, null=True, blank=True)  # same value as Conversation.assigned_to
+    set_priority = models.CharField(max_length=10, choices=Conversation.PRIORITY_CHOICES, blank=True, default="")
+    archive = models.BooleanField(default=False)
+    mark_spam = models.BooleanField(default=False)
+    stop_processing = models.BooleanField(default=False)  # skip the rules after this one
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["position", "created_at"]
+        indexes = [
+            models.Index(fields=["inbox", "position"], name="idx_inbox_rule_position"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.inbox_id})"
+
+
 class Message(models.Model):
     PRIORITY_CHOICES = [
         ('low', 'Low'),
@@ -166,6 +454,15 @@ class Message(models.Model):
         ('internal', 'Internal'),
     ]
 
+    DELIVERY_QUEUED = 'queued'
+    DELIVERY_SENT = 'sent'
+    DELIVERY_FAILED = 'failed'
+    DELIVERY_CHOICES = [
+        (DELIVERY_QUEUED, 'Queued'),
+        (DELIVERY_SENT, 'Sent'),
+        (DELIVERY_FAILED, 'Failed'),
+    ]
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     conversation = models.ForeignKey(
         Conversation,
@@ -186,8 +483,15 @@ class Message(models.Model):
     bcc = models.JSONField(blank=True, null=True)
     reply_to = models.JSONField(blank=True, null=True)
 
-    content = models.TextField()
-    html_content = models.TextField(blank=True, null=True)
+    # Bodies live compressed in MessageBody; see the content/html_content properties
+    preview = models.CharField(max_length=255, blank=True, default="")
+    raw_mime_sha256 = models.CharField(max_length=64, blank=True, default="")  # compressed original, in the blob store
+    # Where the message came from, so its body can be fetched later (lazy_bodies inboxes)
+    channel_account = models.ForeignKey(
+        'ChannelAccount', null=True, blank=True, on_delete=models.SET_NULL, related_name='+'
+    )
+    provider_message_id = models.CharField(max_length=255, blank=True, default="")  # Gmail id / Graph id
+    body_pending = models.BooleanField(default=False)  # only the snippet is stored so far
 
     timestamp = models.DateTimeField()
     is_read = models.BooleanField(default=False)
@@ -195,6 +499,7 @@ class Message(models.Model):
     is_draft = models.BooleanField(default=False)
 
     source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default='incoming')
+    delivery_status = models.CharField(max_length=10, choices=DELIVERY_CHOICES, blank=True, null=True)  # outgoing only
     priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='normal')
 
     inbox = models.ForeignKey(
@@ -219,9 +524,131 @@ class Message(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Cursor paging of a conversation's messages, newest first
+            models.Index(fields=["conversation", "-timestamp", "-created_at"], name="idx_message_conv_timeline"),
+            # Background hydration, newest first
+            models.Index(
+                fields=["-timestamp"], condition=models.Q(body_pending=True), name="idx_message_body_pending"
+            ),
+        ]
+
     def __str__(self):
         return self.subject
 
+    def _body_values(self):
+        """(content, html_content), loading MessageBody on first access."""
+        pending = self.__dict__.get("_pending_body")
+        if pending is not None:
+            return pending
+        loaded = self.__dict__.get("_loaded_body")
+        if loaded is None:
+            loaded = ("", None)
+            if not self._state.adding:
+                try:
+                    loaded = self.body.decode()
+                except MessageBody.DoesNotExist:
+                    pass
+            self._loaded_body = loaded
+        return loaded
+
+    @property
+    def content(self):
+        return self._body_values()[0]
+
+    @content.setter
+    def content(self, value):
+        self._pending_body = (value or "", self._body_values()[1])
+        self.preview = make_preview(value)
+
+    @property
+    def html_content(self):
+        return self._body_values()[1]
+
+    @html_content.setter
+    def html_content(self, value):
+        self._pending_body = (self._body_values()[0], value)
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if kwargs.get("update_fields") is not None:
+            return  # a partial save never touches the body
+        pending = self.__dict__.pop("_pending_body", None)
+        if pending is not None:
+            self.body = MessageBody.build(self, *pending)
+            self.body.save(force_insert=adding)
+            self._loaded_body = pending
+
+
+class MessageBody(models.Model):
+    """
+    Compressed message bodies, kept out of the Message table so list
+    queries and vacuum never touch them (see services/body_store.py).
+    search_text is the uncompressed plain body that message search matches.
+    """
+    message = models.OneToOneField(
+        Message,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="body"
+    )
+    codec = models.CharField(max_length=10)
+    content = models.BinaryField()
+    html_content = models.BinaryField(blank=True, null=True)
+    raw_size = models.PositiveIntegerField(default=0)
+    search_text = models.TextField(blank=True, default="")
+
+    @classmethod
+    def build(cls, message, content, html_content):
+        search_text = make_search_text(content)
+        codec, content, html_content, raw_size = encode_body(content, html_content)
+        return cls(
+            message=message, codec=codec, content=content,
+            html_content=html_content, raw_size=raw_size, search_text=search_text
+        )
+
+    def decode(self):
+        """Return (content, html_content) as text."""
+        return decompress(self.codec, self.content) or "", decompress(self.codec, self.html_content)
+
+    def __str__(self):
+        return f"Body of {self.message_id}"
+
+
+class ThreadKey(models.Model):
+    """
+    Maps every known Message-ID (including ids seen only in References)
+    and provider thread id (Gmail threadId, Outlook conversationId, SMTP
+    thread) to its conversation, so threading is a unique-index lookup
+    (see services/thread_index.py).
+    """
+    KIND_MESSAGE_ID = "message_id"
+    KIND_THREAD = "thread"
+    KIND_CHOICES = [
+        (KIND_MESSAGE_ID, "Message-ID"),
+        (KIND_THREAD, "Provider thread"),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    key = models.CharField(max_length=255)
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        related_name="thread_keys"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "key"], name="uniq_thread_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.key}"
+
 
 class Attachment(models.Model):
     message = models.ForeignKey(
@@ -230,9 +657,10 @@ class Attachment(models.Model):
         related_name='attachment_set'  
     )
     filename = models.CharField(max_length=255)
-    file_url = models.URLField()
+    file_url = models.URLField(blank=True, default="")
     mime_type = models.CharField(max_length=100)
     size = models.IntegerField()  # in bytes
+    sha256 = models.CharField(max_length=64, blank=True, default="", db_index=True)  # blob store key
 
     def __str__(self):
         return self.filename
@@ -293,6 +721,10 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Unread counts, "my notifications" listings and retention scans
+            models.Index(fields=["user", "is_read", "-created_at"], name="notif_user_read_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.type} → {self.user.email}"
@@ -1,8 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.urls import reverse
 from .models import (
     TeamMember, Inbox, ChannelAccount, Tag, Conversation,
-    Message, Attachment, InternalNote, Label, Comment, Notification, Task, CalendarEvent
+    Message, Attachment, InternalNote, Label, Comment, Notification, Task, CalendarEvent,
+    MailboxBackfill, MailImport, InboxRule,
 )
 
 User = get_user_model()
@@ -56,15 +58,67 @@ class ChannelAccountSerializer(serializers.ModelSerializer):
         ]
 
 
+class MailboxBackfillSerializer(serializers.ModelSerializer):
+    channelAccount = serializers.UUIDField(source="channel_account_id", read_only=True)
+    pagesDone = serializers.IntegerField(source="pages", read_only=True)
+    messagesListed = serializers.IntegerField(source="messages_listed", read_only=True)
+    messagesStored = serializers.IntegerField(source="messages_stored", read_only=True)
+    estimatedTotal = serializers.IntegerField(source="estimated_total", read_only=True)
+    percent = serializers.SerializerMethodField()
+    lastError = serializers.CharField(source="last_error", read_only=True)
+    createdAt = serializers.DateTimeField(source="created_at", read_only=True)
+    updatedAt = serializers.DateTimeField(source="updated_at", read_only=True)
+    finishedAt = serializers.DateTimeField(source="finished_at", read_only=True)
+
+    class Meta:
+        model = MailboxBackfill
+        fields = [
+            "id", "channelAccount", "status", "after", "before", "pagesDone", "messagesListed",
+            "messagesStored", "estimatedTotal", "percent", "lastError", "createdAt", "updatedAt", "finishedAt",
+        ]
+        read_only_fields = ["id", "status"]
+
+    def get_percent(self, obj):
+        if obj.status == MailboxBackfill.STATUS_DONE:
+            return 100
+        if not obj.estimated_total:
+            return None
+        return min(99, int(obj.messages_listed * 100 / obj.estimated_total))
+
+
+class MailImportSerializer(serializers.ModelSerializer):
+    inbox = serializers.UUIDField(source="inbox_id", read_only=True)
+    archiveSize = serializers.IntegerField(source="archive_size", read_only=True)
+    messagesParsed = serializers.IntegerField(source="messages_parsed", read_only=True)
+    messagesStored = serializers.IntegerField(source="messages_stored", read_only=True)
+    messagesFailed = serializers.IntegerField(source="messages_failed", read_only=True)
+    messagesPerSecond = serializers.SerializerMethodField()
+    lastError = serializers.CharField(source="last_error", read_only=True)
+    createdAt = serializers.DateTimeField(source="created_at", read_only=True)
+    finishedAt = serializers.DateTimeField(source="finished_at", read_only=True)
+
+    class Meta:
+        model = MailImport
+        fields = [
+            "id", "inbox", "filename", "archiveSize", "status", "messagesParsed", "messagesStored",
+            "messagesFailed", "seconds", "messagesPerSecond", "lastError", "createdAt", "finishedAt",
+        ]
+        read_only_fields = fields
+
+    def get_messagesPerSecond(self, obj):
+        return round(obj.messages_parsed / obj.seconds) if obj.seconds else None
+
+
 # --- Inbox Serializer ---
 class InboxSerializer(serializers.ModelSerializer):
     channels = ChannelAccountSerializer(many=True, read_only=True)
+    lazyBodies = serializers.BooleanField(source="lazy_bodies", required=False)
     createdAt = serializers.DateTimeField(source="created_at", read_only=True)
     updatedAt = serializers.DateTimeField(source="updated_at", read_only=True)
 
     class Meta:
         model = Inbox
-        fields = ["id", "name", "description", "channels", "createdAt", "updatedAt"]
+        fields = ["id", "name", "description", "channels", "lazyBodies", "createdAt", "updatedAt"]
 
     def create(self, validated_data):
         channels_data = validated_data.pop("channels", [])
@@ -78,6 +132,42 @@ class InboxSerializer(serializers.ModelSerializer):
         return inbox
 
 
+# --- Inbox Rule Serializer ---
+class InboxRuleSerializer(serializers.ModelSerializer):
+    isActive = serializers.BooleanField(source="is_active", required=False)
+    matchAll = serializers.BooleanField(source="match_all", required=False)
+    addTags = serializers.PrimaryKeyRelatedField(
+        source="add_tags", queryset=Tag.objects.all(), many=True, required=False
+    )
+    assignTo = serializers.CharField(source="assign_to", allow_null=True, allow_blank=True, required=False)
+    setPriority = serializers.ChoiceField(
+        source="set_priority", choices=Conversation.PRIORITY_CHOICES, allow_blank=True, required=False
+    )
+    markSpam = serializers.BooleanField(source="mark_spam", required=False)
+    stopProcessing = serializers.BooleanField(source="stop_processing", required=False)
+    createdAt = serializers.DateTimeField(source="created_at", read_only=True)
+    updatedAt = serializers.DateTimeField(source="updated_at", read_only=True)
+
+    class Meta:
+        model = InboxRule
+        fields = [
+            "id", "inbox", "name", "position", "isActive", "matchAll", "conditions", "addTags", "assignTo",
+            "setPriority", "archive", "markSpam", "stopProcessing", "createdAt", "updatedAt",
+        ]
+
+    def validate_conditions(self, value):
+        fields = {choice for choice, _ in InboxRule.FIELD_CHOICES}
+        if not isinstance(value, list):
+            raise serializers.ValidationError("Expected a list of {field, values} conditions.")
+        for condition in value:
+            if not isinstance(condition, dict) or condition.get("field") not in fields:
+                raise serializers.ValidationError(f"Each condition needs a field, one of: {', '.join(sorted(fields))}.")
+            values = condition.get("values")
+            if not isinstance(values, list) or not values or not all(isinstance(v, str) and v.strip() for v in values):
+                raise serializers.ValidationError("Each condition needs a non-empty list of string values.")
+        return value
+
+
 # --- User Serializer for Comments ---
 class UserSerializer(serializers.ModelSerializer):
     full_name = serializers.SerializerMethodField()
@@ -148,10 +238,18 @@ class EmailAddressSerializer(serializers.Serializer):
 
 # --- Attachment Serializer ---
 class AttachmentSerializer(serializers.ModelSerializer):
+    file_url = serializers.SerializerMethodField()
+
     class Meta:
         model = Attachment
         fields = ['id', 'filename', 'file_url', 'mime_type', 'size']
 
+    def get_file_url(self, obj):
+        # Archived attachments are served from the blob store
+        if obj.sha256:
+            return reverse('attachment-download', args=[obj.pk])
+        return obj.file_url
+
 
 # --- Internal Note Serializer ---
 class InternalNoteSerializer(serializers.ModelSerializer):
@@ -186,6 +284,7 @@ class MessageSerializer(serializers.ModelSerializer):
     messageId = serializers.CharField(source='message_id')
     inReplyTo = serializers.CharField(source='in_reply_to', required=False, allow_null=True)
     references = serializers.ListField(child=serializers.CharField(), allow_null=True)
+    content = serializers.CharField(required=False, allow_blank=True)  # stored in MessageBody
     htmlContent = serializers.CharField(source='html_content', required=False, allow_null=True)
     isRead = serializers.BooleanField(source='is_read')
     isStarred = serializers.BooleanField(source='is_starred')
@@ -195,6 +294,8 @@ class MessageSerializer(serializers.ModelSerializer):
     labels = LabelSerializer(many=True, read_only=True)
     priority = serializers.ChoiceField(choices=Message.PRIORITY_CHOICES)
     source = serializers.ChoiceField(choices=Message.SOURCE_CHOICES)
+    deliveryStatus = serializers.CharField(source='delivery_status', read_only=True)
+    bodyPending = serializers.BooleanField(source='body_pending', read_only=True)
 
     class Meta:
         model = Message
@@ -203,6 +304,7 @@ class MessageSerializer(serializers.ModelSerializer):
             'subject', 'content', 'htmlContent', 'timestamp', 'isRead',
             'isStarred', 'isDraft', 'messageId', 'inReplyTo', 'references',
             'attachments', 'internalNotes', 'labels', 'priority', 'source',
+            'deliveryStatus', 'bodyPending',
         ]
 
     def get_replyTo(self, obj):
@@ -271,6 +373,56 @@ class ConversationSerializer(serializers.ModelSerializer):
 
     def get_messages(self, obj):
         """Return messages ordered by created_at ascending."""
-        messages_qs = obj.messages.order_by('created_at')
-        return MessageSerializer(messages_qs, many=True).data
+        # The viewset prefetches messages (with bodies) in this order; sorting
+        # here keeps other callers (WS broadcasts) correct
+        if "messages" in getattr(obj, "_prefetched_objects_cache", {}):
+            messages = obj.messages.all()
+        else:
+            messages = obj.messages.select_related("body")
+        messages = sorted(messages, key=lambda message: message.created_at)
+        return MessageSerializer(messages, many=True).data
+
+
+class ConversationSummarySerializer(serializers.ModelSerializer):
+    """
+    Lightweight conversation row for list views: no message bodies, just a
+    snippet of the last message plus counts and flags. Reads the annotations
+    added by ConversationViewSet for view=summary.
+    """
+    participants = EmailAddressSerializer(many=True)
+    tags = TagSerializer(many=True, read_only=True)
+    lastMessage = serializers.SerializerMethodField()
+    messageCount = serializers.IntegerField(source='message_count', read_only=True)
+    unreadCount = serializers.IntegerField(source='unread_count', read_only=True)
+    hasAttachments = serializers.BooleanField(source='has_attachments', read_only=True)
+    isStarred = serializers.BooleanField(source='is_starred', read_only=True)
+    assignedTo = serializers.CharField(source='assigned_to', allow_null=True)
+    threadId = serializers.CharField(source='thread_id')
+    lastActivity = serializers.DateTimeField(source='last_activity', format='%Y-%m-%dT%H:%M:%SZ')
+    snoozeUntil = serializers.DateTimeField(source='snooze_until', format='%Y-%m-%dT%H:%M:%SZ', allow_null=True)
+    sharedInboxId = serializers.UUIDField(source='shared_inbox_id', allow_null=True)
+    isArchived = serializers.BooleanField(source='is_archived')
+    createdAt = serializers.DateTimeField(source='created_at', format='%Y-%m-%dT%H:%M:%SZ')
+    updatedAt = serializers.DateTimeField(source='updated_at', format='%Y-%m-%dT%H:%M:%SZ')
+
+    class Meta:
+        model = Conversation
+        fields = [
+            'id', 'threadId', 'subject', 'participants', 'tags', 'assignedTo',
+            'status', 'priority', 'lastActivity', 'lastMessage', 'messageCount',
+            'unreadCount', 'hasAttachments', 'isStarred', 'snoozed', 'snoozeUntil',
+            'channel', 'sharedInboxId', 'isArchived', 'createdAt', 'updatedAt',
+        ]
+
+    def get_lastMessage(self, obj):
+        if not obj.last_message_id:
+            return None
+        return {
+            'id': obj.last_message_id,
+            'from': EmailAddressSerializer(obj.last_message_from).data if obj.last_message_from else None,
+            'snippet': obj.last_message_snippet or '',
+            'timestamp': obj.last_message_timestamp,
+            'isRead': obj.last_message_is_read,
+            'source': obj.last_message_source,
+        }
 
@@ -0,0 +1,307 @@
+"""
+Resumable mailbox backfill
+
+Connecting a mailbox queues a MailboxBackfill for its existing Inbox mail
+(the whole mailbox, or an after/before window). Worker processes
+(`manage.py process_backfills`) claim backfills and import them in work
+units of INBOX_BACKFILL_PAGES_PER_RUN listing pages:
+
+- Checkpoints: after each page is stored, the next Gmail pageToken or
+  Graph nextLink and the progress counters are saved in one UPDATE, so a
+  restart resumes at the first page not yet stored.
+- Parallel fetch: Gmail pages are fetched on GmailFetcher's thread pool,
+  drawing from the mailbox's quota bucket; Outlook pages go through JSON
+  $batch. Messages go through write_message_batch without live
+  broadcasts, so old mail doesn't flood open sockets.
+- Fair sharing: after each work unit the backfill returns to the queue, so
+  one large mailbox doesn't hold a worker while others wait.
+- Progress: every unit publishes a backfill.progress event to the inbox
+  group; the channel-account backfill endpoint reports the same counters.
+- Pause/resume: pausing is seen by the worker between pages. Resuming
+  continues from the saved page token.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import MailboxBackfill
+from .gmail_ingest import store_gmail_messages
+from .gmail_service import GmailService
+from .ingest_queue import retry_delay
+from .outlook_service import OutlookService
+from .outlook_sync import store_graph_messages, unseen_message_ids
+from .realtime import publish_inbox_events
+
+logger = logging.getLogger(__name__)
+
+
+def start_backfill(account, after=None, before=None):
+    """
+    Queue a backfill for account unless one is already unfinished.
+    Returns (backfill, created).
+    """
+    active = MailboxBackfill.objects.filter(
+        channel_account=account, status__in=MailboxBackfill.ACTIVE_STATUSES
+    )
+    try:
+        with transaction.atomic():
+            backfill = active.first()
+            if backfill is not None:
+                return backfill, False
+            return (
+                MailboxBackfill.objects.create(
+                    channel_account=account, after=after, before=before
+                ),
+                True,
+            )
+    except IntegrityError:
+        # Lost a race with a concurrent start for the same mailbox
+        return active.get(), False
+
+
+def queue_connect_backfill(account):
+    """Backfill a newly connected mailbox per INBOX_BACKFILL_ON_CONNECT(_DAYS); None when disabled."""
+    if not settings.INBOX_BACKFILL_ON_CONNECT:
+        return None
+    days = settings.INBOX_BACKFILL_ON_CONNECT_DAYS
+    after = (timezone.now() - timedelta(days=days)).date() if days else None
+    return start_backfill(account, after=after)[0]
+
+
+def pause_backfill(backfill):
+    """Pause a queued or running backfill; a running one stops after its current page."""
+    paused = MailboxBackfill.objects.filter(
+        pk=backfill.pk,
+        status__in=[MailboxBackfill.STATUS_PENDING, MailboxBackfill.STATUS_RUNNING],
+    ).update(status=MailboxBackfill.STATUS_PAUSED, updated_at=timezone.now())
+    backfill.refresh_from_db()
+    return bool(paused)
+
+
+def resume_backfill(backfill):
+    """Requeue a paused or failed backfill from its saved page token."""
+    resumed = MailboxBackfill.objects.filter(
+        pk=backfill.pk,
+        status__in=[MailboxBackfill.STATUS_PAUSED, MailboxBackfill.STATUS_FAILED],
+    ).update(
+        status=MailboxBackfill.STATUS_PENDING,
+        available_at=timezone.now(),
+        locked_at=None,
+        attempts=0,
+        last_error=None,
+        finished_at=None,
+        updated_at=timezone.now(),
+    )
+    backfill.refresh_from_db()
+    return bool(resumed)
+
+
+def release_stale_backfills():
+    """Return backfills abandoned by crashed workers to the queue."""
+    timeout = timedelta(seconds=settings.INBOX_BACKFILL_LOCK_TIMEOUT)
+    return MailboxBackfill.objects.filter(
+        status=MailboxBackfill.STATUS_RUNNING,
+        locked_at__lt=timezone.now() - timeout,
+    ).update(status=MailboxBackfill.STATUS_PENDING, locked_at=None)
+
+
+def claim_next_backfill():
+    """Claim the oldest runnable backfill. Returns it (now running) or None."""
+    now = timezone.now()
+    with transaction.atomic():
+        backfill = (
+            MailboxBackfill.objects.select_for_update(skip_locked=True)
+            .filter(status=MailboxBackfill.STATUS_PENDING, available_at__lte=now)
+            .order_by("available_at", "created_at")
+            .first()
+        )
+        if backfill is None:
+            return None
+
+        backfill.status = MailboxBackfill.STATUS_RUNNING
+        backfill.locked_at = now
+        backfill.attempts = F("attempts") + 1
+        backfill.save(update_fields=["status", "locked_at", "attempts", "updated_at"])
+        backfill.refresh_from_db(fields=["attempts"])
+        return backfill
+
+
+def fail_backfill(backfill, error):
+    """Schedule a retry of the current page with backoff, or park the backfill."""
+    now = timezone.now()
+    if backfill.attempts >= settings.INBOX_BACKFILL_MAX_ATTEMPTS:
+        changes = {"status": MailboxBackfill.STATUS_FAILED, "finished_at": now}
+    else:
+        changes = {
+            "status": MailboxBackfill.STATUS_PENDING,
+            "available_at": now + timedelta(seconds=retry_delay(backfill.attempts)),
+        }
+    # A backfill paused while this unit ran stays paused
+    MailboxBackfill.objects.filter(
+        pk=backfill.pk, status=MailboxBackfill.STATUS_RUNNING
+    ).update(last_error=str(error)[:2000], locked_at=None, updated_at=now, **changes)
+
+
+def gmail_query(backfill):
+    terms = []
+    if backfill.after:
+        terms.append(f"after:{backfill.after:%Y/%m/%d}")
+    if backfill.before:
+        terms.append(f"before:{backfill.before:%Y/%m/%d}")
+    return " ".join(terms) or None
+
+
+def _gmail_page(backfill, account, tenant, page_size):
+    gmail = GmailService(account)
+    ids, next_token, estimate = gmail.fetcher.list_message_page(
+        query=gmail_query(backfill),
+        page_token=backfill.page_token,
+        max_results=page_size,
+    )
+    lazy = account.inbox.lazy_bodies
+    messages = gmail.fetcher.iter_messages(ids, fmt="metadata" if lazy else "full")
+    stored = store_gmail_messages(
+        gmail, account, tenant, messages, broadcast=False, metadata_only=lazy
+    )
+    return len(ids), len(stored), next_token, estimate
+
+
+def _outlook_page(backfill, account, tenant, page_size):
+    service = OutlookService(account)
+    url = backfill.page_token or service.inbox_messages_url(
+        backfill.after, backfill.before, page_size
+    )
+    items, next_link = service.list_messages_page(url)
+    graph_ids = unseen_message_ids(items)
+    stored = (
+        store_graph_messages(service, account, tenant, graph_ids, broadcast=False)
+        if graph_ids
+        else []
+    )
+    return len(items), len(stored), next_link, None
+
+
+PAGE_IMPORTERS = {
+    "gmail": _gmail_page,
+    "outlook": _outlook_page,
+}
+
+
+def backfill_event(backfill):
+    return {
+        "event": "backfill.progress",
+        "inboxId": str(backfill.channel_account.inbox_id),
+        "backfillId": str(backfill.pk),
+        "channelAccountId": str(backfill.channel_account_id),
+        "status": backfill.status,
+        "pages": backfill.pages,
+        "messagesListed": backfill.messages_listed,
+        "messagesStored": backfill.messages_stored,
+        "estimatedTotal": backfill.estimated_total,
+    }
+
+
+def run_backfill(backfill, tenant, max_pages=None):
+    """
+    Import up to max_pages listing pages of a claimed backfill, saving the
+    checkpoint after each one. Must run inside the tenant schema. Errors
+    are raised with the checkpoint at the last stored page.
+
+    Returns:
+        int: Number of new messages stored
+    """
+    account = backfill.channel_account
+    import_page = PAGE_IMPORTERS.get(account.provider)
+    if import_page is None:
+        raise ValueError(f"No backfill importer for provider {account.provider}")
+    max_pages = max_pages or settings.INBOX_BACKFILL_PAGES_PER_RUN
+    page_size = settings.INBOX_BACKFILL_PAGE_SIZE
+
+    stored_total = 0
+    finished = False
+    for _ in range(max_pages):
+        backfill.refresh_from_db(fields=["status", "page_token"])
+        if backfill.status != MailboxBackfill.STATUS_RUNNING:
+            break  # paused between pages
+
+        listed, stored, next_token, estimate = import_page(
+            backfill, account, tenant, page_size
+        )
+        stored_total += stored
+        MailboxBackfill.objects.filter(pk=backfill.pk).update(
+            page_token=next_token,
+            pages=F("pages") + 1,
+            messages_listed=F("messages_listed") + listed,
+            messages_stored=F("messages_stored") + stored,
+            estimated_total=estimate if estimate is not None else F("estimated_total"),
+            updated_at=timezone.now(),
+        )
+        if not next_token:
+            finished = True
+            break
+
+    now = timezone.now()
+    if finished:
+        MailboxBackfill.objects.filter(
+            pk=backfill.pk,
+            status__in=[MailboxBackfill.STATUS_RUNNING, MailboxBackfill.STATUS_PAUSED],
+        ).update(
+            status=MailboxBackfill.STATUS_DONE,
+            finished_at=now,
+            locked_at=None,
+            last_error=None,
+        )
+    else:
+        # Back in the queue so other mailboxes get a turn
+        MailboxBackfill.objects.filter(
+            pk=backfill.pk, status=MailboxBackfill.STATUS_RUNNING
+        ).update(
+            status=MailboxBackfill.STATUS_PENDING,
+            available_at=now,
+            locked_at=None,
+            attempts=0,
+            last_error=None,
+        )
+
+    backfill.refresh_from_db()
+    publish_inbox_events(tenant, [backfill_event(backfill)])
+    return stored_total
+
+
+def process_backfills(tenant, limit=10):
+    """
+    Run up to limit backfill work units for the current tenant schema.
+    Returns (units, failed) counts.
+    """
+    release_stale_backfills()
+
+    units = failed = 0
+    for _ in range(limit):
+        backfill = claim_next_backfill()
+        if backfill is None:
+            break
+        try:
+            stored = run_backfill(backfill, tenant)
+        except Exception as e:
+            logger.exception(
+                "Backfill %s failed (attempt %s)", backfill.pk, backfill.attempts
+            )
+            fail_backfill(backfill, e)
+            failed += 1
+            continue
+
+        units += 1
+        logger.info(
+            "Backfill %s: %s new messages, %s stored of %s listed (%s)",
+            backfill.pk,
+            stored,
+            backfill.messages_stored,
+            backfill.messages_listed,
+            backfill.status,
+        )
+    return units, failed
@@ -0,0 +1,177 @@
+"""
+Content-addressed blob storage for attachments and raw MIME
+
+Blobs are keyed by the SHA-256 of their bytes, so an attachment delivered
+to many messages (or to many tenants) is stored once. Writes stream through
+a temp file while hashing. The blob is moved into place only once its digest
+is known, so readers never see a partial blob.
+
+The store is shared by every tenant and lives outside the tenant schemas.
+Tenant rows (Attachment.sha256, Message.raw_mime_sha256) point into it.
+
+INBOX_BLOB_STORE_BACKEND is the dotted path of the backend class and
+INBOX_BLOB_STORE_OPTIONS its keyword arguments. FileSystemBlobStore is the
+default. An S3-compatible backend subclasses BlobStore and implements put,
+open, size, exists and delete against a bucket.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+CHUNK_SIZE = 1024 * 1024
+_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+
+BlobInfo = namedtuple("BlobInfo", ["digest", "size", "created"])
+
+
+class BlobNotFound(Exception):
+    pass
+
+
+def _check_digest(digest):
+    if not isinstance(digest, str) or not _DIGEST.match(digest):
+        raise ValueError(f"Invalid blob digest: {digest!r}")
+    return digest
+
+
+def iter_chunks(source, chunk_size=CHUNK_SIZE):
+    """Yield bytes chunks from bytes, a binary file object or an iterable of bytes."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = bytes(source)
+        for start in range(0, len(source), chunk_size):
+            yield source[start : start + chunk_size]
+    elif hasattr(source, "read"):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        for chunk in source:
+            if chunk:
+                yield bytes(chunk)
+
+
+class BlobStore(ABC):
+    """Interface every blob backend implements."""
+
+    @abstractmethod
+    def put(self, source):
+        """
+        Store bytes from source (see iter_chunks), streaming.
+
+        Returns:
+            BlobInfo: digest, size, and whether a new blob was written
+        """
+
+    @abstractmethod
+    def open(self, digest):
+        """Open a stored blob as a seekable binary file; raises BlobNotFound."""
+
+    @abstractmethod
+    def size(self, digest):
+        """Size in bytes of a stored blob; raises BlobNotFound."""
+
+    @abstractmethod
+    def exists(self, digest):
+        """Whether a blob with this digest is stored."""
+
+    @abstractmethod
+    def delete(self, digest):
+        """Remove a blob; deleting a missing blob is not an error."""
+
+    def iter_range(self, digest, start=0, end=None, chunk_size=CHUNK_SIZE):
+        """Yield bytes start..end (inclusive) of a blob, in chunks."""
+        remaining = None if end is None else end - start + 1
+        with self.open(digest) as blob:
+            blob.seek(start)
+            while remaining is None or remaining > 0:
+                chunk = blob.read(
+                    chunk_size if remaining is None else min(chunk_size, remaining)
+                )
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+
+class FileSystemBlobStore(BlobStore):
+    """Blobs under root/ab/cd/<digest>; temp files under root/tmp."""
+
+    def __init__(self, root=None):
+        self.root = Path(root or settings.INBOX_BLOB_ROOT)
+
+    def path(self, digest):
+        _check_digest(digest)
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def put(self, source):
+        tmp_dir = self.root / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            sha = hashlib.sha256()
+            size = 0
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in iter_chunks(source):
+                    sha.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+
+            digest = sha.hexdigest()
+            path = self.path(digest)
+            if path.exists():
+                os.unlink(tmp_path)
+                return BlobInfo(digest, size, False)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, path)
+            return BlobInfo(digest, size, True)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def open(self, digest):
+        try:
+            return open(self.path(digest), "rb")
+        except FileNotFoundError:
+            raise BlobNotFound(digest) from None
+
+    def size(self, digest):
+        try:
+            return self.path(digest).stat().st_size
+        except FileNotFoundError:
+            raise BlobNotFound(digest) from None
+
+    def exists(self, digest):
+        return self.path(digest).exists()
+
+    def delete(self, digest):
+        self.path(digest).unlink(missing_ok=True)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_blob_store():
+    """The configured backend, built once per backend/options pair."""
+    backend = getattr(
+        settings, "INBOX_BLOB_STORE_BACKEND", f"{__name__}.FileSystemBlobStore"
+    )
+    options = getattr(settings, "INBOX_BLOB_STORE_OPTIONS", {}) or {}
+    key = (backend, repr(sorted(options.items())))
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = import_string(backend)(**options)
+        return _stores[key]
@@ -0,0 +1,204 @@
+"""
+Lazy message bodies (two-phase ingest)
+
+An Inbox with lazy_bodies ingests only metadata: Gmail format=metadata or
+Graph $select without body. Conversations and messages are created from
+the headers and snippet, and each Message is flagged body_pending. That
+halves the provider calls per message (no body or raw MIME fetch) and cuts
+the bytes transferred for mail nobody opens.
+
+Bodies are filled in from the raw MIME (Gmail format=raw, Graph $value),
+which is one call per message and also yields the attachments:
+
+- On open: the message and conversation-messages endpoints hydrate the
+  pending messages they are about to return (INBOX_HYDRATE_ON_OPEN).
+- In the background: `manage.py hydrate_bodies` works through pending
+  messages newest first, INBOX_HYDRATE_BATCH_SIZE at a time, with
+  INBOX_HYDRATE_MAX_WORKERS concurrent fetches per mailbox so live ingest
+  keeps most of the quota.
+
+Messages the provider no longer has keep their snippet and are no longer
+pending. Fetch failures leave them pending for the next pass.
+"""
+
+import base64
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from email.parser import BytesParser
+
+from django.conf import settings
+from django.db import transaction
+
+from ..models import Message, MessageBody
+from .email_parsing import normalize_mime_message
+from .gmail_fetch import GmailFetcher
+from .gmail_service import GmailService
+from .mime_archive import archive_message
+from .outlook_service import OutlookService
+
+logger = logging.getLogger(__name__)
+
+
+def _gmail_raw(account, provider_ids, max_workers):
+    """Yield (provider id, raw MIME or None) for a Gmail mailbox; failed ids are not yielded."""
+    gmail = GmailService(account)
+    fetcher = GmailFetcher(
+        gmail.client.token,
+        user_key=account.identifier,
+        session=gmail.client.session,
+        max_workers=max_workers,
+    )
+    returned = set()
+    for msg in fetcher.iter_messages(provider_ids, fmt="raw"):
+        returned.add(msg.get("id"))
+        encoded = msg.get("raw") or ""
+        yield msg.get("id"), base64.urlsafe_b64decode(
+            encoded + "=" * (-len(encoded) % 4)
+        )
+
+    failed = set(fetcher.failed_ids)
+    for provider_id in provider_ids:
+        if provider_id not in returned and provider_id not in failed:
+            yield provider_id, None  # deleted from the mailbox
+
+
+def _outlook_raw(account, provider_ids, max_workers):
+    """Yield (provider id, raw MIME or None) for an Outlook mailbox; failed ids are not yielded."""
+    service = OutlookService(account)
+
+    def fetch(provider_id):
+        try:
+            return provider_id, service.get_mime(provider_id), True
+        except Exception:
+            logger.warning(
+                "Fetching MIME of Outlook message %s failed", provider_id, exc_info=True
+            )
+            return provider_id, None, False
+
+    with ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="outlook-hydrate"
+    ) as pool:
+        for provider_id, raw, ok in pool.map(fetch, provider_ids):
+            if ok:
+                yield provider_id, raw
+
+
+RAW_FETCHERS = {
+    "gmail": _gmail_raw,
+    "outlook": _outlook_raw,
+}
+
+
+def _save_bodies(hydrated, dropped):
+    """Write hydrated bodies and clear body_pending, in a fixed number of queries."""
+    with transaction.atomic():
+        MessageBody.objects.bulk_create(
+            [
+                MessageBody.build(message, message.content, message.html_content)
+                for message in hydrated
+            ],
+            update_conflicts=True,
+            unique_fields=["message"],
+            update_fields=[
+                "codec",
+                "content",
+                "html_content",
+                "raw_size",
+                "search_text",
+            ],
+        )
+        for message in hydrated + dropped:
+            message.body_pending = False
+        Message.objects.bulk_update(hydrated + dropped, ["preview", "body_pending"])
+
+
+def hydrate_messages(messages, max_workers=None):
+    """
+    Fetch and store the bodies (and attachments) of body_pending messages.
+    Must run inside the tenant schema. Hydrated Message objects carry their
+    new content, so they can be serialized straight away.
+
+    Returns:
+        int: Number of messages hydrated
+    """
+    max_workers = max_workers or settings.INBOX_HYDRATE_MAX_WORKERS
+    archive = getattr(settings, "INBOX_ARCHIVE_RAW_MIME", True)
+    parser = BytesParser()
+
+    by_account = defaultdict(list)
+    dropped = []
+    for message in messages:
+        if not message.body_pending:
+            continue
+        account = message.channel_account
+        if (
+            account is None
+            or not message.provider_message_id
+            or account.provider not in RAW_FETCHERS
+        ):
+            dropped.append(
+                message
+            )  # mailbox disconnected: the snippet is all there will be
+        else:
+            by_account[account].append(message)
+
+    hydrated = []
+    raws = {}
+    for account, pending in by_account.items():
+        by_provider_id = {message.provider_message_id: message for message in pending}
+        try:
+            fetched = RAW_FETCHERS[account.provider](
+                account, list(by_provider_id), max_workers
+            )
+            for provider_id, raw in fetched:
+                message = by_provider_id[provider_id]
+                if raw is None:
+                    dropped.append(message)
+                    continue
+                data = normalize_mime_message(parser.parsebytes(raw))
+                message.content = data["content"] or message.content
+                message.html_content = data["html_content"] or message.html_content
+                hydrated.append(message)
+                raws[message.pk] = raw
+        except Exception:
+            logger.exception("Hydrating message bodies for %s failed", account)
+
+    if hydrated or dropped:
+        _save_bodies(hydrated, dropped)
+    if archive:
+        for message in hydrated:
+            try:
+                archive_message(message, raws[message.pk])
+            except Exception:
+                logger.exception("Archiving message %s failed", message.pk)
+    return len(hydrated)
+
+
+def hydrate_on_open(messages):
+    """Hydrate the pending messages an endpoint is about to return; never raises."""
+    if not settings.INBOX_HYDRATE_ON_OPEN:
+        return 0
+    pending = [message for message in messages if message.body_pending]
+    if not pending:
+        return 0
+    try:
+        return hydrate_messages(pending, max_workers=settings.GMAIL_FETCH_MAX_WORKERS)
+    except Exception:
+        logger.exception("Hydrating %s messages on open failed", len(pending))
+        return 0
+
+
+def hydrate_pending(limit=None):
+    """
+    Hydrate up to limit body_pending messages of the current tenant,
+    newest first. Returns (hydrated, failed) counts; failed ones stay pending.
+    """
+    limit = limit or settings.INBOX_HYDRATE_BATCH_SIZE
+    pending = list(
+        Message.objects.filter(body_pending=True)
+        .select_related("channel_account", "body")
+        .order_by("-timestamp")[:limit]
+    )
+    hydrated = hydrate_messages(pending)
+    return hydrated, sum(1 for message in pending if message.body_pending)
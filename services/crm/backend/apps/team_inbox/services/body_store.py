@@ -0,0 +1,104 @@
+"""
+Message body compression
+
+Message bodies live in MessageBody (a side table keyed by message), not in
+the hot Message table. Each body is stored compressed with the codec named
+in its row:
+
+- zstd: used when the optional `zstandard` package is installed;
+- zlib: stdlib fallback (deflate, the gzip algorithm);
+- none: bodies under INBOX_BODY_COMPRESS_MIN_BYTES, where compression
+  doesn't pay off.
+
+INBOX_BODY_CODEC picks the codec for new writes. Rows written with any
+codec can always be read back.
+
+Next to the compressed bytes each row keeps search_text, the
+whitespace-collapsed plain body (first INBOX_BODY_SEARCH_CHARS characters),
+so message search still covers bodies without decompressing them.
+"""
+
+import zlib
+
+from django.conf import settings
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+CODEC_NONE = "none"
+CODEC_ZLIB = "zlib"
+CODEC_ZSTD = "zstd"
+
+PREVIEW_LENGTH = 255
+
+
+def _write_codec():
+    codec = getattr(settings, "INBOX_BODY_CODEC", CODEC_ZSTD)
+    if codec == CODEC_ZSTD and zstandard is None:
+        return CODEC_ZLIB
+    return codec
+
+
+def _compress(codec, raw):
+    if raw is None:
+        return None
+    if codec == CODEC_ZSTD:
+        level = getattr(settings, "INBOX_BODY_ZSTD_LEVEL", 6)
+        return zstandard.ZstdCompressor(level=level).compress(raw)
+    if codec == CODEC_ZLIB:
+        return zlib.compress(raw, getattr(settings, "INBOX_BODY_ZLIB_LEVEL", 6))
+    return raw
+
+
+def encode_body(content, html_content):
+    """
+    Compress a message's plain and HTML bodies with one codec.
+
+    Returns:
+        tuple: (codec, content_bytes, html_bytes, raw_size)
+    """
+    raw_content = (content or "").encode("utf-8", "surrogatepass")
+    raw_html = (
+        html_content.encode("utf-8", "surrogatepass")
+        if html_content is not None
+        else None
+    )
+    raw_size = len(raw_content) + len(raw_html or b"")
+
+    codec = _write_codec()
+    if raw_size < getattr(settings, "INBOX_BODY_COMPRESS_MIN_BYTES", 256):
+        codec = CODEC_NONE
+    return codec, _compress(codec, raw_content), _compress(codec, raw_html), raw_size
+
+
+def decompress(codec, data):
+    if data is None:
+        return None
+    data = bytes(data)  # psycopg2 hands back memoryview
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError(
+                "zstandard is required to read zstd-compressed message bodies"
+            )
+        return (
+            zstandard.ZstdDecompressor()
+            .decompress(data)
+            .decode("utf-8", "surrogatepass")
+        )
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data).decode("utf-8", "surrogatepass")
+    return data.decode("utf-8", "surrogatepass")
+
+
+def make_preview(text):
+    """Whitespace-collapsed start of a body, kept uncompressed on Message."""
+    return " ".join((text or "").split())[:PREVIEW_LENGTH]
+
+
+def make_search_text(text):
+    """Whitespace-collapsed plain body searched by the message list, kept on MessageBody."""
+    return " ".join((text or "").split())[
+        : getattr(settings, "INBOX_BODY_SEARCH_CHARS", 20000)
+    ]
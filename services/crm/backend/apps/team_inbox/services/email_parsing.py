@@ -0,0 +1,310 @@
+import base64
+import html
+from datetime import UTC, datetime
+from email.header import decode_header, make_header
+from email.utils import getaddresses, parsedate_to_datetime
+
+from .html_text import cached_html_to_text
+
+
+def parse_email_subject_and_snippet(message):
+    headers = message.get("payload", {}).get("headers", [])
+    subject = next(
+        (h["value"] for h in headers if h.get("name", "").lower() == "subject"), None
+    )
+    snippet = message.get("snippet", "")
+    return subject, snippet
+
+
+def parse_email_address(raw):
+    name, email = getaddresses([raw])[0] if raw else ("", "")
+    return {"name": name, "email": email}
+
+
+def parse_email_list(raw):
+    return (
+        [{"name": name, "email": email} for name, email in getaddresses([raw])]
+        if raw
+        else []
+    )
+
+
+def html_to_clean_text(html_body: str) -> str:
+    """
+    Convert Gmail HTML into plain text with controlled newlines
+    (like Gmail does). Single streaming pass, cached by content hash.
+    """
+    return cached_html_to_text(html_body)
+
+
+def preserve_gmail_format(plain_text: str) -> str:
+    escaped = html.escape(plain_text)
+    lines = escaped.splitlines()
+    formatted_lines = []
+    for line in lines:
+        if line.strip() == "":
+            formatted_lines.append("<br>")
+        else:
+            formatted_lines.append(line)
+    return "<br>\n".join(formatted_lines)
+
+
+# --- NEW helper: safe header extraction from Gmail payload headers list ---
+def get_header(headers_list, name: str):
+    """
+    Given Gmail's headers list (list of {"name": "...", "value": "..."})
+    return the value for header 'name' (case-insensitive), or None.
+    """
+    if not headers_list:
+        return None
+    for h in headers_list:
+        if h is None:
+            continue
+        if h.get("name", "").lower() == name.lower():
+            return h.get("value")
+    return None
+
+
+def extract_gmail_bodies(payload):
+    """Return (html_body, plain_body) from a Gmail message payload."""
+    html_body = None
+    plain_body = None
+
+    def walk(parts):
+        for part in parts:
+            if not isinstance(part, dict):
+                continue
+            mime = part.get("mimeType")
+            body_data = part.get("body", {}).get("data")
+            if part.get("parts"):
+                yield from walk(part.get("parts"))
+            elif body_data:
+                try:
+                    decoded = base64.urlsafe_b64decode(body_data).decode(
+                        "utf-8", errors="ignore"
+                    )
+                except Exception:
+                    try:
+                        decoded = base64.b64decode(body_data).decode(
+                            "utf-8", errors="ignore"
+                        )
+                    except Exception:
+                        decoded = ""
+                yield mime, decoded
+
+    parts = payload.get("parts")
+    if parts:
+        for mime, decoded in walk(parts):
+            if not mime or not decoded:
+                continue
+            if mime.lower().split(";")[0] == "text/html" and not html_body:
+                html_body = decoded
+            elif mime.lower().split(";")[0] == "text/plain" and not plain_body:
+                plain_body = decoded
+    else:
+        body_data = payload.get("body", {}).get("data")
+        if body_data:
+            try:
+                plain_body = base64.urlsafe_b64decode(body_data).decode(
+                    "utf-8", errors="ignore"
+                )
+            except Exception:
+                plain_body = None
+
+    if html_body:
+        # Clean HTML to preserve blank lines
+        plain_body = html_to_clean_text(html_body)
+    elif plain_body:
+        # fallback to text → HTML
+        html_body = preserve_gmail_format(plain_body)
+
+    return html_body, plain_body
+
+
+def parse_gmail_timestamp(msg):
+    """Gmail internalDate (epoch millis) as an aware UTC datetime."""
+    return datetime.fromtimestamp(int(msg.get("internalDate", 0)) / 1000.0, tz=UTC)
+
+
+def parse_iso_datetime(iso_str):
+    """Graph API ISO timestamp ('...Z') as an aware datetime; now() if unparseable."""
+    try:
+        return datetime.fromisoformat(iso_str.replace("Z", "+00:00"))
+    except Exception:
+        return datetime.now(tz=UTC)
+
+
+def _split_references(references):
+    refs = [r.strip() for r in references.split()] if references else []
+    return refs or None
+
+
+def normalize_gmail_message(msg):
+    """
+    Map a Gmail API message (format=full) onto Message fields. The result is
+    what write_message_batch expects from every provider.
+    """
+    subject, snippet = parse_email_subject_and_snippet(msg)
+    headers_list = msg.get("payload", {}).get("headers", []) or []
+    headers = {
+        h.get("name", "").lower(): h.get("value")
+        for h in headers_list
+        if isinstance(h, dict)
+    }
+    html_body, plain_body = extract_gmail_bodies(msg.get("payload", {}) or {})
+    reply_to = parse_email_list(headers.get("reply-to"))
+    in_reply_to = headers.get("in-reply-to")
+
+    return {
+        "message_id": (headers.get("message-id") or msg.get("id"))[:255],
+        "provider_message_id": (msg.get("id") or "")[:255],
+        "thread_id": msg.get("threadId"),
+        "in_reply_to": in_reply_to[:255] if in_reply_to else None,
+        "references": _split_references(headers.get("references")),
+        "subject": (subject or "(No Subject)")[:255],
+        "from_email": parse_email_address(headers.get("from")),
+        "to": parse_email_list(headers.get("to")),
+        "cc": parse_email_list(headers.get("cc")) or None,
+        "bcc": parse_email_list(headers.get("bcc")) or None,
+        "reply_to": reply_to[0] if reply_to else None,
+        "content": plain_body or snippet or "",
+        "html_content": html_body or preserve_gmail_format(plain_body or snippet or ""),
+        "timestamp": parse_gmail_timestamp(msg),
+    }
+
+
+def _graph_recipients(recips):
+    if not recips:
+        return []
+    return [
+        {
+            "email": r.get("emailAddress", {}).get("address"),
+            "name": r.get("emailAddress", {}).get("name"),
+        }
+        for r in recips
+        if r.get("emailAddress", {}).get("address")
+    ]
+
+
+def normalize_outlook_message(msg, fallback_id=None):
+    """Map a Microsoft Graph message onto Message fields (see normalize_gmail_message)."""
+    from_ea = (msg.get("from") or {}).get("emailAddress") or {}
+    reply_to = _graph_recipients(msg.get("replyTo"))
+    headers = {
+        h.get("name", "").lower(): h.get("value")
+        for h in msg.get("internetMessageHeaders") or []
+    }
+    in_reply_to = headers.get("in-reply-to")
+    thread_id = msg.get("conversationId")
+
+    return {
+        "message_id": (msg.get("internetMessageId") or fallback_id or msg.get("id"))[
+            :255
+        ],
+        "provider_message_id": (msg.get("id") or fallback_id or "")[:255],
+        "thread_id": thread_id[:255] if thread_id else None,
+        "in_reply_to": in_reply_to[:255] if in_reply_to else None,
+        "references": _split_references(headers.get("references")),
+        "subject": (msg.get("subject") or "(No Subject)")[:255],
+        "from_email": {"email": from_ea.get("address"), "name": from_ea.get("name")},
+        "to": _graph_recipients(msg.get("toRecipients")),
+        "cc": _graph_recipients(msg.get("ccRecipients")) or None,
+        "bcc": _graph_recipients(msg.get("bccRecipients")) or None,
+        "reply_to": reply_to[0] if reply_to else None,
+        "content": msg.get("bodyPreview") or "",
+        "html_content": (msg.get("body") or {}).get("content"),
+        "timestamp": parse_iso_datetime(msg.get("receivedDateTime")),
+    }
+
+
+def decode_mime_header(value):
+    """RFC 2047 header value as text ('=?utf-8?q?...?=' words decoded)."""
+    if value is None:
+        return None
+    try:
+        return str(make_header(decode_header(str(value))))
+    except (LookupError, UnicodeError, ValueError):
+        return str(value)
+
+
+def _part_text(part):
+    payload = part.get_payload(decode=True) or b""
+    try:
+        return payload.decode(part.get_content_charset() or "utf-8", errors="replace")
+    except LookupError:
+        # Unknown charset name
+        return payload.decode("utf-8", errors="replace")
+
+
+def _is_attachment(part):
+    return part.get_content_disposition() == "attachment" or bool(part.get_filename())
+
+
+def mime_bodies(parsed):
+    """Return (html_body, plain_body): the first inline text/html and text/plain parts."""
+    html_body = plain_body = None
+    for part in parsed.walk():
+        if part.is_multipart() or _is_attachment(part):
+            continue
+        content_type = part.get_content_type()
+        if content_type == "text/html" and html_body is None:
+            html_body = _part_text(part)
+        elif content_type == "text/plain" and plain_body is None:
+            plain_body = _part_text(part)
+    return html_body, plain_body
+
+
+def _mime_date(value):
+    """Date header as an aware datetime (naive dates are taken as UTC); now() if unparseable."""
+    try:
+        parsed = parsedate_to_datetime(str(value))
+    except (TypeError, ValueError, IndexError):
+        return datetime.now(tz=UTC)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=UTC)
+
+
+def message_attachments(parsed):
+    """Yield (filename, mime_type, payload) for each attachment of a parsed MIME message."""
+    for part in parsed.walk():
+        if part.is_multipart() or not _is_attachment(part):
+            continue
+        filename = decode_mime_header(part.get_filename())
+        payload = part.get_payload(decode=True) or b""
+        yield (filename or "attachment")[:255], part.get_content_type()[:100], payload
+
+
+def normalize_mime_message(parsed, fallback_id=None):
+    """
+    Map a parsed RFC 822 message (email.message.Message from the default
+    compat32 parser, or an EmailMessage) onto Message fields (see
+    normalize_gmail_message). Imported mail has no provider thread id, so
+    it threads by Message-ID/In-Reply-To/References.
+    """
+
+    def header(name):
+        value = decode_mime_header(parsed.get(name))
+        return value.strip() if value else None
+
+    html_body, plain_body = mime_bodies(parsed)
+    if html_body and not plain_body:
+        plain_body = html_to_clean_text(html_body)
+    elif plain_body and not html_body:
+        html_body = preserve_gmail_format(plain_body)
+    reply_to = parse_email_list(header("reply-to"))
+    in_reply_to = header("in-reply-to")
+
+    return {
+        "message_id": (header("message-id") or fallback_id)[:255],
+        "thread_id": None,
+        "in_reply_to": in_reply_to[:255] if in_reply_to else None,
+        "references": _split_references(header("references")),
+        "subject": (header("subject") or "(No Subject)")[:255],
+        "from_email": parse_email_address(header("from")),
+        "to": parse_email_list(header("to")),
+        "cc": parse_email_list(header("cc")) or None,
+        "bcc": parse_email_list(header("bcc")) or None,
+        "reply_to": reply_to[0] if reply_to else None,
+        "content": plain_body or "",
+        "html_content": html_body or "",
+        "timestamp": _mime_date(parsed.get("date")),
+    }
@@ -0,0 +1,169 @@
+"""
+Sequenced, replayable log of realtime inbox events
+
+Every event published to the inbox groups is first given the next
+per-tenant sequence number and appended to a bounded log. A reconnecting
+socket sends the last sequence it saw (resume_from) and gets the events it
+missed replayed. If the log no longer reaches back that far it is told to
+resync instead.
+
+Backends (INBOX_EVENT_LOG_BACKEND, options in INBOX_EVENT_LOG_OPTIONS):
+- RedisEventLog: a Redis stream per tenant. Entry ids are the sequence
+  numbers, assigned and appended atomically by one Lua script. Shared by
+  every web and worker process.
+- MemoryEventLog: a ring buffer per tenant, for tests and single-process
+  development.
+"""
+
+import json
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+
+import redis
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class EventLog(ABC):
+    """Interface every event log backend implements."""
+
+    @abstractmethod
+    def append(self, tenant_id, events):
+        """
+        Assign sequence numbers to events (in place, as event["seq"]) and
+        store them.
+
+        Returns:
+            list: The events, now carrying "seq"
+        """
+
+    @abstractmethod
+    def last_seq(self, tenant_id):
+        """The highest sequence number issued for the tenant (0 if none)."""
+
+    @abstractmethod
+    def read_since(self, tenant_id, after_seq, limit):
+        """
+        Events with seq > after_seq, oldest first.
+
+        Returns:
+            list | None: The events, or None when they can't all be replayed
+                (trimmed from the log, more than limit, or after_seq is from
+                a log that has since been reset)
+        """
+
+
+def _max_events():
+    return getattr(settings, "INBOX_EVENT_LOG_MAX_EVENTS", 10_000)
+
+
+class MemoryEventLog(EventLog):
+    def __init__(self, max_events=None):
+        self.max_events = max_events or _max_events()
+        self.tenants = {}
+        self.lock = threading.Lock()
+
+    def _tenant(self, tenant_id):
+        return self.tenants.setdefault(
+            str(tenant_id), {"seq": 0, "events": deque(maxlen=self.max_events)}
+        )
+
+    def append(self, tenant_id, events):
+        with self.lock:
+            log = self._tenant(tenant_id)
+            for event in events:
+                log["seq"] += 1
+                event["seq"] = log["seq"]
+                log["events"].append(event)
+        return events
+
+    def last_seq(self, tenant_id):
+        with self.lock:
+            return self._tenant(tenant_id)["seq"]
+
+    def read_since(self, tenant_id, after_seq, limit):
+        with self.lock:
+            log = self._tenant(tenant_id)
+            last = log["seq"]
+            if after_seq > last or last - after_seq > limit:
+                return None
+            if after_seq == last:
+                return []
+            oldest = log["events"][0]["seq"] if log["events"] else last + 1
+            if oldest > after_seq + 1:
+                return None
+            return [event for event in log["events"] if event["seq"] > after_seq]
+
+
+# KEYS: seq counter, stream. ARGV: maxlen, then one JSON payload per event.
+# Returns the first sequence number assigned.
+_APPEND_SCRIPT = """
+local count = #ARGV - 1
+local last = redis.call('INCRBY', KEYS[1], count)
+local first = last - count + 1
+for i = 2, #ARGV do
+    redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[1], (first + i - 2) .. '-0', 'e', ARGV[i])
+end
+return first
+"""
+
+
+class RedisEventLog(EventLog):
+    def __init__(self, url=None, max_events=None, prefix="inbox_events"):
+        self.redis = redis.Redis.from_url(url or settings.INBOX_EVENT_LOG_REDIS_URL)
+        self.max_events = max_events or _max_events()
+        self.prefix = prefix
+        self.append_script = self.redis.register_script(_APPEND_SCRIPT)
+
+    def _keys(self, tenant_id):
+        return f"{self.prefix}:{tenant_id}:seq", f"{self.prefix}:{tenant_id}:stream"
+
+    def append(self, tenant_id, events):
+        if not events:
+            return events
+        payloads = [json.dumps(event) for event in events]
+        first = int(
+            self.append_script(
+                keys=self._keys(tenant_id), args=[self.max_events, *payloads]
+            )
+        )
+        for offset, event in enumerate(events):
+            event["seq"] = first + offset
+        return events
+
+    def last_seq(self, tenant_id):
+        return int(self.redis.get(self._keys(tenant_id)[0]) or 0)
+
+    def read_since(self, tenant_id, after_seq, limit):
+        last = self.last_seq(tenant_id)
+        if after_seq > last or last - after_seq > limit:
+            return None
+        if after_seq == last:
+            return []
+        entries = self.redis.xrange(
+            self._keys(tenant_id)[1], min=f"{after_seq + 1}-0", max="+", count=limit
+        )
+        if not entries or int(entries[0][0].split(b"-")[0]) != after_seq + 1:
+            return None  # trimmed past after_seq
+        events = []
+        for entry_id, fields in entries:
+            event = json.loads(fields[b"e"])
+            event["seq"] = int(entry_id.split(b"-")[0])
+            events.append(event)
+        return events
+
+
+_logs = {}
+_logs_lock = threading.Lock()
+
+
+def get_event_log():
+    """The configured backend, built once per backend/options pair."""
+    backend = getattr(settings, "INBOX_EVENT_LOG_BACKEND", f"{__name__}.RedisEventLog")
+    options = getattr(settings, "INBOX_EVENT_LOG_OPTIONS", {}) or {}
+    key = (backend, repr(sorted(options.items())))
+    with _logs_lock:
+        if key not in _logs:
+            _logs[key] = import_string(backend)(**options)
+        return _logs[key]
@@ -0,0 +1,270 @@
+"""
+Concurrent Gmail message fetching
+
+GmailFetcher talks to the Gmail REST API directly over a pooled
+requests.Session (googleapiclient service objects are not thread-safe) and
+fetches messages on a bounded thread pool. Results are yielded as they
+arrive so the ingest step can start storing while the rest are in flight.
+
+Every call draws from a per-user token bucket sized to Gmail's per-user
+quota (250 units/s; messages.get costs 5), and 429/5xx responses are retried
+with backoff, honouring Retry-After.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://gmail.googleapis.com/gmail/v1"
+
+# Gmail API quota units per method
+MESSAGES_GET_UNITS = 5
+MESSAGES_LIST_UNITS = 5
+HISTORY_LIST_UNITS = 2
+GET_PROFILE_UNITS = 1
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Headers normalize_gmail_message reads; format=metadata returns only these
+METADATA_HEADERS = [
+    "Message-ID",
+    "Subject",
+    "From",
+    "To",
+    "Cc",
+    "Bcc",
+    "Reply-To",
+    "In-Reply-To",
+    "References",
+]
+
+
+class GmailApiError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class QuotaLimiter:
+    """Token bucket of Gmail quota units for one user."""
+
+    def __init__(self, units_per_second):
+        self.rate = float(units_per_second)
+        self.capacity = float(units_per_second)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, units):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= units:
+                    self.tokens -= units
+                    return
+                wait_for = (units - self.tokens) / self.rate
+            time.sleep(wait_for)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_quota_limiter(user_key):
+    """Process-wide limiter per mailbox, shared by every fetcher for that user."""
+    with _limiters_lock:
+        limiter = _limiters.get(user_key)
+        if limiter is None:
+            limiter = _limiters[user_key] = QuotaLimiter(
+                getattr(settings, "GMAIL_QUOTA_UNITS_PER_SECOND", 250)
+            )
+        return limiter
+
+
+class GmailFetcher:
+    """Bounded-concurrency Gmail REST client for one mailbox."""
+
+    def __init__(
+        self,
+        access_token,
+        user_key,
+        base_url=None,
+        max_workers=None,
+        limiter=None,
+        timeout=30,
+        max_retries=4,
+        session=None,
+    ):
+        self.base_url = (
+            base_url or getattr(settings, "GMAIL_API_BASE_URL", DEFAULT_BASE_URL)
+        ).rstrip("/")
+        self.max_workers = max_workers or getattr(
+            settings, "GMAIL_FETCH_MAX_WORKERS", 8
+        )
+        self.limiter = limiter or get_quota_limiter(user_key)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.failed_ids = []
+
+        if session is None:
+            # A cached provider client passes its own pooled, authorized session
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["Authorization"] = f"Bearer {access_token}"
+        self.session = session
+
+    def _get(self, path, params=None, units=MESSAGES_GET_UNITS):
+        """GET with quota accounting and retry; returns JSON or None on 404."""
+        url = f"{self.base_url}/users/me/{path}"
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(units)
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                if attempt == self.max_retries:
+                    raise GmailApiError(f"Gmail request failed: {e}") from e
+                time.sleep(min(2**attempt, 30))
+                continue
+
+            if response.status_code == 404:
+                return None
+            if response.status_code in RETRYABLE_STATUS and attempt < self.max_retries:
+                retry_after = response.headers.get("Retry-After")
+                delay = (
+                    float(retry_after)
+                    if retry_after and retry_after.isdigit()
+                    else 2**attempt
+                )
+                time.sleep(min(delay, 30))
+                continue
+            if response.status_code >= 400:
+                raise GmailApiError(
+                    f"Gmail API error {response.status_code} for {path}",
+                    response.status_code,
+                )
+            return response.json()
+
+        raise GmailApiError(f"Gmail API retries exhausted for {path}")
+
+    def list_history(self, start_history_id):
+        """
+        Message ids added since start_history_id, oldest first, plus the
+        mailbox's latest historyId. Raises GmailApiError(status=404) when the
+        start id is too old and a full resync is needed.
+        """
+        message_ids = []
+        latest_history_id = None
+        page_token = None
+        while True:
+            params = {
+                "startHistoryId": start_history_id,
+                "historyTypes": "messageAdded",
+            }
+            if page_token:
+                params["pageToken"] = page_token
+            page = self._get("history", params, units=HISTORY_LIST_UNITS)
+            if page is None:
+                raise GmailApiError("History id expired", 404)
+
+            for record in page.get("history", []):
+                for added in record.get("messagesAdded", []) or record.get(
+                    "messages", []
+                ):
+                    msg = added.get("message", added)
+                    if msg.get("id"):
+                        message_ids.append(msg["id"])
+
+            latest_history_id = page.get("historyId", latest_history_id)
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                break
+
+        return list(dict.fromkeys(message_ids)), latest_history_id
+
+    def get_profile(self):
+        """The mailbox profile: emailAddress, messagesTotal and the current historyId."""
+        return self._get("profile", units=GET_PROFILE_UNITS) or {}
+
+    def list_message_ids(self, max_results=10, query=None, label_ids=("INBOX",)):
+        params = {"maxResults": max_results, "labelIds": list(label_ids)}
+        if query:
+            params["q"] = query
+        page = self._get("messages", params, units=MESSAGES_LIST_UNITS) or {}
+        return [msg["id"] for msg in page.get("messages", []) if msg.get("id")]
+
+    def list_message_page(
+        self, query=None, page_token=None, max_results=500, label_ids=("INBOX",)
+    ):
+        """
+        One page of messages.list.
+
+        Returns:
+            tuple: (message ids, next page token or None, resultSizeEstimate)
+        """
+        params = {"maxResults": max_results, "labelIds": list(label_ids)}
+        if query:
+            params["q"] = query
+        if page_token:
+            params["pageToken"] = page_token
+        page = self._get("messages", params, units=MESSAGES_LIST_UNITS) or {}
+        ids = [msg["id"] for msg in page.get("messages", []) if msg.get("id")]
+        return ids, page.get("nextPageToken"), page.get("resultSizeEstimate")
+
+    def get_message(self, message_id, fmt="full"):
+        params = {"format": fmt}
+        if fmt == "metadata":
+            params["metadataHeaders"] = METADATA_HEADERS
+        return self._get(f"messages/{message_id}", params, units=MESSAGES_GET_UNITS)
+
+    def _fetch_one(self, message_id, fmt):
+        try:
+            return message_id, self.get_message(message_id, fmt)
+        except GmailApiError as e:
+            logger.warning("Gmail fetch failed for %s: %s", message_id, e)
+            self.failed_ids.append(message_id)
+            return message_id, None
+
+    def iter_messages(self, message_ids, fmt="full"):
+        """
+        Yield fetched messages as they complete, keeping at most
+        2 * max_workers requests queued. Ids that fail after retries are
+        collected in failed_ids; deleted messages (404) are skipped.
+        """
+        pending_ids = iter(dict.fromkeys(message_ids))
+        window = self.max_workers * 2
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="gmail-fetch"
+        ) as pool:
+            in_flight = set()
+            for message_id in pending_ids:
+                in_flight.add(pool.submit(self._fetch_one, message_id, fmt))
+                if len(in_flight) >= window:
+                    break
+
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    _, message = future.result()
+                    if message:
+                        yield message
+                for message_id in pending_ids:
+                    in_flight.add(pool.submit(self._fetch_one, message_id, fmt))
+                    if len(in_flight) >= window:
+                        break
+
+    def close(self):
+        self.session.close()
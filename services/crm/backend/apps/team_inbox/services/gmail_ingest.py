@@ -0,0 +1,147 @@
+import base64
+import logging
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.functions import Length
+
+from ..models import ChannelAccount
+from .email_parsing import normalize_gmail_message
+from .gmail_fetch import GmailApiError
+from .gmail_service import GmailService
+from .message_writer import write_message_batch
+from .mime_archive import archive_message
+
+logger = logging.getLogger(__name__)
+
+
+def ingest_gmail_message(account, tenant, msg):
+    """
+    Store one Gmail API message (format=full) and broadcast it.
+    Returns the Message, or None when it was already stored.
+    """
+    stored = write_message_batch(account, tenant, [normalize_gmail_message(msg)])
+    return stored[0] if stored else None
+
+
+def advance_history_id(account, history_id):
+    """
+    Move the mailbox's Gmail checkpoint forward in one conditional UPDATE.
+    historyIds are decimal strings, compared by length and then value, so a
+    sync that finishes late can never move the checkpoint back.
+
+    Returns:
+        bool: True when the checkpoint moved
+    """
+    history_id = str(history_id)
+    behind = (
+        Q(last_history_id__isnull=True)
+        | Q(history_length__lt=len(history_id))
+        | Q(history_length=len(history_id), last_history_id__lt=history_id)
+    )
+    moved = (
+        ChannelAccount.objects.filter(pk=account.pk)
+        .annotate(history_length=Length("last_history_id"))
+        .filter(behind)
+        .update(last_history_id=history_id)
+    )
+    if moved:
+        account.last_history_id = history_id
+    return bool(moved)
+
+
+def store_gmail_messages(
+    gmail, account, tenant, messages, broadcast=True, metadata_only=False
+):
+    """
+    Normalize streamed Gmail messages and write them in batches of
+    INBOX_INGEST_WRITE_BATCH_SIZE as they arrive, then archive their MIME.
+    With metadata_only (format=metadata messages) they are stored with
+    their snippet and body_pending, and archiving is left to hydration.
+
+    Raises GmailApiError when any fetch still failed after retries; already
+    stored messages are skipped by the message_id dedup on the next pass.
+
+    Returns:
+        list: Newly stored Message objects
+    """
+    batch_size = getattr(settings, "INBOX_INGEST_WRITE_BATCH_SIZE", 50)
+
+    stored = []
+    batch = []
+    gmail_ids = {}
+    for msg in messages:
+        data = normalize_gmail_message(msg)
+        data["body_pending"] = metadata_only
+        gmail_ids[data["message_id"]] = msg.get("id")
+        batch.append(data)
+        if len(batch) >= batch_size:
+            stored.extend(
+                write_message_batch(account, tenant, batch, broadcast=broadcast)
+            )
+            batch = []
+    if batch:
+        stored.extend(write_message_batch(account, tenant, batch, broadcast=broadcast))
+
+    failed_ids = gmail.fetcher.failed_ids
+    if failed_ids:
+        raise GmailApiError(f"{len(failed_ids)} Gmail messages could not be fetched")
+
+    if getattr(settings, "INBOX_ARCHIVE_RAW_MIME", True) and not metadata_only:
+        archive_gmail_messages(
+            gmail.fetcher, {gmail_ids[m.message_id]: m for m in stored}
+        )
+    return stored
+
+
+def sync_gmail_mailbox(account, tenant, history_id):
+    """
+    Pull everything added to a Gmail mailbox since history_id, store it and
+    advance the account's history checkpoint. Must run inside the tenant schema.
+
+    Messages are fetched concurrently and stored by store_gmail_messages;
+    for a lazy_bodies inbox only their metadata is fetched. If any fetch
+    still fails after retries the checkpoint is left alone and the error is
+    raised, so the queue retries the job.
+
+    Returns:
+        int: Number of new messages stored
+    """
+    gmail = GmailService(account)
+    lazy = account.inbox.lazy_bodies
+    messages, new_history_id = gmail.stream_new_emails(
+        history_id, fmt="metadata" if lazy else "full"
+    )
+    stored = store_gmail_messages(gmail, account, tenant, messages, metadata_only=lazy)
+
+    if new_history_id:
+        advance_history_id(account, new_history_id)
+
+    return len(stored)
+
+
+def archive_gmail_messages(fetcher, messages):
+    """
+    Fetch format=raw for stored messages and archive their MIME and
+    attachments. Failures are logged, not raised: the messages themselves are
+    already stored and the history checkpoint has moved on.
+
+    Args:
+        fetcher: GmailFetcher for the mailbox
+        messages (dict): Gmail message id -> stored Message
+
+    Returns:
+        int: Number of messages archived
+    """
+    archived = 0
+    for raw in fetcher.iter_messages(list(messages), fmt="raw"):
+        message = messages.get(raw.get("id"))
+        if message is None or not raw.get("raw"):
+            continue
+        try:
+            encoded = raw["raw"] + "=" * (-len(raw["raw"]) % 4)
+            archive_message(message, base64.urlsafe_b64decode(encoded))
+            archived += 1
+        except Exception:
+            logger.exception("Archiving Gmail message %s failed", raw.get("id"))
+    return archived
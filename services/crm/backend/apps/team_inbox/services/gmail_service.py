@@ -1,7 +1,7 @@
-import requests
 from django.conf import settings
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
+
+from .gmail_fetch import GmailApiError, GmailFetcher
+from .provider_clients import ensure_fresh_token, get_provider_client
 
 
 class GmailService:
@@ -9,111 +9,74 @@ class GmailService:
 
     def __init__(self, channel_account):
         self.channel_account = channel_account
-        self.credentials = Credentials(
-            token=channel_account.access_token,
-            refresh_token=channel_account.refresh_token,
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=settings.GOOGLE_CLIENT_ID,
-            client_secret=settings.GOOGLE_CLIENT_SECRET,
-        )
-
-        # Refresh token if expired
-        if not self.credentials.valid and self.credentials.refresh_token:
-            self.credentials.refresh(requests.Request())
-            #  update channel_account with new access_token if you store tokens in DB
-            channel_account.access_token = self.credentials.token
-            channel_account.save(update_fields=["access_token"])
+        # Tokens are refreshed ahead of expiry by refresh_channel_tokens
+        ensure_fresh_token(channel_account)
+        self.client = get_provider_client(channel_account)
+        self.credentials = self.client.credentials
+        self._fetcher = None
 
-        self.service = build("gmail", "v1", credentials=self.credentials)
+    @property
+    def service(self):
+        """googleapiclient resource (built from the process's cached discovery document)."""
+        return self.client.gmail_service
 
     def start_watch(self):
         """Start Gmail push notifications (Pub/Sub watch)."""
         url = "https://gmail.googleapis.com/gmail/v1/users/me/watch"
-        headers = {
-            "Authorization": f"Bearer {self.credentials.token}",
-            "Content-Type": "application/json",
-        }
         payload = {
             "labelIds": ["INBOX"],
             "topicName": "projects/team-inbox-project/topics/inbox-notify",
         }
 
-        response = requests.post(url, headers=headers, json=payload)
+        response = self.client.session.post(url, json=payload, timeout=settings.PROVIDER_HTTP_TIMEOUT)
         response.raise_for_status()
         return response.json()
 
-    def fetch_new_emails(self, history_id):
-        """Fetch new emails using Gmail history API.  
-        Falls back to recent unread messages if history is expired/missing.
+    @property
+    def fetcher(self):
+        """Concurrent REST fetcher sharing this mailbox's quota bucket."""
+        if self._fetcher is None:
+            self._fetcher = GmailFetcher(
+                self.client.token, user_key=self.channel_account.identifier, session=self.client.session,
+            )
+        return self._fetcher
+
+    def stream_new_emails(self, history_id, fmt="full"):
         """
-        full_messages = []
-        page_token = None
+        Return (messages, new_history_id) where messages is an iterator that
+        yields messages (format fmt) as the concurrent fetches complete.
 
+        If the history id has expired, falls back to recent unread messages
+        and returns the mailbox's current historyId (read before listing
+        them), so the checkpoint moves past the expired id and the next sync
+        resumes from history.
+        """
         try:
-            while True:
-                history = (
-                    self.service.users()
-                    .history()
-                    .list(
-                        userId="me",
-                        startHistoryId=history_id,
-                        historyTypes=["messageAdded"],
-                        pageToken=page_token,
-                    )
-                    .execute()
-                )
-
-                if not history.get("history"):
-                    return self.fetch_recent_messages(), None
-
-                for record in history.get("history", []):
-                    for msg in record.get("messages", []):
-                        msg_id = msg.get("id")
-                        if msg_id:
-                            msg_data = self._safe_fetch_message(msg_id)
-                            if msg_data:
-                                full_messages.append(msg_data)
-
-                page_token = history.get("nextPageToken")
-                if not page_token:
-                    break
-
-            return full_messages, history.get("historyId")
+            message_ids, new_history_id = self.fetcher.list_history(history_id)
+        except GmailApiError as e:
+            if e.status != 404:
+                raise
+            current_history_id = self.fetcher.get_profile().get("historyId")
+            return self.stream_recent_messages(fmt=fmt), current_history_id
+        return self.fetcher.iter_messages(message_ids, fmt=fmt), new_history_id
+
+    def stream_recent_messages(self, max_results=10, fmt="full"):
+        """Stream recent unread messages from the INBOX."""
+        return self.fetcher.iter_messages(self.fetcher.list_message_ids(max_results, query="is:unread"), fmt=fmt)
 
-        except Exception:
+    def fetch_new_emails(self, history_id):
+        """Fetch new emails using Gmail history API.
+        Falls back to recent unread messages if history is expired/missing.
+        """
+        try:
+            messages, new_history_id = self.stream_new_emails(history_id)
+            return list(messages), new_history_id
+        except GmailApiError:
             return self.fetch_recent_messages(), None
 
     def fetch_recent_messages(self, max_results=10):
         """Fetch recent unread messages from the INBOX."""
-        full_messages = []
         try:
-            response = (
-                self.service.users()
-                .messages()
-                .list(userId="me", maxResults=max_results, labelIds=["INBOX"], q="is:unread")
-                .execute()
-            )
-
-            for msg in response.get("messages", []):
-                msg_id = msg.get("id")
-                if msg_id:
-                    msg_data = self._safe_fetch_message(msg_id)
-                    if msg_data:
-                        full_messages.append(msg_data)
-
-            return full_messages
-
-        except Exception:
+            return list(self.stream_recent_messages(max_results))
+        except GmailApiError:
             return []
-
-    def _safe_fetch_message(self, msg_id):
-        """Safely fetch a single Gmail message."""
-        try:
-            return (
-                self.service.users()
-                .messages()
-                .get(userId="me", id=msg_id, format="full")
-                .execute()
-            )
-        except Exception:
-            return None
@@ -0,0 +1,212 @@
+"""
+Single-pass HTML to plain text for email bodies
+
+HtmlTextExtractor is a streaming html.parser subclass. The body is fed in
+chunks and text is emitted as tags go by. There is no tree to build, mutate
+and re-serialize, and no second parse.
+
+Output contract (same as the old BeautifulSoup pipeline):
+- style/script/head/title/noscript content is dropped, as are images,
+  so tracking pixels never reach the text;
+- <br> is a line break, and block elements (p, div, tr, td, li, headings…)
+  start a new line;
+- runs of spaces collapse to one and lines are stripped;
+- at most one blank line between paragraphs, with a single trailing newline.
+
+Bodies longer than INBOX_HTML_MAX_CHARS are truncated before parsing. Output
+stops at INBOX_TEXT_MAX_CHARS. Parsing stops after INBOX_HTML_TIMEOUT_MS and
+keeps whatever text was extracted so far. Results are cached in-process by
+SHA-256 of the body, since newsletters arrive in many mailboxes at once.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from html.parser import HTMLParser
+
+from django.conf import settings
+
+SKIP_TAGS = {"style", "script", "head", "title", "noscript", "template", "svg"}
+BLOCK_TAGS = {
+    "p",
+    "div",
+    "section",
+    "article",
+    "header",
+    "footer",
+    "main",
+    "aside",
+    "nav",
+    "table",
+    "tbody",
+    "thead",
+    "tfoot",
+    "tr",
+    "td",
+    "th",
+    "caption",
+    "ul",
+    "ol",
+    "li",
+    "dl",
+    "dt",
+    "dd",
+    "blockquote",
+    "pre",
+    "hr",
+    "center",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "address",
+    "figure",
+    "figcaption",
+    "form",
+}
+
+CHUNK_SIZE = 64 * 1024
+_SPACES = re.compile(r"\s+")
+_BLANK_RUNS = re.compile(r"\n{3,}")
+
+
+class HtmlTextExtractor(HTMLParser):
+    def __init__(self, max_chars):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.parts = []
+        self.length = 0
+        self.skip_depth = 0
+        self.pre_depth = 0
+        self.truncated = False
+
+    def _emit(self, text):
+        if self.length + len(text) > self.max_chars:
+            text = text[: max(self.max_chars - self.length, 0)]
+            self.truncated = True
+        self.parts.append(text)
+        self.length += len(text)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+            return
+        if tag == "body":
+            # An unclosed <head> must not swallow the body
+            self.skip_depth = 0
+        if self.skip_depth:
+            return
+        if tag == "br":
+            self._emit("\n")
+        elif tag in BLOCK_TAGS:
+            self._emit("\n")
+            if tag == "pre":
+                self.pre_depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        # Self-closing tags (<br/>, <img/>, <div/>) never open a skip block
+        if not self.skip_depth and (tag == "br" or tag in BLOCK_TAGS):
+            self._emit("\n")
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skip_depth = max(self.skip_depth - 1, 0)
+            return
+        if self.skip_depth:
+            return
+        if tag in BLOCK_TAGS:
+            self._emit("\n")
+            if tag == "pre":
+                self.pre_depth = max(self.pre_depth - 1, 0)
+
+    def handle_data(self, data):
+        if self.skip_depth or not data:
+            return
+        if self.pre_depth:
+            self._emit(data.replace("\r\n", "\n").replace("\r", "\n"))
+        else:
+            self._emit(_SPACES.sub(" ", data))
+
+    def text(self):
+        lines = (line.strip(" \t\xa0") for line in "".join(self.parts).split("\n"))
+        text = "\n".join(lines)
+        return _BLANK_RUNS.sub("\n\n", text).strip() + "\n"
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def html_to_text(html_body, max_html_chars=None, max_chars=None, timeout_ms=None):
+    """
+    Convert an HTML email body to plain text in one streaming pass.
+
+    Returns:
+        tuple: (text, truncated) where truncated is True when a size cap or
+            the timeout cut the conversion short
+    """
+    max_html_chars = max_html_chars or _setting("INBOX_HTML_MAX_CHARS", 2 * 1024 * 1024)
+    max_chars = max_chars or _setting("INBOX_TEXT_MAX_CHARS", 200_000)
+    timeout_ms = timeout_ms or _setting("INBOX_HTML_TIMEOUT_MS", 500)
+
+    html_body = html_body or ""
+    truncated = len(html_body) > max_html_chars
+    if truncated:
+        html_body = html_body[:max_html_chars]
+
+    parser = HtmlTextExtractor(max_chars)
+    deadline = time.monotonic() + timeout_ms / 1000.0
+    for start in range(0, len(html_body), CHUNK_SIZE):
+        parser.feed(html_body[start : start + CHUNK_SIZE])
+        if parser.truncated or time.monotonic() > deadline:
+            truncated = True
+            break
+    else:
+        parser.close()
+
+    return parser.text(), truncated or parser.truncated
+
+
+class _LRUCache:
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, max_entries):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_cache = _LRUCache()
+
+
+def cached_html_to_text(html_body):
+    """html_to_text keyed by content hash; returns only the text."""
+    max_entries = _setting("INBOX_HTML_TEXT_CACHE_SIZE", 1024)
+    if not max_entries:
+        return html_to_text(html_body)[0]
+
+    key = hashlib.sha256((html_body or "").encode("utf-8", "surrogatepass")).digest()
+    text = _cache.get(key)
+    if text is None:
+        text = html_to_text(html_body)[0]
+        _cache.set(key, text, max_entries)
+    return text
@@ -0,0 +1,268 @@
+"""
+Mailbox ingestion queue
+
+Webhooks only record an IngestJob and return; worker processes
+(`manage.py process_ingest_queue`) claim jobs and run the provider sync.
+
+- Per-mailbox ordering: a job is only claimable when no older job for the
+  same ChannelAccount is pending or processing, and a partial unique index
+  allows a single processing job per account even across workers.
+- Coalescing: a mailbox has at most one pending job. Notifications that
+  arrive while one is pending fold into it (coalesced += 1); one arriving
+  mid-sync creates that pending job, i.e. marks the mailbox dirty, so a
+  burst costs one sync plus exactly one follow-up. Syncs read from the
+  account's checkpoint, so nothing a folded notification announced is
+  lost. New jobs wait INBOX_INGEST_DEBOUNCE_SECONDS so a burst can gather.
+- Retries: failures are rescheduled with exponential backoff until
+  INBOX_INGEST_MAX_ATTEMPTS, then parked as failed. A notification folded
+  into a job that is backing off brings its retry forward to the
+  debounce window.
+- Crashed workers: jobs stuck in processing past INBOX_INGEST_LOCK_TIMEOUT
+  are released back to pending.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, Exists, F, Min, OuterRef, Q, Sum
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from ..models import ChannelAccount, IngestJob
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue_ingest_job(account, history_id=None, payload=None, dedup_key=None):
+    """
+    Record a mailbox change notification. Returns (job, created); created
+    is False when dedup_key was already recorded or the notification was
+    folded into the mailbox's pending job.
+    """
+    if dedup_key:
+        existing = IngestJob.objects.filter(dedup_key=dedup_key).first()
+        if existing is not None:
+            return existing, False
+
+    try:
+        with transaction.atomic():
+            # The account row lock serializes concurrent notifications for one mailbox
+            ChannelAccount.objects.select_for_update().filter(pk=account.pk).exists()
+            pending = (
+                IngestJob.objects.filter(
+                    channel_account=account, status=IngestJob.STATUS_PENDING
+                )
+                .order_by("-created_at")
+                .first()
+            )
+            delay = timedelta(seconds=_setting("INBOX_INGEST_DEBOUNCE_SECONDS", 0))
+            if pending is not None:
+                # A job waiting out a retry backoff runs again once the burst window
+                # passes: the new change is worth another attempt now
+                IngestJob.objects.filter(pk=pending.pk).update(
+                    coalesced=F("coalesced") + 1,
+                    available_at=Least(F("available_at"), timezone.now() + delay),
+                )
+                pending.refresh_from_db(fields=["coalesced", "available_at"])
+                return pending, False
+
+            job = IngestJob.objects.create(
+                channel_account=account,
+                provider=account.provider,
+                history_id=history_id,
+                payload=payload or {},
+                dedup_key=dedup_key or None,
+                available_at=timezone.now() + delay,
+            )
+            return job, True
+    except IntegrityError:
+        # Lost a race with a concurrent redelivery of the same push
+        return IngestJob.objects.get(dedup_key=dedup_key), False
+
+
+def retry_delay(attempts):
+    """Exponential backoff (seconds) after the given number of failed attempts."""
+    base = _setting("INBOX_INGEST_RETRY_BASE_SECONDS", 30)
+    cap = _setting("INBOX_INGEST_RETRY_MAX_SECONDS", 3600)
+    return min(cap, base * (2 ** max(attempts - 1, 0)))
+
+
+def release_stale_jobs():
+    """Return jobs abandoned by crashed workers to the queue."""
+    timeout = timedelta(seconds=_setting("INBOX_INGEST_LOCK_TIMEOUT", 600))
+    return IngestJob.objects.filter(
+        status=IngestJob.STATUS_PROCESSING,
+        locked_at__lt=timezone.now() - timeout,
+    ).update(status=IngestJob.STATUS_PENDING, locked_at=None)
+
+
+def claim_next_job():
+    """
+    Claim the next runnable job, honouring per-mailbox ordering.
+    Returns the job (now processing) or None when nothing is runnable.
+    """
+    now = timezone.now()
+    earlier_for_account = IngestJob.objects.filter(
+        channel_account=OuterRef("channel_account"),
+        status__in=[IngestJob.STATUS_PENDING, IngestJob.STATUS_PROCESSING],
+        created_at__lt=OuterRef("created_at"),
+    )
+    busy_account = IngestJob.objects.filter(
+        channel_account=OuterRef("channel_account"),
+        status=IngestJob.STATUS_PROCESSING,
+    )
+
+    while True:
+        try:
+            with transaction.atomic():
+                job = (
+                    IngestJob.objects.select_for_update(skip_locked=True)
+                    .filter(status=IngestJob.STATUS_PENDING, available_at__lte=now)
+                    .exclude(Exists(earlier_for_account))
+                    .exclude(Exists(busy_account))
+                    .order_by("created_at")
+                    .first()
+                )
+                if job is None:
+                    return None
+
+                job.status = IngestJob.STATUS_PROCESSING
+                job.locked_at = now
+                job.started_at = now
+                job.attempts = F("attempts") + 1
+                job.save(
+                    update_fields=["status", "locked_at", "started_at", "attempts"]
+                )
+                job.refresh_from_db(fields=["attempts"])
+                return job
+        except IntegrityError:
+            # Another worker claimed a job for the same mailbox first; look again
+            continue
+
+
+def complete_job(job):
+    job.status = IngestJob.STATUS_DONE
+    job.finished_at = timezone.now()
+    job.locked_at = None
+    job.last_error = None
+    job.save(update_fields=["status", "finished_at", "locked_at", "last_error"])
+
+
+def fail_job(job, error):
+    """Schedule a retry with backoff, or park the job once attempts run out."""
+    job.last_error = str(error)[:2000]
+    job.locked_at = None
+    if job.attempts >= _setting("INBOX_INGEST_MAX_ATTEMPTS", 5):
+        job.status = IngestJob.STATUS_FAILED
+        job.finished_at = timezone.now()
+    else:
+        job.status = IngestJob.STATUS_PENDING
+        job.available_at = timezone.now() + timedelta(seconds=retry_delay(job.attempts))
+    job.save(
+        update_fields=[
+            "status",
+            "last_error",
+            "locked_at",
+            "available_at",
+            "finished_at",
+        ]
+    )
+
+
+def _run_job(job, tenant):
+    # Imported here so the queue stays usable without provider SDKs loaded
+    from .gmail_ingest import sync_gmail_mailbox
+    from .outlook_sync import sync_outlook_mailbox
+
+    handlers = {
+        "gmail": sync_gmail_mailbox,
+        "outlook": sync_outlook_mailbox,
+    }
+    handler = handlers.get(job.provider)
+    if handler is None:
+        raise ValueError(f"No ingest handler for provider {job.provider}")
+
+    account = job.channel_account
+    history_id = account.last_history_id or job.history_id
+    return handler(account, tenant, history_id)
+
+
+def process_available_jobs(tenant, limit=50):
+    """
+    Drain up to limit runnable jobs for the current tenant schema.
+    Returns (processed, failed) counts.
+    """
+    release_stale_jobs()
+
+    processed = failed = 0
+    for _ in range(limit):
+        job = claim_next_job()
+        if job is None:
+            break
+
+        try:
+            stored = _run_job(job, tenant)
+        except Exception as e:
+            logger.exception("Ingest job %s failed (attempt %s)", job.id, job.attempts)
+            fail_job(job, e)
+            failed += 1
+            continue
+
+        complete_job(job)
+        processed += 1
+        logger.info(
+            "Ingest job %s done: %s messages, lag %.1fs",
+            job.id,
+            stored,
+            (job.finished_at - job.created_at).total_seconds(),
+        )
+
+    return processed, failed
+
+
+def queue_metrics(window_minutes=15):
+    """
+    Queue depth and ingest lag for the current tenant schema.
+
+    depth counts pending jobs, oldest_pending_age_seconds is how far behind
+    the queue is, and avg_ingest_lag_seconds is notification-to-stored time
+    for jobs finished in the last window_minutes. coalesced counts the
+    notifications folded into existing jobs in that window.
+    """
+    now = timezone.now()
+    counts = IngestJob.objects.aggregate(
+        pending=Count("id", filter=Q(status=IngestJob.STATUS_PENDING)),
+        processing=Count("id", filter=Q(status=IngestJob.STATUS_PROCESSING)),
+        failed=Count("id", filter=Q(status=IngestJob.STATUS_FAILED)),
+        retrying=Count("id", filter=Q(status=IngestJob.STATUS_PENDING, attempts__gt=0)),
+        coalesced=Sum(
+            "coalesced",
+            filter=Q(created_at__gte=now - timedelta(minutes=window_minutes)),
+        ),
+        oldest_pending=Min("created_at", filter=Q(status=IngestJob.STATUS_PENDING)),
+        avg_lag=Avg(
+            F("finished_at") - F("created_at"),
+            filter=Q(
+                status=IngestJob.STATUS_DONE,
+                finished_at__gte=now - timedelta(minutes=window_minutes),
+            ),
+        ),
+    )
+
+    counts["coalesced"] = counts["coalesced"] or 0
+    oldest_pending = counts.pop("oldest_pending")
+    avg_lag = counts.pop("avg_lag")
+    return {
+        "depth": counts["pending"],
+        **counts,
+        "oldest_pending_age_seconds": (
+            (now - oldest_pending).total_seconds() if oldest_pending else 0
+        ),
+        "avg_ingest_lag_seconds": avg_lag.total_seconds() if avg_lag else None,
+    }
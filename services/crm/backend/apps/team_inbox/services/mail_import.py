@@ -0,0 +1,274 @@
+"""
+Bulk MBOX/EML import into an inbox
+
+import_archive streams an archive (see mbox_reader.iter_archive_messages)
+through three stages:
+
+- Read: raw messages are grouped into chunks of INBOX_IMPORT_PARSE_CHUNK
+  messages, and at most two chunks per worker are in flight, so memory
+  stays flat however large the archive is.
+- Parse: chunks are parsed and normalized on a process pool of
+  INBOX_IMPORT_WORKERS processes (0 = one per CPU), since MIME decoding is
+  CPU-bound. Results come back in archive order.
+- Write: messages are stored INBOX_IMPORT_BATCH_SIZE at a time through
+  write_message_batch, which threads them by Message-ID, In-Reply-To and
+  References. The raw MIME and attachments of the stored ones go to the
+  blob store with archive_imported.
+
+Imports are idempotent: messages already stored (by Message-ID) are
+skipped, so a failed or interrupted import can be run again.
+
+Uploaded archives are kept in the blob store as a MailImport and run by
+`manage.py import_mail --queued`. `manage.py import_mail PATH` imports a
+file on disk directly.
+"""
+
+import logging
+import os
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import MailImport
+from .blob_store import get_blob_store
+from .mbox_reader import (
+    init_parse_worker,
+    iter_archive_messages,
+    parse_raw_messages,
+    parse_worker_settings,
+)
+from .message_writer import write_message_batch
+from .mime_archive import archive_imported
+
+logger = logging.getLogger(__name__)
+
+# What write_message_batch needs from a ChannelAccount: imported mail
+# belongs to the inbox, not to a connected mailbox
+ImportTarget = namedtuple("ImportTarget", ["pk", "inbox_id", "provider"])
+
+
+def _chunks(raws, size, max_bytes):
+    chunk, chunk_bytes = [], 0
+    for raw in raws:
+        chunk.append(raw)
+        chunk_bytes += len(raw)
+        if len(chunk) >= size or chunk_bytes >= max_bytes:
+            yield chunk
+            chunk, chunk_bytes = [], 0
+    if chunk:
+        yield chunk
+
+
+def iter_parsed(raws, workers, chunk_size, zlib_level):
+    """
+    Parse raw messages on a process pool (in-process for workers=1),
+    yielding parse_raw_messages results in input order.
+    """
+    parse = partial(parse_raw_messages, zlib_level=zlib_level)
+    chunks = _chunks(raws, chunk_size, settings.INBOX_IMPORT_CHUNK_MAX_BYTES)
+    if workers == 1:
+        for chunk in chunks:
+            yield from parse(chunk)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_parse_worker,
+        initargs=(parse_worker_settings(),),
+    ) as pool:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(pool.submit(parse, chunk))
+            if len(in_flight) >= workers * 2:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+
+def import_archive(
+    fileobj, inbox, tenant, workers=None, batch_size=None, progress=None
+):
+    """
+    Import every message of an MBOX/EML archive into inbox. Must run inside
+    the tenant schema.
+
+    Args:
+        fileobj: Seekable binary file object of the archive
+        inbox: Inbox the conversations are created in
+        tenant: Client (unused; imports are not broadcast)
+        workers (int): Parser processes, default INBOX_IMPORT_WORKERS
+        batch_size (int): Messages per write, default INBOX_IMPORT_BATCH_SIZE
+        progress: Called with the running report after every write
+
+    Returns:
+        dict: parsed, stored, failed, bytes, seconds and messages_per_second
+    """
+    workers = workers or settings.INBOX_IMPORT_WORKERS or os.cpu_count() or 1
+    batch_size = batch_size or settings.INBOX_IMPORT_BATCH_SIZE
+    archive = getattr(settings, "INBOX_ARCHIVE_RAW_MIME", True)
+    target = ImportTarget(pk=None, inbox_id=inbox.pk, provider="email")
+    store = get_blob_store() if archive else None
+
+    report = {
+        "parsed": 0,
+        "stored": 0,
+        "failed": 0,
+        "bytes": 0,
+        "seconds": 0.0,
+        "messages_per_second": 0.0,
+    }
+    started = time.perf_counter()
+
+    def counted(raws):
+        for raw in raws:
+            report["bytes"] += len(raw)
+            yield raw
+
+    def flush(batch):
+        stored = write_message_batch(
+            target, tenant, [data for data, _, _ in batch], broadcast=False
+        )
+        if archive and stored:
+            parsed_by_id = {
+                data["message_id"]: (raw, parts) for data, raw, parts in batch
+            }
+            archive_imported(
+                [(msg, *parsed_by_id[msg.message_id]) for msg in stored],
+                store=store,
+            )
+        report["stored"] += len(stored)
+        report["seconds"] = time.perf_counter() - started
+        report["messages_per_second"] = (
+            report["parsed"] / report["seconds"] if report["seconds"] else 0.0
+        )
+        if progress:
+            progress(report)
+
+    raws = counted(
+        iter_archive_messages(fileobj, settings.INBOX_IMPORT_MAX_MESSAGE_BYTES)
+    )
+    batch = []
+    for result in iter_parsed(
+        raws, workers, settings.INBOX_IMPORT_PARSE_CHUNK, settings.INBOX_BODY_ZLIB_LEVEL
+    ):
+        if result is None:
+            report["failed"] += 1
+            continue
+        report["parsed"] += 1
+        batch.append(result)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    flush(batch)
+    return report
+
+
+def format_report(report):
+    return (
+        f"{report['parsed']} messages parsed, {report['stored']} stored, {report['failed']} failed; "
+        f"{report['bytes'] / 1024 / 1024:.1f} MB in {report['seconds']:.1f}s "
+        f"({report['messages_per_second']:.0f} msgs/s)"
+    )
+
+
+def queue_import(inbox, uploaded_file, user=None):
+    """Keep an uploaded archive in the blob store and queue its import."""
+    blob = get_blob_store().put(uploaded_file)
+    return MailImport.objects.create(
+        inbox=inbox,
+        filename=(getattr(uploaded_file, "name", "") or "")[:255],
+        archive_sha256=blob.digest,
+        archive_size=blob.size,
+        created_by=user,
+    )
+
+
+def release_stale_imports():
+    """Return imports abandoned by crashed workers to the queue (re-running skips what was stored)."""
+    timeout = timedelta(seconds=settings.INBOX_IMPORT_LOCK_TIMEOUT)
+    return MailImport.objects.filter(
+        status=MailImport.STATUS_RUNNING,
+        locked_at__lt=timezone.now() - timeout,
+    ).update(status=MailImport.STATUS_PENDING, locked_at=None)
+
+
+def claim_next_import():
+    """Claim the oldest pending import. Returns it (now running) or None."""
+    with transaction.atomic():
+        mail_import = (
+            MailImport.objects.select_for_update(skip_locked=True)
+            .filter(status=MailImport.STATUS_PENDING)
+            .order_by("created_at")
+            .first()
+        )
+        if mail_import is None:
+            return None
+        mail_import.status = MailImport.STATUS_RUNNING
+        mail_import.locked_at = timezone.now()
+        mail_import.save(update_fields=["status", "locked_at", "updated_at"])
+        return mail_import
+
+
+def run_import(mail_import, tenant, workers=None):
+    """Import a claimed MailImport, saving its counters after every batch. Returns the report."""
+
+    def progress(report):
+        # Saving progress also keeps the lock fresh for release_stale_imports
+        now = timezone.now()
+        MailImport.objects.filter(pk=mail_import.pk).update(
+            messages_parsed=report["parsed"],
+            messages_stored=report["stored"],
+            messages_failed=report["failed"],
+            seconds=report["seconds"],
+            locked_at=now,
+            updated_at=now,
+        )
+
+    with get_blob_store().open(mail_import.archive_sha256) as archive:
+        report = import_archive(
+            archive, mail_import.inbox, tenant, workers=workers, progress=progress
+        )
+
+    MailImport.objects.filter(pk=mail_import.pk).update(
+        status=MailImport.STATUS_DONE,
+        locked_at=None,
+        last_error=None,
+        finished_at=timezone.now(),
+    )
+    return report
+
+
+def process_mail_imports(tenant, limit=1, workers=None):
+    """
+    Run up to limit queued imports for the current tenant schema.
+    Returns (done, failed) counts.
+    """
+    release_stale_imports()
+
+    done = failed = 0
+    for _ in range(limit):
+        mail_import = claim_next_import()
+        if mail_import is None:
+            break
+        try:
+            report = run_import(mail_import, tenant, workers=workers)
+        except Exception as e:
+            logger.exception("Mail import %s failed", mail_import.pk)
+            MailImport.objects.filter(pk=mail_import.pk).update(
+                status=MailImport.STATUS_FAILED,
+                last_error=str(e)[:2000],
+                locked_at=None,
+                finished_at=timezone.now(),
+            )
+            failed += 1
+            continue
+
+        done += 1
+        logger.info("Mail import %s: %s", mail_import.pk, format_report(report))
+    return done, failed
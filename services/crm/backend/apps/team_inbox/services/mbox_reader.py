@@ -0,0 +1,171 @@
+"""
+Streaming MBOX/EML reading and MIME parsing for mail imports
+
+iter_archive_messages yields the raw RFC 822 bytes of each message in an
+archive, one message at a time, so an archive of any size is read in
+constant memory. It accepts:
+
+- an MBOX file (mboxo/mboxrd: messages start at a "From " line after a
+  blank line, and ">From " escapes are undone),
+- a single .eml message,
+- a gzip-compressed MBOX or EML,
+- a zip of .eml and/or .mbox files.
+
+The format is sniffed from the first bytes, so uploads read back from the
+blob store need no filename.
+
+parse_raw_messages runs in the import's process pool and imports no
+models. Converting HTML bodies reads a few settings (PARSE_SETTINGS), so the
+pool runs init_parse_worker with the parent's values: a worker started with
+spawn/forkserver, which has no Django settings, is configured with just
+those, and a forked worker already has them.
+"""
+
+import gzip
+import hashlib
+import logging
+import re
+import zipfile
+import zlib
+from email.parser import BytesParser
+
+from .email_parsing import message_attachments, normalize_mime_message
+
+logger = logging.getLogger(__name__)
+
+# Settings read while parsing (html_text), handed to pool workers
+PARSE_SETTINGS = (
+    "INBOX_HTML_MAX_CHARS",
+    "INBOX_TEXT_MAX_CHARS",
+    "INBOX_HTML_TIMEOUT_MS",
+    "INBOX_HTML_TEXT_CACHE_SIZE",
+)
+ZIP_MAGIC = b"PK\x03\x04"
+GZIP_MAGIC = b"\x1f\x8b"
+_ESCAPED_FROM = re.compile(rb"^>+From ")
+
+
+def _is_blank(line):
+    return line in (b"\n", b"\r\n")
+
+
+def iter_mbox_messages(fileobj, max_bytes=None):
+    """
+    Yield the raw bytes of each message in an MBOX stream.
+
+    Messages larger than max_bytes are skipped (logged); the reader moves on
+    to the next "From " line without buffering the rest.
+    """
+    lines = []
+    size = 0
+    oversized = False
+    previous_blank = True
+    for line in fileobj:
+        if line.startswith(b"From ") and previous_blank:
+            if lines and not oversized:
+                yield _join_message(lines)
+            elif oversized:
+                logger.warning("Skipped a message larger than %s bytes", max_bytes)
+            lines, size, oversized = [], 0, False
+            previous_blank = False
+            continue
+
+        previous_blank = _is_blank(line)
+        if oversized:
+            continue
+        if _ESCAPED_FROM.match(line):
+            line = line[1:]
+        lines.append(line)
+        size += len(line)
+        if max_bytes and size > max_bytes:
+            lines, oversized = [], True
+
+    if lines and not oversized:
+        yield _join_message(lines)
+    elif oversized:
+        logger.warning("Skipped a message larger than %s bytes", max_bytes)
+
+
+def _join_message(lines):
+    # The blank line before the next "From " belongs to the separator
+    if lines and _is_blank(lines[-1]):
+        lines.pop()
+    return b"".join(lines)
+
+
+def _sniff(fileobj):
+    position = fileobj.tell()
+    head = fileobj.read(5)
+    fileobj.seek(position)
+    return head
+
+
+def iter_archive_messages(fileobj, max_bytes=None):
+    """Yield raw messages from a seekable binary MBOX, EML, gzip or zip stream."""
+    head = _sniff(fileobj)
+    if head.startswith(ZIP_MAGIC):
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or info.filename.startswith("__MACOSX/"):
+                    continue
+                with archive.open(info) as member:
+                    yield from iter_archive_messages(member, max_bytes)
+    elif head.startswith(GZIP_MAGIC):
+        with gzip.GzipFile(fileobj=fileobj) as unzipped:
+            yield from iter_archive_messages(unzipped, max_bytes)
+    elif head.startswith(b"From "):
+        yield from iter_mbox_messages(fileobj, max_bytes)
+    elif head.strip():
+        raw = fileobj.read(max_bytes + 1 if max_bytes else -1)
+        if max_bytes and len(raw) > max_bytes:
+            logger.warning("Skipped a message larger than %s bytes", max_bytes)
+        else:
+            yield raw
+
+
+def fallback_message_id(raw):
+    """Stable Message-ID for mail without one, so a re-import dedups."""
+    return f"<{hashlib.sha256(raw).hexdigest()[:40]}@import.invalid>"
+
+
+def parse_worker_settings():
+    """The PARSE_SETTINGS values of this process, for init_parse_worker."""
+    from django.conf import settings
+
+    return {
+        name: getattr(settings, name)
+        for name in PARSE_SETTINGS
+        if hasattr(settings, name)
+    }
+
+
+def init_parse_worker(values):
+    """ProcessPoolExecutor initializer: configure settings in a worker that has none."""
+    from django.conf import settings
+
+    if not settings.configured:
+        settings.configure(**values)
+
+
+def parse_raw_messages(raws, zlib_level=6):
+    """
+    Parse a chunk of raw messages. Runs in a pool worker.
+
+    Returns:
+        list: (normalized dict, zlib-compressed raw, attachment parts) per
+        message, or None for a message that could not be parsed
+    """
+    # compat32 (the parser default) leaves headers as strings; policy.default
+    # parses every header it touches and is several times slower
+    parser = BytesParser()
+    results = []
+    for raw in raws:
+        try:
+            parsed = parser.parsebytes(raw)
+            data = normalize_mime_message(parsed, fallback_id=fallback_message_id(raw))
+            attachments = list(message_attachments(parsed))
+            results.append((data, zlib.compress(raw, zlib_level), attachments))
+        except Exception:
+            logger.exception("Could not parse an imported message")
+            results.append(None)
+    return results
@@ -0,0 +1,188 @@
+"""
+Batch message persistence shared by every mail provider
+
+write_message_batch stores a list of normalized messages (see
+email_parsing.normalize_gmail_message / normalize_outlook_message) in a
+fixed number of queries however large the batch is:
+
+    1. existing message_ids                        (one IN query)
+    2. conversations by thread key                 (one ThreadKey lookup)
+    3. new conversations                           (bulk_create)
+    4. new messages                                (bulk_create, message_id conflicts ignored)
+    5. which messages were actually inserted       (one IN query)
+    6. compressed bodies for the stored messages   (bulk_create into MessageBody)
+    7. last_activity / last_message                (bulk_update, once per conversation)
+    8. thread keys for the stored messages         (bulk_create, conflicts ignored)
+
+plus one rules stamp check (see inbox_rules.py) and, when a rule tags a
+new conversation, one Tag lookup and one insert of the tag links.
+
+Incoming messages are run through the inbox's compiled rules as they are
+built: a rule's priority applies to the message, and its priority,
+assignment, archive, spam and tags to the conversation the message
+starts. Replies to existing conversations leave those alone.
+
+Messages are threaded in timestamp order, so a reply arriving in the same
+batch as its parent lands in the parent's conversation. The whole batch is
+announced in one frame per inbox (see realtime.py).
+"""
+
+from django.db import transaction
+
+from ..models import Conversation, Message, MessageBody
+from .inbox_rules import apply_to_conversation, inbox_rules, link_rule_tags
+from .realtime import publish_message_events
+from .thread_index import candidate_keys, index_messages, lookup_keys, message_keys
+
+
+def write_message_batch(account, tenant, messages, source="incoming", broadcast=True):
+    """
+    Store normalized messages for one ChannelAccount and announce them.
+    Must run inside the tenant schema.
+
+    Args:
+        account: ChannelAccount the messages were fetched from
+        tenant: Client, used for the WebSocket group
+        messages (list): Normalized message dicts
+        source (str): Message.source for every row
+        broadcast (bool): Publish message.created deltas to the inbox groups
+
+    Returns:
+        list: Newly stored Message objects (already stored ones are skipped)
+    """
+    # Drop duplicates within the batch, then anything already stored
+    unique = {}
+    for data in messages:
+        if data.get("message_id"):
+            unique.setdefault(data["message_id"], data)
+    if not unique:
+        return []
+
+    existing = set(
+        Message.objects.filter(message_id__in=list(unique)).values_list(
+            "message_id", flat=True
+        )
+    )
+    pending = sorted(
+        (data for message_id, data in unique.items() if message_id not in existing),
+        key=lambda data: data["timestamp"],
+    )
+    if not pending:
+        return []
+
+    candidates = [
+        candidate_keys(
+            data.get("thread_id"), data.get("in_reply_to"), data.get("references")
+        )
+        for data in pending
+    ]
+    known = lookup_keys(pair for pairs in candidates for pair in pairs)
+    rules = inbox_rules(account.inbox_id) if source == "incoming" else None
+
+    new_conversations = []
+    new_messages = []
+    tagged = []
+    for data, pairs in zip(pending, candidates, strict=True):
+        thread_id = data.get("thread_id")
+        outcome = rules.evaluate(data) if rules else None
+        conversation = next((known[pair] for pair in pairs if pair in known), None)
+        if conversation is None:
+            conversation = Conversation(
+                thread_id=thread_id or data["message_id"],
+                subject=(data.get("subject") or "(No Subject)")[:255],
+                channel=account.provider,
+                priority="normal",
+                status="open",
+                last_activity=data["timestamp"],
+                shared_inbox_id=account.inbox_id,
+            )
+            new_conversations.append(conversation)
+            if outcome:
+                apply_to_conversation(conversation, outcome)
+                if outcome.tag_ids:
+                    tagged.append((conversation, outcome.tag_ids))
+
+        # Later messages in this batch thread onto this one
+        for pair in message_keys(**data):
+            known.setdefault(pair, conversation)
+
+        new_messages.append(
+            Message(
+                conversation=conversation,
+                inbox_id=account.inbox_id,
+                channel_account_id=account.pk,
+                source=source,
+                priority=outcome.priority if outcome and outcome.priority else "normal",
+                **data,
+            )
+        )
+
+    with transaction.atomic():
+        Conversation.objects.bulk_create(new_conversations)
+        Message.objects.bulk_create(new_messages, ignore_conflicts=True)
+
+        # ignore_conflicts hides which rows lost a race with a concurrent writer
+        inserted = set(
+            Message.objects.filter(pk__in=[msg.pk for msg in new_messages]).values_list(
+                "pk", flat=True
+            )
+        )
+        stored = [msg for msg in new_messages if msg.pk in inserted]
+        MessageBody.objects.bulk_create(
+            [MessageBody.build(msg, msg.content, msg.html_content) for msg in stored]
+        )
+
+        latest = {}
+        for msg in stored:
+            latest[msg.conversation.pk] = msg  # stored is in timestamp order
+        changed = []
+        for msg in latest.values():
+            conversation = msg.conversation
+            if (
+                conversation.last_message_id is None
+                or msg.timestamp >= conversation.last_activity
+            ):
+                conversation.last_activity = msg.timestamp
+                conversation.last_message = msg
+                changed.append(conversation)
+        Conversation.objects.bulk_update(changed, ["last_activity", "last_message"])
+
+        index_messages(
+            (
+                msg.conversation,
+                {
+                    "message_id": msg.message_id,
+                    "thread_id": msg.thread_id,
+                    "references": msg.references,
+                },
+            )
+            for msg in stored
+        )
+
+        link_rule_tags(
+            [
+                (conversation, tag_ids)
+                for conversation, tag_ids in tagged
+                if conversation.pk in latest
+            ]
+        )
+
+        orphaned = [c.pk for c in new_conversations if c.pk not in latest]
+        if orphaned:
+            Conversation.objects.filter(pk__in=orphaned).delete()
+
+    if broadcast:
+        new_conversation_ids = {c.pk for c in new_conversations}
+        announced = set()
+        entries = []
+        for msg in stored:
+            conversation = msg.conversation
+            created = (
+                conversation.pk in new_conversation_ids
+                and conversation.pk not in announced
+            )
+            announced.add(conversation.pk)
+            entries.append((msg, conversation, created))
+        publish_message_events(tenant, entries)
+
+    return stored
@@ -0,0 +1,167 @@
+"""
+Raw MIME archiving and attachment extraction
+
+archive_message keeps the original RFC 822 bytes of a stored message
+(zlib-compressed, in the blob store) and stores every attachment in the
+blob store, so a message can be reprocessed without going back to Google or
+Microsoft. Attachments are content-addressed, so the same PDF mailed to a
+hundred people is stored once.
+"""
+
+import logging
+import zlib
+from email import policy
+from email.parser import BytesParser
+
+from django.conf import settings
+from django.db import transaction
+
+from ..models import Attachment, Message
+from .blob_store import CHUNK_SIZE, get_blob_store, iter_chunks
+from .email_parsing import message_attachments
+
+logger = logging.getLogger(__name__)
+
+
+def _compressed(raw):
+    compressor = zlib.compressobj(getattr(settings, "INBOX_BODY_ZLIB_LEVEL", 6))
+    for chunk in iter_chunks(raw):
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_attachment_parts(raw):
+    """Yield (filename, mime_type, payload) for each attachment in raw MIME."""
+    return message_attachments(BytesParser(policy=policy.default).parsebytes(raw))
+
+
+def archive_message(message, raw, store=None):
+    """
+    Archive a stored message's raw MIME and attachments. Safe to repeat:
+    blobs dedup by digest and attachments already recorded are skipped.
+
+    Args:
+        message: Message the MIME belongs to
+        raw (bytes): Original RFC 822 message
+        store: BlobStore, defaults to the configured one
+
+    Returns:
+        list: Attachment rows created by this call
+    """
+    store = store or get_blob_store()
+    raw_blob = store.put(_compressed(raw))
+
+    known = set(message.attachment_set.values_list("sha256", "filename"))
+    created = []
+    for filename, mime_type, payload in iter_attachment_parts(raw):
+        blob = store.put(payload)
+        if (blob.digest, filename) in known:
+            continue
+        known.add((blob.digest, filename))
+        created.append(
+            Attachment(
+                message=message,
+                filename=filename,
+                mime_type=mime_type,
+                size=blob.size,
+                sha256=blob.digest,
+            )
+        )
+
+    with transaction.atomic():
+        if created:
+            Attachment.objects.bulk_create(created)
+            message.attachments.add(*created)
+        message.raw_mime_sha256 = raw_blob.digest
+        message.save(update_fields=["raw_mime_sha256"])
+    return created
+
+
+def archive_imported(entries, store=None):
+    """
+    Archive a batch of newly imported messages whose MIME was already parsed
+    and compressed (see mbox_reader.parse_raw_messages). Attachment rows,
+    their message links and raw_mime_sha256 are written in one query each.
+
+    Args:
+        entries (list): (Message, zlib-compressed raw MIME, attachment parts) tuples
+        store: BlobStore, defaults to the configured one
+
+    Returns:
+        int: Number of attachments stored
+    """
+    store = store or get_blob_store()
+    attachments = []
+    owners = []
+    for message, compressed_raw, parts in entries:
+        message.raw_mime_sha256 = store.put(compressed_raw).digest
+        seen = set()
+        for filename, mime_type, payload in parts:
+            blob = store.put(payload)
+            if (blob.digest, filename) in seen:
+                continue
+            seen.add((blob.digest, filename))
+            attachments.append(
+                Attachment(
+                    message=message,
+                    filename=filename,
+                    mime_type=mime_type,
+                    size=blob.size,
+                    sha256=blob.digest,
+                )
+            )
+            owners.append(message)
+
+    Link = Message.attachments.through
+    with transaction.atomic():
+        Attachment.objects.bulk_create(attachments)
+        Link.objects.bulk_create(
+            [
+                Link(message_id=message.pk, attachment_id=attachment.pk)
+                for message, attachment in zip(owners, attachments, strict=True)
+            ]
+        )
+        Message.objects.bulk_update(
+            [message for message, _, _ in entries], ["raw_mime_sha256"], batch_size=500
+        )
+    return len(attachments)
+
+
+def archive_fetched(messages, fetch_raw):
+    """
+    Archive messages whose MIME is fetched one at a time. Failures are
+    logged, not raised, since the messages themselves are already stored.
+
+    Args:
+        messages (dict): Provider message id -> stored Message
+        fetch_raw: Callable returning the raw bytes for a provider id, or None
+
+    Returns:
+        int: Number of messages archived
+    """
+    archived = 0
+    for provider_id, message in messages.items():
+        try:
+            raw = fetch_raw(provider_id)
+            if raw:
+                archive_message(message, raw)
+                archived += 1
+        except Exception:
+            logger.exception("Archiving message %s failed", provider_id)
+    return archived
+
+
+def iter_raw_message(message, store=None):
+    """Yield the decompressed raw MIME of an archived message in chunks."""
+    store = store or get_blob_store()
+    decompressor = zlib.decompressobj()
+    with store.open(message.raw_mime_sha256) as blob:
+        for chunk in iter_chunks(blob, CHUNK_SIZE):
+            data = decompressor.decompress(chunk)
+            if data:
+                yield data
+    tail = decompressor.flush()
+    if tail:
+        yield tail
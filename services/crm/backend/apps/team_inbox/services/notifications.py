@@ -0,0 +1,179 @@
+"""
+Notification fan-out and unread counters
+
+create_notifications writes every recipient's row with one bulk_create and,
+after the transaction commits, pushes them to the users' sockets in one
+event-loop hop: the group_sends run concurrently, so a channels_redis layer
+pipelines them over its connection pool instead of paying one round trip
+(and one async_to_sync) per recipient.
+
+Unread counts are kept per user in Django's cache and maintained
+incrementally: creating notifications adds to them and marking them read
+subtracts. A missing counter is rebuilt with one indexed COUNT, and
+counters expire after INBOX_NOTIFICATION_COUNT_TTL so any drift is bounded.
+Use a shared cache backend when running more than one process.
+"""
+
+import asyncio
+import logging
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from ..models import Notification
+from .realtime import user_group
+
+logger = logging.getLogger(__name__)
+
+
+def _count_key(user_id):
+    return f"inbox:notif_unread:{connection.schema_name}:{user_id}"
+
+
+def notification_payload(notification):
+    return {
+        "id": str(notification.id),
+        "type": notification.type,
+        "object_id": str(notification.object_id),
+        "data": notification.data,
+        "is_read": notification.is_read,
+        "created_at": notification.created_at.isoformat(),
+    }
+
+
+def unread_count(user_id):
+    """The user's unread notification count, from the counter when cached."""
+    key = _count_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+        cache.set(key, count, settings.INBOX_NOTIFICATION_COUNT_TTL)
+    return count
+
+
+def adjust_unread_count(user_id, delta):
+    """Add delta to a cached counter; a missing one is rebuilt on next read."""
+    if not delta:
+        return
+    try:
+        if cache.incr(_count_key(user_id), delta) < 0:
+            cache.delete(_count_key(user_id))
+    except ValueError:
+        pass  # not cached
+
+
+def reset_unread_counts(user_ids):
+    cache.delete_many([_count_key(user_id) for user_id in set(user_ids)])
+
+
+def send_notifications(notifications):
+    """Push notifications to their users' groups in one event-loop hop."""
+    if not notifications:
+        return
+    channel_layer = get_channel_layer()
+
+    async def send_all():
+        results = await asyncio.gather(
+            *(
+                channel_layer.group_send(
+                    user_group(n.user_id),
+                    {
+                        "type": "notification_message",  # matches consumer method
+                        "data": notification_payload(n),
+                    },
+                )
+                for n in notifications
+            ),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning("Notification push failed: %s", result)
+
+    try:
+        async_to_sync(send_all)()
+    except Exception:
+        logger.exception("Notification push failed")
+
+
+def create_notifications(users, notification_type, object_id, data):
+    """
+    Notify several users of the same event.
+
+    Returns:
+        list: The created Notification rows
+    """
+    notifications = Notification.objects.bulk_create(
+        [
+            Notification(
+                user=user, type=notification_type, object_id=object_id, data=data
+            )
+            for user in {user.pk: user for user in users}.values()
+        ]
+    )
+
+    def committed():
+        for notification in notifications:
+            adjust_unread_count(notification.user_id, 1)
+        send_notifications(notifications)
+
+    transaction.on_commit(committed)
+    return notifications
+
+
+def mark_read(user_id, notification_ids=None):
+    """
+    Mark a user's notifications read (all of them when notification_ids is None).
+
+    Returns:
+        int: Rows that changed from unread to read
+    """
+    unread = Notification.objects.filter(user_id=user_id, is_read=False)
+    if notification_ids is not None:
+        unread = unread.filter(id__in=notification_ids)
+    updated = unread.update(is_read=True)
+    if notification_ids is None:
+        cache.set(_count_key(user_id), 0, settings.INBOX_NOTIFICATION_COUNT_TTL)
+    else:
+        adjust_unread_count(user_id, -updated)
+    return updated
+
+
+def purge_notifications(read_days=None, unread_days=None, batch_size=5000):
+    """
+    Delete read notifications older than read_days and any notification
+    older than unread_days, in batches so no single DELETE holds long locks.
+    Must run inside the tenant schema.
+
+    Returns:
+        int: Rows deleted
+    """
+    now = timezone.now()
+    read_cutoff = now - timedelta(
+        days=read_days or settings.INBOX_NOTIFICATION_READ_RETENTION_DAYS
+    )
+    unread_cutoff = now - timedelta(
+        days=unread_days or settings.INBOX_NOTIFICATION_UNREAD_RETENTION_DAYS
+    )
+
+    deleted = 0
+    for expired, had_unread in (
+        (Notification.objects.filter(is_read=True, created_at__lt=read_cutoff), False),
+        (Notification.objects.filter(created_at__lt=unread_cutoff), True),
+    ):
+        while True:
+            batch = list(expired.values_list("id", "user_id", "is_read")[:batch_size])
+            if not batch:
+                break
+            Notification.objects.filter(id__in=[row[0] for row in batch]).delete()
+            deleted += len(batch)
+            if had_unread:
+                reset_unread_counts(
+                    user_id for _, user_id, is_read in batch if not is_read
+                )
+    return deleted
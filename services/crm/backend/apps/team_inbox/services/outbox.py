@@ -0,0 +1,276 @@
+"""
+Outbound mail queue
+
+API requests compose the MIME message, record an OutboundEmail and return;
+worker processes (`manage.py process_outbox`) send it over reused relay
+sessions (see smtp_pool.py).
+
+- Retries: connection errors and 4xx replies are retried with exponential
+  backoff until INBOX_OUTBOX_MAX_ATTEMPTS. A 5xx rejection fails at once.
+- Throttle: a tenant sends at most INBOX_OUTBOX_TENANT_RATE_PER_MINUTE
+  messages per minute, counted from the table so it holds across workers.
+- Status: outgoing Messages carry delivery_status (queued, sent, failed).
+  Each change is published to the inbox's WebSocket group as a
+  message.delivery event.
+- Crashed workers: rows stuck in sending past INBOX_OUTBOX_LOCK_TIMEOUT
+  are released back to pending.
+- Configuration: with no SMTP_SERVER or SMTP_USER the outbox is disabled;
+  enqueue_email raises OutboxNotConfigured instead of queueing mail that
+  could never be sent.
+"""
+
+import logging
+import smtplib
+import uuid
+from datetime import timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import markdown
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from ..models import Message, OutboundEmail
+from .realtime import publish_inbox_events
+from .smtp_pool import get_smtp_pool
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxNotConfigured(RuntimeError):
+    """Raised when mail is queued while no SMTP relay is configured."""
+
+
+def outbox_configured():
+    """Outgoing mail needs a relay host and the relay account every message is sent as."""
+    return bool(settings.SMTP_SERVER and settings.SMTP_USER)
+
+
+def compose_email(
+    from_email,
+    to_email,
+    subject,
+    plain_body=None,
+    html_body=None,
+    cc=None,
+    in_reply_to=None,
+    references=None,
+):
+    """
+    Build a reply sent through the shared relay on behalf of from_email.
+
+    Returns:
+        tuple: (Message-ID, MIMEMultipart)
+    """
+    relay_user = settings.SMTP_USER
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = subject
+    msg["From"] = f"{from_email} via TeamInbox <{relay_user}>"
+    msg["Reply-To"] = from_email
+    msg["To"] = ", ".join(to_email) if isinstance(to_email, list) else to_email
+
+    if cc:
+        msg["Cc"] = ", ".join(cc)
+
+    message_id = f"<{uuid.uuid4().hex}@{relay_user.split('@')[-1]}>"
+    msg["Message-ID"] = message_id
+
+    if in_reply_to:
+        msg["In-Reply-To"] = in_reply_to
+    if references:
+        msg["References"] = (
+            " ".join(references) if isinstance(references, list) else references
+        )
+
+    if plain_body:
+        msg.attach(MIMEText(plain_body, "plain"))
+
+    if html_body:
+        html_body_clean = markdown.markdown(html_body, extensions=["extra", "nl2br"])
+    elif plain_body:
+        html_body_clean = markdown.markdown(plain_body, extensions=["extra", "nl2br"])
+    else:
+        html_body_clean = ""
+
+    html_content = f"""
+        <html>
+            <body style="font-family: Arial, sans-serif; font-size:14px; line-height:1.5; color:#111;">
+                {html_body_clean}
+            </body>
+        </html>
+        """
+
+    msg.attach(MIMEText(html_content, "html"))
+    return message_id, msg
+
+
+def enqueue_email(mime, recipients, message=None):
+    """
+    Queue a composed message for the workers.
+
+    Args:
+        mime: email.message.Message to send as-is
+        recipients: Envelope recipients (To, Cc and Bcc)
+        message: Outgoing Message row whose delivery_status tracks this send
+
+    Raises:
+        OutboxNotConfigured: If SMTP_SERVER or SMTP_USER is not set
+    """
+    if not outbox_configured():
+        raise OutboxNotConfigured(
+            "Outgoing mail is disabled: set SMTP_SERVER and SMTP_USER"
+        )
+    if message is not None and message.delivery_status != Message.DELIVERY_QUEUED:
+        message.delivery_status = Message.DELIVERY_QUEUED
+        message.save(update_fields=["delivery_status"])
+    return OutboundEmail.objects.create(
+        message=message,
+        envelope_from=settings.SMTP_USER,
+        recipients=[r for r in recipients if r],
+        mime=mime.as_bytes(),
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff (seconds) after the given number of failed attempts."""
+    base = settings.INBOX_OUTBOX_RETRY_BASE_SECONDS
+    return min(
+        settings.INBOX_OUTBOX_RETRY_MAX_SECONDS, base * (2 ** max(attempts - 1, 0))
+    )
+
+
+def is_permanent(error):
+    """5xx replies won't succeed on retry; everything else might."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return getattr(error, "smtp_code", 0) >= 500
+
+
+def release_stale_emails():
+    """Return rows abandoned by crashed workers to the queue."""
+    timeout = timedelta(seconds=settings.INBOX_OUTBOX_LOCK_TIMEOUT)
+    return OutboundEmail.objects.filter(
+        status=OutboundEmail.STATUS_SENDING,
+        locked_at__lt=timezone.now() - timeout,
+    ).update(status=OutboundEmail.STATUS_PENDING, locked_at=None)
+
+
+def send_budget():
+    """How many more messages the current tenant may send this minute."""
+    since = timezone.now() - timedelta(minutes=1)
+    recent = OutboundEmail.objects.filter(
+        Q(sent_at__gte=since) | Q(status=OutboundEmail.STATUS_SENDING)
+    ).count()
+    return max(0, settings.INBOX_OUTBOX_TENANT_RATE_PER_MINUTE - recent)
+
+
+def claim_next_email():
+    """Claim the oldest due row (now sending), or None."""
+    now = timezone.now()
+    with transaction.atomic():
+        outbound = (
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.STATUS_PENDING, available_at__lte=now)
+            .order_by("created_at")
+            .first()
+        )
+        if outbound is None:
+            return None
+        outbound.status = OutboundEmail.STATUS_SENDING
+        outbound.locked_at = now
+        outbound.attempts = F("attempts") + 1
+        outbound.save(update_fields=["status", "locked_at", "attempts"])
+        outbound.refresh_from_db(fields=["attempts"])
+        return outbound
+
+
+def delivery_event(message, error=None):
+    return {
+        "event": "message.delivery",
+        "inboxId": str(message.inbox_id),
+        "conversationId": str(message.conversation_id),
+        "messageId": str(message.pk),
+        "status": message.delivery_status,
+        "error": error,
+    }
+
+
+def _set_delivery_status(outbound, status):
+    message = outbound.message
+    if message is None or message.delivery_status == status:
+        return None
+    message.delivery_status = status
+    message.save(update_fields=["delivery_status"])
+    return message
+
+
+def complete_email(outbound, refused=None):
+    outbound.status = OutboundEmail.STATUS_SENT
+    outbound.sent_at = timezone.now()
+    outbound.locked_at = None
+    outbound.last_error = f"Refused: {', '.join(refused)}" if refused else None
+    outbound.mime = b""  # sent; no need to keep the payload twice
+    outbound.save(
+        update_fields=["status", "sent_at", "locked_at", "last_error", "mime"]
+    )
+    return _set_delivery_status(outbound, Message.DELIVERY_SENT)
+
+
+def fail_email(outbound, error):
+    """Schedule a retry with backoff, or give up on permanent errors and exhausted attempts."""
+    outbound.last_error = str(error)[:2000]
+    outbound.locked_at = None
+    if is_permanent(error) or outbound.attempts >= settings.INBOX_OUTBOX_MAX_ATTEMPTS:
+        outbound.status = OutboundEmail.STATUS_FAILED
+        outbound.save(update_fields=["status", "last_error", "locked_at"])
+        return _set_delivery_status(outbound, Message.DELIVERY_FAILED)
+    outbound.status = OutboundEmail.STATUS_PENDING
+    outbound.available_at = timezone.now() + timedelta(
+        seconds=retry_delay(outbound.attempts)
+    )
+    outbound.save(update_fields=["status", "last_error", "locked_at", "available_at"])
+    return None
+
+
+def process_outbox(tenant, limit=50, pool=None):
+    """
+    Send up to limit due messages for the current tenant schema, within
+    its per-minute budget. Returns (sent, failed) counts.
+    """
+    release_stale_emails()
+    pool = pool or get_smtp_pool()
+
+    sent = failed = 0
+    events = []
+    for _ in range(min(limit, send_budget())):
+        outbound = claim_next_email()
+        if outbound is None:
+            break
+
+        try:
+            refused = pool.send(
+                outbound.envelope_from, outbound.recipients, bytes(outbound.mime)
+            )
+        except (smtplib.SMTPException, OSError) as e:
+            logger.warning(
+                "Outbound email %s failed (attempt %s): %s",
+                outbound.id,
+                outbound.attempts,
+                e,
+            )
+            message = fail_email(outbound, e)
+            if message is not None:
+                events.append(delivery_event(message, outbound.last_error))
+            failed += 1
+            continue
+
+        message = complete_email(outbound, refused)
+        if message is not None:
+            events.append(delivery_event(message))
+        sent += 1
+
+    if events:
+        publish_inbox_events(tenant, events)
+    return sent, failed
@@ -1,62 +1,238 @@
-from datetime import datetime, timedelta
+import time
+from datetime import UTC, datetime, timedelta
+
 import requests
 from django.conf import settings
+from django_tenants.utils import get_public_schema_name, schema_context
+
+from ...core.models import TenantEmailMapping
+from .email_parsing import parse_iso_datetime
+from .provider_clients import ensure_fresh_token, get_provider_client
+
+# Graph accepts at most 20 requests in one JSON $batch
+GRAPH_BATCH_LIMIT = 20
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Fields normalize_outlook_message reads; headers are only returned when selected
+MESSAGE_FIELDS = (
+    "id,internetMessageId,conversationId,subject,from,toRecipients,ccRecipients,"
+    "bccRecipients,replyTo,bodyPreview,body,receivedDateTime,internetMessageHeaders"
+)
+# The same without the body, for lazy_bodies inboxes
+MESSAGE_METADATA_FIELDS = MESSAGE_FIELDS.replace(",body,", ",")
+
+
+def map_subscription(identifier, subscription_id):
+    """Record which mailbox a Graph subscription belongs to in its public TenantEmailMapping."""
+    if not subscription_id:
+        return
+    with schema_context(get_public_schema_name()):
+        TenantEmailMapping.objects.filter(subscription_id=subscription_id).exclude(
+            email=identifier
+        ).update(subscription_id=None)
+        TenantEmailMapping.objects.filter(email=identifier).update(subscription_id=subscription_id)
+
+
+class GraphApiError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def _retry_after(headers, attempt):
+    value = (headers or {}).get("Retry-After")
+    delay = float(value) if value and value.isdigit() else 2 ** attempt
+    return min(delay, 30)
 
 
 class OutlookService:
     """Service wrapper around Microsoft Graph API for subscriptions and messages."""
 
-    def __init__(self, channel_account):
+    def __init__(self, channel_account, max_retries=4):
         self.channel_account = channel_account
-        self.token = channel_account.access_token
-        self.base_url = "https://graph.microsoft.com/v1.0"
+        # Tokens are refreshed ahead of expiry by refresh_channel_tokens
+        ensure_fresh_token(channel_account)
+        self.client = get_provider_client(channel_account)
+        self.session = self.client.session  # pooled, carries the bearer token
+        self.token = self.client.token
+        self.timeout = settings.PROVIDER_HTTP_TIMEOUT
+        self.base_url = settings.OUTLOOK_GRAPH_BASE_URL.rstrip("/")
+        self.max_retries = max_retries
 
-    def _headers(self):
-        return {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json"
-        }
+    def _request(self, method, url, **kwargs):
+        """Graph call with retry on throttling and 5xx; returns the response (404 included)."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except requests.RequestException as e:
+                if attempt == self.max_retries:
+                    raise GraphApiError(f"Graph request failed: {e}") from e
+                time.sleep(min(2 ** attempt, 30))
+                continue
+
+            if response.status_code in RETRYABLE_STATUS and attempt < self.max_retries:
+                time.sleep(_retry_after(response.headers, attempt))
+                continue
+            if response.status_code >= 400 and response.status_code != 404:
+                raise GraphApiError(f"Graph API error {response.status_code} for {method} {url}", response.status_code)
+            return response
+
+        raise GraphApiError(f"Graph API retries exhausted for {method} {url}")
+
+    def _subscription_expiration(self):
+        minutes = settings.OUTLOOK_SUBSCRIPTION_MINUTES
+        expires = datetime.now(UTC) + timedelta(minutes=minutes)
+        return expires.replace(microsecond=0).isoformat().replace("+00:00", "Z")
+
+    def _save_subscription(self, sub):
+        self.channel_account.subscription_id = sub.get("id")
+        self.channel_account.subscription_expires_at = parse_iso_datetime(sub.get("expirationDateTime"))
+        self.channel_account.save(update_fields=["subscription_id", "subscription_expires_at"])
+        map_subscription(self.channel_account.identifier, self.channel_account.subscription_id)
 
     def start_subscription(self, webhook_url):
         """
         Create a Microsoft Graph subscription for new messages in the Inbox.
-        Saves subscriptionId in ChannelAccount.
+        Saves subscriptionId and its expiry in ChannelAccount.
         """
         url = f"{self.base_url}/subscriptions"
-        expiration = (
-            datetime.utcnow() + timedelta(hours=1)
-        ).replace(microsecond=0).isoformat() + "Z"
-
         data = {
             "changeType": "created",
             "notificationUrl": webhook_url,  # must be publicly accessible
             "resource": "/me/mailFolders('inbox')/messages",
-            "expirationDateTime": expiration,
+            "expirationDateTime": self._subscription_expiration(),
             "clientState": "secretRandomString"
         }
 
-        response = requests.post(url, headers=self._headers(), json=data)
+        response = self.session.post(url, json=data, timeout=self.timeout)
         response.raise_for_status()
         sub = response.json()
+        self._save_subscription(sub)
+        return sub
 
-        # Save subscriptionId to channel account
-        self.channel_account.subscription_id = sub.get("id")
-        self.channel_account.save(update_fields=["subscription_id"])
-
+    def renew_subscription(self):
+        """
+        Push the subscription's expiry OUTLOOK_SUBSCRIPTION_MINUTES ahead.
+        Returns the subscription, or None when Graph no longer has it.
+        """
+        url = f"{self.base_url}/subscriptions/{self.channel_account.subscription_id}"
+        response = self._request("PATCH", url, json={"expirationDateTime": self._subscription_expiration()})
+        if response.status_code == 404:
+            return None
+        sub = response.json()
+        self._save_subscription(sub)
         return sub
 
+    def initial_delta_url(self, since):
+        """First delta request for the Inbox, limited to mail received after since."""
+        params = {
+            "changeType": "created",
+            "$select": "id,internetMessageId",
+            "$filter": f"receivedDateTime ge {since.strftime('%Y-%m-%dT%H:%M:%SZ')}",
+        }
+        request = requests.Request("GET", f"{self.base_url}/me/mailFolders('inbox')/messages/delta", params=params)
+        return request.prepare().url
+
+    def delta_page(self, url, page_size=None):
+        """
+        One page of an Inbox delta query (an initial, next or delta link).
+        Raises GraphApiError(status=410) when the sync state has expired.
+        """
+        page_size = page_size or settings.OUTLOOK_DELTA_PAGE_SIZE
+        response = self._request("GET", url, headers={"Prefer": f"odata.maxpagesize={page_size}"})
+        if response.status_code == 404:
+            raise GraphApiError("Inbox delta not found", 404)
+        return response.json()
+
+    def inbox_messages_url(self, after=None, before=None, page_size=100):
+        """First page of the Inbox listing (ids only), optionally limited to a received-date window."""
+        params = {"$select": "id,internetMessageId", "$top": page_size}
+        window = []
+        if after:
+            window.append(f"receivedDateTime ge {after.isoformat()}T00:00:00Z")
+        if before:
+            window.append(f"receivedDateTime lt {before.isoformat()}T00:00:00Z")
+        if window:
+            params["$filter"] = " and ".join(window)
+        request = requests.Request("GET", f"{self.base_url}/me/mailFolders('inbox')/messages", params=params)
+        return request.prepare().url
+
+    def list_messages_page(self, url):
+        """
+        One page of an Inbox listing.
+
+        Returns:
+            tuple: (items with id and internetMessageId, @odata.nextLink or None)
+        """
+        response = self._request("GET", url)
+        if response.status_code == 404:
+            raise GraphApiError("Inbox not found", 404)
+        page = response.json()
+        return page.get("value", []), page.get("@odata.nextLink")
+
+    def batch_get_messages(self, message_ids, batch_size=None, fields=MESSAGE_FIELDS):
+        """
+        Fetch messages (the $select fields) through JSON $batch, up to 20 per request.
+        Throttled items are retried in a follow-up batch, honouring
+        Retry-After; messages deleted in the meantime are skipped.
+
+        Returns:
+            tuple: (messages by Graph id, ids that could not be fetched)
+        """
+        batch_size = min(batch_size or settings.OUTLOOK_BATCH_SIZE, GRAPH_BATCH_LIMIT)
+        messages, failed = {}, []
+        for start in range(0, len(message_ids), batch_size):
+            pending = list(message_ids[start:start + batch_size])
+            for attempt in range(self.max_retries + 1):
+                body = {"requests": [
+                    {"id": str(i), "method": "GET", "url": f"/me/messages/{message_id}?$select={fields}"}
+                    for i, message_id in enumerate(pending)
+                ]}
+                response = self._request("POST", f"{self.base_url}/$batch", json=body)
+                if response.status_code == 404:
+                    raise GraphApiError("Graph $batch endpoint not found", 404)
+
+                retry, delay = [], 0
+                for item in response.json().get("responses", []):
+                    message_id = pending[int(item["id"])]
+                    status = int(item.get("status", 500))
+                    if status == 200:
+                        messages[message_id] = item.get("body") or {}
+                    elif status in RETRYABLE_STATUS:
+                        retry.append(message_id)
+                        delay = max(delay, _retry_after(item.get("headers"), attempt))
+                    elif status != 404:
+                        failed.append(message_id)
+
+                if not retry:
+                    break
+                if attempt == self.max_retries:
+                    failed.extend(retry)
+                    break
+                time.sleep(delay)
+                pending = retry
+        return messages, failed
+
     def get_message(self, message_id):
         """
         Fetch a full Outlook message by its ID.
         """
         url = f"{self.base_url}/me/messages/{message_id}"
         try:
-            response = requests.get(url, headers=self._headers())
+            response = self.session.get(url, timeout=self.timeout)
             response.raise_for_status()
             return response.json()
         except Exception:
             return None
 
+    def get_mime(self, message_id):
+        """
+        Fetch the raw MIME (RFC 822 bytes) of an Outlook message; None when
+        it no longer exists. Other failures raise GraphApiError.
+        """
+        response = self._request("GET", f"{self.base_url}/me/messages/{message_id}/$value")
+        return None if response.status_code == 404 else response.content
+
     def fetch_recent_messages(self, max_results=10):
         """
         Fetch recent messages from Inbox (fallback if webhook/history fails).
@@ -66,7 +242,7 @@ class OutlookService:
             f"?$top={max_results}&$orderby=receivedDateTime DESC"
         )
         try:
-            response = requests.get(url, headers=self._headers())
+            response = self.session.get(url, timeout=self.timeout)
             response.raise_for_status()
             return response.json().get("value", [])
         except Exception:
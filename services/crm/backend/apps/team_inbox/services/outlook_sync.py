@@ -0,0 +1,198 @@
+"""
+Outlook mailbox sync over Microsoft Graph
+
+Webhooks only enqueue an IngestJob; the ingest worker runs
+sync_outlook_mailbox, which walks the Inbox delta query from the
+account's checkpoint:
+
+- Delta links: each page's @odata.nextLink, and finally the
+  @odata.deltaLink, is stored in ChannelAccount.delta_link once that page is
+  written, so a crash or failure resumes from the last completed page.
+- Bounded work units: a run reads at most OUTLOOK_DELTA_MAX_PAGES pages.
+  A longer catch-up queues a follow-up job for the same mailbox, which
+  keeps a backlog from holding a worker (and the mailbox lock) for minutes.
+- $batch: new messages are fetched OUTLOOK_BATCH_SIZE (at most 20) per
+  request instead of one GET each. Messages already stored are skipped
+  using the internetMessageId from the delta page.
+- Gaps: an expired delta token (410) restarts from the newest stored
+  message, bounded by OUTLOOK_DELTA_INITIAL_DAYS. A subscription that
+  lapsed is recreated by renew_outlook_subscriptions, which also queues a
+  catch-up, since its notifications were lost.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from ..models import ChannelAccount, Message
+from .email_parsing import normalize_outlook_message
+from .ingest_queue import enqueue_ingest_job
+from .message_writer import write_message_batch
+from .mime_archive import archive_fetched
+from .outlook_service import (
+    MESSAGE_FIELDS,
+    MESSAGE_METADATA_FIELDS,
+    GraphApiError,
+    OutlookService,
+)
+
+logger = logging.getLogger(__name__)
+
+# Overlap when restarting a delta query after the sync state expired
+RESYNC_OVERLAP = timedelta(hours=1)
+
+
+def _resync_since(account):
+    """Start of the window re-read when there is no usable delta link."""
+    floor = timezone.now() - timedelta(days=settings.OUTLOOK_DELTA_INITIAL_DAYS)
+    newest = Message.objects.filter(inbox=account.inbox, source="incoming").aggregate(
+        newest=Max("timestamp")
+    )["newest"]
+    return max(floor, newest - RESYNC_OVERLAP) if newest else floor
+
+
+def unseen_message_ids(items):
+    """Graph ids from a delta or listing page that are not removals and not stored yet."""
+    added = {}
+    for item in items:
+        if "@removed" in item or not item.get("id"):
+            continue
+        added[item["id"]] = item.get("internetMessageId")
+
+    known = set(
+        Message.objects.filter(
+            message_id__in=[m for m in added.values() if m]
+        ).values_list("message_id", flat=True)
+    )
+    return [
+        graph_id for graph_id, message_id in added.items() if message_id not in known
+    ]
+
+
+def store_graph_messages(service, account, tenant, graph_ids, broadcast=True):
+    """
+    Fetch messages through $batch, store and archive them. For a lazy_bodies
+    inbox only metadata is fetched, and the messages wait for hydration.
+    Returns the stored Messages.
+    """
+    lazy = account.inbox.lazy_bodies
+    fetched, failed = service.batch_get_messages(
+        graph_ids, fields=MESSAGE_METADATA_FIELDS if lazy else MESSAGE_FIELDS
+    )
+    if failed:
+        raise GraphApiError(f"{len(failed)} Outlook messages could not be fetched")
+
+    batch_size = getattr(settings, "INBOX_INGEST_WRITE_BATCH_SIZE", 50)
+    graph_id_by_message = {}
+    normalized = []
+    for graph_id in graph_ids:
+        msg = fetched.get(graph_id)
+        if msg is None:
+            continue  # deleted since the page was read
+        data = normalize_outlook_message(msg, fallback_id=graph_id)
+        data["body_pending"] = lazy
+        graph_id_by_message[data["message_id"]] = graph_id
+        normalized.append(data)
+
+    stored = []
+    for start in range(0, len(normalized), batch_size):
+        batch = normalized[start : start + batch_size]
+        stored.extend(write_message_batch(account, tenant, batch, broadcast=broadcast))
+
+    if getattr(settings, "INBOX_ARCHIVE_RAW_MIME", True) and not lazy:
+        archive_fetched(
+            {graph_id_by_message[m.message_id]: m for m in stored}, service.get_mime
+        )
+    return stored
+
+
+def sync_outlook_mailbox(account, tenant, history_id=None, max_pages=None):
+    """
+    Pull new Inbox messages from the account's delta checkpoint, store them
+    and advance the checkpoint page by page. Must run inside the tenant
+    schema. history_id is unused (Outlook keeps its own delta link) and is
+    accepted for the ingest queue's handler signature.
+
+    If a fetch still fails after retries the error is raised with the
+    checkpoint at the last completed page, so the queue retries the job.
+
+    Returns:
+        int: Number of new messages stored
+    """
+    max_pages = max_pages or settings.OUTLOOK_DELTA_MAX_PAGES
+    service = OutlookService(account)
+    url = account.delta_link or service.initial_delta_url(_resync_since(account))
+
+    stored = 0
+    for _ in range(max_pages):
+        try:
+            page = service.delta_page(url)
+        except GraphApiError as e:
+            if e.status != 410 or not account.delta_link:
+                raise
+            logger.warning(
+                "Delta token for %s expired; resyncing from the newest stored message",
+                account,
+            )
+            account.delta_link = None
+            url = service.initial_delta_url(_resync_since(account))
+            page = service.delta_page(url)
+
+        graph_ids = unseen_message_ids(page.get("value", []))
+        if graph_ids:
+            stored += len(store_graph_messages(service, account, tenant, graph_ids))
+
+        next_link = page.get("@odata.nextLink")
+        account.delta_link = (
+            next_link or page.get("@odata.deltaLink") or account.delta_link
+        )
+        account.save(update_fields=["delta_link"])
+        if not next_link:
+            return stored
+        url = next_link
+
+    # Page budget spent mid catch-up: continue in a follow-up work unit
+    enqueue_ingest_job(account, payload={"reason": "catch_up"})
+    return stored
+
+
+def renew_outlook_subscriptions(margin_minutes=None):
+    """
+    Renew every Outlook subscription in the current schema that expires
+    within margin_minutes. One Graph no longer knows is recreated, and a
+    lapsed or recreated subscription queues a catch-up sync.
+
+    Returns:
+        tuple: (renewed, failed) counts
+    """
+    if margin_minutes is None:
+        margin_minutes = settings.OUTLOOK_SUBSCRIPTION_RENEW_MARGIN_MINUTES
+    now = timezone.now()
+    due = ChannelAccount.objects.filter(provider="outlook").filter(
+        Q(subscription_expires_at__isnull=True)
+        | Q(subscription_expires_at__lte=now + timedelta(minutes=margin_minutes))
+    )
+
+    renewed = failed = 0
+    for account in due:
+        lapsed = (
+            account.subscription_expires_at is None
+            or account.subscription_expires_at <= now
+        )
+        try:
+            service = OutlookService(account)
+            if not account.subscription_id or service.renew_subscription() is None:
+                service.start_subscription(settings.OUTLOOK_WEBHOOK_URL)
+                lapsed = True
+        except Exception:
+            logger.exception("Renewing the Outlook subscription for %s failed", account)
+            failed += 1
+            continue
+
+        if lapsed:
+            enqueue_ingest_job(account, payload={"reason": "subscription_lapsed"})
+        renewed += 1
+    return renewed, failed
@@ -0,0 +1,236 @@
+"""
+Cached provider clients and OAuth token refresh
+
+get_provider_client(account) returns a per-ChannelAccount ProviderClient
+kept for the life of the process. It holds:
+- a pooled requests.Session with the current bearer token;
+- Google Credentials for the account;
+- the Gmail discovery document, parsed once per process from the copy
+  bundled with googleapiclient (never fetched over the network).
+A client is rebuilt only when the stored access token changes.
+
+Tokens are refreshed ahead of expiry by `manage.py refresh_channel_tokens`.
+It refreshes every account within INBOX_TOKEN_REFRESH_MARGIN_SECONDS of
+expires_in/token_acquired_at, so requests and webhooks never wait on an
+OAuth round trip. ensure_fresh_token remains as a worker-side fallback for
+a token that has already expired.
+"""
+
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from google.oauth2.credentials import Credentials
+from requests.adapters import HTTPAdapter
+
+from ..models import ChannelAccount
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
+OUTLOOK_TOKEN_URL = "https://login.microsoftonline.com/common/oauth2/v2.0/token"
+CLIENT_CACHE_SIZE = 1000
+
+
+def pooled_session(pool_maxsize=None):
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=pool_maxsize or settings.PROVIDER_HTTP_POOL_SIZE,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_oauth_session = None
+_gmail_discovery = None
+_shared_lock = threading.Lock()
+
+
+def oauth_session():
+    """Session shared by every token refresh in the process."""
+    global _oauth_session
+    with _shared_lock:
+        if _oauth_session is None:
+            _oauth_session = pooled_session()
+        return _oauth_session
+
+
+def gmail_discovery_document():
+    """Gmail v1 discovery document, parsed once from googleapiclient's static copy."""
+    global _gmail_discovery
+    with _shared_lock:
+        if _gmail_discovery is None:
+            from googleapiclient.discovery_cache import get_static_doc
+
+            _gmail_discovery = json.loads(get_static_doc("gmail", "v1"))
+        return _gmail_discovery
+
+
+def token_expires_at(account):
+    if not account.expires_in:
+        return None
+    return account.token_acquired_at + timedelta(seconds=account.expires_in)
+
+
+def needs_refresh(account, margin=None):
+    """True when the token expires within margin seconds and can be refreshed."""
+    expires_at = token_expires_at(account)
+    if expires_at is None or not account.refresh_token:
+        return False
+    if margin is None:
+        margin = settings.INBOX_TOKEN_REFRESH_MARGIN_SECONDS
+    return timezone.now() + timedelta(seconds=margin) >= expires_at
+
+
+def _request_token(account):
+    if account.provider == "outlook":
+        url, data = OUTLOOK_TOKEN_URL, {
+            "client_id": settings.OUTLOOK_CLIENT_ID,
+            "client_secret": settings.OUTLOOK_CLIENT_SECRET,
+        }
+    else:
+        url, data = GOOGLE_TOKEN_URL, {
+            "client_id": settings.GOOGLE_CLIENT_ID,
+            "client_secret": settings.GOOGLE_CLIENT_SECRET,
+        }
+    data.update(refresh_token=account.refresh_token, grant_type="refresh_token")
+    response = oauth_session().post(
+        url, data=data, timeout=settings.PROVIDER_HTTP_TIMEOUT
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def refresh_account_token(account, margin=None):
+    """
+    Refresh the account's access token unless another worker already did.
+
+    The row is locked while refreshing, so concurrent schedulers and workers
+    don't spend the refresh token twice. account is updated in place.
+
+    Returns:
+        bool: True when this call obtained a new token
+    """
+    with transaction.atomic():
+        locked = ChannelAccount.objects.select_for_update().get(pk=account.pk)
+        if not needs_refresh(locked, margin):
+            refreshed = False
+        else:
+            token_data = _request_token(locked)
+            if "access_token" not in token_data:
+                raise ValueError(f"Token refresh for {locked} returned no access_token")
+            locked.access_token = token_data["access_token"]
+            locked.expires_in = token_data.get("expires_in", 3600)
+            locked.token_acquired_at = timezone.now()
+            # Microsoft rotates refresh tokens
+            locked.refresh_token = (
+                token_data.get("refresh_token") or locked.refresh_token
+            )
+            locked.save(
+                update_fields=[
+                    "access_token",
+                    "expires_in",
+                    "token_acquired_at",
+                    "refresh_token",
+                ]
+            )
+            refreshed = True
+
+    for field in ("access_token", "expires_in", "token_acquired_at", "refresh_token"):
+        setattr(account, field, getattr(locked, field))
+    return refreshed
+
+
+def ensure_fresh_token(account):
+    """Worker-side fallback: refresh only a token that has already expired."""
+    if needs_refresh(account, margin=0):
+        logger.warning(
+            "Token for %s expired before the scheduler refreshed it", account
+        )
+        refresh_account_token(account, margin=0)
+
+
+def refresh_expiring_tokens(margin=None):
+    """
+    Refresh every account in the current schema close to expiry.
+
+    Returns:
+        tuple: (refreshed, failed) counts
+    """
+    refreshed = failed = 0
+    accounts = ChannelAccount.objects.exclude(refresh_token__isnull=True).exclude(
+        refresh_token=""
+    )
+    for account in accounts:
+        if not needs_refresh(account, margin):
+            continue
+        try:
+            if refresh_account_token(account, margin):
+                refreshed += 1
+        except Exception:
+            logger.exception("Token refresh failed for %s", account)
+            failed += 1
+    return refreshed, failed
+
+
+class ProviderClient:
+    """Long-lived HTTP state for one ChannelAccount."""
+
+    def __init__(self, account):
+        self.account_id = account.pk
+        self.provider = account.provider
+        self.session = pooled_session()
+        self.token = None
+        self.credentials = None
+        self._gmail_service = None
+        self.update_token(account)
+
+    def update_token(self, account):
+        self.token = account.access_token
+        self.session.headers["Authorization"] = f"Bearer {self.token}"
+        self.credentials = Credentials(
+            token=account.access_token,
+            refresh_token=account.refresh_token,
+            token_uri=GOOGLE_TOKEN_URL,
+            client_id=settings.GOOGLE_CLIENT_ID,
+            client_secret=settings.GOOGLE_CLIENT_SECRET,
+        )
+        self._gmail_service = None
+
+    @property
+    def gmail_service(self):
+        """googleapiclient resource, built from the cached discovery document."""
+        if self._gmail_service is None:
+            from googleapiclient.discovery import build_from_document
+
+            self._gmail_service = build_from_document(
+                gmail_discovery_document(), credentials=self.credentials
+            )
+        return self._gmail_service
+
+
+_clients = OrderedDict()
+_clients_lock = threading.Lock()
+
+
+def get_provider_client(account):
+    """The process's client for account, with its current token."""
+    key = str(account.pk)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = ProviderClient(account)
+            while len(_clients) > CLIENT_CACHE_SIZE:
+                _clients.popitem(last=False)[1].session.close()
+        elif client.token != account.access_token:
+            client.update_token(account)
+        _clients.move_to_end(key)
+        return client
@@ -0,0 +1,120 @@
+"""
+Realtime inbox events over Channels
+
+Message traffic is published to per-inbox groups as compact deltas, not as
+full serialized messages and conversations:
+
+    {"type": "inbox_events", "events": [
+        {"event": "message.created", "inboxId", "conversationId",
+         "conversationCreated", "messageId", "threadId", "subject", "from",
+         "snippet", "timestamp", "source", "isRead"},
+        ...
+    ]}
+
+Each event carries "seq", its per-tenant sequence number from the event log
+(see event_log.py), so reconnecting sockets can resume. Clients fetch full
+objects over the REST API when they need them.
+
+A socket joins inbox_group(tenant, inbox) for every inbox its TeamMember is
+assigned to (admins join every inbox). One publish call sends one
+group_send per inbox however many messages it carries. The consumer also
+merges frames that arrive within INBOX_WS_COALESCE_MS into a single frame.
+"""
+
+import logging
+from collections import defaultdict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from ..models import Inbox, TeamMember
+from .event_log import get_event_log
+
+logger = logging.getLogger(__name__)
+
+SNIPPET_LENGTH = 200
+
+
+def inbox_group(tenant_id, inbox_id):
+    return f"tenant_{tenant_id}_inbox_{inbox_id}"
+
+
+def user_group(user_id):
+    return f"user_{user_id}"
+
+
+def member_inbox_ids(user_id):
+    """Inbox ids a user receives events for. Must run inside the tenant schema."""
+    members = TeamMember.objects.filter(user_id=user_id, is_active=True)
+    if members.filter(role="admin").exists():
+        return [str(pk) for pk in Inbox.objects.values_list("id", flat=True)]
+    return [
+        str(pk)
+        for pk in Inbox.objects.filter(teammates__in=members)
+        .values_list("id", flat=True)
+        .distinct()
+    ]
+
+
+def message_event(message, conversation, created):
+    """Compact delta for a stored message (plain JSON types only)."""
+    return {
+        "event": "message.created",
+        "inboxId": str(message.inbox_id),
+        "conversationId": str(conversation.pk),
+        "conversationCreated": created,
+        "messageId": str(message.pk),
+        "threadId": message.thread_id,
+        "subject": message.subject,
+        "from": message.from_email,
+        "snippet": (message.preview or "")[:SNIPPET_LENGTH],
+        "timestamp": message.timestamp.isoformat(),
+        "source": message.source,
+        "isRead": message.is_read,
+    }
+
+
+def publish_inbox_events(tenant, events):
+    """Sequence events in the tenant's event log, then send one frame per inbox."""
+    try:
+        events = get_event_log().append(tenant.id, events)
+    except Exception:
+        # Still deliver live; sockets will resync on their next reconnect
+        logger.exception("Event log append failed for tenant %s", tenant.id)
+
+    by_inbox = defaultdict(list)
+    for event in events:
+        by_inbox[event["inboxId"]].append(event)
+    if not by_inbox:
+        return
+
+    try:
+        channel_layer = get_channel_layer()
+        for inbox_id, inbox_events in by_inbox.items():
+            async_to_sync(channel_layer.group_send)(
+                inbox_group(tenant.id, inbox_id),
+                {"type": "inbox_events", "events": inbox_events},
+            )
+    except Exception:
+        logger.exception("WebSocket publish failed for tenant %s", tenant.id)
+
+
+def publish_message_events(tenant, entries):
+    """
+    Publish message.created deltas.
+
+    Args:
+        tenant: Client, used for the group names
+        entries: Iterable of (message, conversation, conversation_created)
+    """
+    publish_inbox_events(tenant, [message_event(*entry) for entry in entries])
+
+
+def notify_membership_changed(user_id):
+    """Ask a user's open sockets to re-read their inbox assignments."""
+    try:
+        async_to_sync(get_channel_layer().group_send)(
+            user_group(user_id), {"type": "inbox_membership"}
+        )
+    except Exception:
+        logger.exception("WebSocket membership refresh failed for user %s", user_id)
@@ -0,0 +1,168 @@
+"""
+Reused SMTP relay connections for the outbox workers
+
+Opening a relay session costs a TCP handshake, EHLO, STARTTLS and AUTH. A
+worker pays that once and then sends queued messages over the same
+session:
+- Sessions idle longer than SMTP_POOL_IDLE_SECONDS are probed with NOOP
+  before reuse.
+- SMTP_POOL_MAX_MESSAGES caps how many messages one session carries, since
+  relays drop long sessions.
+- A reused session that turns out to be dead is replaced once,
+  transparently.
+
+Relay settings: SMTP_SERVER, SMTP_PORT, SMTP_USER, SMTP_PASS, SMTP_USE_TLS.
+With SMTP_USE_TLS off and no SMTP_PASS the pool talks plain SMTP without
+AUTH, which is what a local sink (mailpit, `python -m aiosmtpd -n`, the
+test sink) expects.
+"""
+
+import smtplib
+import threading
+import time
+
+from django.conf import settings
+
+
+class _Session:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.last_used = time.monotonic()
+        self.sent = 0
+
+
+class SMTPConnectionPool:
+    def __init__(
+        self,
+        host=None,
+        port=None,
+        user=None,
+        password=None,
+        use_tls=None,
+        timeout=None,
+        max_idle=None,
+        idle_seconds=None,
+        max_messages=None,
+    ):
+        self.host = host or settings.SMTP_SERVER
+        self.port = port or settings.SMTP_PORT
+        self.user = settings.SMTP_USER if user is None else user
+        self.password = settings.SMTP_PASS if password is None else password
+        self.use_tls = settings.SMTP_USE_TLS if use_tls is None else use_tls
+        self.timeout = timeout or settings.SMTP_TIMEOUT
+        self.max_idle = max_idle or settings.SMTP_POOL_SIZE
+        self.idle_seconds = (
+            settings.SMTP_POOL_IDLE_SECONDS if idle_seconds is None else idle_seconds
+        )
+        self.max_messages = max_messages or settings.SMTP_POOL_MAX_MESSAGES
+        self.idle = []
+        self.lock = threading.Lock()
+        self.opened = 0  # sessions opened over the pool's lifetime
+
+    def _open(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.use_tls:
+                smtp.starttls()
+                smtp.ehlo()
+            if self.password:
+                smtp.login(self.user, self.password)
+        except Exception:
+            self._quit(smtp)
+            raise
+        self.opened += 1
+        return _Session(smtp)
+
+    @staticmethod
+    def _quit(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def _acquire(self):
+        """A live session, and whether it was reused."""
+        while True:
+            with self.lock:
+                session = self.idle.pop() if self.idle else None
+            if session is None:
+                return self._open(), False
+            if time.monotonic() - session.last_used < self.idle_seconds:
+                return session, True
+            try:
+                if session.smtp.noop()[0] == 250:
+                    return session, True
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._quit(session.smtp)
+
+    def _release(self, session):
+        session.last_used = time.monotonic()
+        with self.lock:
+            if session.sent < self.max_messages and len(self.idle) < self.max_idle:
+                self.idle.append(session)
+                return
+        self._quit(session.smtp)
+
+    def send(self, from_addr, recipients, message_bytes):
+        """
+        Send one message.
+
+        Returns:
+            dict: Recipients the relay refused (the others were accepted)
+
+        Raises:
+            smtplib.SMTPException | OSError: when nothing was accepted
+        """
+        session, reused = self._acquire()
+        try:
+            refused = session.smtp.sendmail(from_addr, recipients, message_bytes)
+        except smtplib.SMTPServerDisconnected:
+            self._quit(session.smtp)
+            if not reused:
+                raise
+            # The relay closed an idle session on us; one retry on a fresh one
+            session = self._open()
+            try:
+                refused = session.smtp.sendmail(from_addr, recipients, message_bytes)
+            except Exception:
+                self._quit(session.smtp)
+                raise
+        except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+            # Rejected, but the session is still usable after RSET
+            self._reset_or_drop(session)
+            raise
+        except Exception:
+            self._quit(session.smtp)
+            raise
+        session.sent += 1
+        self._release(session)
+        return refused
+
+    def _reset_or_drop(self, session):
+        try:
+            session.smtp.rset()
+        except (smtplib.SMTPException, OSError):
+            self._quit(session.smtp)
+            return
+        self._release(session)
+
+    def close(self):
+        with self.lock:
+            sessions, self.idle = self.idle, []
+        for session in sessions:
+            self._quit(session.smtp)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_smtp_pool():
+    """The process-wide pool (one per worker process)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SMTPConnectionPool()
+        return _pool
@@ -0,0 +1,93 @@
+"""
+Conversation threading through the ThreadKey index
+
+One resolver for every provider. A message's candidate keys are checked in
+order:
+
+    1. provider thread id   (Gmail threadId, Outlook conversationId, SMTP thread)
+    2. In-Reply-To
+    3. References, nearest parent first
+
+Each candidate is a unique-index hit on ThreadKey(kind, key) rather than a
+join over the message table. Whenever a message is stored (ingest or send)
+its Message-ID, every References id and its thread id are indexed against
+its conversation. The first conversation to claim a key keeps it.
+"""
+
+from django.db.models import Q
+
+from ..models import ThreadKey
+
+MAX_KEY_LENGTH = 255
+
+
+def _clean(key):
+    key = (key or "").strip()
+    return key if 0 < len(key) <= MAX_KEY_LENGTH else None
+
+
+def _references(references):
+    # A list of ids, or a raw References header from API clients
+    if isinstance(references, str):
+        return references.split()
+    return [ref for ref in references or [] if isinstance(ref, str)]
+
+
+def candidate_keys(thread_id=None, in_reply_to=None, references=None):
+    """(kind, key) pairs to try for a message, most specific first."""
+    candidates = []
+    if _clean(thread_id):
+        candidates.append((ThreadKey.KIND_THREAD, _clean(thread_id)))
+    for ref in [in_reply_to, *reversed(_references(references))]:
+        if _clean(ref):
+            candidates.append((ThreadKey.KIND_MESSAGE_ID, _clean(ref)))
+    return list(dict.fromkeys(candidates))
+
+
+def lookup_keys(pairs):
+    """Map (kind, key) -> Conversation for the indexed pairs, in one query."""
+    pairs = set(pairs)
+    if not pairs:
+        return {}
+
+    condition = Q()
+    for kind in {kind for kind, _ in pairs}:
+        condition |= Q(kind=kind, key__in=[key for k, key in pairs if k == kind])
+    rows = ThreadKey.objects.filter(condition).select_related("conversation")
+    return {(row.kind, row.key): row.conversation for row in rows}
+
+
+def resolve_conversation(thread_id=None, in_reply_to=None, references=None):
+    """Return the conversation a message belongs to, or None for a new thread."""
+    candidates = candidate_keys(thread_id, in_reply_to, references)
+    found = lookup_keys(candidates)
+    return next((found[pair] for pair in candidates if pair in found), None)
+
+
+def message_keys(message_id=None, thread_id=None, references=None, **_):
+    """(kind, key) pairs a stored message claims for its conversation."""
+    pairs = []
+    if _clean(thread_id):
+        pairs.append((ThreadKey.KIND_THREAD, _clean(thread_id)))
+    for ref in [message_id, *_references(references)]:
+        if _clean(ref):
+            pairs.append((ThreadKey.KIND_MESSAGE_ID, _clean(ref)))
+    return pairs
+
+
+def index_messages(entries):
+    """
+    Record thread keys for stored messages.
+
+    Args:
+        entries: Iterable of (conversation, fields) where fields holds
+            message_id, thread_id and references
+    """
+    rows = {}
+    for conversation, fields in entries:
+        for kind, key in message_keys(**fields):
+            rows.setdefault(
+                (kind, key), ThreadKey(kind=kind, key=key, conversation=conversation)
+            )
+    if rows:
+        ThreadKey.objects.bulk_create(rows.values(), ignore_conflicts=True)
@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework import routers
 from .views.views import (
-    gmail_notify, outlook_notify,
+    gmail_notify, outlook_notify, ingest_metrics,
     TeamMemberViewSet, InboxViewSet, ChannelAccountViewSet,
-    TagViewSet, CommentViewSet, NotificationViewSet, TaskViewSet, CalendarEventViewSet
+    TagViewSet, InboxRuleViewSet, CommentViewSet, NotificationViewSet, TaskViewSet, CalendarEventViewSet
 )
 from .views.message_view import MessageViewSet
+from .views.attachments import AttachmentViewSet
 from .views.conversations import ConversationViewSet
 from .views.ai_views import AIReplyView
 from .views.google_integration import google_callback
@@ -15,10 +16,12 @@ from .views.outlook_integration import outlook_callback
 router = routers.DefaultRouter()
 router.register(r'conversations', ConversationViewSet, basename='conversation')
 router.register(r'messages', MessageViewSet, basename='message')
+router.register(r'attachments', AttachmentViewSet, basename='attachment')
 router.register(r'tags', TagViewSet)
 router.register(r'comments', CommentViewSet)
 router.register(r'notifications', NotificationViewSet, basename='notifications')
 router.register(r'inboxes', InboxViewSet)
+router.register(r'inbox-rules', InboxRuleViewSet)
 router.register(r'tasks', TaskViewSet)
 router.register(r'calendar_events', CalendarEventViewSet)
 router.register(r'channel-account', ChannelAccountViewSet)
@@ -36,6 +39,9 @@ urlpatterns = [
     path('gmail/push/', gmail_notify, name='gmail_notify'),
     path('outlook/notify/', outlook_notify, name='outlook_notify'),
 
+    # Ingest queue
+    path('ingest/metrics/', ingest_metrics, name='ingest_metrics'),
+
     # AI reply endpoint
     path("ai-reply/", AIReplyView.as_view(), name="ai-reply"),
 ]
@@ -21,7 +21,7 @@ class AIReplyView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        messages_qs = Message.objects.filter(conversation_id=conversation_id).order_by("timestamp")
+        messages_qs = Message.objects.filter(conversation_id=conversation_id).select_related("body").order_by("timestamp")
         conversation_messages = [m.content for m in messages_qs]
 
         if not conversation_messages:
@@ -0,0 +1,104 @@
+import re
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+from rest_framework import permissions, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+
+from ..models import Attachment
+from ..serializers import AttachmentSerializer
+from ..services.blob_store import BlobNotFound, get_blob_store
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range Range header against a blob of `size` bytes.
+
+    Returns:
+        tuple | None: (start, end) inclusive, or None to send the whole blob
+            (no header, or a form we don't serve such as multiple ranges)
+
+    Raises:
+        ValueError: The range is not satisfiable (respond 416)
+    """
+    match = _RANGE.match((header or "").strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the final `last` bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def blob_response(request, digest, content_type, filename=None):
+    """Stream a blob, honouring Range and If-None-Match (digests never change)."""
+    store = get_blob_store()
+    try:
+        size = store.size(digest)
+    except BlobNotFound:
+        raise NotFound("File is no longer available.") from None
+
+    etag = f'"{digest}"'
+    if etag in request.headers.get("If-None-Match", ""):
+        response = HttpResponse(status=304)
+        response["ETag"] = etag
+        return response
+
+    try:
+        byte_range = parse_range(request.headers.get("Range"), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if byte_range is None:
+        start, end = 0, size - 1
+        response = StreamingHttpResponse(
+            store.iter_range(digest), content_type=content_type
+        )
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            store.iter_range(digest, start, end), content_type=content_type, status=206
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    response["Content-Length"] = str(max(end - start + 1, 0))
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, max-age=86400"
+    if filename:
+        response["Content-Disposition"] = content_disposition_header(True, filename)
+    return response
+
+
+class AttachmentViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Attachment metadata, plus downloads from the blob store at
+    /attachments/{id}/download/ (supports Range for resumable and
+    partial downloads).
+    """
+
+    queryset = Attachment.objects.all()
+    serializer_class = AttachmentSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        attachment = self.get_object()
+        if not attachment.sha256:
+            raise NotFound("Attachment content was not archived.")
+        return blob_response(
+            request, attachment.sha256, attachment.mime_type, attachment.filename
+        )
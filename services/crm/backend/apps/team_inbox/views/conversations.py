@@ -1,12 +1,17 @@
-from django.db.models import Q
+from django.db.models import Count, Exists, F, IntegerField, OuterRef, Prefetch, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.filters import OrderingFilter, SearchFilter
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
-from ..models import Conversation
-from ..serializers import ConversationSerializer
+from ..models import Conversation, Message
+from ..serializers import ConversationSerializer, ConversationSummarySerializer, MessageSerializer
+from ..services.body_hydration import hydrate_on_open
+
+SNIPPET_LENGTH = 200
 
 
 # -----------------------------
@@ -18,6 +23,49 @@ class ConversationPagination(PageNumberPagination):
     max_page_size = 100
 
 
+class MessageCursorPagination(CursorPagination):
+    """Newest first; follow `next` to page back through the thread."""
+    page_size = 30
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-timestamp', '-created_at')
+
+
+def _message_queryset():
+    # Everything MessageSerializer touches, in a fixed number of queries
+    return Message.objects.select_related('body', 'channel_account').prefetch_related(
+        'attachments', 'internal_notes__author', 'labels'
+    )
+
+
+def _message_count(**filters):
+    rows = (
+        Message.objects.filter(conversation=OuterRef('pk'), **filters)
+        .order_by()
+        .values('conversation')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+
+def annotate_summary(queryset):
+    """Counts, flags and last-message snippet for ConversationSummarySerializer."""
+    return queryset.annotate(
+        message_count=_message_count(),
+        unread_count=_message_count(is_read=False),
+        has_attachments=Exists(
+            Message.attachments.through.objects.filter(message__conversation=OuterRef('pk'))
+        ),
+        is_starred=Exists(Message.objects.filter(conversation=OuterRef('pk'), is_starred=True)),
+        last_message_from=F('last_message__from_email'),
+        last_message_snippet=Substr('last_message__preview', 1, SNIPPET_LENGTH),
+        last_message_timestamp=F('last_message__timestamp'),
+        last_message_is_read=F('last_message__is_read'),
+        last_message_source=F('last_message__source'),
+    )
+
+
 # -----------------------------
 # Conversation ViewSet
 # -----------------------------
@@ -25,6 +73,9 @@ class ConversationViewSet(viewsets.ModelViewSet):
     """
     A viewset for listing, retrieving, updating, and managing conversations.
     Supports UUID lookup, partial updates, filtering, search, and ordering.
+
+    List views accept ?view=summary for ConversationSummarySerializer rows
+    (no message bodies); messages are then paged from /conversations/{id}/messages/.
     """
     queryset = Conversation.objects.all()
     serializer_class = ConversationSerializer
@@ -45,10 +96,18 @@ class ConversationViewSet(viewsets.ModelViewSet):
         user = self.request.user
         params = self.request.query_params
 
-        queryset = (
-            Conversation.objects.all()
-            .prefetch_related("tags", "messages", "last_message__labels")
-        )
+        if self.action == "messages":
+            queryset = Conversation.objects.all()
+        elif self.is_summary:
+            queryset = annotate_summary(Conversation.objects.prefetch_related("tags"))
+        else:
+            queryset = Conversation.objects.select_related("last_message__body").prefetch_related(
+                "tags",
+                Prefetch("messages", queryset=_message_queryset().order_by("created_at")),
+                "last_message__attachments",
+                "last_message__internal_notes__author",
+                "last_message__labels",
+            )
 
         # Filter by inbox
         inbox_id = params.get("inbox_id")
@@ -79,6 +138,30 @@ class ConversationViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    @property
+    def is_summary(self):
+        return self.action == 'list' and self.request.query_params.get('view') == 'summary'
+
+    def get_serializer_class(self):
+        if self.is_summary:
+            return ConversationSummarySerializer
+        return super().get_serializer_class()
+
+    @action(detail=True, methods=['get'])
+    def messages(self, request, id=None):
+        """
+        Cursor-paginated messages of one conversation, newest first.
+        GET /conversations/{id}/messages/?page_size=30&cursor=...
+        """
+        conversation = self.get_object()
+
+        paginator = MessageCursorPagination()
+        page = paginator.paginate_queryset(
+            _message_queryset().filter(conversation=conversation), request, view=self
+        )
+        hydrate_on_open(page)
+        return paginator.get_paginated_response(MessageSerializer(page, many=True).data)
+
     def update(self, request, *args, **kwargs):
         """
         Full update of conversation.
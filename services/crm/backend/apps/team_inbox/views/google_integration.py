@@ -7,6 +7,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from django_tenants.utils import schema_context
 
+from ..services.backfill import queue_connect_backfill
 from ..services.gmail_service import GmailService
 from ..models import Inbox, ChannelAccount
 from ...core.models import TenantEmailMapping
@@ -102,7 +103,14 @@ def google_callback(request):
                 # Silent fail: watch can be retried later
                 pass
 
-            return JsonResponse({"email": identifier, "inbox_id": str(inbox.id)})
+            # Import existing mail in the background (process_backfills)
+            backfill = queue_connect_backfill(channel_account)
+
+            return JsonResponse({
+                "email": identifier,
+                "inbox_id": str(inbox.id),
+                "backfill_id": str(backfill.id) if backfill else None,
+            })
 
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
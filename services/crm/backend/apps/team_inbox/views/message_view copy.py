@@ -28,10 +28,10 @@ from django_tenants.utils import  schema_context
 User = get_user_model()
 
 # SMTP Configuration
-SMTP_SERVER = os.getenv("SMTP_SERVER", "mail.ralakde.co.uk")
+SMTP_SERVER = os.getenv("SMTP_SERVER", "")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
-SMTP_USER = os.getenv("SMTP_USER", "teams@ralakde.com")
-SMTP_PASS = os.getenv("SMTP_PASS", "Ralakde123")
+SMTP_USER = os.getenv("SMTP_USER", "")
+SMTP_PASS = os.getenv("SMTP_PASS", "")
 
 
 class MessageViewSet(viewsets.ModelViewSet):
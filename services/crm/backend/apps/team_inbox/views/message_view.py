@@ -1,36 +1,34 @@
-import os
-import smtplib
 import uuid
-import traceback
-import markdown
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from itertools import chain
 
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.utils import timezone
+from django.utils.http import content_disposition_header
 from django.core.exceptions import ObjectDoesNotExist
 from django.contrib.auth import get_user_model
 
 from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
 from django_tenants.utils import schema_context
 from contextlib import nullcontext
 
 from ..models import ChannelAccount, Message, Conversation
 from ..serializers import MessageSerializer, ConversationSerializer
+from ..services.blob_store import BlobNotFound
+from ..services.body_hydration import hydrate_on_open
+from ..services.mime_archive import iter_raw_message
+from ..services.outbox import compose_email, enqueue_email, outbox_configured
+from ..services.realtime import publish_message_events
+from ..services.thread_index import index_messages, resolve_conversation
 
 User = get_user_model()
 
-# SMTP Configuration
-SMTP_SERVER = os.getenv("SMTP_SERVER", "mail.ralakde.co.uk")
-SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
-SMTP_USER = os.getenv("SMTP_USER", "teams@ralakde.com")
-SMTP_PASS = os.getenv("SMTP_PASS", "Ralakde123")
-
 
 class MessageViewSet(viewsets.ModelViewSet):
     serializer_class = MessageSerializer
@@ -40,12 +38,12 @@ class MessageViewSet(viewsets.ModelViewSet):
     filterset_fields = ['is_read', 'priority', 'source', 'inbox']
     ordering_fields = ['timestamp', 'created_at', 'received_at']
     ordering = ['-created_at']
-    search_fields = ['subject', 'from_email', 'to', 'content']
+    search_fields = ['subject', 'from_email', 'to', 'body__search_text']
 
     def get_queryset(self):
         user = self.request.user
         qs = Message.objects.select_related(
-            'inbox', 'assigned_to', 'conversation'
+            'inbox', 'assigned_to', 'conversation', 'body', 'channel_account'
         ).prefetch_related(
             'attachments', 'labels', 'internal_notes'
         )
@@ -59,64 +57,32 @@ class MessageViewSet(viewsets.ModelViewSet):
 
         return qs
 
-    def send_email_smtp(
-        self, from_email, to_email, subject,
-        plain_body=None, html_body=None,
-        cc=None, bcc=None, attachments=None,
-        in_reply_to=None, references=None
-    ):
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = subject
-        msg["From"] = f"{from_email} via TeamInbox <{SMTP_USER}>"
-        msg["Reply-To"] = from_email
-        msg["To"] = ", ".join(to_email) if isinstance(to_email, list) else to_email
-
-        if cc:
-            msg["Cc"] = ", ".join(cc)
-
-        message_id = f"<{uuid.uuid4().hex}@{SMTP_USER.split('@')[-1]}>"
-        msg["Message-ID"] = message_id
-
-        if in_reply_to:
-            msg["In-Reply-To"] = in_reply_to
-        if references:
-            msg["References"] = " ".join(references) if isinstance(references, list) else references
-
-        if plain_body:
-            msg.attach(MIMEText(plain_body, "plain"))
-
-        if html_body:
-            html_body_clean = markdown.markdown(html_body, extensions=["extra", "nl2br"])
-        elif plain_body:
-            html_body_clean = markdown.markdown(plain_body, extensions=["extra", "nl2br"])
-        else:
-            html_body_clean = ""
-
-        html_content = f"""
-        <html>
-            <body style="font-family: Arial, sans-serif; font-size:14px; line-height:1.5; color:#111;">
-                {html_body_clean}
-            </body>
-        </html>
-        """
-
-        msg.attach(MIMEText(html_content, "html"))
-
-        recipients = []
-        recipients.extend(to_email if isinstance(to_email, list) else [to_email])
-        if cc:
-            recipients.extend(cc)
-        if bcc:
-            recipients.extend(bcc)
-
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASS)
-            server.sendmail(SMTP_USER, recipients, msg.as_string())
-
-        return message_id
+    def retrieve(self, request, *args, **kwargs):
+        message = self.get_object()
+        hydrate_on_open([message])
+        return Response(self.get_serializer(message).data)
+
+    @action(detail=True, methods=["get"])
+    def raw(self, request, pk=None):
+        """Original RFC 822 message, from the blob store archive."""
+        message = self.get_object()
+        if not message.raw_mime_sha256:
+            raise NotFound("Raw message was not archived.")
+        try:
+            chunks = iter_raw_message(message)
+            first = next(chunks, b"")
+        except BlobNotFound:
+            raise NotFound("Raw message is no longer available.") from None
+        response = StreamingHttpResponse(chain([first], chunks), content_type="message/rfc822")
+        response["Content-Disposition"] = content_disposition_header(True, f"{message.pk}.eml")
+        return response
 
     def create(self, request, *args, **kwargs):
+        if not outbox_configured():
+            return Response(
+                {"error": "Outgoing mail is not configured"}, status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+
         data = request.data
         subject = data.get("subject") or "(No Subject)"
         from_email = data.get("from_", {}).get("email")
@@ -139,22 +105,17 @@ class MessageViewSet(viewsets.ModelViewSet):
         references = data.get("references", [])
         thread_id = data.get("threadId")
 
-        try:
-            new_message_id = self.send_email_smtp(
-                from_email=from_email,
-                to_email=to_emails,
-                subject=subject,
-                plain_body=plain_body,
-                html_body=html_body,
-                cc=cc_emails,
-                bcc=bcc_emails,
-                attachments=None,
-                in_reply_to=in_reply_to,
-                references=references,
-            )
-        except Exception as e:
-            traceback.print_exc()
-            return Response({"error": f"SMTP send failed: {str(e)}"}, status=500)
+        # Sent by the outbox workers; the Message tracks delivery_status
+        new_message_id, mime = compose_email(
+            from_email=from_email,
+            to_email=to_emails,
+            subject=subject,
+            plain_body=plain_body,
+            html_body=html_body,
+            cc=cc_emails,
+            in_reply_to=in_reply_to,
+            references=references,
+        )
 
         participants = []
         seen = set()
@@ -163,13 +124,7 @@ class MessageViewSet(viewsets.ModelViewSet):
                 participants.append(p)
                 seen.add(p["email"])
 
-        conversation = None
-        if thread_id:
-            conversation = Conversation.objects.filter(thread_id=thread_id).first()
-        if not conversation and in_reply_to:
-            parent_msg = Message.objects.filter(message_id=in_reply_to).first()
-            if parent_msg:
-                conversation = parent_msg.conversation
+        conversation = resolve_conversation(thread_id, in_reply_to, references)
 
         if not conversation:
             conversation = Conversation.objects.create(
@@ -183,7 +138,7 @@ class MessageViewSet(viewsets.ModelViewSet):
             )
 
         schema_ctx = schema_context(tenant_schema) if tenant_schema else nullcontext()
-        with schema_ctx:
+        with schema_ctx, transaction.atomic():
             message = Message.objects.create(
                 conversation=conversation,
                 inbox=account.inbox,
@@ -200,27 +155,23 @@ class MessageViewSet(viewsets.ModelViewSet):
                 references=references,
                 timestamp=timezone.now(),
                 source="outgoing",
+                delivery_status=Message.DELIVERY_QUEUED,
                 priority=data.get("priority", "normal"),
             )
 
+            index_messages([(conversation, {
+                "message_id": new_message_id,
+                "thread_id": thread_id or conversation.thread_id,
+                "references": references,
+            })])
+
+            enqueue_email(mime, to_emails + cc_emails + bcc_emails, message=message)
+
         conversation.last_message = message
         conversation.last_activity = timezone.now()
         conversation.save(update_fields=["last_message", "last_activity"])
 
-        try:
-            channel_layer = get_channel_layer()
-            group_name = f"tenant_{tenant.id}"
-            ws_payload = {
-                "type": "new_conversation" if not thread_id else "new_message",
-                "message": {
-                    "type": "new_conversation" if not thread_id else "new_message",
-                    "message": MessageSerializer(message).data,
-                    "conversation": ConversationSerializer(conversation).data,
-                },
-            }
-            async_to_sync(channel_layer.group_send)(group_name, ws_payload)
-        except Exception:
-            traceback.print_exc()
+        publish_message_events(tenant, [(message, conversation, not thread_id)])
 
         return Response(
             {
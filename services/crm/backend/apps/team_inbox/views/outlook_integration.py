@@ -7,6 +7,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from ..models import Inbox, ChannelAccount
 from ...core.models import TenantEmailMapping
+from ..services.backfill import queue_connect_backfill
 from ..services.outlook_service import OutlookService
 
 @api_view(["POST"])
@@ -79,12 +80,17 @@ def outlook_callback(request):
             channel_account.subscription_id = subscription_id
             channel_account.save(update_fields=["subscription_id"])
 
+        # Import existing mail in the background (process_backfills)
+        with schema_context(tenant.schema_name):
+            backfill = queue_connect_backfill(channel_account)
+
         return JsonResponse({
             "email": identifier,
             "inbox_id": str(inbox.id),
             "new_inbox": created_inbox,
             "new_channel_account": created_account,
             "subscription_id": subscription_id,
+            "backfill_id": str(backfill.id) if backfill else None,
         })
 
     except Exception as e:
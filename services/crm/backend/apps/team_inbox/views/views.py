@@ -1,22 +1,15 @@
 import json
 import base64
-import requests
+import hashlib
+import logging
 import traceback
-import smtplib
-import html
-import re
 
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email.utils import getaddresses
-from bs4 import BeautifulSoup
 
-from django.core.cache import cache
 from django.db import transaction
 from django.http import JsonResponse, HttpResponse
-from django.utils import timezone
 
-from datetime import datetime, timezone as dt_timezone
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -28,40 +21,39 @@ from django_tenants.utils import schema_context
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.permissions import AllowAny
 from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 
 
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 
+from ..services.backfill import pause_backfill, resume_backfill, start_backfill
+from ..services.ingest_queue import enqueue_ingest_job, queue_metrics
+from ..services.mail_import import queue_import
+from ..services.notifications import (
+    create_notifications, mark_read as mark_notifications_read, unread_count as unread_notification_count,
+)
+from ..services.outbox import enqueue_email, outbox_configured
+from ..services.realtime import member_inbox_ids, notify_membership_changed
 
-
-from ..services.gmail_service import GmailService
-from ..services.outlook_service import OutlookService
-
-from ..models import TeamMember, Inbox, ChannelAccount, Tag, Message, Comment, Notification, Task, CalendarEvent, Conversation
+from ..models import (
+    TeamMember, Inbox, ChannelAccount, Tag, Comment, Notification, Task, CalendarEvent, MailboxBackfill, InboxRule,
+)
 from ..serializers import (
     TeamMemberSerializer, InboxSerializer, ChannelAccountSerializer,
-    TagSerializer, MessageSerializer, CommentSerializer, NotificationSerializer,
-    TaskSerializer, CalendarEventSerializer, ConversationSerializer
+    TagSerializer, CommentSerializer, NotificationSerializer,
+    TaskSerializer, CalendarEventSerializer, MailboxBackfillSerializer, MailImportSerializer, InboxRuleSerializer,
 )
 
-from email.utils import getaddresses
-
 from rest_framework.permissions import IsAuthenticated
 
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 from ...core.models import TenantEmailMapping, Client  # adjust if needed
 
 
 
-SMTP_SERVER = "mail.ralakde.co.uk"
-SMTP_PORT = 587
-SMTP_USER = "teams@ralakde.com"
-SMTP_PASS = "Ralakde123"
-
 def send_invitation_email(email: str, tenant_id: str, created: bool):
     if created:
         subject = "Welcome! Your account has been created"
@@ -93,33 +85,18 @@ Click below to accept and access the team:
 Best regards,
 NeuraCRM Team
 """
-    print(f"📧 Sending invite to {email} (tenant={tenant_id}, created={created})")
+    if not outbox_configured():
+        logger.warning("Outgoing mail is not configured; invite to %s was not sent", email)
+        return
+    logger.info("Queueing invite to %s (tenant=%s, created=%s)", email, tenant_id, created)
     msg = MIMEMultipart()
-    msg["From"] = SMTP_USER
+    msg["From"] = settings.SMTP_USER
     msg["To"] = email
     msg["Subject"] = subject
     msg.attach(MIMEText(body, "plain"))
 
-    with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-        server.starttls()
-        server.login(SMTP_USER, SMTP_PASS)
-        server.sendmail(SMTP_USER, email, msg.as_string())
-
-
-def parse_email_subject_and_snippet(message):
-    headers = message.get('payload', {}).get('headers', [])
-    subject = next((h['value'] for h in headers if h.get('name', '').lower() == 'subject'), None)
-    snippet = message.get('snippet', '')
-    return subject, snippet
-
-
-def parse_email_address(raw):
-    name, email = getaddresses([raw])[0] if raw else ("", "")
-    return {"name": name, "email": email}
-
-
-def parse_email_list(raw):
-    return [{"name": name, "email": email} for name, email in getaddresses([raw])] if raw else []
+    # Sent by the outbox workers
+    enqueue_email(msg, [email])
 
 
 def get_tenant_for_email(email: str):
@@ -130,280 +107,102 @@ def get_tenant_for_email(email: str):
     return None
 
 
-def refresh_access_token(channel_account):
-    response = requests.post("https://oauth2.googleapis.com/token", data={
-        "client_id": settings.GOOGLE_CLIENT_ID,
-        "client_secret": settings.GOOGLE_CLIENT_SECRET,
-        "refresh_token": channel_account.refresh_token,
-        "grant_type": "refresh_token",
-    })
-    token_data = response.json()
-    if "access_token" in token_data:
-        channel_account.access_token = token_data["access_token"]
-        channel_account.expires_in = token_data.get("expires_in", 3600)
-        channel_account.token_acquired_at = timezone.now()
-        channel_account.save(update_fields=["access_token", "expires_in", "token_acquired_at"])
-    return channel_account.access_token
-
-
-def clean_gmail_html(html_body: str) -> str:
-    """Clean marketing/newsletter HTML and return compact plain text."""
-    soup = BeautifulSoup(html_body, "html.parser")
-
-    # --- Remove junk ---
-    for tag in soup(["style", "script", "meta", "title", "head", "noscript"]):
-        tag.decompose()
-
-    # Remove tracking pixels / invisible images
-    for img in soup.find_all("img", {"height": "1", "width": "1"}):
-        img.decompose()
-
-    # --- Replace structural tags with newlines ---
-    for br in soup.find_all("br"):
-        br.replace_with("\n")
-    for block in soup.find_all(["p", "div", "tr", "td", "section"]):
-        block.append("\n")
-
-    # --- Extract text ---
-    text = soup.get_text(separator=" ", strip=True)
-
-    # --- Normalize spacing ---
-    text = re.sub(r"\n\s*\n\s*\n+", "\n\n", text)  # collapse >2 blank lines
-    text = re.sub(r"[ \t]+", " ", text)           # collapse spaces
-    text = text.strip()
-
-    return text
-
-
-def html_to_clean_text(html_body: str) -> str:
+def get_tenant_for_subscription(subscription_id: str):
     """
-    Convert cleaned Gmail HTML into plain text
-    with controlled newlines (like Gmail does).
+    Tenant of the Outlook mailbox a Graph subscription notifies for.
+    Subscriptions made before their id was kept on TenantEmailMapping are
+    found by looking through the tenant schemas, then recorded.
     """
-    cleaned_html = clean_gmail_html(html_body)
-    soup = BeautifulSoup(cleaned_html, "html.parser")
-
-    text = soup.get_text("\n")
-
-    # Normalize line endings
-    text = text.replace("\r\n", "\n").replace("\r", "\n")
-
-    # Collapse 3+ newlines into exactly 2
-    text = re.sub(r"\n{3,}", "\n\n", text)
-
-    # Strip trailing/leading newlines
-    return text.strip() + "\n"
-
-
-def preserve_gmail_format(plain_text: str) -> str:
-    escaped = html.escape(plain_text)
-    lines = escaped.splitlines()
-    formatted_lines = []
-    for line in lines:
-        if line.strip() == "":
-            formatted_lines.append("<br>")
-        else:
-            formatted_lines.append(line)
-    return "<br>\n".join(formatted_lines)
-
+    with schema_context("public"):
+        mapping = TenantEmailMapping.objects.filter(subscription_id=subscription_id).select_related("tenant").first()
+        if mapping:
+            return mapping.tenant
+        tenants = list(Client.objects.exclude(schema_name="public"))
 
-# --- NEW helper: safe header extraction from Gmail payload headers list ---
-def get_header(headers_list, name: str):
-    """
-    Given Gmail's headers list (list of {"name": "...", "value": "..."})
-    return the value for header 'name' (case-insensitive), or None.
-    """
-    if not headers_list:
-        return None
-    for h in headers_list:
-        if h is None:
-            continue
-        if h.get("name", "").lower() == name.lower():
-            return h.get("value")
+    for tenant in tenants:
+        with schema_context(tenant.schema_name):
+            identifier = (
+                ChannelAccount.objects.filter(subscription_id=subscription_id)
+                .values_list("identifier", flat=True)
+                .first()
+            )
+        if identifier:
+            with schema_context("public"):
+                TenantEmailMapping.objects.update_or_create(
+                    email=identifier, defaults={"tenant": tenant, "subscription_id": subscription_id}
+                )
+            return tenant
     return None
 
+
 @api_view(["POST"])
 @permission_classes([AllowAny])
 
 def gmail_notify(request):
+    """
+    Gmail Pub/Sub push: validate the notification, record it on the ingest
+    queue and acknowledge. Fetching and storing happens in the ingest workers
+    (manage.py process_ingest_queue).
+    """
     try:
         envelope = json.loads(request.body)
-        message_data = envelope.get("message", {}).get("data")
+        pubsub_message = envelope.get("message", {})
+        message_data = pubsub_message.get("data")
         if not message_data:
             return JsonResponse({"error": "No message data"}, status=400)
 
         payload = json.loads(base64.urlsafe_b64decode(message_data).decode("utf-8"))
         incoming_history_id = payload.get("historyId")
         email = payload.get("emailAddress")
+        if not email:
+            return JsonResponse({"error": "Missing emailAddress"}, status=400)
 
-        # Deduplication guard
-        cache_key = f"gmail_webhook_lock:{email}"
-        if cache.get(cache_key):
-            return JsonResponse({"status": "duplicate_skipped"})
-        cache.set(cache_key, True, timeout=10)
-
-        # Resolve account + tenant
-        account = ChannelAccount.objects.get(identifier=email)
+        # Resolve tenant + account
         tenant = get_tenant_for_email(email)
         if not tenant:
             return JsonResponse({"error": "Tenant not found"}, status=404)
 
         with schema_context(tenant.schema_name):
+            account = ChannelAccount.objects.filter(identifier=email).first()
+            if not account:
+                return JsonResponse({"error": "Channel account not found"}, status=404)
+
             history_id = incoming_history_id or account.last_history_id
             if not history_id:
                 return JsonResponse({"error": "Missing historyId"}, status=400)
 
-            gmail = GmailService(account)
-            messages, new_history_id = gmail.fetch_new_emails(history_id)
-
-            def extract_bodies(payload):
-                headers_list = payload.get("headers", []) or []
-                subject_for_debug = get_header(headers_list, "Subject")
-                from_for_debug = get_header(headers_list, "From")
-
-                html_body = None
-                plain_body = None
-
-                def walk(parts):
-                    for part in parts:
-                        if not isinstance(part, dict):
-                            continue
-                        mime = part.get("mimeType")
-                        body_data = part.get("body", {}).get("data")
-                        if part.get("parts"):
-                            yield from walk(part.get("parts"))
-                        elif body_data:
-                            try:
-                                decoded = base64.urlsafe_b64decode(body_data).decode("utf-8", errors="ignore")
-                            except Exception:
-                                try:
-                                    decoded = base64.b64decode(body_data).decode("utf-8", errors="ignore")
-                                except Exception:
-                                    decoded = ""
-                            yield mime, decoded
-
-                parts = payload.get("parts")
-                if parts:
-                    for mime, decoded in walk(parts):
-                        if not mime or not decoded:
-                            continue
-                        if mime.lower().split(";")[0] == "text/html" and not html_body:
-                            html_body = decoded
-                        elif mime.lower().split(";")[0] == "text/plain" and not plain_body:
-                            plain_body = decoded
-                else:
-                    body_data = payload.get("body", {}).get("data")
-                    if body_data:
-                        try:
-                            plain_body = base64.urlsafe_b64decode(body_data).decode("utf-8", errors="ignore")
-                        except Exception:
-                            plain_body = None
-
-                if html_body:
-                    # Clean HTML to preserve blank lines
-                    plain_body = html_to_clean_text(html_body)
-                elif plain_body:
-                    # fallback to text → HTML
-                    html_body = preserve_gmail_format(plain_body)
-
-                return html_body, plain_body
-
-            for msg in messages:
-                subject, snippet = parse_email_subject_and_snippet(msg)
-                headers_list = msg.get("payload", {}).get("headers", []) or []
-                headers = {h.get("name", "").lower(): h.get("value") for h in headers_list if isinstance(h, dict)}
-                msg_id = headers.get("message-id") or msg.get("id")
-                if Message.objects.filter(message_id=msg_id).exists():
-                    continue
-
-                thread_id = msg.get("threadId")
-                in_reply_to = headers.get("in-reply-to")
-                references = headers.get("references")
-                from_email = parse_email_address(headers.get("from"))
-                to = parse_email_list(headers.get("to"))
-                cc = parse_email_list(headers.get("cc"))
-                bcc = parse_email_list(headers.get("bcc"))
-                reply_to = parse_email_list(headers.get("reply-to"))
-                timestamp = datetime.fromtimestamp(int(msg.get("internalDate", 0)) / 1000.0, tz=dt_timezone.utc)
-
-                # Conversation matching
-                conversation = None
-                if thread_id:
-                    conversation = Conversation.objects.filter(thread_id=thread_id).first()
-                if not conversation and in_reply_to:
-                    conversation = Conversation.objects.filter(messages__message_id=in_reply_to).first()
-                if not conversation and references:
-                    ref_ids = [r.strip() for r in references.split()] if isinstance(references, str) else None
-                    if ref_ids:
-                        conversation = Conversation.objects.filter(messages__message_id__in=ref_ids).first()
-
-                created = False
-                if not conversation:
-                    conversation = Conversation.objects.create(
-                        thread_id=thread_id,
-                        subject=subject or "(No Subject)",
-                        channel=account.provider,
-                        priority="normal",
-                        status="open",
-                        last_activity=timestamp,
-                        shared_inbox_id=account.inbox.id,
-                    )
-                    created = True
-
-                payload_msg = msg.get("payload", {}) or {}
-                html_body, plain_body = extract_bodies(payload_msg)
-
-                message = Message.objects.create(
-                    conversation=conversation,
-                    message_id=msg_id,
-                    thread_id=thread_id,
-                    in_reply_to=in_reply_to,
-                    references=[r.strip() for r in references.split()] if references else None,
-                    subject=subject or "(No Subject)",
-                    from_email=from_email,
-                    to=to,
-                    cc=cc or None,
-                    bcc=bcc or None,
-                    reply_to=reply_to[0] if reply_to else None,
-                    content=plain_body or snippet or "",
-                    html_content=html_body or preserve_gmail_format(plain_body or snippet or ""),
-                    timestamp=timestamp,
-                    inbox=account.inbox,
-                    source="incoming",
-                    priority="normal",
-                )
+            # Pub/Sub redelivers unacknowledged pushes; its messageId dedupes them
+            pubsub_id = pubsub_message.get("messageId") or pubsub_message.get("message_id")
+            dedup_key = f"gmail:{pubsub_id}" if pubsub_id else None
+            # A burst of pushes folds into the mailbox's pending sync
+            job, created = enqueue_ingest_job(
+                account,
+                history_id=str(history_id),
+                payload={"email": email, "history_id": str(history_id)},
+                dedup_key=dedup_key,
+            )
 
-                conversation.last_activity = timestamp
-                conversation.last_message = message
-                conversation.save(update_fields=["last_activity", "last_message"])
-
-                # WebSocket broadcast
-                try:
-                    channel_layer = get_channel_layer()
-                    async_to_sync(channel_layer.group_send)(
-                        f"tenant_{tenant.id}",
-                        {
-                            "type": "new_conversation" if created else "new_message",
-                            "message": {
-                                "type": "new_conversation" if created else "new_message",
-                                "message": MessageSerializer(message).data,
-                                "conversation": ConversationSerializer(conversation).data,
-                            },
-                        },
-                    )
-                except Exception:
-                    traceback.print_exc()
-
-            if new_history_id:
-                account.last_history_id = new_history_id
-                account.save(update_fields=["last_history_id"])
-
-        return JsonResponse({"status": "ok"})
+        if created:
+            outcome = "queued"
+        elif dedup_key and job.dedup_key == dedup_key:
+            outcome = "duplicate_skipped"
+        else:
+            outcome = "coalesced"
+        return JsonResponse({"status": outcome, "job_id": str(job.id)})
 
+    except (ValueError, TypeError):
+        return JsonResponse({"error": "Invalid notification payload"}, status=400)
     except Exception as e:
         traceback.print_exc()
         return JsonResponse({"error": str(e)}, status=500)
 
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def ingest_metrics(request):
+    """Ingest queue depth and lag for the current tenant."""
+    return Response(queue_metrics())
+
 # ----------------- Outlook Webhook ----------------- #
 
 @csrf_exempt
@@ -411,9 +210,8 @@ def outlook_notify(request):
     """
     Outlook webhook handler:
     - Handles validation handshake
-    - Processes new message notifications
-    - Deduplicates, fetches, normalizes, and stores messages
-    - Broadcasts via WebSocket
+    - Records one ingest job per mailbox and returns; the ingest workers
+      run the delta sync (see services/outlook_sync.py)
     """
     try:
         # 1. Validation handshake
@@ -427,127 +225,35 @@ def outlook_notify(request):
         body = json.loads(request.body.decode("utf-8"))
         notifications = body.get("value", [])
 
+        # 2. Group the notified message ids per subscription
+        resources = {}
         for notif in notifications:
             subscription_id = notif.get("subscriptionId")
             resource = notif.get("resource")
-            message_id = resource.split("/")[-1] if resource else None
-            if not subscription_id or not message_id:
-                continue
-
-            # 2. Deduplication
-            cache_key = f"outlook_webhook_lock:{subscription_id}:{message_id}"
-            if cache.get(cache_key):
-                continue
-            cache.set(cache_key, True, timeout=10)
-
-            # 3. Resolve account + tenant
-            try:
-                account = ChannelAccount.objects.get(subscription_id=subscription_id)
-            except ChannelAccount.DoesNotExist:
-                continue
-
-            tenant = get_tenant_for_email(account.identifier)
+            if subscription_id and resource:
+                resources.setdefault(subscription_id, []).append(resource.split("/")[-1])
+
+        # 3. One job per mailbox; a redelivered notification batch hashes to the same key
+        queued = 0
+        for subscription_id, message_ids in resources.items():
+            # Resolve the tenant first: the webhook is served from the public schema
+            tenant = get_tenant_for_subscription(subscription_id)
             if not tenant:
                 continue
 
+            digest = hashlib.sha256(",".join(sorted(message_ids)).encode()).hexdigest()[:32]
             with schema_context(tenant.schema_name):
-                service = OutlookService(account)
-                msg = service.get_message(message_id)
-                if not msg:
+                account = ChannelAccount.objects.filter(subscription_id=subscription_id).first()
+                if not account:
                     continue
-
-                # --- Normalization helpers ---
-                def normalize_recipient_list(recips):
-                    if not recips:
-                        return []
-                    return [
-                        {"email": r.get("emailAddress", {}).get("address"), "name": r.get("emailAddress", {}).get("name")}
-                        for r in recips if r.get("emailAddress", {}).get("address")
-                    ]
-
-                def parse_iso(iso_str):
-                    try:
-                        return dt_datetime.fromisoformat(iso_str.replace("Z", "+00:00"))
-                    except Exception:
-                        return dt_datetime.now(tz=dt_timezone.utc)
-
-                # --- Extract message fields ---
-                from_ea = (msg.get("from") or {}).get("emailAddress") or {}
-                from_email = {"email": from_ea.get("address"), "name": from_ea.get("name")}
-                to_list = normalize_recipient_list(msg.get("toRecipients"))
-                cc_list = normalize_recipient_list(msg.get("ccRecipients"))
-                reply_to_list = normalize_recipient_list(msg.get("replyTo"))
-
-                subject = msg.get("subject") or "(No Subject)"
-                timestamp = parse_iso(msg.get("receivedDateTime"))
-                internet_message_id = msg.get("internetMessageId") or message_id
-                thread_id = msg.get("conversationId")
-
-                headers = {h.get("name"): h.get("value") for h in msg.get("internetMessageHeaders") or []}
-                in_reply_to = headers.get("In-Reply-To")
-                references = [r.strip() for r in headers.get("References", "").split()] if headers.get("References") else None
-
-                # Skip if message already saved
-                if Message.objects.filter(message_id=internet_message_id).exists():
-                    continue
-
-                # --- Conversation resolution ---
-                conversation, created = Conversation.objects.get_or_create(
-                    thread_id=thread_id,
-                    defaults={
-                        "subject": subject,
-                        "channel": account.provider,
-                        "priority": "normal",
-                        "status": "open",
-                        "last_activity": timestamp,
-                        "shared_inbox_id": account.inbox.id,
-                    }
-                )
-
-                # --- Save message ---
-                message = Message.objects.create(
-                    conversation=conversation,
-                    message_id=internet_message_id,
-                    thread_id=thread_id,
-                    in_reply_to=in_reply_to,
-                    references=references,
-                    subject=subject,
-                    from_email=from_email,
-                    to=to_list,
-                    cc=cc_list or None,
-                    bcc=None,
-                    reply_to=reply_to_list[0] if reply_to_list else None,
-                    content=msg.get("bodyPreview") or "",
-                    html_content=(msg.get("body") or {}).get("content"),
-                    timestamp=timestamp,
-                    inbox=account.inbox,
-                    source="incoming",
-                    priority="normal",
+                _, created = enqueue_ingest_job(
+                    account,
+                    payload={"subscription_id": subscription_id, "message_ids": message_ids},
+                    dedup_key=f"outlook:{subscription_id}:{digest}",
                 )
+            queued += int(created)
 
-                # --- Update conversation ---
-                conversation.last_activity = timestamp
-                conversation.last_message = message
-                conversation.save(update_fields=["last_activity", "last_message"])
-
-                # --- WebSocket broadcast ---
-                try:
-                    channel_layer = get_channel_layer()
-                    async_to_sync(channel_layer.group_send)(
-                        f"tenant_{tenant.id}",
-                        {
-                            "type": "new_conversation" if created else "new_message",
-                            "message": {
-                                "type": "new_conversation" if created else "new_message",
-                                "message": MessageSerializer(message).data,
-                                "conversation": ConversationSerializer(conversation).data,
-                            },
-                        },
-                    )
-                except Exception:
-                    traceback.print_exc()
-
-        return JsonResponse({"status": "ok"})
+        return JsonResponse({"status": "queued", "jobs": queued}, status=202)
 
     except Exception as e:
         traceback.print_exc()
@@ -613,6 +319,7 @@ class TeamMemberViewSet(viewsets.ModelViewSet):
         # Assign inboxes
         if team_inboxes:
             team_member.team_inboxes.set(team_inboxes)
+            transaction.on_commit(lambda: notify_membership_changed(user.id))
 
         if send_invite:
             send_invitation_email(user.email, tenant_id, created)
@@ -665,6 +372,8 @@ class TeamMemberViewSet(viewsets.ModelViewSet):
         team_inboxes = data.get("teamInboxes")
         if team_inboxes is not None:
             team_member.team_inboxes.set(team_inboxes)
+        if team_inboxes is not None or role or is_active is not None:
+            transaction.on_commit(lambda: notify_membership_changed(user.id))
 
 
         serializer = self.get_serializer(team_member)
@@ -703,6 +412,23 @@ class InboxViewSet(viewsets.ModelViewSet):
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=True, methods=["get", "post"], url_path="import")
+    def import_mail(self, request, pk=None):
+        """
+        GET: the inbox's MBOX/EML imports, newest first.
+        POST: upload an archive (multipart "file": .mbox, .eml, gzip or zip) and queue its import.
+        """
+        inbox = self.get_object()
+        if request.method == "GET":
+            imports = inbox.mail_imports.order_by("-created_at")
+            return Response(MailImportSerializer(imports, many=True).data)
+
+        uploaded = request.FILES.get("file")
+        if uploaded is None:
+            return Response({"detail": "Upload the archive as the 'file' field"}, status=status.HTTP_400_BAD_REQUEST)
+        mail_import = queue_import(inbox, uploaded, user=request.user)
+        return Response(MailImportSerializer(mail_import).data, status=status.HTTP_202_ACCEPTED)
+
 
 class ChannelAccountViewSet(viewsets.ModelViewSet):
     queryset = ChannelAccount.objects.all()
@@ -713,14 +439,80 @@ class ChannelAccountViewSet(viewsets.ModelViewSet):
         return super().get_queryset()
 
     def retrieve(self, request, *args, **kwargs):
+        # Tokens are refreshed ahead of expiry by refresh_channel_tokens, never inline
         instance = self.get_object()
-        if instance.is_token_expired():
-            refresh_access_token(instance)
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
+
+    @action(detail=True, methods=["get", "post"])
+    def backfill(self, request, pk=None):
+        """
+        GET: progress of the mailbox's latest backfill.
+        POST: queue a backfill of existing mail ({"after": date, "before": date}, both optional).
+        """
+        account = self.get_object()
+        if request.method == "GET":
+            backfill = account.backfills.order_by("-created_at").first()
+            if backfill is None:
+                return Response({"detail": "No backfill for this mailbox"}, status=status.HTTP_404_NOT_FOUND)
+            return Response(MailboxBackfillSerializer(backfill).data)
+
+        serializer = MailboxBackfillSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        backfill, created = start_backfill(
+            account, after=serializer.validated_data.get("after"), before=serializer.validated_data.get("before"),
+        )
+        return Response(
+            MailboxBackfillSerializer(backfill).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+    @action(detail=True, methods=["post"], url_path="backfill/pause")
+    def backfill_pause(self, request, pk=None):
+        backfill = self.get_object().backfills.filter(status__in=MailboxBackfill.ACTIVE_STATUSES).first()
+        if backfill is None or not pause_backfill(backfill):
+            return Response({"detail": "No running backfill to pause"}, status=status.HTTP_409_CONFLICT)
+        return Response(MailboxBackfillSerializer(backfill).data)
+
+    @action(detail=True, methods=["post"], url_path="backfill/resume")
+    def backfill_resume(self, request, pk=None):
+        backfill = self.get_object().backfills.order_by("-created_at").first()
+        if backfill is None or not resume_backfill(backfill):
+            return Response({"detail": "No paused or failed backfill to resume"}, status=status.HTTP_409_CONFLICT)
+        return Response(MailboxBackfillSerializer(backfill).data)
     
 
 
+class InboxRuleViewSet(viewsets.ModelViewSet):
+    """
+    Ingest rules of an inbox (?inbox=<id>), in the order they run. Limited to
+    the inboxes the user is a teammate of (all of them for admins).
+    """
+    queryset = InboxRule.objects.prefetch_related("add_tags")
+    serializer_class = InboxRuleSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        qs = super().get_queryset().filter(inbox_id__in=member_inbox_ids(self.request.user.pk))
+        inbox_id = self.request.query_params.get("inbox")
+        if inbox_id:
+            qs = qs.filter(inbox_id=inbox_id)
+        return qs
+
+    def _check_inbox(self, serializer):
+        inbox = serializer.validated_data.get("inbox")
+        if inbox is not None and str(inbox.pk) not in member_inbox_ids(self.request.user.pk):
+            raise PermissionDenied("You do not have access to this inbox.")
+
+    def perform_create(self, serializer):
+        self._check_inbox(serializer)
+        serializer.save()
+
+    def perform_update(self, serializer):
+        self._check_inbox(serializer)
+        serializer.save()
+
+
 class TagViewSet(viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
@@ -744,45 +536,17 @@ class CommentViewSet(viewsets.ModelViewSet):
         # Save the comment
         comment = serializer.save(user=self.request.user)
 
-        mentioned_users = serializer.validated_data.get("mentions", [])
-        print(f"👥 Mentioned users: {[u.email for u in mentioned_users]}")
-
-        channel_layer = get_channel_layer()
-
-        # Create notifications and send to each mentioned user
-        for u in mentioned_users:
-            notif = Notification.objects.create(
-                user=u,
-                type="comment_mention",
-                object_id=comment.id,
-                data={
-                    "comment_content": comment.content,
-                    "author": comment.user.full_name,
-                    "message_id": str(comment.message_id),
-                },
-            )
-            print(f"📨 Created Notification for {u.email}: {notif.id}")
-
-            # Prepare payload
-            payload = {
-                "id": str(notif.id),
-                "type": notif.type,
-                "object_id": str(notif.object_id),
-                "data": notif.data,
-                "is_read": notif.is_read,
-                "created_at": notif.created_at.isoformat(),
-            }
-            print(f"📤 Prepared WebSocket payload for {u.email}: {payload}")
-
-            # Send notification over WebSocket to the user's group
-            async_to_sync(channel_layer.group_send)(
-                f"user_{u.id}",
-                {
-                    "type": "notification_message",  # matches consumer method
-                    "data": payload,
-                },
-            )
-            print(f"🔔 Sent targeted notification to user_{u.id}")
+        # One bulk insert and one socket fan-out for every mentioned user
+        create_notifications(
+            serializer.validated_data.get("mentions", []),
+            "comment_mention",
+            comment.id,
+            {
+                "comment_content": comment.content,
+                "author": comment.user.full_name,
+                "message_id": str(comment.message_id),
+            },
+        )
 
 
 # class NotificationViewSet(viewsets.ModelViewSet):
@@ -816,9 +580,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
         Mark a single notification as read
         """
         notif = self.get_object()
-        if not notif.is_read:
-            notif.is_read = True
-            notif.save()
+        mark_notifications_read(request.user.id, [notif.id])
         return Response({"status": "read"}, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["post"])
@@ -826,10 +588,16 @@ class NotificationViewSet(viewsets.ModelViewSet):
         """
         Mark all unread notifications as read
         """
-        unread = Notification.objects.filter(user=request.user, is_read=False)
-        updated_count = unread.update(is_read=True)
+        updated_count = mark_notifications_read(request.user.id)
         return Response({"status": "all_read", "updated_count": updated_count}, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=["get"])
+    def unread_count(self, request):
+        """
+        Unread notification count, from the cached per-user counter
+        """
+        return Response({"unread_count": unread_notification_count(request.user.id)}, status=status.HTTP_200_OK)
+
 
 
 class TaskViewSet(viewsets.ModelViewSet):
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+"""
+Benchmark the vectorized deal forecast against a per-deal Python loop
+
+Usage:
+    python benchmarks/bench_forecast.py [--deals 1000000] [--owners 200]
+    python benchmarks/bench_forecast.py --tenant acme [--db-deals 1000000]
+
+Synthetic per-deal arrays are generated in memory (no database needed), so
+this measures the forecast engine itself on the worst case of one row per
+deal. In production the engine sees pre-grouped (stage, owner, month) rows
+and the row count is much smaller.
+
+With --tenant the endpoint's query path is timed as well (needs the
+database): --db-deals deals are inserted for that tenant inside a
+transaction that is rolled back afterwards, then build_forecast (the
+load_pipeline_arrays GROUP BY plus the engine) is timed against fetching
+every deal row and looping over it in Python. The tenant needs an account;
+deals are spread over its users.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+import django
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.dev")
+django.setup()
+
+from apps.opportunities.forecast import (  # noqa: E402
+    CLOSED_STAGES,
+    CLOSED_WON,
+    DEFAULT_STAGE_PROBABILITIES,
+    compute_forecast,
+)
+
+
+def generate_deals(deal_count, owner_count, seed=42):
+    """Generate synthetic per-deal column arrays"""
+    rng = np.random.default_rng(seed)
+    stage_labels = list(DEFAULT_STAGE_PROBABILITIES)
+    start = np.datetime64("2024-01-01")
+    return {
+        "stage_codes": rng.integers(0, len(stage_labels), deal_count),
+        "stage_labels": stage_labels,
+        "owner_codes": rng.integers(0, owner_count, deal_count),
+        "owner_labels": [f"owner-{i}" for i in range(owner_count)],
+        "close_month": start
+        + rng.integers(0, 730, deal_count).astype("timedelta64[D]"),
+        "amount": np.round(rng.uniform(500, 250000, deal_count), 2),
+    }
+
+
+def python_forecast(arrays, probabilities):
+    """Reference implementation looping over deals one at a time"""
+    stage_labels = arrays["stage_labels"]
+    owner_labels = arrays["owner_labels"]
+    totals = defaultdict(float)
+    monthly = defaultdict(float)
+    quarterly = defaultdict(float)
+    by_owner = defaultdict(float)
+
+    rows = zip(
+        arrays["stage_codes"].tolist(),
+        arrays["owner_codes"].tolist(),
+        arrays["close_month"].astype("datetime64[M]").astype(np.int64).tolist(),
+        arrays["amount"].tolist(),
+        strict=True,
+    )
+    for stage_code, owner_code, month, amount in rows:
+        stage = stage_labels[stage_code]
+        if stage in CLOSED_STAGES:
+            if stage == CLOSED_WON:
+                totals["closed_won_value"] += amount
+            continue
+        weighted = amount * float(probabilities.get(stage, 0)) / 100.0
+        totals["pipeline_value"] += amount
+        totals["weighted_pipeline"] += weighted
+        monthly[month] += weighted
+        quarterly[month // 3] += weighted
+        by_owner[owner_labels[owner_code]] += weighted
+
+    return totals, monthly, quarterly, by_owner
+
+
+def best_of(runs, func, *args):
+    """Return (best seconds, last result) over several runs"""
+    best = None
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def seed_deals(tenant, count, batch_size=10_000, seed=42):
+    """Insert count synthetic deals for tenant (call inside a transaction)"""
+    from apps.accounts.models import Account
+    from apps.opportunities.models import Deal
+
+    account = Account.objects.filter(tenant=tenant).first()
+    if account is None:
+        raise SystemExit(
+            f"Tenant {tenant.schema_name} has no account to attach deals to"
+        )
+    owner_ids = list(tenant.users.values_list("id", flat=True)) or [None]
+    stages = [stage for stage, _ in Deal.STAGE_CHOICES]
+
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2024-01-01")
+    for offset in range(0, count, batch_size):
+        size = min(batch_size, count - offset)
+        stage_codes = rng.integers(0, len(stages), size).tolist()
+        owner_codes = rng.integers(0, len(owner_ids), size).tolist()
+        close_dates = (
+            start + rng.integers(0, 730, size).astype("timedelta64[D]")
+        ).tolist()
+        amounts = np.round(rng.uniform(500, 250000, size), 2).tolist()
+        Deal.objects.bulk_create(
+            [
+                Deal(
+                    tenant=tenant,
+                    deal_name=f"bench-forecast-{offset + i}",
+                    stage=stages[stage_codes[i]],
+                    amount=f"{amounts[i]:.2f}",
+                    close_date=close_dates[i],
+                    account=account,
+                    owner_id=owner_ids[owner_codes[i]],
+                )
+                for i in range(size)
+            ],
+            batch_size=batch_size,
+        )
+
+
+def per_deal_forecast(queryset, probabilities):
+    """Reference endpoint path: fetch every deal row and loop over it in Python"""
+    totals = defaultdict(float)
+    rows = (
+        queryset.order_by().values_list("stage", "amount").iterator(chunk_size=10_000)
+    )
+    for stage, amount in rows:
+        amount = float(amount)
+        if stage in CLOSED_STAGES:
+            if stage == CLOSED_WON:
+                totals["closed_won_value"] += amount
+            continue
+        totals["pipeline_value"] += amount
+        totals["weighted_pipeline"] += (
+            amount * float(probabilities.get(stage, 0)) / 100.0
+        )
+    return totals
+
+
+def bench_database(schema_name, deal_count, runs):
+    """Time the forecast endpoint's query path on seeded deals, then roll them back"""
+    from django.db import transaction
+    from django_tenants.utils import schema_context
+
+    from apps.core.models import Client
+    from apps.opportunities.forecast import (
+        build_forecast,
+        get_stage_probabilities,
+        load_pipeline_arrays,
+    )
+    from apps.opportunities.models import Deal
+
+    tenant = Client.objects.get(schema_name=schema_name)
+    with schema_context(tenant.schema_name), transaction.atomic():
+        started = time.perf_counter()
+        seed_deals(tenant, deal_count)
+        print(
+            f"Seeded              {deal_count:,} deals in {time.perf_counter() - started:.1f}s"
+        )
+
+        deals = Deal.objects.filter(tenant=tenant)
+        probabilities = get_stage_probabilities(tenant)
+        query_time, arrays = best_of(runs, load_pipeline_arrays, deals)
+        endpoint_time, forecast = best_of(runs, build_forecast, deals, tenant)
+        loop_time, totals = best_of(1, per_deal_forecast, deals, probabilities)
+
+        expected = round(totals["weighted_pipeline"], 2)
+        actual = forecast["totals"]["weighted_pipeline"]
+        if abs(expected - actual) > max(1.0, abs(expected) * 1e-9):
+            print(f"MISMATCH: per-deal={expected} grouped={actual}")
+
+        print(f"Grouped rows        {len(arrays['amount']):,} (stage, owner, month)")
+        print(f"GROUP BY query      {query_time * 1000:9.1f} ms (best of {runs})")
+        print(f"build_forecast      {endpoint_time * 1000:9.1f} ms (best of {runs})")
+        print(f"Per-deal fetch+loop {loop_time * 1000:9.1f} ms")
+        print(f"Speedup             {loop_time / endpoint_time:9.1f}x")
+        transaction.set_rollback(True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--deals", type=int, default=1_000_000)
+    parser.add_argument("--owners", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument(
+        "--tenant", help="Also time the database path for this tenant schema"
+    )
+    parser.add_argument(
+        "--db-deals", type=int, default=1_000_000, help="Deals seeded with --tenant"
+    )
+    args = parser.parse_args()
+
+    arrays = generate_deals(args.deals, args.owners)
+    probabilities = DEFAULT_STAGE_PROBABILITIES
+
+    vector_time, forecast = best_of(args.runs, compute_forecast, arrays, probabilities)
+    python_time, (totals, *_rest) = best_of(1, python_forecast, arrays, probabilities)
+
+    # Both implementations must agree on the headline number
+    expected = round(totals["weighted_pipeline"], 2)
+    actual = forecast["totals"]["weighted_pipeline"]
+    if abs(expected - actual) > max(1.0, abs(expected) * 1e-9):
+        print(f"MISMATCH: python={expected} vectorized={actual}")
+        sys.exit(1)
+
+    print(f"Deals:              {args.deals:,}")
+    print(f"Owners:             {args.owners:,}")
+    print(f"Vectorized forecast {vector_time * 1000:9.1f} ms (best of {args.runs})")
+    print(f"Python loop         {python_time * 1000:9.1f} ms")
+    print(f"Speedup             {python_time / vector_time:9.1f}x")
+    print(f"Weighted pipeline   {actual:,.2f}")
+
+    if args.tenant:
+        print()
+        bench_database(args.tenant, args.db_deals, args.runs)
+
+
+if __name__ == "__main__":
+    main()
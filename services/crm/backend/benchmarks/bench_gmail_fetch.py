@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+Benchmark serial vs concurrent Gmail message fetching on a post-outage burst
+
+Usage:
+    python benchmarks/bench_gmail_fetch.py [--messages 200] [--latency 0.15] [--workers 8]
+
+Runs against the local fake Gmail server (tests/utils/fake_gmail.py) with a
+fixed per-request latency standing in for the Gmail round trip. The serial
+run is one request at a time, like the old _safe_fetch_message loop. The
+concurrent runs go through GmailFetcher, with an unlimited quota and with
+the real per-user quota (250 units/s).
+"""
+import argparse
+import os
+import sys
+import time
+
+import django
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.dev")
+django.setup()
+
+from apps.team_inbox.services.gmail_fetch import (  # noqa: E402
+    GmailFetcher,
+    QuotaLimiter,
+)
+from tests.utils.fake_gmail import FakeGmailServer  # noqa: E402
+
+
+def run(server, start_history_id, workers, units_per_second):
+    """Time history listing plus fetching every message; returns (seconds, count)"""
+    fetcher = GmailFetcher(
+        "token",
+        "bench@example.com",
+        base_url=server.base_url,
+        max_workers=workers,
+        limiter=QuotaLimiter(units_per_second),
+    )
+    started = time.perf_counter()
+    message_ids, _ = fetcher.list_history(start_history_id)
+    count = sum(1 for _ in fetcher.iter_messages(message_ids))
+    elapsed = time.perf_counter() - started
+    fetcher.close()
+    return elapsed, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument(
+        "--latency", type=float, default=0.15, help="Seconds per fake Gmail request"
+    )
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument(
+        "--quota", type=int, default=250, help="Per-user quota units per second"
+    )
+    args = parser.parse_args()
+
+    with FakeGmailServer(latency=args.latency) as server:
+        start_history_id = server.history_id
+        server.add_messages(args.messages)
+
+        serial_time, serial_count = run(server, start_history_id, 1, 10**9)
+        concurrent_time, concurrent_count = run(
+            server, start_history_id, args.workers, 10**9
+        )
+        quota_time, quota_count = run(
+            server, start_history_id, args.workers, args.quota
+        )
+
+    if not serial_count == concurrent_count == quota_count == args.messages:
+        print(
+            f"MISMATCH: serial={serial_count} concurrent={concurrent_count} quota={quota_count}"
+        )
+        sys.exit(1)
+
+    print(f"Messages:             {args.messages:,}")
+    print(f"Request latency       {args.latency * 1000:9.1f} ms")
+    print(
+        f"Serial                {serial_time:9.2f} s  ({args.messages / serial_time:7.1f} msg/s)"
+    )
+    print(
+        f"Concurrent x{args.workers:<3}       {concurrent_time:9.2f} s  "
+        f"({args.messages / concurrent_time:7.1f} msg/s)"
+    )
+    print(
+        f"Concurrent, {args.quota} u/s   {quota_time:9.2f} s  ({args.messages / quota_time:7.1f} msg/s)"
+    )
+    print(f"Speedup (quota bound) {serial_time / quota_time:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
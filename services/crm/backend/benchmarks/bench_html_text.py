@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+"""
+Benchmark the single-pass HTML to text converter against the old BeautifulSoup pipeline
+
+Usage:
+    python benchmarks/bench_html_text.py [--corpus DIR] [--documents 200] [--repeat 3]
+
+With --corpus, every *.html / *.htm file under DIR is used. Otherwise a
+synthetic corpus of newsletter-style bodies (nested tables, inline styles,
+tracking pixels, entities) from 2KB up to ~500KB is generated.
+
+Reports total time for the old two-parse pipeline, the new converter with a
+cold cache and with a warm cache (repeat deliveries of the same newsletter),
+plus how many documents produce the same non-whitespace text in both
+(documents cut short by the size caps or timeout are counted separately).
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+import django
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.dev")
+django.setup()
+
+from apps.team_inbox.services import html_text  # noqa: E402
+
+WORDS = (
+    "update account invoice meeting offer weekly digest customer support team product "
+    'release notes pricing webinar event register today limited exclusive & < > "quoted"'
+).split()
+
+
+def legacy_html_to_text(html_body):
+    """The previous clean_gmail_html + html_to_clean_text pipeline"""
+    soup = BeautifulSoup(html_body, "html.parser")
+    for tag in soup(["style", "script", "meta", "title", "head", "noscript"]):
+        tag.decompose()
+    for img in soup.find_all("img", {"height": "1", "width": "1"}):
+        img.decompose()
+    for br in soup.find_all("br"):
+        br.replace_with("\n")
+    for block in soup.find_all(["p", "div", "tr", "td", "section"]):
+        block.append("\n")
+    text = soup.get_text(separator=" ", strip=True)
+    text = re.sub(r"\n\s*\n\s*\n+", "\n\n", text)
+    text = re.sub(r"[ \t]+", " ", text).strip()
+
+    soup = BeautifulSoup(text, "html.parser")
+    text = soup.get_text("\n").replace("\r\n", "\n").replace("\r", "\n")
+    return re.sub(r"\n{3,}", "\n\n", text).strip() + "\n"
+
+
+def _sentence(rng, count):
+    words = [rng.choice(WORDS) for _ in range(count)]
+    return " ".join(
+        w.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;") for w in words
+    )
+
+
+def newsletter(rng, target_size):
+    """One synthetic marketing email of roughly target_size characters"""
+    head = (
+        '<html><head><title>Newsletter</title><meta charset="utf-8">'
+        "<style>.btn{color:#fff;background:#06c} td{padding:4px}</style>"
+        '<script>var tracking = {"id": 1};</script></head><body>'
+    )
+    rows = []
+    size = len(head)
+    while size < target_size:
+        row = (
+            '<tr><td style="font-family:Arial;font-size:14px;color:#333">'
+            f"<h2>{_sentence(rng, 4)}</h2><p>{_sentence(rng, 30)}<br>{_sentence(rng, 12)}</p>"
+            f'<div><a href="https://example.com/{rng.randint(1, 10**6)}" class="btn">{_sentence(rng, 2)}</a>'
+            "&nbsp;&copy;&#8212;</div>"
+            f"<table><tr><td>{_sentence(rng, 5)}</td><td><span>{_sentence(rng, 5)}</span></td></tr></table>"
+            '<img src="https://t.example.com/o.gif" width="1" height="1" alt="">'
+            "</td></tr>"
+        )
+        rows.append(row)
+        size += len(row)
+    return f'{head}<table>{"".join(rows)}</table></body></html>'
+
+
+def synthetic_corpus(count, seed=7):
+    rng = random.Random(seed)
+    sizes = [2_000, 10_000, 50_000, 150_000, 500_000]
+    return [newsletter(rng, sizes[i % len(sizes)]) for i in range(count)]
+
+
+def load_corpus(path):
+    files = sorted(
+        p for p in Path(path).rglob("*") if p.suffix.lower() in (".html", ".htm")
+    )
+    return [f.read_text(encoding="utf-8", errors="replace") for f in files]
+
+
+def timed(func, documents):
+    started = time.perf_counter()
+    results = [func(doc) for doc in documents]
+    return time.perf_counter() - started, results
+
+
+def squash(text):
+    return "".join(text.split())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", help="Directory of .html files")
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Deliveries per document for the warm cache run",
+    )
+    args = parser.parse_args()
+
+    documents = (
+        load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.documents)
+    )
+    total_chars = sum(len(doc) for doc in documents)
+
+    legacy_time, legacy = timed(legacy_html_to_text, documents)
+    new_time, converted = timed(html_text.html_to_text, documents)
+    capped = sum(truncated for _, truncated in converted)
+
+    html_text._cache.clear()
+    cached_time, _ = timed(html_text.cached_html_to_text, documents * args.repeat)
+
+    same = sum(
+        squash(a) == squash(b)
+        for a, (b, truncated) in zip(legacy, converted, strict=True)
+        if not truncated
+    )
+    mb = total_chars / 1_000_000
+
+    print(
+        f"Documents:            {len(documents):,} ({mb:.1f}M chars, largest {max(map(len, documents)):,})"
+    )
+    print(
+        f"BeautifulSoup x2      {legacy_time * 1000:9.1f} ms  ({mb / legacy_time:6.1f} MB/s)"
+    )
+    print(
+        f"Single pass           {new_time * 1000:9.1f} ms  ({mb / new_time:6.1f} MB/s)"
+    )
+    print(
+        f"Single pass, cached   {cached_time * 1000:9.1f} ms  ({args.repeat} deliveries each)"
+    )
+    print(f"Speedup               {legacy_time / new_time:9.1f}x")
+    print(
+        f"Same text (ignoring whitespace): {same}/{len(documents) - capped}"
+        f" ({capped} cut short by INBOX_TEXT_MAX_CHARS / timeout)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+"""
+Benchmark compiled inbox rule matching against evaluating each rule in turn
+
+Usage:
+    python benchmarks/bench_inbox_rules.py [--rules 200] [--messages 20000] [--naive-messages 2000] [--body-kb 4]
+
+Generates --rules rules over the five condition fields (sender, domain,
+subject and body keywords, recipients; some match_all with two conditions,
+a few keyword phrases) and --messages normalized messages whose senders,
+subjects and bodies hit some of them.
+
+Reports compile time, then msgs/s for the compiled matcher
+(services/inbox_rules.py) and for a naive matcher that loops over every
+rule and runs a word-boundary regex per keyword (on the first
+--naive-messages only, it is slow), and checks both agree on which rules
+match each message. No database is needed.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+import django
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.dev")
+django.setup()
+
+from apps.team_inbox.models import InboxRule  # noqa: E402
+from apps.team_inbox.services.inbox_rules import CompiledRules  # noqa: E402
+
+WORDS = (
+    "order invoice refund shipping delivery account password reset meeting offer weekly digest customer "
+    "support team product release pricing webinar event register today limited exclusive urgent help"
+).split()
+DOMAINS = [f"company{i}.com" for i in range(500)] + [
+    "gmail.com",
+    "outlook.com",
+    "yahoo.com",
+]
+
+
+def make_rules(count, rng):
+    rules = []
+    for index in range(count):
+        kind = index % 5
+        if kind == 0:
+            conditions = [
+                {
+                    "field": "sender",
+                    "values": [f"user{rng.randrange(2000)}@{rng.choice(DOMAINS)}"],
+                }
+            ]
+        elif kind == 1:
+            conditions = [{"field": "domain", "values": rng.sample(DOMAINS, 3)}]
+        elif kind == 2:
+            phrase = " ".join(rng.sample(WORDS, 2))
+            conditions = [
+                {"field": "subject", "values": [f"{rng.choice(WORDS)}{index}", phrase]}
+            ]
+        elif kind == 3:
+            conditions = [
+                {
+                    "field": "body",
+                    "values": [f"{rng.choice(WORDS)}{index}", f"ticket{index}"],
+                }
+            ]
+        else:
+            conditions = [
+                {"field": "recipients", "values": [f"team{index}@support.example.com"]}
+            ]
+        match_all = index % 7 == 0
+        if match_all:
+            conditions.append({"field": "domain", "values": [rng.choice(DOMAINS)]})
+        rule = InboxRule(
+            name=f"rule {index}",
+            match_all=match_all,
+            conditions=conditions,
+            set_priority="high",
+        )
+        rule.tag_ids = []
+        rules.append(rule)
+    return rules
+
+
+def make_messages(count, rule_count, body_kb, rng):
+    messages = []
+    filler = [rng.choice(WORDS) for _ in range(body_kb * 1024 // 7)]
+    for index in range(count):
+        body = list(filler)
+        rng.shuffle(body)
+        body.insert(rng.randrange(len(body)), f"ticket{rng.randrange(rule_count * 2)}")
+        messages.append(
+            {
+                "message_id": f"<m{index}@bench>",
+                "subject": " ".join(
+                    rng.sample(WORDS, 4)
+                    + [f"{rng.choice(WORDS)}{rng.randrange(rule_count)}"]
+                ),
+                "from_email": {
+                    "name": "",
+                    "email": f"user{rng.randrange(2000)}@{rng.choice(DOMAINS)}",
+                },
+                "to": [
+                    {
+                        "name": "",
+                        "email": f"team{rng.randrange(rule_count)}@support.example.com",
+                    }
+                ],
+                "cc": None,
+                "content": " ".join(body),
+            }
+        )
+    return messages
+
+
+class NaiveRules:
+    """Every rule checked in turn, one regex search per keyword."""
+
+    def __init__(self, rules):
+        self.rules = []
+        for rule in rules:
+            checks = []
+            for condition in rule.conditions:
+                values = [value.lower() for value in condition["values"]]
+                if condition["field"] in ("subject", "body"):
+                    values = [
+                        re.compile(
+                            r"\b" + r"\W+".join(map(re.escape, value.split())) + r"\b",
+                            re.I,
+                        )
+                        for value in values
+                    ]
+                checks.append((condition["field"], values))
+            self.rules.append((rule, checks))
+
+    @staticmethod
+    def holds(field, values, data):
+        sender = data["from_email"]["email"].lower()
+        if field == "sender":
+            return sender in values
+        if field == "domain":
+            domain = sender.rpartition("@")[2]
+            return any(
+                domain == value or domain.endswith("." + value) for value in values
+            )
+        if field == "recipients":
+            return any(
+                entry["email"].lower() in values
+                for entry in data["to"] + (data["cc"] or [])
+            )
+        text = data["subject"] if field == "subject" else data["content"]
+        return any(pattern.search(text) for pattern in values)
+
+    def evaluate(self, data):
+        matched = []
+        for rule, checks in self.rules:
+            results = (self.holds(field, values, data) for field, values in checks)
+            if all(results) if rule.match_all else any(results):
+                matched.append(rule)
+        return matched
+
+
+def timed(matcher, messages):
+    started = time.perf_counter()
+    results = [matcher.evaluate(data) for data in messages]
+    return time.perf_counter() - started, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rules", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument(
+        "--naive-messages",
+        type=int,
+        default=2000,
+        help="Messages timed with the naive matcher",
+    )
+    parser.add_argument(
+        "--body-kb", type=int, default=4, help="Plain-text body size per message"
+    )
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rules = make_rules(args.rules, rng)
+    messages = make_messages(args.messages, args.rules, args.body_kb, rng)
+
+    started = time.perf_counter()
+    compiled = CompiledRules(rules)
+    print(
+        f"compiled {args.rules} rules in {(time.perf_counter() - started) * 1000:.1f}ms"
+    )
+
+    fast_seconds, fast = timed(compiled, messages)
+    slow_seconds, slow = timed(NaiveRules(rules), messages[: args.naive_messages])
+    matches = sum(len(outcome.rules) for outcome in fast if outcome)
+    agree = sum(
+        1
+        for outcome, expected in zip(fast, slow, strict=False)
+        if (outcome.rules if outcome else []) == expected
+    )
+
+    for label, seconds, count in (
+        ("compiled", fast_seconds, len(fast)),
+        ("naive", slow_seconds, len(slow)),
+    ):
+        print(
+            f"{label:>8}: {count} messages in {seconds:.2f}s = {count / seconds:,.0f} msgs/s"
+        )
+    print(
+        f"{matches} rule matches; compiled and naive agree on {agree}/{len(slow)} messages"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+"""
+Benchmark MBOX import throughput (streaming read + MIME parsing) on a generated archive
+
+Usage:
+    python benchmarks/bench_mail_import.py [--size-mb 2048] [--workers 8] [--attachment-kb 40]
+    python benchmarks/bench_mail_import.py --archive export.mbox --tenant acme --inbox Support
+
+Writes an MBOX of about --size-mb (tests/utils/mbox_factory.py: threads of
+four, every other message with an attachment) to a temp file, or uses
+--archive. It then times the read and parse stages of import_archive, once
+in-process and once on the process pool, reporting msgs/s, MB/s and peak
+RSS. Peak RSS stays flat as the archive grows, since at most two parse
+chunks per worker are in flight.
+
+With --tenant and --inbox the archive is also imported for real through
+import_archive (needs the database), and its report is printed.
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import django
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.dev")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+
+from apps.team_inbox.services.mail_import import (  # noqa: E402
+    format_report,
+    import_archive,
+    iter_parsed,
+)
+from apps.team_inbox.services.mbox_reader import iter_archive_messages  # noqa: E402
+from tests.utils.mbox_factory import write_mbox  # noqa: E402
+
+BLOCK = 1000  # messages generated per write_mbox call
+
+
+def generate(path, size_mb, attachment_kb):
+    """Write an archive of at least size_mb; returns (messages, bytes)"""
+    target = size_mb * 1024 * 1024
+    written = count = 0
+    with open(path, "wb") as archive:
+        while written < target:
+            half = BLOCK // 2
+            written += write_mbox(
+                archive,
+                half,
+                thread_size=4,
+                attachment_bytes=attachment_kb * 1024,
+                start=count,
+            )
+            written += write_mbox(
+                archive, half, thread_size=4, html=True, start=count + half
+            )
+            count += BLOCK
+    return count, written
+
+
+def run(path, workers):
+    """Read and parse the whole archive; returns (seconds, messages, bytes)"""
+    size = 0
+
+    def counted(raws):
+        nonlocal size
+        for raw in raws:
+            size += len(raw)
+            yield raw
+
+    started = time.perf_counter()
+    with open(path, "rb") as archive:
+        raws = counted(
+            iter_archive_messages(archive, settings.INBOX_IMPORT_MAX_MESSAGE_BYTES)
+        )
+        count = sum(
+            1
+            for result in iter_parsed(
+                raws,
+                workers,
+                settings.INBOX_IMPORT_PARSE_CHUNK,
+                settings.INBOX_BODY_ZLIB_LEVEL,
+            )
+            if result
+        )
+    return time.perf_counter() - started, count, size
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--size-mb", type=int, default=2048, help="Size of the generated archive"
+    )
+    parser.add_argument("--attachment-kb", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--archive", help="Use this MBOX/EML archive instead of generating one"
+    )
+    parser.add_argument(
+        "--skip-serial", action="store_true", help="Only time the process pool"
+    )
+    parser.add_argument("--tenant", help="Also import into this tenant schema")
+    parser.add_argument("--inbox", help="Inbox name to import into (with --tenant)")
+    args = parser.parse_args()
+
+    path = args.archive
+    if path is None:
+        handle, path = tempfile.mkstemp(suffix=".mbox")
+        os.close(handle)
+        started = time.perf_counter()
+        count, written = generate(path, args.size_mb, args.attachment_kb)
+        print(
+            f"generated {count} messages, {written / 1024 / 1024:.0f} MB in {time.perf_counter() - started:.1f}s"
+        )
+
+    try:
+        runs = (
+            [("pool", args.workers)]
+            if args.skip_serial
+            else [("serial", 1), ("pool", args.workers)]
+        )
+        for label, workers in runs:
+            seconds, count, size = run(path, workers)
+            print(
+                f"{label:>6} ({workers} workers): {count} messages in {seconds:.1f}s = "
+                f"{count / seconds:.0f} msgs/s, {size / 1024 / 1024 / seconds:.1f} MB/s, "
+                f"peak RSS {peak_rss_mb():.0f} MB"
+            )
+
+        if args.tenant and args.inbox:
+            from django_tenants.utils import schema_context
+
+            from apps.core.models import Client
+            from apps.team_inbox.models import Inbox
+
+            tenant = Client.objects.get(schema_name=args.tenant)
+            with schema_context(tenant.schema_name), open(path, "rb") as archive:
+                inbox = Inbox.objects.get(name=args.inbox)
+                report = import_archive(archive, inbox, tenant, workers=args.workers)
+            print(f"import: {format_report(report)}")
+    finally:
+        if args.archive is None:
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
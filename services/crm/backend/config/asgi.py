@@ -32,16 +32,18 @@
 import os
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
-from apps.team_inbox.routings import websocket_urlpatterns
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.base')
 
 django_asgi_app = get_asgi_application()
 
+# Imported after setup: these load models
+from apps.core.ws_auth import JWTAuthMiddleware  # noqa: E402
+from apps.team_inbox.routings import websocket_urlpatterns  # noqa: E402
+
 application = ProtocolTypeRouter({
     'http': django_asgi_app,
-    'websocket': AuthMiddlewareStack(
+    'websocket': JWTAuthMiddleware(
         URLRouter(websocket_urlpatterns)
     ),
 })
@@ -184,6 +184,112 @@ JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", SECRET_KEY)
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_EXPIRATION_MINUTES = int(os.getenv("JWT_EXPIRATION_MINUTES", "60"))
 
+# WebSocket auth (handshake cache, periodic revocation recheck)
+WS_AUTH_CACHE_SECONDS = int(os.getenv("WS_AUTH_CACHE_SECONDS", "30"))
+WS_AUTH_RECHECK_SECONDS = int(os.getenv("WS_AUTH_RECHECK_SECONDS", "60"))
+
+# Batch API Settings
+BATCH_API_MAX_REQUESTS = int(os.getenv("BATCH_API_MAX_REQUESTS", "20"))
+BATCH_API_MAX_WORKERS = int(os.getenv("BATCH_API_MAX_WORKERS", "4"))
+
+# Team Inbox ingest queue
+INBOX_INGEST_MAX_ATTEMPTS = int(os.getenv("INBOX_INGEST_MAX_ATTEMPTS", "5"))
+INBOX_INGEST_RETRY_BASE_SECONDS = int(os.getenv("INBOX_INGEST_RETRY_BASE_SECONDS", "30"))
+INBOX_INGEST_RETRY_MAX_SECONDS = int(os.getenv("INBOX_INGEST_RETRY_MAX_SECONDS", "3600"))
+INBOX_INGEST_LOCK_TIMEOUT = int(os.getenv("INBOX_INGEST_LOCK_TIMEOUT", "600"))
+INBOX_INGEST_WRITE_BATCH_SIZE = int(os.getenv("INBOX_INGEST_WRITE_BATCH_SIZE", "50"))
+INBOX_INGEST_DEBOUNCE_SECONDS = int(os.getenv("INBOX_INGEST_DEBOUNCE_SECONDS", "2"))
+
+# Mailbox backfill (existing mail imported on connect; 0 days = whole mailbox)
+INBOX_BACKFILL_ON_CONNECT = os.getenv("INBOX_BACKFILL_ON_CONNECT", "True").lower() == "true"
+INBOX_BACKFILL_ON_CONNECT_DAYS = int(os.getenv("INBOX_BACKFILL_ON_CONNECT_DAYS", "0"))
+INBOX_BACKFILL_PAGE_SIZE = int(os.getenv("INBOX_BACKFILL_PAGE_SIZE", "500"))
+INBOX_BACKFILL_PAGES_PER_RUN = int(os.getenv("INBOX_BACKFILL_PAGES_PER_RUN", "4"))
+INBOX_BACKFILL_MAX_ATTEMPTS = int(os.getenv("INBOX_BACKFILL_MAX_ATTEMPTS", "5"))
+INBOX_BACKFILL_LOCK_TIMEOUT = int(os.getenv("INBOX_BACKFILL_LOCK_TIMEOUT", "1800"))
+
+# Lazy message bodies (Inbox.lazy_bodies): hydrated on open and by hydrate_bodies
+INBOX_HYDRATE_ON_OPEN = os.getenv("INBOX_HYDRATE_ON_OPEN", "True").lower() == "true"
+INBOX_HYDRATE_BATCH_SIZE = int(os.getenv("INBOX_HYDRATE_BATCH_SIZE", "50"))
+INBOX_HYDRATE_MAX_WORKERS = int(os.getenv("INBOX_HYDRATE_MAX_WORKERS", "2"))
+
+# Inbox rules (matched at ingest; body keyword conditions look at this many characters)
+INBOX_RULES_BODY_SCAN_CHARS = int(os.getenv("INBOX_RULES_BODY_SCAN_CHARS", "20000"))
+
+# MBOX/EML imports (0 workers = one parser process per CPU)
+INBOX_IMPORT_WORKERS = int(os.getenv("INBOX_IMPORT_WORKERS", "0"))
+INBOX_IMPORT_BATCH_SIZE = int(os.getenv("INBOX_IMPORT_BATCH_SIZE", "1000"))
+INBOX_IMPORT_PARSE_CHUNK = int(os.getenv("INBOX_IMPORT_PARSE_CHUNK", "64"))
+INBOX_IMPORT_CHUNK_MAX_BYTES = int(os.getenv("INBOX_IMPORT_CHUNK_MAX_BYTES", str(16 * 1024 * 1024)))
+INBOX_IMPORT_MAX_MESSAGE_BYTES = int(os.getenv("INBOX_IMPORT_MAX_MESSAGE_BYTES", str(64 * 1024 * 1024)))
+INBOX_IMPORT_LOCK_TIMEOUT = int(os.getenv("INBOX_IMPORT_LOCK_TIMEOUT", "1800"))
+
+# Email HTML to text conversion
+INBOX_HTML_MAX_CHARS = int(os.getenv("INBOX_HTML_MAX_CHARS", str(2 * 1024 * 1024)))
+INBOX_TEXT_MAX_CHARS = int(os.getenv("INBOX_TEXT_MAX_CHARS", "200000"))
+INBOX_HTML_TIMEOUT_MS = int(os.getenv("INBOX_HTML_TIMEOUT_MS", "500"))
+INBOX_HTML_TEXT_CACHE_SIZE = int(os.getenv("INBOX_HTML_TEXT_CACHE_SIZE", "1024"))
+
+# Message body storage (zstd needs the optional zstandard package, else zlib)
+INBOX_BODY_CODEC = os.getenv("INBOX_BODY_CODEC", "zstd")
+INBOX_BODY_COMPRESS_MIN_BYTES = int(os.getenv("INBOX_BODY_COMPRESS_MIN_BYTES", "256"))
+INBOX_BODY_ZSTD_LEVEL = int(os.getenv("INBOX_BODY_ZSTD_LEVEL", "6"))
+INBOX_BODY_ZLIB_LEVEL = int(os.getenv("INBOX_BODY_ZLIB_LEVEL", "6"))
+INBOX_BODY_SEARCH_CHARS = int(os.getenv("INBOX_BODY_SEARCH_CHARS", "20000"))
+
+# Realtime inbox events (per-inbox deltas, coalesced per socket)
+INBOX_WS_COALESCE_MS = int(os.getenv("INBOX_WS_COALESCE_MS", "100"))
+INBOX_WS_MAX_EVENTS_PER_FRAME = int(os.getenv("INBOX_WS_MAX_EVENTS_PER_FRAME", "200"))
+INBOX_WS_REPLAY_MAX_EVENTS = int(os.getenv("INBOX_WS_REPLAY_MAX_EVENTS", "1000"))
+INBOX_EVENT_LOG_BACKEND = os.getenv(
+    "INBOX_EVENT_LOG_BACKEND", "apps.team_inbox.services.event_log.RedisEventLog"
+)
+INBOX_EVENT_LOG_OPTIONS = {}
+INBOX_EVENT_LOG_REDIS_URL = os.getenv("INBOX_EVENT_LOG_REDIS_URL", "redis://127.0.0.1:6379/0")
+INBOX_EVENT_LOG_MAX_EVENTS = int(os.getenv("INBOX_EVENT_LOG_MAX_EVENTS", "10000"))
+
+# Provider API clients (cached per ChannelAccount) and OAuth refresh scheduling
+PROVIDER_HTTP_POOL_SIZE = int(os.getenv("PROVIDER_HTTP_POOL_SIZE", "10"))
+PROVIDER_HTTP_TIMEOUT = int(os.getenv("PROVIDER_HTTP_TIMEOUT", "30"))
+INBOX_TOKEN_REFRESH_MARGIN_SECONDS = int(os.getenv("INBOX_TOKEN_REFRESH_MARGIN_SECONDS", "600"))
+
+# SMTP relay for outgoing mail (plain, unauthenticated SMTP works for a local sink).
+# Outgoing mail is disabled until SMTP_SERVER and SMTP_USER are set.
+SMTP_SERVER = os.getenv("SMTP_SERVER", "")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USER = os.getenv("SMTP_USER", "")
+SMTP_PASS = os.getenv("SMTP_PASS", "")
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+SMTP_TIMEOUT = int(os.getenv("SMTP_TIMEOUT", "30"))
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+SMTP_POOL_IDLE_SECONDS = int(os.getenv("SMTP_POOL_IDLE_SECONDS", "30"))
+SMTP_POOL_MAX_MESSAGES = int(os.getenv("SMTP_POOL_MAX_MESSAGES", "100"))
+
+# Outbox workers (retry backoff, per-tenant throttle)
+INBOX_OUTBOX_MAX_ATTEMPTS = int(os.getenv("INBOX_OUTBOX_MAX_ATTEMPTS", "8"))
+INBOX_OUTBOX_RETRY_BASE_SECONDS = int(os.getenv("INBOX_OUTBOX_RETRY_BASE_SECONDS", "30"))
+INBOX_OUTBOX_RETRY_MAX_SECONDS = int(os.getenv("INBOX_OUTBOX_RETRY_MAX_SECONDS", "3600"))
+INBOX_OUTBOX_LOCK_TIMEOUT = int(os.getenv("INBOX_OUTBOX_LOCK_TIMEOUT", "300"))
+INBOX_OUTBOX_TENANT_RATE_PER_MINUTE = int(os.getenv("INBOX_OUTBOX_TENANT_RATE_PER_MINUTE", "120"))
+
+# Notifications (cached unread counters, retention)
+INBOX_NOTIFICATION_COUNT_TTL = int(os.getenv("INBOX_NOTIFICATION_COUNT_TTL", "300"))
+INBOX_NOTIFICATION_READ_RETENTION_DAYS = int(os.getenv("INBOX_NOTIFICATION_READ_RETENTION_DAYS", "90"))
+INBOX_NOTIFICATION_UNREAD_RETENTION_DAYS = int(os.getenv("INBOX_NOTIFICATION_UNREAD_RETENTION_DAYS", "365"))
+
+# Attachment / raw MIME blob store (content-addressed, shared by all tenants)
+INBOX_BLOB_STORE_BACKEND = os.getenv(
+    "INBOX_BLOB_STORE_BACKEND", "apps.team_inbox.services.blob_store.FileSystemBlobStore"
+)
+INBOX_BLOB_STORE_OPTIONS = {}
+INBOX_BLOB_ROOT = os.getenv("INBOX_BLOB_ROOT", str(BASE_DIR / "blobs"))
+INBOX_ARCHIVE_RAW_MIME = os.getenv("INBOX_ARCHIVE_RAW_MIME", "True").lower() == "true"
+
+# Gmail fetching (per-user quota is 250 units/s; messages.get costs 5)
+GMAIL_API_BASE_URL = os.getenv("GMAIL_API_BASE_URL", "https://gmail.googleapis.com/gmail/v1")
+GMAIL_FETCH_MAX_WORKERS = int(os.getenv("GMAIL_FETCH_MAX_WORKERS", "8"))
+GMAIL_QUOTA_UNITS_PER_SECOND = int(os.getenv("GMAIL_QUOTA_UNITS_PER_SECOND", "250"))
+
 # Session Settings (for Django Admin)
 SESSION_COOKIE_AGE = 3600  # 1 hour (in seconds)
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
@@ -361,6 +467,15 @@ OUTLOOK_WEBHOOK_URL = os.getenv(
 
 )
 
+# Outlook sync (Graph delta queries; JSON $batch takes at most 20 requests)
+OUTLOOK_GRAPH_BASE_URL = os.getenv("OUTLOOK_GRAPH_BASE_URL", "https://graph.microsoft.com/v1.0")
+OUTLOOK_BATCH_SIZE = int(os.getenv("OUTLOOK_BATCH_SIZE", "20"))
+OUTLOOK_DELTA_PAGE_SIZE = int(os.getenv("OUTLOOK_DELTA_PAGE_SIZE", "50"))
+OUTLOOK_DELTA_MAX_PAGES = int(os.getenv("OUTLOOK_DELTA_MAX_PAGES", "10"))
+OUTLOOK_DELTA_INITIAL_DAYS = int(os.getenv("OUTLOOK_DELTA_INITIAL_DAYS", "7"))
+OUTLOOK_SUBSCRIPTION_MINUTES = int(os.getenv("OUTLOOK_SUBSCRIPTION_MINUTES", "4230"))
+OUTLOOK_SUBSCRIPTION_RENEW_MARGIN_MINUTES = int(os.getenv("OUTLOOK_SUBSCRIPTION_RENEW_MARGIN_MINUTES", "720"))
+
 
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
\ No newline at end of file
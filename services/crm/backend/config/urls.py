@@ -6,7 +6,7 @@ from django.urls import include, path
 
 from apps.core.super_admin import super_admin_site
 from apps.tenant_core.admin import tenant_admin_site
-from apps.core.views import LoginView
+from apps.core.views import BatchView, LoginView
 
 def debug_view(request):
     schema = getattr(connection, 'schema_name', 'unknown')
@@ -54,6 +54,7 @@ urlpatterns = [
     path("api/campaigns/", include("apps.campaigns.urls")),
     path("api/inbox/", include("apps.team_inbox.urls")),
     path("api/token/", LoginView.as_view(), name="token_obtain_pair"),
+    path("api/batch/", BatchView.as_view(), name="batch"),
 
     # path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),  # JWT token refresh
 ]
@@ -1,16 +1,28 @@
 """
 Tests for accounts app views and API endpoints
 """
+from datetime import date
+from decimal import Decimal
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from apps.accounts.models import Account
+from apps.opportunities.models import Deal
 from apps.tenant_core.models import Role, UserRole
-from tests.utils.factories import AccountFactory, ClientFactory, UserFactory
-from tests.utils.helpers import TenantTestMixin
+from tests.utils.factories import (
+    AccountFactory,
+    ClientFactory,
+    ContactFactory,
+    LeadFactory,
+    UserFactory,
+)
+from tests.utils.mixins import TenantTestMixin
 
 User = get_user_model()
 
@@ -220,6 +232,70 @@ class AccountViewSetTest(TenantTestMixin, TestCase):
             self.assertIn('count', data)
             self.assertEqual(data['account_id'], self.account1.account_id)
 
+    def _create_related(self, count):
+        """Create contacts, deals and leads for account1"""
+        for i in range(count):
+            ContactFactory(tenant=self.tenant1, account=self.account1)
+            LeadFactory(tenant=self.tenant1, company=self.account1, lead_owner=self.user1)
+            Deal.objects.create(
+                tenant=self.tenant1,
+                deal_name=f"Overview Deal {i}",
+                stage="Prospecting" if i % 2 else "Negotiation",
+                amount=Decimal("1000.00"),
+                close_date=date.today(),
+                account=self.account1,
+                owner=self.user1,
+            )
+
+    def test_account_overview_endpoint(self):
+        """Test account overview returns paged sections, stage totals and activity"""
+        self.client.force_authenticate(user=self.user1)
+        self._create_related(3)
+        url = reverse('account-overview', kwargs={'pk': self.account1.account_id})
+
+        with self.set_tenant(self.tenant1):
+            response = self.client.get(url, {'contacts_limit': 2, 'deals_limit': 2, 'activity_limit': 4})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+            data = response.data
+            self.assertEqual(data['account']['account_id'], self.account1.account_id)
+            self.assertEqual(len(data['contacts']['results']), 2)
+            self.assertEqual(data['contacts']['count'], 3)
+            self.assertTrue(data['contacts']['has_more'])
+            self.assertEqual(data['deals']['count'], 3)
+            self.assertEqual(len(data['leads']['results']), 3)
+            self.assertFalse(data['leads']['has_more'])
+
+            stage_totals = {row['stage']: row['deal_count'] for row in data['deal_stage_totals']}
+            self.assertEqual(stage_totals, {'Negotiation': 2, 'Prospecting': 1})
+            self.assertEqual(len(data['recent_activity']), 4)
+
+    def test_account_overview_query_count_is_constant(self):
+        """Test account overview query count does not grow with account size"""
+        self.client.force_authenticate(user=self.user1)
+        url = reverse('account-overview', kwargs={'pk': self.account1.account_id})
+
+        with self.set_tenant(self.tenant1):
+            self._create_related(1)
+            with CaptureQueriesContext(connection) as small:
+                self.client.get(url)
+
+            self._create_related(10)
+            with CaptureQueriesContext(connection) as large:
+                response = self.client.get(url)
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+
+    def test_account_overview_invalid_limit(self):
+        """Test account overview rejects invalid section limits"""
+        self.client.force_authenticate(user=self.user1)
+        url = reverse('account-overview', kwargs={'pk': self.account1.account_id})
+
+        with self.set_tenant(self.tenant1):
+            response = self.client.get(url, {'deals_limit': 0})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_account_parent_validation(self):
         """Test parent account validation across tenants"""
         self.client.force_authenticate(user=self.user1)
@@ -0,0 +1,171 @@
+"""
+Tests for contacts app views and API endpoints
+"""
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.contacts.models import Contact
+from apps.tenant_core.models import Role, UserRole
+from tests.utils.factories import AccountFactory, ContactFactory, UserFactory
+from tests.utils.mixins import TenantTestMixin
+
+User = get_user_model()
+
+
+class ContactOrgChartTest(TenantTestMixin, TestCase):
+    """Test org chart and report reassignment endpoints"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient(HTTP_HOST=self.domain.domain)
+
+        self.user1 = UserFactory(email="user1@test1.com")
+        self.user1.tenants.add(self.tenant)
+
+        with self.set_tenant(self.tenant):
+            self.manager_role = Role.objects.create(
+                name="Manager",
+                role_type="manager",
+                permissions={"manage_contacts": True},
+            )
+            UserRole.objects.create(user=self.user1, role=self.manager_role)
+
+            self.account1 = AccountFactory(tenant=self.tenant, owner=self.user1)
+
+            # ceo -> vp -> (director_a -> engineer, director_b)
+            self.ceo = ContactFactory(
+                tenant=self.tenant, account=self.account1, last_name="Ceo"
+            )
+            self.vp = ContactFactory(
+                tenant=self.tenant,
+                account=self.account1,
+                last_name="Vp",
+                reports_to=self.ceo,
+            )
+            self.director_a = ContactFactory(
+                tenant=self.tenant,
+                account=self.account1,
+                last_name="Alpha",
+                reports_to=self.vp,
+            )
+            self.director_b = ContactFactory(
+                tenant=self.tenant,
+                account=self.account1,
+                last_name="Beta",
+                reports_to=self.vp,
+            )
+            self.engineer = ContactFactory(
+                tenant=self.tenant,
+                account=self.account1,
+                last_name="Engineer",
+                reports_to=self.director_a,
+            )
+
+        self.org_chart_url = lambda pk: reverse("contact-org-chart", kwargs={"pk": pk})
+        self.reassign_url = lambda pk: reverse(
+            "contact-reassign-reports", kwargs={"pk": pk}
+        )
+
+    def test_org_chart_returns_chain_and_tree(self):
+        """Test org chart returns management chain and nested reportees"""
+        self.client.force_authenticate(user=self.user1)
+
+        with self.set_tenant(self.tenant):
+            response = self.client.get(self.org_chart_url(self.vp.contact_id))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+            chain_ids = [
+                node["contact_id"] for node in response.data["management_chain"]
+            ]
+            self.assertEqual(chain_ids, [self.ceo.contact_id])
+
+            reportees = response.data["reportees"]
+            self.assertEqual(
+                [node["contact_id"] for node in reportees],
+                [self.director_a.contact_id, self.director_b.contact_id],
+            )
+            self.assertEqual(
+                reportees[0]["reportees"][0]["contact_id"], self.engineer.contact_id
+            )
+            self.assertEqual(response.data["node_count"], 3)
+            self.assertFalse(response.data["truncated"])
+
+    def test_org_chart_depth_and_breadth_limits(self):
+        """Test org chart honours depth and breadth limits"""
+        self.client.force_authenticate(user=self.user1)
+
+        with self.set_tenant(self.tenant):
+            response = self.client.get(
+                self.org_chart_url(self.vp.contact_id), {"depth": 1, "breadth": 1}
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+            reportees = response.data["reportees"]
+            self.assertEqual(len(reportees), 1)
+            self.assertEqual(reportees[0]["reportees"], [])
+            self.assertEqual(reportees[0]["reportee_count"], 1)
+            self.assertTrue(response.data["truncated"])
+
+    def test_org_chart_invalid_params(self):
+        """Test org chart rejects non-numeric limits"""
+        self.client.force_authenticate(user=self.user1)
+
+        with self.set_tenant(self.tenant):
+            response = self.client.get(
+                self.org_chart_url(self.vp.contact_id), {"depth": "all"}
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reassign_reports_moves_subtree(self):
+        """Test reassigning reports repoints direct reports and keeps their subtree"""
+        self.client.force_authenticate(user=self.user1)
+
+        with self.set_tenant(self.tenant):
+            response = self.client.post(
+                self.reassign_url(self.vp.contact_id),
+                {"new_manager_id": self.ceo.contact_id},
+                format="json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["reassigned_count"], 2)
+
+            self.director_a.refresh_from_db()
+            self.engineer.refresh_from_db()
+            self.assertEqual(self.director_a.reports_to_id, self.ceo.contact_id)
+            self.assertEqual(self.engineer.reports_to_id, self.director_a.contact_id)
+            self.assertFalse(Contact.objects.filter(reports_to=self.vp).exists())
+
+    def test_reassign_reports_rejects_cycle(self):
+        """Test reassigning reports to a member of the subtree is rejected"""
+        self.client.force_authenticate(user=self.user1)
+
+        with self.set_tenant(self.tenant):
+            response = self.client.post(
+                self.reassign_url(self.vp.contact_id),
+                {"new_manager_id": self.engineer.contact_id},
+                format="json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+            self.director_a.refresh_from_db()
+            self.assertEqual(self.director_a.reports_to_id, self.vp.contact_id)
+
+    def test_reassign_reports_rejects_non_integer_manager(self):
+        """Test a new_manager_id that is not an integer is a bad request"""
+        self.client.force_authenticate(user=self.user1)
+
+        with self.set_tenant(self.tenant):
+            for value in ("abc", True, {"id": 1}):
+                response = self.client.post(
+                    self.reassign_url(self.vp.contact_id),
+                    {"new_manager_id": value},
+                    format="json",
+                )
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertEqual(
+                    response.data["error"], "new_manager_id must be an integer"
+                )
@@ -0,0 +1,51 @@
+"""
+Tests for kanban board cursors
+"""
+
+import base64
+import datetime
+import json
+
+from django.db.models import QuerySet
+from django.test import SimpleTestCase
+
+from apps.core import kanban
+from apps.opportunities.models import Deal
+
+
+def raw_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+
+class ColumnCursorTest(SimpleTestCase):
+    """Test column cursors are decoded and validated before they reach a query"""
+
+    def column_page(self, cursor):
+        return kanban.get_column_page(
+            QuerySet(model=Deal),
+            "stage",
+            "Negotiation",
+            ["close_date", "deal_id"],
+            ["deal_id"],
+            dict,
+            cursor=cursor,
+        )
+
+    def test_cursor_round_trip(self):
+        """Test encoded ordering values decode back to the same JSON values"""
+        cursor = kanban.encode_cursor([datetime.date(2025, 3, 1), 42])
+        self.assertEqual(kanban.decode_cursor(cursor, 2), ["2025-03-01", 42])
+
+    def test_malformed_cursors_are_rejected(self):
+        """Test undecodable cursors and values that do not fit their fields raise InvalidCursor"""
+        for cursor in (
+            "not-a-cursor",
+            raw_cursor(["2025-03-01"]),
+            raw_cursor(["not-a-date", 42]),
+            raw_cursor(["2025-03-01", {"gt": 1}]),
+            raw_cursor([["2025-03-01"], 42]),
+            raw_cursor(["2025-03-01", "abc"]),
+            raw_cursor([None, 42]),
+        ):
+            with self.subTest(cursor=cursor), self.assertRaises(kanban.InvalidCursor):
+                self.column_page(cursor)
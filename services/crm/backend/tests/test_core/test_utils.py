@@ -0,0 +1,55 @@
+"""
+Tests for core utility functions
+"""
+
+from django.test import SimpleTestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.core.utils import get_int_param, parse_int
+
+
+class GetIntParamTest(SimpleTestCase):
+    """Test integer query param parsing shared by the list and board views"""
+
+    def request(self, **params):
+        return Request(APIRequestFactory().get("/", params))
+
+    def test_default_and_cap(self):
+        """Test missing params use the default and large values are capped"""
+        self.assertEqual(get_int_param(self.request(), "limit", 20, maximum=100), 20)
+        self.assertEqual(
+            get_int_param(self.request(limit=""), "limit", 20, maximum=100), 20
+        )
+        self.assertEqual(
+            get_int_param(self.request(limit="7"), "limit", 20, maximum=100), 7
+        )
+        self.assertEqual(
+            get_int_param(self.request(limit="500"), "limit", 20, maximum=100), 100
+        )
+        self.assertEqual(
+            get_int_param(self.request(offset="500"), "offset", 0, minimum=0), 500
+        )
+
+    def test_invalid_values(self):
+        """Test non-integers and values below the minimum are rejected"""
+        with self.assertRaisesMessage(ValueError, "limit must be an integer"):
+            get_int_param(self.request(limit="all"), "limit", 20)
+        with self.assertRaisesMessage(ValueError, "limit must be at least 1"):
+            get_int_param(self.request(limit="0"), "limit", 20)
+        with self.assertRaisesMessage(ValueError, "offset cannot be negative"):
+            get_int_param(self.request(offset="-1"), "offset", 0, minimum=0)
+
+
+class ParseIntTest(SimpleTestCase):
+    """Test integer parsing of request body values"""
+
+    def test_body_values(self):
+        """Test JSON numbers and numeric strings parse and other types are rejected"""
+        self.assertEqual(parse_int(12, "new_manager_id"), 12)
+        self.assertEqual(parse_int("12", "new_manager_id"), 12)
+        for value in ("abc", True, 1.5, {"id": 1}, [1]):
+            with self.assertRaisesMessage(
+                ValueError, "new_manager_id must be an integer"
+            ):
+                parse_int(value, "new_manager_id")
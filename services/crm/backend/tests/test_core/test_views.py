@@ -4,6 +4,7 @@ Tests for core app views
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
+from django.test import override_settings
 from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
 
@@ -13,6 +14,7 @@ from tests.utils.helpers import (
     create_test_user,
     get_jwt_token,
 )
+from tests.utils.mixins import TenantTestMixin
 
 User = get_user_model()
 
@@ -324,3 +326,62 @@ class RefreshTokenViewTest(APITestCase):
         response = self.client.post(self.refresh_url, data, format='json')
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BatchViewTest(TenantTestMixin, APITestCase):
+    """Test BatchView"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient(HTTP_HOST=self.domain.domain)
+        self.batch_url = '/api/batch/'
+
+        self.user = create_test_user(email='test@example.com')
+        self.user.tenants.add(self.tenant)
+        self.client.force_authenticate(user=self.user)
+
+    def test_batch_requires_authentication(self):
+        """Test batch endpoint requires authentication"""
+        self.client.force_authenticate(user=None)
+        response = self.client.post(self.batch_url, {'requests': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_batch_returns_per_item_status(self):
+        """Test each sub-request gets its own status code and body"""
+        data = {
+            'requests': [
+                {'id': 'profile', 'method': 'GET', 'path': '/api/auth/profile/'},
+                {'id': 'missing', 'method': 'GET', 'path': '/api/does-not-exist/'},
+            ]
+        }
+
+        with self.set_tenant(self.tenant):
+            response = self.client.post(self.batch_url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+
+        profile, missing = response.data['responses']
+        self.assertEqual(profile['id'], 'profile')
+        self.assertEqual(profile['status'], status.HTTP_200_OK)
+        self.assertEqual(profile['body']['email'], 'test@example.com')
+        self.assertEqual(missing['status'], status.HTTP_404_NOT_FOUND)
+
+    @override_settings(BATCH_API_MAX_REQUESTS=2)
+    def test_batch_size_limit(self):
+        """Test batches over the configured size are rejected"""
+        data = {'requests': [{'path': '/api/auth/profile/'}] * 3}
+
+        with self.set_tenant(self.tenant):
+            response = self.client.post(self.batch_url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_rejects_nested_batches(self):
+        """Test a batch cannot call the batch endpoint"""
+        data = {'requests': [{'method': 'POST', 'path': '/api/batch/'}]}
+
+        with self.set_tenant(self.tenant):
+            response = self.client.post(self.batch_url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,154 @@
+"""
+Tests for WebSocket handshake authentication
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from apps.core.authentication import JWTTokenGenerator
+from apps.core.ws_auth import (
+    JWTAuthMiddleware,
+    WebSocketIdentity,
+    _cache,
+    authenticate_handshake,
+    get_identity,
+    handshake_host,
+    handshake_token,
+    recheck_identity,
+)
+from apps.team_inbox.consumers import InboxConsumer
+from tests.utils.helpers import create_test_tenant, create_test_user
+
+IN_MEMORY_LAYER = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+
+class HandshakeAuthTest(TestCase):
+    """Test token and tenant validation for WebSocket handshakes"""
+
+    def setUp(self):
+        _cache.clear()
+        self.tenant = create_test_tenant()
+        self.user = create_test_user()
+        self.user.tenants.add(self.tenant)
+        self.host = f"{self.tenant.schema_name}.localhost"
+        self.access_token = JWTTokenGenerator.generate_tokens(
+            self.user, self.tenant.schema_name
+        )["access_token"]
+
+    def test_valid_token_for_host_tenant(self):
+        """Test a member's access token authenticates against its tenant's host"""
+        identity = authenticate_handshake(self.host, self.access_token)
+
+        self.assertEqual(identity.user.id, self.user.id)
+        self.assertEqual(identity.tenant.id, self.tenant.id)
+        self.assertGreater(identity.seconds_left(), 0)
+
+    def test_token_for_another_tenant_is_rejected(self):
+        """Test the tenant comes from the host, not the token"""
+        other = create_test_tenant(schema_name="other_tenant", name="Other")
+        self.user.tenants.add(other)
+
+        self.assertIsNone(
+            authenticate_handshake("other_tenant.localhost", self.access_token)
+        )
+
+    def test_refresh_token_and_unknown_host_are_rejected(self):
+        """Test only access tokens on known tenant hosts are accepted"""
+        tokens = JWTTokenGenerator.generate_tokens(self.user, self.tenant.schema_name)
+
+        self.assertIsNone(authenticate_handshake(self.host, tokens["refresh_token"]))
+        self.assertIsNone(
+            authenticate_handshake("unknown.localhost", self.access_token)
+        )
+        self.assertIsNone(authenticate_handshake(self.host, "not-a-token"))
+
+    def test_inactive_tenant_is_rejected(self):
+        """Test sockets can't open on a deactivated tenant"""
+        self.tenant.is_active = False
+        self.tenant.save()
+
+        self.assertIsNone(authenticate_handshake(self.host, self.access_token))
+
+    def test_identity_is_cached_between_handshakes(self):
+        """Test a reconnect with the same token skips the database"""
+        first = async_to_sync(get_identity)(self.host, self.access_token)
+        with self.assertNumQueries(0):
+            second = async_to_sync(get_identity)(self.host, self.access_token)
+
+        self.assertIs(first, second)
+
+    def test_recheck_sees_revocation(self):
+        """Test the periodic recheck catches a disabled user"""
+        identity = authenticate_handshake(self.host, self.access_token)
+        self.assertTrue(async_to_sync(recheck_identity)(identity))
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertFalse(async_to_sync(recheck_identity)(identity))
+
+
+class HandshakeScopeTest(SimpleTestCase):
+    """Test how the handshake is read from the ASGI scope"""
+
+    def test_host_and_token(self):
+        """Test the port is dropped and the query token wins over the header"""
+        scope = {
+            "headers": [
+                (b"host", b"acme.localhost:8000"),
+                (b"authorization", b"Bearer header-token"),
+            ],
+            "query_string": b"token=query-token&resume_from=3",
+        }
+        self.assertEqual(handshake_host(scope), "acme.localhost")
+        self.assertEqual(handshake_token(scope), "query-token")
+
+        scope["query_string"] = b""
+        self.assertEqual(handshake_token(scope), "header-token")
+
+    @override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER)
+    def test_consumer_rejects_anonymous_sockets(self):
+        """Test a handshake without a valid token is closed with 4401"""
+
+        async def scenario():
+            communicator = WebsocketCommunicator(
+                JWTAuthMiddleware(InboxConsumer.as_asgi()), "/ws/inbox/"
+            )
+            await communicator.connect()
+            output = await communicator.receive_output()
+            self.assertEqual(output, {"type": "websocket.close", "code": 4401})
+
+        async_to_sync(scenario)()
+
+    @override_settings(
+        CHANNEL_LAYERS=IN_MEMORY_LAYER,
+        WS_AUTH_RECHECK_SECONDS=0,
+        INBOX_EVENT_LOG_BACKEND="apps.team_inbox.services.event_log.MemoryEventLog",
+    )
+    @patch("apps.team_inbox.consumers.load_inbox_ids", AsyncMock(return_value=set()))
+    @patch("apps.team_inbox.consumers.recheck_identity", AsyncMock(return_value=False))
+    def test_consumer_closes_revoked_sockets(self):
+        """Test a failed recheck closes the socket with 4403"""
+        identity = WebSocketIdentity(
+            SimpleNamespace(id=1), SimpleNamespace(id=40, schema_name="t")
+        )
+
+        async def app(scope, receive, send):
+            return await InboxConsumer.as_asgi()(
+                dict(scope, identity=identity), receive, send
+            )
+
+        async def scenario():
+            communicator = WebsocketCommunicator(app, "/ws/inbox/")
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            output = await communicator.receive_output()
+            while output["type"] == "websocket.send":  # system acknowledgment
+                output = await communicator.receive_output()
+            self.assertEqual(output, {"type": "websocket.close", "code": 4403})
+
+        async_to_sync(scenario)()
@@ -0,0 +1,57 @@
+"""
+Tests for weighted pipeline forecasting
+"""
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from apps.opportunities.forecast import (
+    CLOSED_STAGES,
+    DEFAULT_STAGE_PROBABILITIES,
+    compute_forecast,
+)
+from apps.opportunities.models import Deal
+
+
+def deal_arrays(stages, amount=1000.0):
+    """One deal per stage, all owned by one user and closing in one month"""
+    return {
+        "stage_codes": np.arange(len(stages)),
+        "stage_labels": list(stages),
+        "owner_codes": np.zeros(len(stages), dtype=np.int64),
+        "owner_labels": ["owner"],
+        "close_month": np.full(len(stages), "2025-06", dtype="datetime64[M]"),
+        "amount": np.full(len(stages), amount),
+    }
+
+
+class DefaultStageProbabilitiesTest(SimpleTestCase):
+    """Test the default probabilities match the stages deals are stored with"""
+
+    def test_defaults_cover_deal_stages(self):
+        """Test the defaults are keyed by exactly the Deal.STAGE_CHOICES values"""
+        self.assertEqual(
+            list(DEFAULT_STAGE_PROBABILITIES),
+            [stage for stage, _ in Deal.STAGE_CHOICES],
+        )
+
+    def test_need_analysis_deal_is_weighted(self):
+        """Test a Need Analysis deal counts towards the pipeline without overrides"""
+        forecast = compute_forecast(
+            deal_arrays(["Need Analysis"]), DEFAULT_STAGE_PROBABILITIES
+        )
+
+        self.assertEqual(forecast["totals"]["weighted_pipeline"], 300.0)
+        self.assertEqual(forecast["by_stage"][0]["weighted_amount"], 300.0)
+
+    def test_every_open_stage_is_weighted(self):
+        """Test no open form stage falls back to a 0% probability"""
+        open_stages = [
+            stage for stage, _ in Deal.STAGE_CHOICES if stage not in CLOSED_STAGES
+        ]
+        forecast = compute_forecast(
+            deal_arrays(open_stages), DEFAULT_STAGE_PROBABILITIES
+        )
+
+        for row in forecast["by_stage"]:
+            self.assertGreater(row["weighted_amount"], 0, row["stage"])
@@ -13,7 +13,7 @@ from rest_framework.test import APIClient
 from apps.opportunities.models import Deal
 from apps.tenant_core.models import Role, UserRole
 from tests.utils.factories import AccountFactory, ClientFactory, UserFactory
-from tests.utils.helpers import TenantTestMixin
+from tests.utils.mixins import TenantTestMixin
 
 User = get_user_model()
 
@@ -403,3 +403,145 @@ class DealViewSetTest(TenantTestMixin, TestCase):
 
             # Should eventually hit rate limit
             self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_deal_forecast_endpoint(self):
+        """Test weighted pipeline forecast endpoint"""
+        self.client.force_authenticate(user=self.user1)
+
+        Deal.objects.create(
+            tenant=self.tenant1,
+            deal_name="Won Deal",
+            stage="Closed Won",
+            amount=Decimal("5000.00"),
+            close_date=date.today(),
+            account=self.account1,
+            owner=self.user1,
+            created_by=self.user1,
+            updated_by=self.user1
+        )
+
+        with self.set_tenant(self.tenant1):
+            response = self.client.get(self.list_url + 'forecast/')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+            totals = response.data['totals']
+            self.assertEqual(totals['deal_count'], 2)
+            self.assertEqual(totals['open_deal_count'], 1)
+            self.assertEqual(totals['pipeline_value'], 10000.00)
+            # Prospecting defaults to a 10% win probability
+            self.assertEqual(totals['weighted_pipeline'], 1000.00)
+            self.assertEqual(totals['closed_won_value'], 5000.00)
+
+            self.assertIn('monthly', response.data)
+            self.assertIn('quarterly', response.data)
+            self.assertEqual(response.data['by_owner'][0]['owner_id'], self.user1.id)
+
+    def test_deal_forecast_invalid_date(self):
+        """Test forecast rejects malformed date filters"""
+        self.client.force_authenticate(user=self.user1)
+
+        with self.set_tenant(self.tenant1):
+            response = self.client.get(self.list_url + 'forecast/', {'date_from': '01/01/2024'})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_deal_forecast_invalid_owner(self):
+        """Test forecast rejects an owner filter that is not a user id"""
+        self.client.force_authenticate(user=self.user1)
+
+        with self.set_tenant(self.tenant1):
+            response = self.client.get(self.list_url + 'forecast/', {'owner': 'abc'})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+            response = self.client.get(self.list_url + 'forecast/', {'owner': str(self.user1.id)})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['totals']['deal_count'], 1)
+
+    def test_deal_stage_probabilities_require_manager(self):
+        """Test only managers and admins may update stage probabilities"""
+        sales_user = UserFactory(email="sales@test1.com")
+        sales_user.tenants.add(self.tenant1)
+        sales_role = Role.objects.create(
+            name="Sales Rep",
+            role_type="sales",
+            permissions={"manage_opportunities": True}
+        )
+        UserRole.objects.create(user=sales_user, role=sales_role)
+        self.client.force_authenticate(user=sales_user)
+
+        with self.set_tenant(self.tenant1):
+            response = self.client.get(self.list_url + 'stage_probabilities/')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+            response = self.client.put(
+                self.list_url + 'stage_probabilities/',
+                {'probabilities': {'Prospecting': 90}},
+                format='json'
+            )
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_deal_stage_probabilities_update(self):
+        """Test per-tenant stage probabilities feed the forecast"""
+        self.client.force_authenticate(user=self.user1)
+
+        with self.set_tenant(self.tenant1):
+            response = self.client.put(
+                self.list_url + 'stage_probabilities/',
+                {'probabilities': {'Prospecting': 25}},
+                format='json'
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['stage_probabilities']['Prospecting'], 25.0)
+
+            response = self.client.get(self.list_url + 'forecast/')
+            self.assertEqual(response.data['totals']['weighted_pipeline'], 2500.00)
+
+            response = self.client.put(
+                self.list_url + 'stage_probabilities/',
+                {'probabilities': {'Prospecting': 150}},
+                format='json'
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_deal_board_endpoint(self):
+        """Test board returns top cards per stage with column totals"""
+        self.client.force_authenticate(user=self.user1)
+
+        for i in range(3):
+            Deal.objects.create(
+                tenant=self.tenant1,
+                deal_name=f"Negotiation Deal {i}",
+                stage="Negotiation",
+                amount=Decimal("1000.00"),
+                close_date=date.today() + timedelta(days=i),
+                account=self.account1,
+                owner=self.user1,
+            )
+
+        with self.set_tenant(self.tenant1):
+            response = self.client.get(self.list_url + 'board/', {'limit': 2})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['total_deals'], 4)
+
+            columns = {column['value']: column for column in response.data['columns']}
+            negotiation = columns['Negotiation']
+            self.assertEqual(negotiation['total'], 3)
+            self.assertEqual(negotiation['sum'], '3000.00')
+            self.assertEqual(len(negotiation['cards']), 2)
+            self.assertTrue(negotiation['has_more'])
+            self.assertFalse(columns['Prospecting']['has_more'])
+
+            # Load the rest of one column with its cursor
+            response = self.client.get(self.list_url + 'board/', {
+                'column': 'Negotiation', 'cursor': negotiation['next_cursor'], 'limit': 2
+            })
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual([card['deal_name'] for card in response.data['cards']], ['Negotiation Deal 2'])
+            self.assertFalse(response.data['has_more'])
+
+    def test_deal_board_invalid_cursor(self):
+        """Test board rejects malformed column cursors"""
+        self.client.force_authenticate(user=self.user1)
+
+        with self.set_tenant(self.tenant1):
+            response = self.client.get(self.list_url + 'board/', {'column': 'Negotiation', 'cursor': 'not-a-cursor'})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1 @@
+# Team inbox app tests
@@ -0,0 +1,182 @@
+"""
+Tests for the resumable mailbox backfill
+"""
+
+from datetime import date
+from unittest.mock import patch
+
+from django.test import override_settings
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.team_inbox.models import ChannelAccount, Inbox, MailboxBackfill, Message
+from apps.team_inbox.services.backfill import (
+    claim_next_backfill,
+    pause_backfill,
+    process_backfills,
+    resume_backfill,
+    run_backfill,
+    start_backfill,
+)
+from tests.utils.fake_gmail import FakeGmailServer
+from tests.utils.fake_graph import FakeGraphServer
+from tests.utils.helpers import create_test_user
+
+
+@override_settings(
+    INBOX_BACKFILL_PAGE_SIZE=10,
+    INBOX_BACKFILL_PAGES_PER_RUN=2,
+    INBOX_ARCHIVE_RAW_MIME=False,
+)
+class BackfillTest(TenantTestCase):
+    """Test paging, checkpoints, pause/resume and retries"""
+
+    def setUp(self):
+        super().setUp()
+        self.gmail = FakeGmailServer().start()
+        self.addCleanup(self.gmail.stop)
+        override = override_settings(GMAIL_API_BASE_URL=self.gmail.base_url)
+        override.enable()
+        self.addCleanup(override.disable)
+        patcher = patch("apps.team_inbox.services.backfill.publish_inbox_events")
+        self.publish = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.inbox = Inbox.objects.create(name="Support")
+        self.account = ChannelAccount.objects.create(
+            identifier="support@example.com",
+            provider="gmail",
+            access_token="token",
+            inbox=self.inbox,
+        )
+
+    def test_backfill_runs_in_checkpointed_units(self):
+        """Test each work unit imports a bounded number of pages and saves the page token"""
+        self.gmail.add_messages(25)
+        backfill, created = start_backfill(self.account)
+        self.assertTrue(created)
+
+        self.assertEqual(process_backfills(self.tenant, limit=1), (1, 0))
+        backfill.refresh_from_db()
+        self.assertEqual(backfill.status, MailboxBackfill.STATUS_PENDING)
+        self.assertEqual(
+            (backfill.pages, backfill.messages_stored, backfill.page_token),
+            (2, 20, "20"),
+        )
+        self.assertEqual(backfill.estimated_total, 25)
+
+        self.assertEqual(process_backfills(self.tenant), (1, 0))
+        backfill.refresh_from_db()
+        self.assertEqual(backfill.status, MailboxBackfill.STATUS_DONE)
+        self.assertEqual(backfill.messages_stored, 25)
+        self.assertEqual(Message.objects.count(), 25)
+        (event,) = self.publish.call_args.args[1]
+        self.assertEqual(
+            (event["event"], event["status"]), ("backfill.progress", "done")
+        )
+
+    def test_one_active_backfill_per_mailbox(self):
+        """Test starting again returns the unfinished backfill"""
+        first, _ = start_backfill(self.account)
+        again, created = start_backfill(self.account)
+
+        self.assertFalse(created)
+        self.assertEqual(again.id, first.id)
+
+    def test_pause_and_resume(self):
+        """Test a paused backfill is skipped by workers and resumes from its checkpoint"""
+        self.gmail.add_messages(25)
+        backfill, _ = start_backfill(self.account)
+        process_backfills(self.tenant, limit=1)
+
+        self.assertTrue(pause_backfill(backfill))
+        self.assertEqual(process_backfills(self.tenant), (0, 0))
+
+        self.assertTrue(resume_backfill(backfill))
+        self.assertEqual(backfill.page_token, "20")
+        process_backfills(self.tenant)
+        backfill.refresh_from_db()
+        self.assertEqual(backfill.status, MailboxBackfill.STATUS_DONE)
+        self.assertEqual(Message.objects.count(), 25)
+
+    def test_pause_is_seen_between_pages(self):
+        """Test a worker stops a backfill paused while it was claimed"""
+        self.gmail.add_messages(5)
+        backfill, _ = start_backfill(self.account)
+        claimed = claim_next_backfill()
+        pause_backfill(backfill)
+
+        self.assertEqual(run_backfill(claimed, self.tenant), 0)
+        backfill.refresh_from_db()
+        self.assertEqual(
+            (backfill.status, backfill.pages), (MailboxBackfill.STATUS_PAUSED, 0)
+        )
+
+    def test_failed_page_is_retried_from_checkpoint(self):
+        """Test a page whose fetches fail is retried later without moving the checkpoint"""
+        ids = [m["id"] for m in self.gmail.add_messages(5)]
+        self.gmail.fail_with(ids[0], status=503, times=10)
+        backfill, _ = start_backfill(self.account)
+
+        self.assertEqual(process_backfills(self.tenant), (0, 1))
+
+        backfill.refresh_from_db()
+        self.assertEqual(backfill.status, MailboxBackfill.STATUS_PENDING)
+        self.assertGreater(backfill.available_at, timezone.now())
+        self.assertIsNone(backfill.page_token)
+        self.assertIn("could not be fetched", backfill.last_error)
+
+    def test_date_window_query(self):
+        """Test after/before become a Gmail search query"""
+        start_backfill(self.account, after=date(2021, 1, 1), before=date(2022, 1, 1))
+        process_backfills(self.tenant)
+
+        listing = next(path for path in self.gmail.requests if "/messages?" in path)
+        self.assertIn("q=after%3A2021%2F01%2F01+before%3A2022%2F01%2F01", listing)
+
+    def test_outlook_backfill(self):
+        """Test Outlook mailboxes page through the Inbox listing and fetch with $batch"""
+        graph = FakeGraphServer().start()
+        self.addCleanup(graph.stop)
+        graph.add_messages(25)
+        account = ChannelAccount.objects.create(
+            identifier="sales@example.com",
+            provider="outlook",
+            access_token="token",
+            inbox=self.inbox,
+        )
+
+        with self.settings(OUTLOOK_GRAPH_BASE_URL=graph.base_url):
+            backfill, _ = start_backfill(account)
+            process_backfills(self.tenant)
+            process_backfills(self.tenant)
+
+        backfill.refresh_from_db()
+        self.assertEqual(
+            (backfill.status, backfill.messages_stored),
+            (MailboxBackfill.STATUS_DONE, 25),
+        )
+        self.assertLessEqual(max(graph.batch_sizes), 20)
+
+    def test_backfill_endpoints(self):
+        """Test starting, reading progress and pausing through the API"""
+        client = APIClient(HTTP_HOST=self.domain.domain)
+        client.force_authenticate(user=create_test_user(email="agent@example.com"))
+        url = f"/api/inbox/channel-account/{self.account.id}/backfill/"
+
+        response = client.post(url, {"after": "2024-01-01"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["after"], "2024-01-01")
+
+        response = client.get(url)
+        self.assertEqual(
+            (response.data["status"], response.data["messagesStored"]), ("pending", 0)
+        )
+
+        self.assertEqual(client.post(f"{url}pause/").status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            client.post(f"{url}pause/").status_code, status.HTTP_409_CONFLICT
+        )
+        self.assertEqual(client.post(f"{url}resume/").data["status"], "pending")
@@ -0,0 +1,180 @@
+"""
+Tests for the content-addressed blob store, MIME archiving and downloads
+"""
+
+import hashlib
+import io
+import shutil
+import tempfile
+from datetime import UTC, datetime
+from email.message import EmailMessage
+
+from django.test import SimpleTestCase, override_settings
+from django_tenants.test.cases import TenantTestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.team_inbox.models import Attachment, Conversation, Inbox, Message
+from apps.team_inbox.services.blob_store import BlobStore, FileSystemBlobStore
+from apps.team_inbox.services.mime_archive import archive_message, iter_attachment_parts
+from apps.team_inbox.views.attachments import parse_range
+from tests.utils.helpers import create_test_user
+
+PDF = b"%PDF-1.4 " + bytes(range(256)) * 40
+
+
+def make_mime(message_id, attachment=PDF):
+    mime = EmailMessage()
+    mime["From"] = "customer@example.com"
+    mime["To"] = "support@example.com"
+    mime["Subject"] = "Invoice"
+    mime["Message-ID"] = message_id
+    mime.set_content("Please find the invoice attached.")
+    mime.add_attachment(
+        attachment, maintype="application", subtype="pdf", filename="invoice.pdf"
+    )
+    return mime.as_bytes()
+
+
+class FileSystemBlobStoreTest(SimpleTestCase):
+    """Test blob writes, dedup and ranged reads"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.store = FileSystemBlobStore(self.root)
+
+    def test_put_is_content_addressed_and_deduplicated(self):
+        """Test identical content is stored once under its SHA-256"""
+        first = self.store.put(PDF)
+        second = self.store.put(io.BytesIO(PDF))
+
+        self.assertEqual(first.digest, hashlib.sha256(PDF).hexdigest())
+        self.assertEqual(second.digest, first.digest)
+        self.assertTrue(first.created)
+        self.assertFalse(second.created)
+        self.assertEqual(self.store.size(first.digest), len(PDF))
+        self.assertEqual(list((self.store.root / "tmp").iterdir()), [])
+
+    def test_put_streams_chunks(self):
+        """Test an iterable of chunks hashes the same as the joined bytes"""
+        blob = self.store.put(iter([PDF[:100], PDF[100:5000], PDF[5000:]]))
+        self.assertEqual(blob.digest, hashlib.sha256(PDF).hexdigest())
+
+    def test_iter_range(self):
+        """Test ranged reads return exactly the requested bytes"""
+        digest = self.store.put(PDF).digest
+        self.assertEqual(
+            b"".join(self.store.iter_range(digest, 10, 19, chunk_size=3)), PDF[10:20]
+        )
+
+    def test_rejects_non_digest_keys(self):
+        """Test keys that are not hex SHA-256 never reach the filesystem"""
+        with self.assertRaises(ValueError):
+            self.store.open("../../etc/passwd")
+
+    def test_incomplete_backend_fails_at_construction(self):
+        """Test a backend missing part of the interface cannot be built"""
+
+        class ReadOnlyStore(BlobStore):
+            def open(self, digest):
+                return io.BytesIO()
+
+        with self.assertRaises(TypeError):
+            ReadOnlyStore()
+
+    def test_parse_range(self):
+        """Test Range header forms"""
+        self.assertIsNone(parse_range(None, 100))
+        self.assertIsNone(parse_range("bytes=0-1,5-6", 100))
+        self.assertEqual(parse_range("bytes=10-19", 100), (10, 19))
+        self.assertEqual(parse_range("bytes=90-", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=-5", 100), (95, 99))
+        self.assertEqual(parse_range("bytes=50-500", 100), (50, 99))
+        with self.assertRaises(ValueError):
+            parse_range("bytes=100-", 100)
+
+    def test_attachment_parts(self):
+        """Test attachments are pulled out of the MIME tree, bodies are not"""
+        parts = list(iter_attachment_parts(make_mime("<1@x>")))
+        self.assertEqual(parts, [("invoice.pdf", "application/pdf", PDF)])
+
+
+class MimeArchiveTest(TenantTestCase):
+    """Test archiving messages and serving their blobs"""
+
+    def setUp(self):
+        super().setUp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        settings_override = override_settings(INBOX_BLOB_STORE_OPTIONS={"root": root})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.inbox = Inbox.objects.create(name="Support")
+        self.conversation = Conversation.objects.create(
+            thread_id="thread-1",
+            subject="Invoice",
+            last_activity=datetime(2025, 1, 1, tzinfo=UTC),
+        )
+        self.client = APIClient(HTTP_HOST=self.domain.domain)
+        self.client.force_authenticate(user=create_test_user(email="agent@example.com"))
+
+    def make_message(self, message_id):
+        return Message.objects.create(
+            conversation=self.conversation,
+            inbox=self.inbox,
+            message_id=message_id,
+            subject="Invoice",
+            from_email={"email": "customer@example.com"},
+            to=[],
+            content="Please find the invoice attached.",
+            timestamp=datetime(2025, 1, 1, tzinfo=UTC),
+        )
+
+    def test_archive_dedups_attachments_across_messages(self):
+        """Test the same attachment on two messages is one blob"""
+        first, second = self.make_message("<1@x>"), self.make_message("<2@x>")
+        archive_message(first, make_mime("<1@x>"))
+        archive_message(second, make_mime("<2@x>"))
+        archive_message(second, make_mime("<2@x>"))  # repeat is a no-op
+
+        attachments = Attachment.objects.all()
+        self.assertEqual(attachments.count(), 2)
+        self.assertEqual(
+            {a.sha256 for a in attachments}, {hashlib.sha256(PDF).hexdigest()}
+        )
+        self.assertEqual(second.attachments.count(), 1)
+
+    def test_download_supports_range(self):
+        """Test full, partial and unsatisfiable downloads"""
+        message = self.make_message("<1@x>")
+        attachment = archive_message(message, make_mime("<1@x>"))[0]
+        url = f"/api/inbox/attachments/{attachment.pk}/download/"
+
+        full = self.client.get(url)
+        self.assertEqual(full.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(full.streaming_content), PDF)
+        self.assertEqual(full["Accept-Ranges"], "bytes")
+
+        partial = self.client.get(url, HTTP_RANGE="bytes=100-199")
+        self.assertEqual(partial.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(partial["Content-Range"], f"bytes 100-199/{len(PDF)}")
+        self.assertEqual(b"".join(partial.streaming_content), PDF[100:200])
+
+        too_far = self.client.get(url, HTTP_RANGE=f"bytes={len(PDF)}-")
+        self.assertEqual(
+            too_far.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+
+    def test_raw_message_round_trips(self):
+        """Test the archived MIME is returned byte for byte"""
+        message = self.make_message("<1@x>")
+        raw = make_mime("<1@x>")
+        archive_message(message, raw)
+
+        response = self.client.get(f"/api/inbox/messages/{message.pk}/raw/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "message/rfc822")
+        self.assertEqual(b"".join(response.streaming_content), raw)
@@ -0,0 +1,141 @@
+"""
+Tests for two-phase ingest: metadata first, bodies hydrated lazily
+"""
+
+from unittest.mock import patch
+
+from django.test import override_settings
+from django_tenants.test.cases import TenantTestCase
+from rest_framework.test import APIClient
+
+from apps.team_inbox.models import ChannelAccount, Inbox, Message
+from apps.team_inbox.services.body_hydration import hydrate_pending
+from apps.team_inbox.services.gmail_ingest import sync_gmail_mailbox
+from apps.team_inbox.services.outlook_sync import sync_outlook_mailbox
+from tests.utils.fake_gmail import FakeGmailServer, make_gmail_message
+from tests.utils.fake_graph import FakeGraphServer, make_graph_message
+from tests.utils.helpers import create_test_user
+
+LONG_BODY = "Please refund order 42. " * 20
+
+
+@patch("apps.team_inbox.services.message_writer.publish_message_events")
+@override_settings(INBOX_ARCHIVE_RAW_MIME=False, INBOX_INGEST_DEBOUNCE_SECONDS=0)
+class BodyHydrationTest(TenantTestCase):
+    """Test lazy inboxes store metadata only and fill bodies in on open or in the background"""
+
+    def setUp(self):
+        super().setUp()
+        self.gmail = FakeGmailServer().start()
+        self.addCleanup(self.gmail.stop)
+        self.graph = FakeGraphServer().start()
+        self.addCleanup(self.graph.stop)
+        override = override_settings(
+            GMAIL_API_BASE_URL=self.gmail.base_url,
+            OUTLOOK_GRAPH_BASE_URL=self.graph.base_url,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.inbox = Inbox.objects.create(name="Support", lazy_bodies=True)
+        self.account = ChannelAccount.objects.create(
+            identifier="support@example.com",
+            provider="gmail",
+            access_token="token",
+            inbox=self.inbox,
+        )
+
+    def sync_gmail(self, *messages):
+        start = self.gmail.history_id
+        for message in messages:
+            self.gmail.add_message(message)
+        return sync_gmail_mailbox(self.account, self.tenant, start)
+
+    def test_lazy_gmail_ingest_stores_snippet_only(self, broadcast):
+        """Test a lazy inbox fetches format=metadata and keeps the snippet as the body for now"""
+        self.assertEqual(self.sync_gmail(make_gmail_message("g1", body=LONG_BODY)), 1)
+
+        message = Message.objects.get()
+        self.assertTrue(message.body_pending)
+        self.assertEqual(message.provider_message_id, "g1")
+        self.assertEqual(message.channel_account_id, self.account.id)
+        self.assertEqual(message.content, LONG_BODY[:100])
+        self.assertTrue(any("format=metadata" in path for path in self.gmail.requests))
+        self.assertFalse(any("format=full" in path for path in self.gmail.requests))
+
+    def test_background_hydration_fills_bodies(self, broadcast):
+        """Test hydrate_pending fetches the raw MIME and clears body_pending"""
+        self.sync_gmail(
+            make_gmail_message("g1", body=LONG_BODY), make_gmail_message("g2")
+        )
+
+        self.assertEqual(hydrate_pending(limit=10), (2, 0))
+
+        message = Message.objects.get(provider_message_id="g1")
+        self.assertFalse(message.body_pending)
+        self.assertEqual(message.content.strip(), LONG_BODY.strip())
+        self.assertIn("Please refund order 42. " * 10, message.html_content)
+        self.assertEqual(hydrate_pending(limit=10), (0, 0))
+
+    def test_message_is_hydrated_on_open(self, broadcast):
+        """Test opening a pending message returns its full body"""
+        self.sync_gmail(make_gmail_message("g1", body=LONG_BODY))
+        message = Message.objects.get()
+        client = APIClient(HTTP_HOST=self.domain.domain)
+        client.force_authenticate(user=create_test_user(email="agent@example.com"))
+
+        response = client.get(f"/api/inbox/messages/{message.id}/")
+
+        self.assertFalse(response.data["bodyPending"])
+        self.assertIn("Please refund order 42.", response.data["content"])
+        self.assertGreater(len(response.data["content"]), 100)
+        message.refresh_from_db()
+        self.assertFalse(message.body_pending)
+
+    @override_settings(INBOX_HYDRATE_ON_OPEN=False)
+    def test_on_open_hydration_can_be_disabled(self, broadcast):
+        """Test with INBOX_HYDRATE_ON_OPEN off the message is served from its snippet"""
+        self.sync_gmail(make_gmail_message("g1", body=LONG_BODY))
+        client = APIClient(HTTP_HOST=self.domain.domain)
+        client.force_authenticate(user=create_test_user(email="agent@example.com"))
+
+        response = client.get(f"/api/inbox/messages/{Message.objects.get().id}/")
+
+        self.assertTrue(response.data["bodyPending"])
+
+    def test_deleted_messages_keep_their_snippet(self, broadcast):
+        """Test a message gone from the mailbox is no longer pending and keeps its snippet"""
+        self.sync_gmail(make_gmail_message("g1", body=LONG_BODY))
+        del self.gmail.messages["g1"]
+
+        self.assertEqual(hydrate_pending(), (0, 0))
+
+        message = Message.objects.get()
+        self.assertFalse(message.body_pending)
+        self.assertEqual(message.content, LONG_BODY[:100])
+
+    def test_lazy_outlook_ingest_and_hydration(self, broadcast):
+        """Test Outlook batches leave out the body and hydration reads it from $value"""
+        self.account.provider = "outlook"
+        self.account.save(update_fields=["provider"])
+        self.graph.add_message(make_graph_message("o1", body=LONG_BODY))
+
+        self.assertEqual(sync_outlook_mailbox(self.account, self.tenant), 1)
+        message = Message.objects.get()
+        self.assertTrue(message.body_pending)
+        self.assertEqual(message.content, LONG_BODY[:100])
+
+        self.assertEqual(hydrate_pending(), (1, 0))
+        message.refresh_from_db()
+        self.assertEqual(message.content.strip(), LONG_BODY.strip())
+
+    def test_eager_inbox_is_unchanged(self, broadcast):
+        """Test an inbox without lazy_bodies still stores full bodies at ingest"""
+        self.inbox.lazy_bodies = False
+        self.inbox.save(update_fields=["lazy_bodies"])
+
+        self.sync_gmail(make_gmail_message("g1", body=LONG_BODY))
+
+        message = Message.objects.get()
+        self.assertFalse(message.body_pending)
+        self.assertEqual(message.content, LONG_BODY)
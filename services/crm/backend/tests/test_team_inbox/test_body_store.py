@@ -0,0 +1,140 @@
+"""
+Tests for compressed message body storage
+"""
+
+from datetime import UTC, datetime
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django_tenants.test.cases import TenantTestCase
+from rest_framework.test import APIClient
+
+from apps.team_inbox.models import Conversation, Inbox, Message, MessageBody
+from apps.team_inbox.serializers import MessageSerializer
+from apps.team_inbox.services import body_store
+from tests.utils.helpers import create_test_user
+
+LONG_BODY = "Weekly digest: pricing, webinars and release notes. " * 200
+
+
+class BodyCodecTest(SimpleTestCase):
+    """Test body encoding without the database"""
+
+    @override_settings(INBOX_BODY_CODEC="zlib")
+    def test_roundtrip_compresses_large_bodies(self):
+        """Test large bodies are compressed and decode to the original text"""
+        html = f"<p>{LONG_BODY}</p>"
+        codec, content, html_bytes, raw_size = body_store.encode_body(
+            LONG_BODY + "é", html
+        )
+
+        self.assertEqual(codec, body_store.CODEC_ZLIB)
+        self.assertLess(len(content), raw_size // 10)
+        self.assertEqual(body_store.decompress(codec, content), LONG_BODY + "é")
+        self.assertEqual(body_store.decompress(codec, memoryview(html_bytes)), html)
+
+    def test_small_bodies_are_stored_raw(self):
+        """Test bodies under the threshold skip compression"""
+        codec, content, html_bytes, _ = body_store.encode_body("Thanks!", None)
+
+        self.assertEqual(codec, body_store.CODEC_NONE)
+        self.assertEqual(content, b"Thanks!")
+        self.assertIsNone(html_bytes)
+
+    @override_settings(INBOX_BODY_CODEC="zstd")
+    def test_zstd_falls_back_to_zlib_when_missing(self):
+        """Test the zstd setting writes zlib when zstandard is not installed"""
+        with mock.patch.object(body_store, "zstandard", None):
+            codec, _, _, _ = body_store.encode_body(LONG_BODY, None)
+        self.assertEqual(codec, body_store.CODEC_ZLIB)
+
+    def test_preview_collapses_whitespace(self):
+        """Test the preview is single-spaced and bounded"""
+        preview = body_store.make_preview("Hello\n\n  there\t" + "x" * 400)
+
+        self.assertTrue(preview.startswith("Hello there x"))
+        self.assertEqual(len(preview), body_store.PREVIEW_LENGTH)
+
+    @override_settings(INBOX_BODY_SEARCH_CHARS=20)
+    def test_search_text_collapses_whitespace_and_is_capped(self):
+        """Test the searchable body text is single-spaced and bounded by INBOX_BODY_SEARCH_CHARS"""
+        self.assertEqual(
+            body_store.make_search_text("Refund\n\n  order  42 please, thanks"),
+            "Refund order 42 plea",
+        )
+        self.assertEqual(body_store.make_search_text(None), "")
+
+
+class MessageBodyTest(TenantTestCase):
+    """Test Message reads and writes bodies through MessageBody"""
+
+    def setUp(self):
+        super().setUp()
+        self.inbox = Inbox.objects.create(name="Support")
+        self.conversation = Conversation.objects.create(
+            thread_id="thread-1",
+            subject="Digest",
+            last_activity=datetime(2025, 1, 1, tzinfo=UTC),
+        )
+
+    def create_message(self, **fields):
+        return Message.objects.create(
+            conversation=self.conversation,
+            inbox=self.inbox,
+            message_id="<1@x>",
+            subject="Digest",
+            from_email={"name": "News", "email": "news@example.com"},
+            to=[],
+            timestamp=datetime(2025, 1, 1, tzinfo=UTC),
+            **fields,
+        )
+
+    def test_body_is_stored_compressed_and_loaded_lazily(self):
+        """Test bodies round-trip through MessageBody and stay off Message rows"""
+        self.create_message(content=LONG_BODY, html_content=f"<p>{LONG_BODY}</p>")
+
+        body = MessageBody.objects.get()
+        self.assertNotEqual(body.codec, body_store.CODEC_NONE)
+        self.assertLess(len(body.content), body.raw_size)
+
+        with self.assertNumQueries(1):
+            message = Message.objects.get()
+        self.assertEqual(message.preview, body_store.make_preview(LONG_BODY))
+        with self.assertNumQueries(1):
+            self.assertEqual(message.content, LONG_BODY)
+            self.assertEqual(message.html_content, f"<p>{LONG_BODY}</p>")
+
+    def test_serializer_keeps_body_fields(self):
+        """Test the API still returns content and htmlContent"""
+        self.create_message(content="Short body", html_content="<b>Short body</b>")
+
+        message = Message.objects.select_related("body").get()
+        with self.assertNumQueries(3):  # attachments, notes, labels
+            data = MessageSerializer(message).data
+
+        self.assertEqual(data["content"], "Short body")
+        self.assertEqual(data["htmlContent"], "<b>Short body</b>")
+
+    def test_updating_content_rewrites_body(self):
+        """Test saving new content replaces the stored body"""
+        message = self.create_message(content="First", html_content="<p>First</p>")
+
+        message = Message.objects.get(pk=message.pk)
+        message.content = "Second"
+        message.save()
+
+        message = Message.objects.get(pk=message.pk)
+        self.assertEqual(message.content, "Second")
+        self.assertEqual(message.html_content, "<p>First</p>")
+        self.assertEqual(MessageBody.objects.count(), 1)
+
+    def test_search_matches_the_whole_body(self):
+        """Test message search covers body text past the 255-character preview"""
+        self.create_message(content=LONG_BODY + " Refund reference ZX-42")
+        client = APIClient(HTTP_HOST=self.domain.domain)
+        client.force_authenticate(user=create_test_user(email="agent@example.com"))
+
+        found = client.get("/api/inbox/messages/", {"search": "ZX-42"}).data
+        missing = client.get("/api/inbox/messages/", {"search": "QQ-99"}).data
+
+        self.assertEqual((found["count"], missing["count"]), (1, 0))
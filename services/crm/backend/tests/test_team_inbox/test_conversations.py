@@ -0,0 +1,108 @@
+"""
+Tests for conversation list modes and message paging
+"""
+
+from datetime import UTC, datetime, timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django_tenants.test.cases import TenantTestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.team_inbox.models import Conversation, Inbox, Message
+from tests.utils.helpers import create_test_user
+
+BASE_TIME = datetime(2025, 1, 1, 9, 0, tzinfo=UTC)
+
+
+class ConversationListTest(TenantTestCase):
+    """Test summary list mode and the paged messages endpoint"""
+
+    def setUp(self):
+        super().setUp()
+        self.inbox = Inbox.objects.create(name="Support")
+        self.user = create_test_user(email="agent@example.com")
+        self.client = APIClient(HTTP_HOST=self.domain.domain)
+        self.client.force_authenticate(user=self.user)
+
+    def make_conversation(self, index, message_count):
+        conversation = Conversation.objects.create(
+            thread_id=f"thread-{index}",
+            subject=f"Subject {index}",
+            last_activity=BASE_TIME,
+            shared_inbox_id=self.inbox.id,
+        )
+        message = None
+        for i in range(message_count):
+            message = Message.objects.create(
+                conversation=conversation,
+                inbox=self.inbox,
+                message_id=f"<{index}-{i}@x>",
+                subject="Hello",
+                from_email={"name": "Customer", "email": "customer@example.com"},
+                to=[],
+                content="Body text " * 100,
+                timestamp=BASE_TIME + timedelta(minutes=i),
+                is_read=i % 2 == 0,
+            )
+        conversation.last_message = message
+        conversation.save()
+        return conversation
+
+    def list_queries(self, view=None):
+        params = {"view": view} if view else {}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/inbox/conversations/", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(queries)
+
+    def test_summary_mode_returns_snippet_and_counts(self):
+        """Test summary rows carry counts and a bounded snippet, not bodies"""
+        self.make_conversation(1, 3)
+
+        response, _ = self.list_queries(view="summary")
+
+        row = response.data["results"][0]
+        self.assertNotIn("messages", row)
+        self.assertEqual(row["messageCount"], 3)
+        self.assertEqual(row["unreadCount"], 1)
+        self.assertFalse(row["hasAttachments"])
+        self.assertEqual(row["lastMessage"]["from"]["email"], "customer@example.com")
+        self.assertEqual(len(row["lastMessage"]["snippet"]), 200)
+
+    def test_list_queries_do_not_grow_with_messages(self):
+        """Test both list modes use a fixed number of queries"""
+        self.make_conversation(1, 1)
+        _, summary_small = self.list_queries(view="summary")
+        _, full_small = self.list_queries()
+
+        for index in range(2, 6):
+            self.make_conversation(index, 8)
+        _, summary_large = self.list_queries(view="summary")
+        _, full_large = self.list_queries()
+
+        self.assertEqual(summary_small, summary_large)
+        self.assertEqual(full_small, full_large)
+
+    def test_messages_endpoint_pages_with_cursor(self):
+        """Test messages are returned newest first across cursor pages"""
+        conversation = self.make_conversation(1, 5)
+        url = f"/api/inbox/conversations/{conversation.id}/messages/"
+
+        first = self.client.get(url, {"page_size": 3})
+        second = self.client.get(first.data["next"])
+
+        self.assertEqual(
+            [m["messageId"] for m in first.data["results"]],
+            ["<1-4@x>", "<1-3@x>", "<1-2@x>"],
+        )
+        self.assertEqual(
+            [m["messageId"] for m in second.data["results"]], ["<1-1@x>", "<1-0@x>"]
+        )
+        self.assertIsNone(second.data["next"])
+
+    def test_messages_endpoint_unknown_conversation(self):
+        """Test an unknown conversation id returns 404"""
+        response = self.client.get("/api/inbox/conversations/not-a-uuid/messages/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
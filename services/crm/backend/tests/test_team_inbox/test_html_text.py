@@ -0,0 +1,72 @@
+"""
+Tests for the single-pass HTML to text converter
+"""
+
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from apps.team_inbox.services import html_text
+from apps.team_inbox.services.email_parsing import html_to_clean_text
+
+
+class HtmlTextTest(SimpleTestCase):
+    """Test output contract, caps and caching"""
+
+    def setUp(self):
+        html_text._cache.clear()
+
+    def test_paragraphs_and_whitespace(self):
+        """Test blocks become lines, spaces collapse and blank runs shrink"""
+        body = (
+            "<html><head><title>T</title><style>p{color:red}</style></head><body>"
+            "<p>Hello   <b>there</b>,\n  friend</p><div></div><div></div><div></div>"
+            "<p>Line one<br>Line&nbsp;two &amp; more</p>"
+            "<table><tr><td>Cell A</td><td>Cell B</td></tr></table>"
+            "<script>alert('x')</script></body></html>"
+        )
+
+        self.assertEqual(
+            html_to_clean_text(body),
+            "Hello there, friend\n\nLine one\nLine two & more\n\nCell A\n\nCell B\n",
+        )
+
+    def test_tracking_pixels_and_unclosed_head(self):
+        """Test images are dropped and an unclosed head does not hide the body"""
+        body = '<head><meta charset="utf-8"><body><img src="t.gif" width="1" height="1">Thanks!</body>'
+
+        self.assertEqual(html_text.html_to_text(body), ("Thanks!\n", False))
+
+    def test_size_caps_truncate(self):
+        """Test input and output caps stop the conversion"""
+        body = "<p>" + "word " * 1000 + "</p>"
+
+        text, truncated = html_text.html_to_text(body, max_chars=100)
+        self.assertTrue(truncated)
+        self.assertLessEqual(len(text), 101)
+
+        text, truncated = html_text.html_to_text(body, max_html_chars=20)
+        self.assertTrue(truncated)
+        self.assertEqual(text, "word word word wo\n")
+
+    def test_timeout_keeps_partial_text(self):
+        """Test a conversion past its deadline returns what was extracted"""
+        body = "<p>" + "x" * (html_text.CHUNK_SIZE * 3) + "</p>"
+
+        with patch.object(html_text.time, "monotonic", side_effect=[0.0, 10.0]):
+            text, truncated = html_text.html_to_text(body, timeout_ms=1)
+
+        self.assertTrue(truncated)
+        self.assertLess(len(text), html_text.CHUNK_SIZE + 2)
+
+    @override_settings(INBOX_HTML_TEXT_CACHE_SIZE=2)
+    def test_results_cached_by_content_hash(self):
+        """Test identical bodies are converted once and the cache is bounded"""
+        with patch.object(
+            html_text, "html_to_text", wraps=html_text.html_to_text
+        ) as convert:
+            for body in ["<p>a</p>", "<p>a</p>", "<p>b</p>", "<p>c</p>", "<p>a</p>"]:
+                html_text.cached_html_to_text(body)
+
+        self.assertEqual(convert.call_count, 4)
+        self.assertEqual(len(html_text._cache.entries), 2)
@@ -0,0 +1,370 @@
+"""
+Tests for inbox rules compiled for ingest-time matching
+"""
+
+import uuid
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django_tenants.test.cases import TenantTestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.team_inbox.models import (
+    ChannelAccount,
+    Conversation,
+    Inbox,
+    InboxRule,
+    Message,
+    Tag,
+    TeamMember,
+)
+from apps.team_inbox.services.inbox_rules import CompiledRules, KeywordMatcher
+from apps.team_inbox.services.message_writer import write_message_batch
+from tests.utils.helpers import create_test_user
+
+BASE_TIME = datetime(2025, 1, 1, 9, 0, tzinfo=UTC)
+
+
+def message(
+    message_id="<m1@x>",
+    sender="customer@example.com",
+    subject="Hello",
+    content="Hi there",
+    to=("support@example.com",),
+    cc=(),
+    minutes=0,
+    in_reply_to=None,
+):
+    return {
+        "message_id": message_id,
+        "thread_id": None,
+        "in_reply_to": in_reply_to,
+        "references": [in_reply_to] if in_reply_to else None,
+        "subject": subject,
+        "from_email": {"name": "Sender", "email": sender},
+        "to": [{"name": "", "email": address} for address in to],
+        "cc": [{"name": "", "email": address} for address in cc] or None,
+        "bcc": None,
+        "reply_to": None,
+        "content": content,
+        "html_content": content,
+        "timestamp": BASE_TIME + timedelta(minutes=minutes),
+    }
+
+
+def rule(*conditions, match_all=True, tag_ids=(), **actions):
+    compiled = InboxRule(
+        name=actions.pop("name", "rule"),
+        match_all=match_all,
+        conditions=[
+            {"field": field, "values": list(values)} for field, values in conditions
+        ],
+        **actions,
+    )
+    compiled.tag_ids = list(tag_ids)
+    return compiled
+
+
+class CompiledRulesTest(SimpleTestCase):
+    """Test condition matching and how matching rules combine"""
+
+    def test_keywords_match_whole_words_and_phrases(self):
+        """Test keywords are case-insensitive whole words, and phrases need their words in order"""
+        matcher = KeywordMatcher()
+        matcher.add("refund", 0)
+        matcher.add("Order Cancelled", 1)
+        matcher.add("cancelled order", 2)
+
+        def hits(text):
+            found = set()
+            matcher.match(text, found)
+            return found
+
+        self.assertEqual(hits("Please REFUND me"), {0})
+        self.assertEqual(hits("refunded already"), set())
+        self.assertEqual(hits("my order cancelled yesterday!"), {1})
+        self.assertEqual(hits("cancelled order cancelled"), {1, 2})
+        self.assertEqual(hits(""), set())
+
+    def test_sender_domain_and_recipient_conditions(self):
+        """Test addresses match exactly and domains include their subdomains"""
+        rules = CompiledRules(
+            [
+                rule(("sender", ["VIP@Example.com"]), name="vip"),
+                rule(("domain", ["acme.com"]), name="acme"),
+                rule(
+                    ("recipients", ["billing@example.com", "@partners.io"]), name="to"
+                ),
+            ]
+        )
+
+        def matched(data):
+            outcome = rules.evaluate(data)
+            return [r.name for r in outcome.rules] if outcome else []
+
+        self.assertEqual(matched(message(sender="vip@example.com")), ["vip"])
+        self.assertEqual(matched(message(sender="bob@mail.acme.com")), ["acme"])
+        self.assertEqual(matched(message(sender="bob@notacme.com")), [])
+        self.assertEqual(matched(message(cc=["x@eu.partners.io"])), ["to"])
+        self.assertEqual(matched(message(to=["billing@example.com"])), ["to"])
+
+    def test_match_all_and_match_any(self):
+        """Test match_all needs every condition and match_any just one"""
+        conditions = (("domain", ["acme.com"]), ("subject", ["invoice"]))
+        rules = CompiledRules(
+            [
+                rule(*conditions, name="all", set_priority="high"),
+                rule(*conditions, match_all=False, name="any", tag_ids=["t1"]),
+            ]
+        )
+
+        both = rules.evaluate(message(sender="a@acme.com", subject="Invoice 12"))
+        one = rules.evaluate(message(sender="a@acme.com", subject="Hello"))
+
+        self.assertEqual([r.name for r in both.rules], ["all", "any"])
+        self.assertEqual(both.priority, "high")
+        self.assertEqual([r.name for r in one.rules], ["any"])
+        self.assertEqual((one.priority, one.tag_ids), (None, {"t1"}))
+        self.assertIsNone(rules.evaluate(message(subject="Invoice")).priority)
+
+    def test_actions_combine_in_order_until_stop(self):
+        """Test later rules override assignment and priority, and stop_processing ends the run"""
+        rules = CompiledRules(
+            [
+                rule(
+                    ("body", ["urgent"]),
+                    set_priority="urgent",
+                    assign_to="agent-1",
+                    tag_ids=["a"],
+                ),
+                rule(
+                    ("body", ["urgent"]),
+                    set_priority="high",
+                    archive=True,
+                    tag_ids=["b"],
+                    stop_processing=True,
+                ),
+                rule(("body", ["urgent"]), mark_spam=True),
+            ]
+        )
+
+        outcome = rules.evaluate(message(content="This is URGENT."))
+
+        self.assertEqual(
+            (outcome.priority, outcome.assign_to, outcome.assigned_by),
+            ("high", "agent-1", "rule:rule"),
+        )
+        self.assertEqual(outcome.tag_ids, {"a", "b"})
+        self.assertTrue(outcome.archive)
+        self.assertFalse(outcome.spam)
+
+    def test_unconditional_and_malformed_rules(self):
+        """Test a rule without conditions matches everything and one with only bad conditions nothing"""
+        broken = InboxRule(
+            name="broken", conditions=[{"field": "nope", "values": ["x"]}, "junk"]
+        )
+        rules = CompiledRules([broken, rule(name="everything")])
+
+        self.assertEqual(
+            [r.name for r in rules.evaluate(message()).rules], ["everything"]
+        )
+
+    def test_body_scan_is_capped(self):
+        """Test body keywords past INBOX_RULES_BODY_SCAN_CHARS are not looked at"""
+        with self.settings(INBOX_RULES_BODY_SCAN_CHARS=50):
+            rules = CompiledRules([rule(("body", ["unsubscribe"]))])
+
+        self.assertIsNotNone(
+            rules.evaluate(message(content="unsubscribe " + "x " * 100))
+        )
+        self.assertIsNone(rules.evaluate(message(content="x " * 100 + "unsubscribe")))
+
+
+@patch("apps.team_inbox.services.message_writer.publish_message_events")
+class IngestRulesTest(TenantTestCase):
+    """Test rules run in the batch writer and are managed through the API"""
+
+    def setUp(self):
+        super().setUp()
+        self.inbox = Inbox.objects.create(name="Support")
+        self.account = ChannelAccount.objects.create(
+            identifier="support@example.com",
+            provider="gmail",
+            access_token="token",
+            inbox=self.inbox,
+        )
+        self.billing = Tag.objects.create(name="billing")
+
+    def test_new_conversations_get_rule_actions(self, broadcast):
+        """Test priority, assignment, tags, archive and spam are set on the conversations messages start"""
+        billing = InboxRule.objects.create(
+            inbox=self.inbox,
+            name="Billing",
+            conditions=[{"field": "subject", "values": ["invoice"]}],
+            set_priority="high",
+            assign_to="agent-7",
+        )
+        billing.add_tags.add(self.billing)
+        InboxRule.objects.create(
+            inbox=self.inbox,
+            name="Spam",
+            position=1,
+            mark_spam=True,
+            archive=True,
+            conditions=[{"field": "domain", "values": ["spam.example"]}],
+        )
+
+        write_message_batch(
+            self.account,
+            self.tenant,
+            [
+                message("<a@x>", subject="Invoice 7"),
+                message("<b@x>", sender="x@promo.spam.example", minutes=1),
+                message("<c@x>", minutes=2),
+            ],
+        )
+
+        invoice = Message.objects.get(message_id="<a@x>")
+        self.assertEqual(invoice.priority, "high")
+        conversation = invoice.conversation
+        self.assertEqual(
+            (conversation.priority, conversation.assigned_to), ("high", "agent-7")
+        )
+        self.assertEqual(conversation.assigned_by, "rule:Billing")
+        self.assertEqual(list(conversation.tags.all()), [self.billing])
+        spam = Message.objects.get(message_id="<b@x>").conversation
+        self.assertEqual((spam.status, spam.is_archived), ("spam", True))
+        plain = Message.objects.get(message_id="<c@x>").conversation
+        self.assertEqual(
+            (plain.status, plain.priority, plain.assigned_to), ("open", "normal", None)
+        )
+
+    def test_replies_leave_conversation_alone(self, broadcast):
+        """Test a matching reply sets its own priority but not its conversation's"""
+        write_message_batch(self.account, self.tenant, [message("<a@x>")])
+        conversation = Conversation.objects.get()
+        conversation.assigned_to = "agent-1"
+        conversation.save()
+        InboxRule.objects.create(
+            inbox=self.inbox,
+            name="Urgent",
+            conditions=[{"field": "body", "values": ["urgent"]}],
+            set_priority="urgent",
+            assign_to="agent-2",
+        )
+
+        write_message_batch(
+            self.account,
+            self.tenant,
+            [
+                message(
+                    "<b@x>", content="Urgent please", minutes=1, in_reply_to="<a@x>"
+                ),
+            ],
+        )
+
+        conversation.refresh_from_db()
+        self.assertEqual(
+            (conversation.assigned_to, conversation.priority), ("agent-1", "normal")
+        )
+        self.assertEqual(Message.objects.get(message_id="<b@x>").priority, "urgent")
+
+    def test_rule_changes_are_picked_up(self, broadcast):
+        """Test the compiled rules are rebuilt after a rule is edited or removed"""
+        rule = InboxRule.objects.create(
+            inbox=self.inbox,
+            name="Low",
+            conditions=[{"field": "sender", "values": ["customer@example.com"]}],
+            set_priority="low",
+        )
+        write_message_batch(self.account, self.tenant, [message("<a@x>")])
+        rule.set_priority = "high"
+        rule.save()
+        write_message_batch(self.account, self.tenant, [message("<b@x>", minutes=1)])
+        rule.delete()
+        write_message_batch(self.account, self.tenant, [message("<c@x>", minutes=2)])
+
+        priorities = dict(Message.objects.values_list("message_id", "priority"))
+        self.assertEqual(
+            priorities, {"<a@x>": "low", "<b@x>": "high", "<c@x>": "normal"}
+        )
+
+    def test_rules_of_other_inboxes_do_not_apply(self, broadcast):
+        """Test rules are per inbox"""
+        other = Inbox.objects.create(name="Sales")
+        InboxRule.objects.create(inbox=other, name="All", set_priority="urgent")
+
+        stored = write_message_batch(self.account, self.tenant, [message("<a@x>")])
+
+        self.assertEqual(stored[0].priority, "normal")
+
+    def test_rules_api(self, broadcast):
+        """Test rules are created with validated conditions and listed per inbox"""
+        agent = create_test_user(email="agent@example.com")
+        TeamMember.objects.create(user=agent, role="agent").team_inboxes.set(
+            [self.inbox]
+        )
+        client = APIClient(HTTP_HOST=self.domain.domain)
+        client.force_authenticate(user=agent)
+        payload = {
+            "inbox": str(self.inbox.id),
+            "name": "Billing",
+            "matchAll": False,
+            "setPriority": "high",
+            "addTags": [str(self.billing.id)],
+            "conditions": [{"field": "subject", "values": ["invoice", "receipt"]}],
+        }
+
+        response = client.post("/api/inbox/inbox-rules/", payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["addTags"], [self.billing.id])
+
+        bad = {**payload, "conditions": [{"field": "subject", "values": []}]}
+        self.assertEqual(
+            client.post("/api/inbox/inbox-rules/", bad, format="json").status_code, 400
+        )
+        bad = {**payload, "conditions": [{"field": "header", "values": ["x"]}]}
+        self.assertEqual(
+            client.post("/api/inbox/inbox-rules/", bad, format="json").status_code, 400
+        )
+
+        listed = client.get(f"/api/inbox/inbox-rules/?inbox={self.inbox.id}").data[
+            "results"
+        ]
+        self.assertEqual([r["name"] for r in listed], ["Billing"])
+        self.assertEqual(
+            client.get(f"/api/inbox/inbox-rules/?inbox={uuid.uuid4()}").data["count"], 0
+        )
+
+    def test_rules_api_is_limited_to_member_inboxes(self, broadcast):
+        """Test agents only see and write rules of inboxes they are a teammate of"""
+        sales = Inbox.objects.create(name="Sales")
+        hidden = InboxRule.objects.create(inbox=sales, name="Sales rule")
+        visible = InboxRule.objects.create(inbox=self.inbox, name="Support rule")
+        agent = create_test_user(email="agent@example.com")
+        TeamMember.objects.create(user=agent, role="agent").team_inboxes.set(
+            [self.inbox]
+        )
+        client = APIClient(HTTP_HOST=self.domain.domain)
+        client.force_authenticate(user=agent)
+
+        listed = client.get("/api/inbox/inbox-rules/").data["results"]
+        self.assertEqual([r["id"] for r in listed], [str(visible.id)])
+        self.assertEqual(
+            client.get(f"/api/inbox/inbox-rules/{hidden.id}/").status_code, 404
+        )
+
+        payload = {"inbox": str(sales.id), "name": "Sneaky", "conditions": []}
+        self.assertEqual(
+            client.post("/api/inbox/inbox-rules/", payload, format="json").status_code,
+            403,
+        )
+        moved = client.patch(
+            f"/api/inbox/inbox-rules/{visible.id}/",
+            {"inbox": str(sales.id)},
+            format="json",
+        )
+        self.assertEqual(moved.status_code, 403)
+        self.assertEqual(InboxRule.objects.filter(inbox=sales).count(), 1)
@@ -0,0 +1,238 @@
+"""
+Tests for the team inbox ingest queue and Gmail webhook
+"""
+
+import base64
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+from django_tenants.utils import schema_context
+
+from apps.core.models import TenantEmailMapping
+from apps.team_inbox.models import ChannelAccount, Inbox, IngestJob, Message
+from apps.team_inbox.services import ingest_queue
+from apps.team_inbox.services.gmail_ingest import advance_history_id
+from apps.team_inbox.views.views import gmail_notify
+from tests.utils.fake_gmail import FakeGmailServer, make_gmail_message
+
+
+@override_settings(INBOX_INGEST_DEBOUNCE_SECONDS=0)
+class IngestQueueTest(TenantTestCase):
+    """Test ingest job claiming, ordering and retries"""
+
+    def setUp(self):
+        super().setUp()
+        self.inbox = Inbox.objects.create(name="Support")
+        self.account = ChannelAccount.objects.create(
+            identifier="support@example.com",
+            provider="gmail",
+            access_token="token",
+            inbox=self.inbox,
+        )
+        self.other_account = ChannelAccount.objects.create(
+            identifier="sales@example.com",
+            provider="gmail",
+            access_token="token",
+            inbox=self.inbox,
+        )
+
+    def test_enqueue_dedupes_on_delivery_key(self):
+        """Test redelivered notifications are recorded once"""
+        job, created = ingest_queue.enqueue_ingest_job(
+            self.account, history_id="10", dedup_key="gmail:1"
+        )
+        again, created_again = ingest_queue.enqueue_ingest_job(
+            self.account, history_id="10", dedup_key="gmail:1"
+        )
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(job.id, again.id)
+        self.assertEqual(IngestJob.objects.count(), 1)
+
+    def test_claim_keeps_per_mailbox_order(self):
+        """Test a mailbox's next job waits for its in-flight job"""
+        first, _ = ingest_queue.enqueue_ingest_job(self.account, history_id="1")
+        other, _ = ingest_queue.enqueue_ingest_job(self.other_account, history_id="7")
+
+        claimed = ingest_queue.claim_next_job()
+        self.assertEqual(claimed.id, first.id)
+        self.assertEqual(claimed.status, IngestJob.STATUS_PROCESSING)
+        self.assertEqual(claimed.attempts, 1)
+        ingest_queue.enqueue_ingest_job(self.account, history_id="2")
+
+        # The follow-up job for the same mailbox is blocked; the other mailbox is not
+        self.assertEqual(ingest_queue.claim_next_job().id, other.id)
+        self.assertIsNone(ingest_queue.claim_next_job())
+
+    def test_burst_coalesces_into_one_pending_job(self):
+        """Test notifications for a mailbox with a pending job fold into it"""
+        job, created = ingest_queue.enqueue_ingest_job(self.account, history_id="1")
+        for i in range(2, 6):
+            folded, folded_created = ingest_queue.enqueue_ingest_job(
+                self.account, history_id=str(i), dedup_key=f"gmail:{i}"
+            )
+            self.assertFalse(folded_created)
+            self.assertEqual(folded.id, job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.coalesced, 4)
+        self.assertEqual(IngestJob.objects.count(), 1)
+        self.assertEqual(ingest_queue.queue_metrics()["coalesced"], 4)
+
+    def test_notifications_mid_sync_schedule_one_follow_up(self):
+        """Test a mailbox made dirty during a sync gets exactly one follow-up"""
+        ingest_queue.enqueue_ingest_job(self.account, history_id="1")
+        running = ingest_queue.claim_next_job()
+
+        follow_up, created = ingest_queue.enqueue_ingest_job(
+            self.account, history_id="2"
+        )
+        again, created_again = ingest_queue.enqueue_ingest_job(
+            self.account, history_id="3"
+        )
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(again.id, follow_up.id)
+        self.assertIsNone(ingest_queue.claim_next_job())
+
+        ingest_queue.complete_job(running)
+        self.assertEqual(ingest_queue.claim_next_job().id, follow_up.id)
+
+    def test_new_jobs_wait_for_the_debounce_window(self):
+        """Test a fresh job is not claimable until the burst window passes"""
+        with self.settings(INBOX_INGEST_DEBOUNCE_SECONDS=60):
+            ingest_queue.enqueue_ingest_job(self.account, history_id="1")
+        self.assertIsNone(ingest_queue.claim_next_job())
+
+    def test_history_checkpoint_only_moves_forward(self):
+        """Test a late sync cannot move the Gmail checkpoint back"""
+        self.assertTrue(advance_history_id(self.account, "999"))
+        self.assertTrue(advance_history_id(self.account, "1000"))
+        self.assertFalse(advance_history_id(self.account, "998"))
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.last_history_id, "1000")
+
+    def test_failed_job_retries_with_backoff(self):
+        """Test failures are rescheduled and eventually parked"""
+        job, _ = ingest_queue.enqueue_ingest_job(self.account, history_id="1")
+        claimed = ingest_queue.claim_next_job()
+
+        with self.settings(
+            INBOX_INGEST_MAX_ATTEMPTS=2, INBOX_INGEST_RETRY_BASE_SECONDS=30
+        ):
+            ingest_queue.fail_job(claimed, RuntimeError("Gmail timeout"))
+            job.refresh_from_db()
+            self.assertEqual(job.status, IngestJob.STATUS_PENDING)
+            self.assertGreater(job.available_at, timezone.now() + timedelta(seconds=20))
+            self.assertIsNone(ingest_queue.claim_next_job())
+
+            IngestJob.objects.filter(id=job.id).update(available_at=timezone.now())
+            claimed = ingest_queue.claim_next_job()
+            ingest_queue.fail_job(claimed, RuntimeError("Gmail timeout"))
+            job.refresh_from_db()
+            self.assertEqual(job.status, IngestJob.STATUS_FAILED)
+
+    def test_notification_brings_backed_off_job_forward(self):
+        """Test a new notification folded into a job in retry backoff makes it runnable"""
+        job, _ = ingest_queue.enqueue_ingest_job(self.account, history_id="1")
+        with self.settings(INBOX_INGEST_RETRY_BASE_SECONDS=3600):
+            ingest_queue.fail_job(
+                ingest_queue.claim_next_job(), RuntimeError("Gmail timeout")
+            )
+        self.assertIsNone(ingest_queue.claim_next_job())
+
+        folded, created = ingest_queue.enqueue_ingest_job(self.account, history_id="2")
+
+        self.assertFalse(created)
+        self.assertEqual(folded.id, job.id)
+        self.assertLessEqual(folded.available_at, timezone.now())
+        self.assertEqual(ingest_queue.claim_next_job().id, job.id)
+
+    def test_process_available_jobs_runs_handler(self):
+        """Test workers run the provider sync and record completion"""
+        ingest_queue.enqueue_ingest_job(self.account, history_id="5")
+
+        with patch(
+            "apps.team_inbox.services.gmail_ingest.sync_gmail_mailbox", return_value=3
+        ) as sync:
+            processed, failed = ingest_queue.process_available_jobs(self.tenant)
+
+        self.assertEqual((processed, failed), (1, 0))
+        sync.assert_called_once_with(self.account, self.tenant, "5")
+        self.assertEqual(IngestJob.objects.get().status, IngestJob.STATUS_DONE)
+
+    @patch("apps.team_inbox.services.message_writer.publish_message_events")
+    def test_expired_history_id_resets_checkpoint(self, broadcast):
+        """Test a 404 for an expired historyId moves the checkpoint to the mailbox's current one"""
+        gmail = FakeGmailServer().start()
+        self.addCleanup(gmail.stop)
+        self.account.last_history_id = "500"
+        self.account.save(update_fields=["last_history_id"])
+        gmail.add_message(make_gmail_message("g1"))
+        gmail.expired_before = 900
+
+        with self.settings(
+            GMAIL_API_BASE_URL=gmail.base_url, INBOX_ARCHIVE_RAW_MIME=False
+        ):
+            ingest_queue.enqueue_ingest_job(
+                self.account, history_id=str(gmail.history_id)
+            )
+            self.assertEqual(ingest_queue.process_available_jobs(self.tenant), (1, 0))
+            self.account.refresh_from_db()
+            self.assertEqual(self.account.last_history_id, str(gmail.history_id))
+
+            gmail.add_message(make_gmail_message("g2"))
+            ingest_queue.enqueue_ingest_job(
+                self.account, history_id=str(gmail.history_id)
+            )
+            self.assertEqual(ingest_queue.process_available_jobs(self.tenant), (1, 0))
+
+        resumed = f"startHistoryId={gmail.history_id - 1}"
+        self.assertTrue(any(resumed in path for path in gmail.requests))
+        self.assertEqual(Message.objects.count(), 2)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.last_history_id, str(gmail.history_id))
+
+    def test_queue_metrics(self):
+        """Test queue depth and lag metrics"""
+        ingest_queue.enqueue_ingest_job(self.account, history_id="1")
+        ingest_queue.enqueue_ingest_job(self.other_account, history_id="2")
+
+        metrics = ingest_queue.queue_metrics()
+        self.assertEqual(metrics["depth"], 2)
+        self.assertEqual(metrics["processing"], 0)
+        self.assertGreaterEqual(metrics["oldest_pending_age_seconds"], 0)
+
+    def test_gmail_webhook_only_records_notification(self):
+        """Test the Pub/Sub webhook enqueues without calling Gmail"""
+        with schema_context("public"):
+            TenantEmailMapping.objects.create(
+                email=self.account.identifier, tenant=self.tenant
+            )
+
+        data = base64.urlsafe_b64encode(
+            json.dumps(
+                {"emailAddress": self.account.identifier, "historyId": 1234}
+            ).encode()
+        ).decode()
+        body = json.dumps({"message": {"data": data, "messageId": "pubsub-1"}})
+        request = RequestFactory().post(
+            "/api/inbox/gmail/push/", body, content_type="application/json"
+        )
+
+        with patch(
+            "apps.team_inbox.services.gmail_ingest.GmailService"
+        ) as gmail_service:
+            response = gmail_notify(request)
+
+        self.assertEqual(response.status_code, 200)
+        gmail_service.assert_not_called()
+        job = IngestJob.objects.get()
+        self.assertEqual(job.history_id, "1234")
+        self.assertEqual(job.dedup_key, "gmail:pubsub-1")
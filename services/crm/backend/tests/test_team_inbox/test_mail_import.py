@@ -0,0 +1,228 @@
+"""
+Tests for MBOX/EML reading and bulk import
+"""
+
+import gzip
+import io
+import multiprocessing
+import shutil
+import tempfile
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from django_tenants.test.cases import TenantTestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.team_inbox.models import Attachment, Conversation, Inbox, MailImport, Message
+from apps.team_inbox.services.mail_import import (
+    import_archive,
+    iter_parsed,
+    process_mail_imports,
+)
+from apps.team_inbox.services.mbox_reader import (
+    init_parse_worker,
+    iter_archive_messages,
+    parse_raw_messages,
+)
+from tests.utils.helpers import create_test_user
+from tests.utils.mbox_factory import make_mime, mbox_entry, write_mbox
+
+
+def mbox_bytes(count, **kwargs):
+    archive = io.BytesIO()
+    write_mbox(archive, count, **kwargs)
+    return archive.getvalue()
+
+
+class MboxReaderTest(SimpleTestCase):
+    """Test streaming messages out of MBOX, EML, gzip and zip archives"""
+
+    def test_mbox_is_split_and_unescaped(self):
+        """Test each From_ line starts a message and '>From ' escapes are undone"""
+        raws = list(iter_archive_messages(io.BytesIO(mbox_bytes(3))))
+
+        self.assertEqual(raws, [make_mime(i) for i in range(3)])
+        self.assertIn(b"\nFrom the desk of customer 0.", raws[0])
+
+    def test_single_eml(self):
+        """Test a message without a From_ line is one message"""
+        raws = list(iter_archive_messages(io.BytesIO(make_mime(7))))
+
+        self.assertEqual(raws, [make_mime(7)])
+
+    def test_gzip_and_zip_archives(self):
+        """Test compressed MBOX and zips of .eml/.mbox files are read member by member"""
+        zipped = io.BytesIO()
+        with zipfile.ZipFile(zipped, "w") as archive:
+            archive.writestr("one.eml", make_mime(0))
+            archive.writestr("folder/rest.mbox", mbox_bytes(2, start=1))
+
+        self.assertEqual(
+            len(list(iter_archive_messages(io.BytesIO(gzip.compress(mbox_bytes(4)))))),
+            4,
+        )
+        zipped.seek(0)
+        self.assertEqual(
+            list(iter_archive_messages(zipped)), [make_mime(i) for i in range(3)]
+        )
+
+    def test_oversized_messages_are_skipped(self):
+        """Test a message over the size limit is dropped without stopping the read"""
+        large = make_mime(1, attachment_bytes=50_000)
+        archive = (
+            mbox_entry(make_mime(0)) + mbox_entry(large) + mbox_entry(make_mime(2))
+        )
+
+        raws = list(iter_archive_messages(io.BytesIO(archive), max_bytes=20_000))
+
+        self.assertEqual(raws, [make_mime(0), make_mime(2)])
+
+    def test_parse_normalizes_and_extracts_attachments(self):
+        """Test headers, bodies and attachments come back from a parse chunk"""
+        raw = make_mime(5, thread_size=3, attachment_bytes=10, html=True)
+
+        data, compressed, attachments = parse_raw_messages([raw])[0]
+
+        self.assertEqual(data["message_id"], "<m5@import.example.com>")
+        self.assertEqual(data["in_reply_to"], "<m4@import.example.com>")
+        self.assertEqual(
+            data["references"], ["<m3@import.example.com>", "<m4@import.example.com>"]
+        )
+        self.assertEqual(
+            data["from_email"], {"name": "Customer 1", "email": "customer1@example.com"}
+        )
+        self.assertIn("<b>order 1</b>", data["html_content"])
+        self.assertTrue(data["content"].startswith("Message 5 about order 1."))
+        self.assertEqual(
+            [(name, mime) for name, mime, _ in attachments],
+            [("file5.bin", "application/octet-stream")],
+        )
+        self.assertEqual(zlib.decompress(compressed), raw)
+
+    def test_message_without_id_gets_a_stable_one(self):
+        """Test a missing Message-ID is derived from the bytes, so re-imports dedup"""
+        raw = b"Subject: hello\r\n\r\nbody\r\n"
+
+        first = parse_raw_messages([raw])[0][0]["message_id"]
+        self.assertEqual(first, parse_raw_messages([raw])[0][0]["message_id"])
+        self.assertTrue(first.endswith("@import.invalid>"))
+
+    def test_process_pool_keeps_archive_order(self):
+        """Test parsing on several processes yields results in input order"""
+        raws = [make_mime(i) for i in range(40)]
+
+        with self.settings(INBOX_IMPORT_CHUNK_MAX_BYTES=1024 * 1024):
+            results = list(
+                iter_parsed(iter(raws), workers=2, chunk_size=3, zlib_level=1)
+            )
+
+        self.assertEqual(
+            [data["message_id"] for data, _, _ in results],
+            [f"<m{i}@import.example.com>" for i in range(40)],
+        )
+
+    def test_spawned_workers_parse_html(self):
+        """Test a spawned worker parses HTML with the settings handed to it"""
+        raw = (
+            b"Message-ID: <html-only@x>\r\nContent-Type: text/html\r\n\r\n"
+            + b"<p>"
+            + b"order " * 50
+            + b"</p>\r\n"
+        )
+        context = multiprocessing.get_context("spawn")
+
+        with ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=context,
+            initializer=init_parse_worker,
+            initargs=({"INBOX_TEXT_MAX_CHARS": 20},),
+        ) as pool:
+            [parsed] = pool.submit(parse_raw_messages, [raw]).result()
+
+        self.assertIsNotNone(parsed)
+        # The worker used the settings it was handed
+        self.assertEqual(len(parsed[0]["content"]), 20)
+
+
+@override_settings(INBOX_IMPORT_WORKERS=1, INBOX_IMPORT_BATCH_SIZE=4)
+class MailImportTest(TenantTestCase):
+    """Test importing archives into an inbox"""
+
+    def setUp(self):
+        super().setUp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        settings_override = override_settings(INBOX_BLOB_STORE_OPTIONS={"root": root})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.inbox = Inbox.objects.create(name="Support")
+
+    def test_import_threads_and_stores_attachments(self):
+        """Test replies across write batches join their thread and attachments are archived"""
+        archive = io.BytesIO(mbox_bytes(9, thread_size=3, attachment_bytes=100))
+
+        report = import_archive(archive, self.inbox, self.tenant)
+
+        self.assertEqual(
+            (report["parsed"], report["stored"], report["failed"]), (9, 9, 0)
+        )
+        self.assertGreater(report["messages_per_second"], 0)
+        self.assertEqual(
+            Conversation.objects.filter(shared_inbox_id=self.inbox.id).count(), 3
+        )
+        for conversation in Conversation.objects.all():
+            self.assertEqual(conversation.messages.count(), 3)
+            self.assertEqual(conversation.channel, "email")
+        message = Message.objects.get(message_id="<m4@import.example.com>")
+        self.assertEqual(message.attachments.get().filename, "file4.bin")
+        self.assertTrue(message.raw_mime_sha256)
+        self.assertEqual(Attachment.objects.count(), 9)
+
+    def test_reimport_skips_stored_messages(self):
+        """Test importing the same archive twice stores nothing new"""
+        archive = mbox_bytes(6, thread_size=2)
+        import_archive(io.BytesIO(archive), self.inbox, self.tenant)
+
+        report = import_archive(io.BytesIO(archive), self.inbox, self.tenant)
+
+        self.assertEqual((report["parsed"], report["stored"]), (6, 0))
+        self.assertEqual(Message.objects.count(), 6)
+
+    def test_upload_endpoint_queues_import(self):
+        """Test an uploaded archive is kept in the blob store and imported by the worker"""
+        client = APIClient(HTTP_HOST=self.domain.domain)
+        client.force_authenticate(user=create_test_user(email="agent@example.com"))
+        url = f"/api/inbox/inboxes/{self.inbox.id}/import/"
+        upload = SimpleUploadedFile(
+            "export.mbox", mbox_bytes(5), content_type="application/mbox"
+        )
+
+        response = client.post(url, {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(
+            (response.data["filename"], response.data["status"]),
+            ("export.mbox", "pending"),
+        )
+
+        self.assertEqual(process_mail_imports(self.tenant), (1, 0))
+        mail_import = MailImport.objects.get()
+        self.assertEqual(
+            (mail_import.status, mail_import.messages_stored),
+            (MailImport.STATUS_DONE, 5),
+        )
+        self.assertEqual(client.get(url).data[0]["messagesStored"], 5)
+
+    def test_upload_requires_a_file(self):
+        """Test a POST without an archive is rejected"""
+        client = APIClient(HTTP_HOST=self.domain.domain)
+        client.force_authenticate(user=create_test_user(email="agent@example.com"))
+
+        response = client.post(
+            f"/api/inbox/inboxes/{self.inbox.id}/import/", {}, format="multipart"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
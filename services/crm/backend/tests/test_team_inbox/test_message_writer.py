@@ -0,0 +1,208 @@
+"""
+Tests for the shared batch message writer
+"""
+
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
+from django_tenants.test.cases import TenantTestCase
+
+from apps.team_inbox.models import ChannelAccount, Conversation, Inbox, Message
+from apps.team_inbox.services.email_parsing import (
+    normalize_gmail_message,
+    normalize_outlook_message,
+)
+from apps.team_inbox.services.message_writer import write_message_batch
+from tests.utils.fake_gmail import make_gmail_message
+
+BASE_TIME = datetime(2025, 1, 1, 9, 0, tzinfo=UTC)
+
+
+def normalized(
+    message_id, thread_id=None, minutes=0, in_reply_to=None, references=None
+):
+    return {
+        "message_id": message_id,
+        "thread_id": thread_id,
+        "in_reply_to": in_reply_to,
+        "references": references,
+        "subject": f"Subject {message_id}",
+        "from_email": {"name": "Customer", "email": "customer@example.com"},
+        "to": [{"name": "", "email": "support@example.com"}],
+        "cc": None,
+        "bcc": None,
+        "reply_to": None,
+        "content": "Hello",
+        "html_content": "Hello",
+        "timestamp": BASE_TIME + timedelta(minutes=minutes),
+    }
+
+
+@patch("apps.team_inbox.services.message_writer.publish_message_events")
+class MessageWriterTest(TenantTestCase):
+    """Test batch dedup, threading and conversation updates"""
+
+    def setUp(self):
+        super().setUp()
+        self.inbox = Inbox.objects.create(name="Support")
+        self.account = ChannelAccount.objects.create(
+            identifier="support@example.com",
+            provider="gmail",
+            access_token="token",
+            inbox=self.inbox,
+        )
+
+    def test_batch_uses_fixed_number_of_queries(self, broadcast):
+        """Test query count does not grow with batch size"""
+        batch = [
+            normalized(f"<m{i}@x>", thread_id=f"t{i % 10}", minutes=i)
+            for i in range(100)
+        ]
+
+        # dedup, thread key lookup, rules stamp, conversations, messages, inserted check,
+        # bodies, bulk_update, thread keys, plus savepoint/release for the atomic block
+        with self.assertNumQueries(11):
+            stored = write_message_batch(self.account, self.tenant, batch)
+
+        self.assertEqual(len(stored), 100)
+        self.assertEqual(Conversation.objects.count(), 10)
+        self.assertEqual(broadcast.call_count, 1)
+        self.assertEqual(len(broadcast.call_args.args[1]), 100)
+
+    def test_existing_and_repeated_messages_are_skipped(self, broadcast):
+        """Test already stored and in-batch duplicate message_ids are dropped"""
+        write_message_batch(
+            self.account, self.tenant, [normalized("<a@x>", thread_id="t1")]
+        )
+
+        stored = write_message_batch(
+            self.account,
+            self.tenant,
+            [
+                normalized("<a@x>", thread_id="t1"),
+                normalized("<b@x>", thread_id="t1", minutes=1),
+                normalized("<b@x>", thread_id="t1", minutes=1),
+            ],
+        )
+
+        self.assertEqual([m.message_id for m in stored], ["<b@x>"])
+        self.assertEqual(Message.objects.count(), 2)
+
+    def test_threads_by_thread_id_and_references(self, broadcast):
+        """Test replies join existing and same-batch conversations"""
+        write_message_batch(
+            self.account, self.tenant, [normalized("<root@x>", thread_id="gmail-1")]
+        )
+        root = Conversation.objects.get()
+
+        write_message_batch(
+            self.account,
+            self.tenant,
+            [
+                normalized(
+                    "<reply@x>",
+                    thread_id="other-client",
+                    minutes=2,
+                    in_reply_to="<root@x>",
+                ),
+                normalized("<new@x>", thread_id="gmail-2", minutes=3),
+                normalized("<new-reply@x>", minutes=4, references=["<new@x>"]),
+            ],
+        )
+
+        self.assertEqual(
+            Message.objects.get(message_id="<reply@x>").conversation_id, root.id
+        )
+        new_conversation = Message.objects.get(message_id="<new@x>").conversation_id
+        self.assertEqual(
+            Message.objects.get(message_id="<new-reply@x>").conversation_id,
+            new_conversation,
+        )
+        self.assertEqual(Conversation.objects.count(), 2)
+
+    def test_last_message_updated_to_latest(self, broadcast):
+        """Test last_activity/last_message follow the newest message only"""
+        write_message_batch(
+            self.account,
+            self.tenant,
+            [normalized("<late@x>", thread_id="t1", minutes=30)],
+        )
+
+        write_message_batch(
+            self.account,
+            self.tenant,
+            [
+                normalized("<early@x>", thread_id="t1", minutes=5),
+                normalized("<latest@x>", thread_id="t1", minutes=60),
+                normalized("<middle@x>", thread_id="t1", minutes=45),
+            ],
+        )
+
+        conversation = Conversation.objects.get()
+        self.assertEqual(conversation.last_message.message_id, "<latest@x>")
+        self.assertEqual(conversation.last_activity, BASE_TIME + timedelta(minutes=60))
+
+    def test_provider_normalizers_feed_the_writer(self, broadcast):
+        """Test Gmail and Outlook payloads store through the same path"""
+        gmail = normalize_gmail_message(make_gmail_message("g1", thread_id="thread-g"))
+        outlook = normalize_outlook_message(
+            {
+                "id": "AAMk1",
+                "internetMessageId": "<o1@outlook.com>",
+                "conversationId": "thread-o",
+                "subject": "Outlook hello",
+                "from": {
+                    "emailAddress": {"address": "sender@example.com", "name": "Sender"}
+                },
+                "toRecipients": [
+                    {"emailAddress": {"address": "support@example.com", "name": ""}}
+                ],
+                "bodyPreview": "Hi",
+                "body": {"content": "<p>Hi</p>"},
+                "receivedDateTime": "2025-01-01T10:00:00Z",
+            }
+        )
+
+        stored = write_message_batch(self.account, self.tenant, [gmail, outlook])
+
+        self.assertEqual(
+            {m.message_id for m in stored},
+            {"<g1@mail.example.com>", "<o1@outlook.com>"},
+        )
+        self.assertEqual(
+            set(Conversation.objects.values_list("thread_id", flat=True)),
+            {"thread-g", "thread-o"},
+        )
+
+    def test_long_header_values_do_not_fail_the_batch(self, broadcast):
+        """Test oversized subjects and message ids are truncated to fit their columns"""
+        long_id = "<" + "x" * 300 + "@mail.example.com>"
+        gmail = normalize_gmail_message(
+            make_gmail_message(
+                "g1",
+                subject="S" * 400,
+                headers={"Message-ID": long_id, "In-Reply-To": long_id},
+            )
+        )
+        outlook = normalize_outlook_message(
+            {
+                "id": "AAMk1",
+                "internetMessageId": long_id.replace("x", "y"),
+                "subject": "O" * 400,
+                "internetMessageHeaders": [{"name": "In-Reply-To", "value": long_id}],
+                "from": {
+                    "emailAddress": {"address": "sender@example.com", "name": "Sender"}
+                },
+                "receivedDateTime": "2025-01-01T10:00:00Z",
+            }
+        )
+
+        stored = write_message_batch(
+            self.account, self.tenant, [gmail, outlook, normalized("<ok@x>")]
+        )
+
+        self.assertEqual(len(stored), 3)
+        self.assertEqual(
+            Message.objects.get(subject="S" * 255).message_id, long_id[:255]
+        )
+        self.assertTrue(Message.objects.filter(subject="O" * 255).exists())
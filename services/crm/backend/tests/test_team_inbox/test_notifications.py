@@ -0,0 +1,122 @@
+"""
+Tests for batched notifications, unread counters and retention
+"""
+
+import uuid
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.team_inbox.models import Inbox, Message, Notification
+from apps.team_inbox.services.notifications import (
+    create_notifications,
+    purge_notifications,
+    unread_count,
+)
+from tests.utils.helpers import create_test_user
+
+
+class NotificationFanOutTest(TenantTestCase):
+    """Test mention fan-out and the unread-count endpoint"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.author = create_test_user(email="author@example.com")
+        self.mentioned = [
+            create_test_user(email=f"agent{i}@example.com") for i in range(3)
+        ]
+        inbox = Inbox.objects.create(name="Support")
+        self.message = Message.objects.create(
+            inbox=inbox,
+            message_id="<m@x>",
+            subject="Hello",
+            from_email={"name": "Customer", "email": "customer@example.com"},
+            to=[],
+            content="Hi",
+            timestamp=timezone.now(),
+        )
+        self.client = APIClient(HTTP_HOST=self.domain.domain)
+
+    @patch("apps.team_inbox.services.notifications.send_notifications")
+    def test_comment_mentions_are_bulk_created_and_sent_once(self, send):
+        """Test every mention is inserted together and pushed in one call"""
+        self.client.force_authenticate(user=self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/inbox/comments/",
+                {
+                    "message": str(self.message.id),
+                    "content": "Look at this",
+                    "mentions": [str(u.id) for u in self.mentioned],
+                },
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Notification.objects.filter(type="comment_mention").count(), 3)
+        send.assert_called_once()
+        self.assertEqual(len(send.call_args.args[0]), 3)
+
+    @patch("apps.team_inbox.services.notifications.send_notifications")
+    def test_unread_count_is_maintained_incrementally(self, send):
+        """Test counters follow creates and reads without recounting"""
+        user = self.mentioned[0]
+        self.client.force_authenticate(user=user)
+        self.assertEqual(unread_count(user.id), 0)  # primes the counter
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_notifications([user], "comment_mention", self.message.id, {})
+            (notification,) = create_notifications(
+                [user], "comment_mention", self.message.id, {}
+            )
+
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_count(user.id), 2)
+
+        self.client.post(f"/api/inbox/notifications/{notification.id}/mark_read/")
+        self.client.post(f"/api/inbox/notifications/{notification.id}/mark_read/")
+        response = self.client.get("/api/inbox/notifications/unread_count/")
+        self.assertEqual(response.data, {"unread_count": 1})
+
+        self.client.post("/api/inbox/notifications/mark_all_read/")
+        response = self.client.get("/api/inbox/notifications/unread_count/")
+        self.assertEqual(response.data, {"unread_count": 0})
+
+
+class NotificationRetentionTest(TenantTestCase):
+    """Test the retention job"""
+
+    def test_purge_keeps_recent_and_unread(self):
+        """Test old read rows go first and unread rows get the longer window"""
+        cache.clear()
+        user = create_test_user(email="agent@example.com")
+        now = timezone.now()
+        rows = {}
+        for name, age, is_read in [
+            ("recent_read", 10, True),
+            ("old_read", 100, True),
+            ("old_unread", 100, False),
+            ("ancient_unread", 400, False),
+        ]:
+            rows[name] = Notification.objects.create(
+                user=user,
+                type="comment_mention",
+                object_id=uuid.uuid4(),
+                is_read=is_read,
+            )
+            Notification.objects.filter(pk=rows[name].pk).update(
+                created_at=now - timedelta(days=age)
+            )
+
+        deleted = purge_notifications(read_days=90, unread_days=365, batch_size=1)
+
+        self.assertEqual(deleted, 2)
+        remaining = set(Notification.objects.values_list("id", flat=True))
+        self.assertEqual(remaining, {rows["recent_read"].id, rows["old_unread"].id})
+        self.assertEqual(unread_count(user.id), 1)
@@ -0,0 +1,210 @@
+"""
+Tests for the outbound mail queue and pooled SMTP sessions
+"""
+
+import socket
+from email.mime.text import MIMEText
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.team_inbox.models import ChannelAccount, Inbox, Message, OutboundEmail
+from apps.team_inbox.services.outbox import (
+    OutboxNotConfigured,
+    enqueue_email,
+    process_outbox,
+)
+from apps.team_inbox.services.smtp_pool import SMTPConnectionPool
+from tests.utils.helpers import create_test_user
+from tests.utils.smtp_sink import SMTPSink
+
+
+def mime(subject="Hello"):
+    msg = MIMEText("Body")
+    msg["Subject"] = subject
+    return msg
+
+
+class SMTPConnectionPoolTest(SimpleTestCase):
+    """Test session reuse against the local sink"""
+
+    def setUp(self):
+        self.sink = SMTPSink().__enter__()
+        self.addCleanup(self.sink.__exit__)
+        self.pool = SMTPConnectionPool(
+            host=self.sink.host,
+            port=self.sink.port,
+            user="",
+            password="",
+            use_tls=False,
+            timeout=5,
+            max_idle=1,
+            idle_seconds=30,
+            max_messages=100,
+        )
+        self.addCleanup(self.pool.close)
+
+    def test_messages_share_one_session(self):
+        """Test consecutive sends reuse the relay session"""
+        for i in range(5):
+            self.pool.send(
+                "teams@example.com", ["a@example.com"], mime(f"m{i}").as_bytes()
+            )
+
+        self.assertEqual(len(self.sink.messages), 5)
+        self.assertEqual(self.sink.connections, 1)
+
+    def test_dead_session_is_replaced(self):
+        """Test a session the relay dropped is reopened transparently"""
+        self.pool.send("teams@example.com", ["a@example.com"], mime().as_bytes())
+        self.pool.idle[0].smtp.sock.shutdown(
+            socket.SHUT_RDWR
+        )  # relay went away while idle
+
+        self.pool.send("teams@example.com", ["a@example.com"], mime().as_bytes())
+
+        self.assertEqual(len(self.sink.messages), 2)
+        self.assertEqual(self.pool.opened, 2)
+
+
+@override_settings(INBOX_OUTBOX_TENANT_RATE_PER_MINUTE=3, INBOX_OUTBOX_MAX_ATTEMPTS=3)
+class OutboxTest(TenantTestCase):
+    """Test queueing, delivery status, retries and the tenant throttle"""
+
+    def setUp(self):
+        super().setUp()
+        self.sink = SMTPSink().__enter__()
+        self.addCleanup(self.sink.__exit__)
+        self.pool = SMTPConnectionPool(
+            host=self.sink.host,
+            port=self.sink.port,
+            user="",
+            password="",
+            use_tls=False,
+            timeout=5,
+        )
+        self.addCleanup(self.pool.close)
+        relay = override_settings(**self.sink.settings())
+        relay.enable()
+        self.addCleanup(relay.disable)
+        self.inbox = Inbox.objects.create(name="Support")
+        patcher = patch("apps.team_inbox.services.outbox.publish_inbox_events")
+        self.publish = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def outgoing_message(self, index=0):
+        return Message.objects.create(
+            inbox=self.inbox,
+            message_id=f"<out-{index}@x>",
+            subject="Re: Hello",
+            from_email="support@example.com",
+            to=["customer@example.com"],
+            content="Thanks",
+            timestamp=timezone.now(),
+            source="outgoing",
+        )
+
+    def test_reply_returns_queued_and_worker_sends(self):
+        """Test the API only queues, and the worker delivers and reports status"""
+        ChannelAccount.objects.create(
+            provider="gmail",
+            identifier="support@example.com",
+            inbox=self.inbox,
+        )
+        client = APIClient(HTTP_HOST=self.domain.domain)
+        client.force_authenticate(user=create_test_user(email="agent@example.com"))
+
+        with patch("apps.team_inbox.views.message_view.publish_message_events"):
+            response = client.post(
+                "/api/inbox/messages/",
+                {
+                    "subject": "Hello",
+                    "from_": {"email": "support@example.com"},
+                    "to": [{"email": "customer@example.com"}],
+                    "content": "Hi there",
+                },
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["message"]["deliveryStatus"], "queued")
+        self.assertEqual(self.sink.messages, [])
+
+        self.assertEqual(process_outbox(SimpleNamespace(id=1), pool=self.pool), (1, 0))
+
+        self.assertEqual(self.sink.messages[0][1], ["customer@example.com"])
+        message = Message.objects.get(pk=response.data["message"]["id"])
+        self.assertEqual(message.delivery_status, Message.DELIVERY_SENT)
+        (event,) = self.publish.call_args.args[1]
+        self.assertEqual(
+            (event["event"], event["status"]), ("message.delivery", "sent")
+        )
+
+    def test_outbox_disabled_without_relay(self):
+        """Test nothing is queued while SMTP_SERVER or SMTP_USER is unset"""
+        ChannelAccount.objects.create(
+            provider="gmail",
+            identifier="support@example.com",
+            inbox=self.inbox,
+        )
+        client = APIClient(HTTP_HOST=self.domain.domain)
+        client.force_authenticate(user=create_test_user(email="agent@example.com"))
+
+        with self.settings(SMTP_SERVER="", SMTP_USER=""):
+            response = client.post(
+                "/api/inbox/messages/",
+                {
+                    "subject": "Hello",
+                    "from_": {"email": "support@example.com"},
+                    "to": [{"email": "customer@example.com"}],
+                    "content": "Hi there",
+                },
+                format="json",
+            )
+            with self.assertRaises(OutboxNotConfigured):
+                enqueue_email(mime(), ["customer@example.com"])
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(Message.objects.exists())
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_temporary_failure_retries_with_backoff(self):
+        """Test a 4xx reply leaves the message pending for a later attempt"""
+        self.sink.rcpt_responses["busy@example.com"] = "451 Try again later"
+        enqueue_email(mime(), ["busy@example.com"], message=self.outgoing_message())
+
+        self.assertEqual(process_outbox(SimpleNamespace(id=1), pool=self.pool), (0, 1))
+
+        outbound = OutboundEmail.objects.get()
+        self.assertEqual(outbound.status, OutboundEmail.STATUS_PENDING)
+        self.assertGreater(outbound.available_at, timezone.now())
+        self.assertEqual(outbound.message.delivery_status, Message.DELIVERY_QUEUED)
+
+    def test_permanent_failure_is_not_retried(self):
+        """Test a 5xx rejection fails the message at once"""
+        self.sink.rcpt_responses["nobody@example.com"] = "550 No such user"
+        enqueue_email(mime(), ["nobody@example.com"], message=self.outgoing_message())
+
+        process_outbox(SimpleNamespace(id=1), pool=self.pool)
+
+        outbound = OutboundEmail.objects.get()
+        self.assertEqual(outbound.status, OutboundEmail.STATUS_FAILED)
+        self.assertEqual(outbound.attempts, 1)
+        self.assertEqual(outbound.message.delivery_status, Message.DELIVERY_FAILED)
+
+    def test_tenant_throttle(self):
+        """Test a pass sends no more than the tenant's per-minute budget"""
+        for _ in range(5):
+            enqueue_email(mime(), ["customer@example.com"])
+
+        self.assertEqual(process_outbox(SimpleNamespace(id=1), pool=self.pool), (3, 0))
+        self.assertEqual(process_outbox(SimpleNamespace(id=1), pool=self.pool), (0, 0))
+        self.assertEqual(
+            OutboundEmail.objects.filter(status=OutboundEmail.STATUS_PENDING).count(), 2
+        )
+        self.assertEqual(self.sink.connections, 1)
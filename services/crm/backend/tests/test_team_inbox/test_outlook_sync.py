@@ -0,0 +1,321 @@
+"""
+Tests for the Outlook delta sync, $batch fetching and subscription renewal
+"""
+
+import json
+import uuid
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+from django_tenants.utils import schema_context
+
+from apps.core.models import TenantEmailMapping
+from apps.team_inbox.models import ChannelAccount, Inbox, IngestJob, Message
+from apps.team_inbox.services.ingest_queue import (
+    enqueue_ingest_job,
+    process_available_jobs,
+)
+from apps.team_inbox.services.outlook_service import GraphApiError, OutlookService
+from apps.team_inbox.services.outlook_sync import (
+    renew_outlook_subscriptions,
+    sync_outlook_mailbox,
+)
+from apps.team_inbox.views.views import outlook_notify
+from tests.utils.fake_graph import FakeGraphServer
+
+
+class GraphServerMixin:
+    def start_graph(self):
+        self.graph = FakeGraphServer().start()
+        self.addCleanup(self.graph.stop)
+        override = override_settings(
+            OUTLOOK_GRAPH_BASE_URL=self.graph.base_url, INBOX_ARCHIVE_RAW_MIME=False
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class GraphBatchTest(GraphServerMixin, SimpleTestCase):
+    """Test $batch fetching and delta paging against the local Graph stand-in"""
+
+    def setUp(self):
+        self.start_graph()
+        account = SimpleNamespace(
+            pk=uuid.uuid4(),
+            provider="outlook",
+            access_token="token",
+            refresh_token=None,
+            expires_in=None,
+            token_acquired_at=timezone.now(),
+        )
+        self.service = OutlookService(account)
+
+    def test_messages_are_fetched_twenty_per_batch(self):
+        """Test 45 messages take three $batch round trips"""
+        ids = [m["id"] for m in self.graph.add_messages(45)]
+
+        messages, failed = self.service.batch_get_messages(ids)
+
+        self.assertEqual(len(messages), 45)
+        self.assertEqual(failed, [])
+        self.assertEqual(self.graph.batch_sizes, [20, 20, 5])
+
+    def test_throttled_items_are_retried(self):
+        """Test 429 sub-responses are fetched again and permanent errors reported"""
+        ids = [m["id"] for m in self.graph.add_messages(5)]
+        self.graph.fail_with(ids[1], status=429, times=2)
+        self.graph.fail_with(ids[3], status=403)
+
+        messages, failed = self.service.batch_get_messages(ids)
+
+        self.assertEqual(set(messages), set(ids) - {ids[3]})
+        self.assertEqual(failed, [ids[3]])
+        self.assertEqual(self.graph.batch_sizes, [5, 1, 1])
+
+    def test_delta_pages_end_in_a_delta_link(self):
+        """Test next links page through the log and the last page carries the delta link"""
+        self.graph.add_messages(25)
+        page = self.service.delta_page(
+            self.service.initial_delta_url(timezone.now()), page_size=10
+        )
+        pages = [page]
+        while "@odata.nextLink" in page:
+            page = self.service.delta_page(page["@odata.nextLink"], page_size=10)
+            pages.append(page)
+
+        self.assertEqual([len(p["value"]) for p in pages], [10, 10, 5])
+        self.assertIn("deltatoken=25", pages[-1]["@odata.deltaLink"])
+
+    def test_expired_sync_state(self):
+        """Test an expired delta token surfaces as a 410"""
+        self.graph.expired_before = 10
+        url = f"{self.graph.base_url}/me/mailFolders('inbox')/messages/delta?$deltatoken=3"
+
+        with self.assertRaises(GraphApiError) as raised:
+            self.service.delta_page(url)
+        self.assertEqual(raised.exception.status, 410)
+
+
+@patch("apps.team_inbox.services.message_writer.publish_message_events")
+@override_settings(
+    OUTLOOK_DELTA_PAGE_SIZE=10,
+    OUTLOOK_DELTA_MAX_PAGES=2,
+    INBOX_INGEST_DEBOUNCE_SECONDS=0,
+)
+class OutlookSyncTest(GraphServerMixin, TenantTestCase):
+    """Test delta checkpoints, bounded catch-up and gap recovery"""
+
+    def setUp(self):
+        super().setUp()
+        self.start_graph()
+        self.inbox = Inbox.objects.create(name="Support")
+        self.account = ChannelAccount.objects.create(
+            identifier="support@example.com",
+            provider="outlook",
+            access_token="token",
+            inbox=self.inbox,
+        )
+
+    def test_sync_stores_messages_and_checkpoints(self, broadcast):
+        """Test new mail is stored once and the delta link moves forward"""
+        self.graph.add_messages(15)
+
+        self.assertEqual(sync_outlook_mailbox(self.account, self.tenant), 15)
+        self.assertIn("deltatoken=15", self.account.delta_link)
+
+        self.graph.add_messages(3)
+        self.assertEqual(sync_outlook_mailbox(self.account, self.tenant), 3)
+        self.assertEqual(Message.objects.count(), 18)
+        self.assertEqual(max(self.graph.batch_sizes), 10)
+
+    def test_catch_up_runs_in_bounded_work_units(self, broadcast):
+        """Test a long backlog is split into page-bounded jobs that resume from the next link"""
+        self.graph.add_messages(45)
+
+        self.assertEqual(sync_outlook_mailbox(self.account, self.tenant), 20)
+        self.account.refresh_from_db()
+        self.assertIn("skiptoken=20", self.account.delta_link)
+        self.assertEqual(
+            IngestJob.objects.filter(channel_account=self.account).count(), 1
+        )
+
+        self.assertEqual(sync_outlook_mailbox(self.account, self.tenant), 20)
+        self.assertEqual(sync_outlook_mailbox(self.account, self.tenant), 5)
+        self.assertIn("deltatoken=45", self.account.delta_link)
+        # Both follow-ups were queued while the first was still pending, so they coalesced
+        follow_up = IngestJob.objects.get(channel_account=self.account)
+        self.assertEqual(follow_up.coalesced, 1)
+
+    def test_already_stored_messages_are_not_fetched(self, broadcast):
+        """Test messages seen in an earlier pass are skipped before $batch"""
+        self.graph.add_messages(5)
+        sync_outlook_mailbox(self.account, self.tenant)
+        self.account.delta_link = None
+
+        self.assertEqual(sync_outlook_mailbox(self.account, self.tenant), 0)
+        self.assertEqual(self.graph.batch_sizes, [5])
+
+    def test_failed_fetch_keeps_checkpoint(self, broadcast):
+        """Test a page is retried whole when a message cannot be fetched"""
+        ids = [m["id"] for m in self.graph.add_messages(5)]
+        self.graph.fail_with(ids[2], status=403)
+
+        with self.assertRaises(GraphApiError):
+            sync_outlook_mailbox(self.account, self.tenant)
+        self.account.refresh_from_db()
+        self.assertIsNone(self.account.delta_link)
+
+        self.assertEqual(sync_outlook_mailbox(self.account, self.tenant), 5)
+
+    def test_expired_delta_token_resyncs(self, broadcast):
+        """Test a 410 restarts the delta query instead of failing the job"""
+        self.graph.add_messages(3)
+        self.account.delta_link = f"{self.graph.base_url}/me/mailFolders('inbox')/messages/delta?$deltatoken=1"
+        self.graph.expired_before = 2
+
+        self.assertEqual(sync_outlook_mailbox(self.account, self.tenant), 3)
+        self.assertIn("deltatoken=3", self.account.delta_link)
+
+    def test_queue_runs_outlook_jobs(self, broadcast):
+        """Test the ingest worker dispatches Outlook jobs to the delta sync"""
+        self.graph.add_messages(2)
+        enqueue_ingest_job(self.account)
+
+        self.assertEqual(process_available_jobs(self.tenant), (1, 0))
+        self.assertEqual(Message.objects.count(), 2)
+
+
+class OutlookSubscriptionTest(GraphServerMixin, TenantTestCase):
+    """Test the renewal scheduler and the webhook"""
+
+    def setUp(self):
+        super().setUp()
+        self.start_graph()
+        self.inbox = Inbox.objects.create(name="Support")
+
+    def outlook_account(self, identifier, subscription_id, expires_in_minutes):
+        return ChannelAccount.objects.create(
+            identifier=identifier,
+            provider="outlook",
+            access_token="token",
+            inbox=self.inbox,
+            subscription_id=subscription_id,
+            subscription_expires_at=timezone.now()
+            + timedelta(minutes=expires_in_minutes),
+        )
+
+    def test_expiring_subscriptions_are_renewed(self):
+        """Test only subscriptions inside the margin are renewed"""
+        expiring = self.outlook_account(
+            "a@example.com", self.graph.add_subscription(30), 30
+        )
+        fresh = self.outlook_account(
+            "b@example.com", self.graph.add_subscription(3000), 3000
+        )
+
+        self.assertEqual(renew_outlook_subscriptions(margin_minutes=60), (1, 0))
+
+        expiring.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertGreater(
+            expiring.subscription_expires_at, timezone.now() + timedelta(days=2)
+        )
+        self.assertLess(
+            fresh.subscription_expires_at, timezone.now() + timedelta(days=2, hours=3)
+        )
+        self.assertFalse(IngestJob.objects.exists())
+
+    def test_lost_subscription_is_recreated_with_catch_up(self):
+        """Test a subscription Graph dropped is recreated and the gap is synced"""
+        account = self.outlook_account("a@example.com", "gone", -10)
+        with schema_context("public"):
+            TenantEmailMapping.objects.create(
+                email=account.identifier, tenant=self.tenant, subscription_id="gone"
+            )
+
+        self.assertEqual(renew_outlook_subscriptions(margin_minutes=60), (1, 0))
+
+        account.refresh_from_db()
+        self.assertIn(account.subscription_id, self.graph.subscriptions)
+        self.assertEqual(IngestJob.objects.get().channel_account, account)
+        with schema_context("public"):
+            mapping = TenantEmailMapping.objects.get(email=account.identifier)
+        self.assertEqual(mapping.subscription_id, account.subscription_id)
+
+    def notify(self, *subscription_ids):
+        """POST a Graph notification the way it arrives: on the public schema"""
+        body = json.dumps(
+            {
+                "value": [
+                    {
+                        "subscriptionId": subscription_id,
+                        "resource": "Users/u/Messages/AAA",
+                    }
+                    for subscription_id in subscription_ids
+                ]
+            }
+        )
+        request = RequestFactory().post(
+            "/api/inbox/outlook/notify/", body, content_type="application/json"
+        )
+        with schema_context("public"):
+            response = outlook_notify(request)
+        self.assertEqual(response.status_code, 202)
+        return json.loads(response.content)["jobs"]
+
+    def test_webhook_resolves_tenant_by_subscription(self):
+        """Test a notification on the public schema is queued in its mailbox's tenant"""
+        account = self.outlook_account("support@example.com", "sub-1", 600)
+        with schema_context("public"):
+            TenantEmailMapping.objects.create(
+                email=account.identifier, tenant=self.tenant, subscription_id="sub-1"
+            )
+
+        self.assertEqual(self.notify("sub-1", "unknown-sub"), 1)
+        self.assertEqual(IngestJob.objects.get().channel_account, account)
+
+    def test_webhook_maps_unrecorded_subscription(self):
+        """Test a subscription missing from the public mapping is found and recorded"""
+        account = self.outlook_account("support@example.com", "sub-1", 600)
+
+        self.assertEqual(self.notify("sub-1"), 1)
+
+        self.assertEqual(IngestJob.objects.get().channel_account, account)
+        with schema_context("public"):
+            mapping = TenantEmailMapping.objects.get(email=account.identifier)
+        self.assertEqual(
+            (mapping.tenant_id, mapping.subscription_id), (self.tenant.pk, "sub-1")
+        )
+
+    def test_webhook_only_records_notification(self):
+        """Test notifications enqueue one job per mailbox without calling Graph"""
+        account = self.outlook_account("support@example.com", "sub-1", 600)
+        with schema_context("public"):
+            TenantEmailMapping.objects.create(
+                email=account.identifier, tenant=self.tenant
+            )
+        body = json.dumps(
+            {
+                "value": [
+                    {"subscriptionId": "sub-1", "resource": "Users/u/Messages/AAA"},
+                    {"subscriptionId": "sub-1", "resource": "Users/u/Messages/BBB"},
+                ]
+            }
+        )
+
+        for _ in range(2):  # Graph redelivers unacknowledged notifications
+            request = RequestFactory().post(
+                "/api/inbox/outlook/notify/", body, content_type="application/json"
+            )
+            with schema_context("public"):
+                response = outlook_notify(request)
+            self.assertEqual(response.status_code, 202)
+
+        job = IngestJob.objects.get()
+        self.assertEqual(job.provider, "outlook")
+        self.assertEqual(job.payload["message_ids"], ["AAA", "BBB"])
+        self.assertEqual(self.graph.requests, [])
@@ -0,0 +1,119 @@
+"""
+Tests for cached provider clients and scheduled token refresh
+"""
+
+import uuid
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+from googleapiclient.discovery_cache import get_static_doc
+
+from apps.team_inbox.models import ChannelAccount, Inbox
+from apps.team_inbox.services import provider_clients
+from apps.team_inbox.services.provider_clients import (
+    get_provider_client,
+    needs_refresh,
+    refresh_expiring_tokens,
+)
+
+
+def account(token="token-1", **kwargs):
+    defaults = {
+        "pk": uuid.uuid4(),
+        "provider": "gmail",
+        "access_token": token,
+        "refresh_token": "refresh",
+        "expires_in": 3600,
+        "token_acquired_at": timezone.now(),
+    }
+    defaults.update(kwargs)
+    return SimpleNamespace(**defaults)
+
+
+class ProviderClientCacheTest(SimpleTestCase):
+    """Test clients are reused per account"""
+
+    def test_client_is_reused_until_the_token_changes(self):
+        """Test one session per account, re-authorized in place on a new token"""
+        mailbox = account()
+        client = get_provider_client(mailbox)
+        self.assertIs(get_provider_client(mailbox), client)
+
+        mailbox.access_token = "token-2"
+        self.assertIs(get_provider_client(mailbox), client)
+        self.assertEqual(client.session.headers["Authorization"], "Bearer token-2")
+
+    def test_discovery_document_is_parsed_once(self):
+        """Test building Gmail resources never re-reads discovery"""
+        with (
+            patch.object(provider_clients, "_gmail_discovery", None),
+            patch(
+                "googleapiclient.discovery_cache.get_static_doc", wraps=get_static_doc
+            ) as doc,
+        ):
+            for _ in range(3):
+                self.assertIsNotNone(
+                    get_provider_client(account()).gmail_service.users()
+                )
+
+        self.assertEqual(doc.call_count, 1)
+
+    def test_needs_refresh(self):
+        """Test the refresh window follows expires_in and token_acquired_at"""
+        acquired = timezone.now() - timedelta(minutes=55)
+        self.assertTrue(needs_refresh(account(token_acquired_at=acquired), margin=600))
+        self.assertFalse(needs_refresh(account(token_acquired_at=acquired), margin=60))
+        self.assertFalse(
+            needs_refresh(
+                account(token_acquired_at=acquired, refresh_token=None), margin=600
+            )
+        )
+        self.assertFalse(needs_refresh(account(expires_in=None), margin=600))
+
+
+class TokenRefreshTest(TenantTestCase):
+    """Test the refresh scheduler pass"""
+
+    def test_only_expiring_tokens_are_refreshed(self):
+        """Test accounts near expiry get new tokens, including rotated refresh tokens"""
+        inbox = Inbox.objects.create(name="Support")
+        expiring = ChannelAccount.objects.create(
+            provider="outlook",
+            identifier="a@example.com",
+            inbox=inbox,
+            access_token="old",
+            refresh_token="refresh-old",
+            expires_in=3600,
+            token_acquired_at=timezone.now() - timedelta(minutes=58),
+        )
+        fresh = ChannelAccount.objects.create(
+            provider="gmail",
+            identifier="b@example.com",
+            inbox=inbox,
+            access_token="current",
+            refresh_token="refresh",
+            expires_in=3600,
+            token_acquired_at=timezone.now(),
+        )
+        response = Mock(status_code=200)
+        response.json.return_value = {
+            "access_token": "new",
+            "expires_in": 3599,
+            "refresh_token": "refresh-new",
+        }
+        session = Mock(post=Mock(return_value=response))
+
+        with patch.object(provider_clients, "oauth_session", return_value=session):
+            self.assertEqual(refresh_expiring_tokens(margin=600), (1, 0))
+
+        self.assertIn("login.microsoftonline.com", session.post.call_args.args[0])
+        expiring.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(
+            (expiring.access_token, expiring.refresh_token), ("new", "refresh-new")
+        )
+        self.assertEqual(fresh.access_token, "current")
@@ -0,0 +1,240 @@
+"""
+Tests for per-inbox WebSocket delta events
+"""
+
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.test import SimpleTestCase, override_settings
+from django_tenants.test.cases import TenantTestCase
+
+from apps.core.ws_auth import WebSocketIdentity
+from apps.team_inbox.consumers import InboxConsumer
+from apps.team_inbox.models import Inbox, TeamMember
+from apps.team_inbox.services.event_log import EventLog, MemoryEventLog
+from apps.team_inbox.services.realtime import (
+    inbox_group,
+    member_inbox_ids,
+    publish_inbox_events,
+)
+from tests.utils.helpers import create_test_user
+
+IN_MEMORY_LAYER = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+MEMORY_EVENT_LOG = "apps.team_inbox.services.event_log.MemoryEventLog"
+
+
+def authenticated(tenant_id, user_id=1):
+    """InboxConsumer app with the scope JWTAuthMiddleware would build."""
+    identity = WebSocketIdentity(
+        SimpleNamespace(id=user_id), SimpleNamespace(id=tenant_id, schema_name="t")
+    )
+    consumer = InboxConsumer.as_asgi()
+
+    async def app(scope, receive, send):
+        return await consumer(dict(scope, identity=identity), receive, send)
+
+    return app
+
+
+def event(inbox_id, conversation_id):
+    return {
+        "event": "message.created",
+        "inboxId": inbox_id,
+        "conversationId": conversation_id,
+    }
+
+
+@override_settings(
+    CHANNEL_LAYERS=IN_MEMORY_LAYER,
+    INBOX_WS_COALESCE_MS=20,
+    INBOX_WS_MAX_EVENTS_PER_FRAME=3,
+    INBOX_EVENT_LOG_BACKEND=MEMORY_EVENT_LOG,
+    INBOX_WS_REPLAY_MAX_EVENTS=10,
+)
+class InboxEventsTest(SimpleTestCase):
+    """Test delta routing and coalescing"""
+
+    def test_publish_sends_one_frame_per_inbox(self):
+        """Test a batch becomes one group_send per inbox, to that inbox only"""
+        layer = get_channel_layer()
+        support = async_to_sync(layer.new_channel)()
+        sales = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(inbox_group(1, "support"), support)
+        async_to_sync(layer.group_add)(inbox_group(1, "sales"), sales)
+
+        publish_inbox_events(
+            SimpleNamespace(id=1),
+            [
+                event("support", "c1"),
+                event("sales", "c2"),
+                event("support", "c3"),
+            ],
+        )
+
+        frame = async_to_sync(layer.receive)(support)
+        self.assertEqual(frame["type"], "inbox_events")
+        self.assertEqual([e["conversationId"] for e in frame["events"]], ["c1", "c3"])
+        frame = async_to_sync(layer.receive)(sales)
+        self.assertEqual([e["conversationId"] for e in frame["events"]], ["c2"])
+        self.assertEqual([e["seq"] for e in frame["events"]], [2])
+
+    @patch("apps.team_inbox.consumers.load_inbox_ids", AsyncMock(return_value=set()))
+    def test_consumer_coalesces_bursts(self):
+        """Test frames arriving within the window reach the socket as one"""
+
+        async def scenario():
+            communicator = WebsocketCommunicator(authenticated(39), "/ws/inbox/")
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            await communicator.receive_from()  # system acknowledgment
+
+            layer = get_channel_layer()
+            for conversation_id in ("c1", "c2"):
+                await layer.group_send(
+                    "tenant_39",
+                    {
+                        "type": "inbox_events",
+                        "events": [event("support", conversation_id)],
+                    },
+                )
+            frame = json.loads(await communicator.receive_from())
+            self.assertEqual(
+                [e["conversationId"] for e in frame["events"]], ["c1", "c2"]
+            )
+
+            # More than INBOX_WS_MAX_EVENTS_PER_FRAME: ask the client to refetch
+            await layer.group_send(
+                "tenant_39",
+                {
+                    "type": "inbox_events",
+                    "events": [event("support", str(i)) for i in range(4)],
+                },
+            )
+            frame = json.loads(await communicator.receive_from())
+            self.assertEqual(
+                frame,
+                {"type": "inbox_events", "overflow": True, "count": 4, "seq": None},
+            )
+            self.assertTrue(await communicator.receive_nothing())
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
+
+    @patch(
+        "apps.team_inbox.consumers.load_inbox_ids", AsyncMock(return_value={"support"})
+    )
+    def test_resume_replays_missed_events(self):
+        """Test a reconnect replays its inboxes' events and skips live duplicates"""
+        tenant = SimpleNamespace(id=40)
+        publish_inbox_events(
+            tenant,
+            [event("support", "c1"), event("sales", "c2"), event("support", "c3")],
+        )
+
+        async def scenario():
+            communicator = WebsocketCommunicator(
+                authenticated(40), "/ws/inbox/?resume_from=1"
+            )
+            await communicator.connect()
+            ack = json.loads(await communicator.receive_from())
+            self.assertEqual(ack["seq"], 3)
+
+            replay = json.loads(await communicator.receive_from())
+            self.assertEqual(replay["type"], "inbox_replay")
+            self.assertEqual(replay["seq"], 3)
+            self.assertEqual(
+                [(e["seq"], e["conversationId"]) for e in replay["events"]], [(3, "c3")]
+            )
+
+            # A live frame overlapping the replay only delivers what's new
+            layer = get_channel_layer()
+            await layer.group_send(
+                inbox_group(40, "support"),
+                {
+                    "type": "inbox_events",
+                    "events": [
+                        dict(event("support", "c3"), seq=3),
+                        dict(event("support", "c4"), seq=4),
+                    ],
+                },
+            )
+            frame = json.loads(await communicator.receive_from())
+            self.assertEqual([e["seq"] for e in frame["events"]], [4])
+            self.assertEqual(frame["seq"], 4)
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
+
+    @patch(
+        "apps.team_inbox.consumers.load_inbox_ids", AsyncMock(return_value={"support"})
+    )
+    def test_resume_past_the_replay_limit_requires_resync(self):
+        """Test a gap larger than INBOX_WS_REPLAY_MAX_EVENTS asks for a full resync"""
+        publish_inbox_events(
+            SimpleNamespace(id=41), [event("support", str(i)) for i in range(12)]
+        )
+
+        async def scenario():
+            communicator = WebsocketCommunicator(
+                authenticated(41), "/ws/inbox/?resume_from=0"
+            )
+            await communicator.connect()
+            await communicator.receive_from()
+            frame = json.loads(await communicator.receive_from())
+            self.assertEqual(frame, {"type": "resync_required", "seq": 12})
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
+
+
+class MemoryEventLogTest(SimpleTestCase):
+    """Test sequence numbers and replay windows"""
+
+    def test_sequences_are_per_tenant(self):
+        """Test each tenant counts from 1"""
+        log = MemoryEventLog(max_events=10)
+        log.append(1, [{}, {}])
+        self.assertEqual([e["seq"] for e in log.append(1, [{}])], [3])
+        self.assertEqual([e["seq"] for e in log.append(2, [{}])], [1])
+        self.assertEqual(log.last_seq(1), 3)
+
+    def test_read_since(self):
+        """Test replay is refused once the ring buffer has dropped events"""
+        log = MemoryEventLog(max_events=3)
+        log.append(1, [{"n": i} for i in range(5)])
+
+        self.assertEqual([e["seq"] for e in log.read_since(1, 2, limit=10)], [3, 4, 5])
+        self.assertEqual(log.read_since(1, 5, limit=10), [])
+        self.assertIsNone(log.read_since(1, 1, limit=10))  # seq 2 was evicted
+        self.assertIsNone(log.read_since(1, 2, limit=2))  # more than the limit
+        self.assertIsNone(log.read_since(1, 9, limit=10))  # from before a log reset
+
+    def test_incomplete_backend_fails_at_construction(self):
+        """Test a backend missing part of the interface cannot be built"""
+
+        class AppendOnlyLog(EventLog):
+            def append(self, tenant_id, events):
+                return events
+
+        with self.assertRaises(TypeError):
+            AppendOnlyLog()
+
+
+class MemberInboxesTest(TenantTestCase):
+    """Test which inbox groups a user joins"""
+
+    def test_agents_get_assigned_inboxes_admins_get_all(self):
+        """Test agents join their assigned inboxes and admins every inbox"""
+        support = Inbox.objects.create(name="Support")
+        Inbox.objects.create(name="Sales")
+        agent = create_test_user(email="agent@example.com")
+        admin = create_test_user(email="admin@example.com")
+        TeamMember.objects.create(user=agent, role="agent").team_inboxes.set([support])
+        TeamMember.objects.create(user=admin, role="admin")
+
+        self.assertEqual(member_inbox_ids(agent.id), [str(support.id)])
+        self.assertEqual(len(member_inbox_ids(admin.id)), 2)
@@ -0,0 +1,85 @@
+"""
+Tests for ThreadKey-based conversation resolution
+"""
+
+from django.utils import timezone
+from django_tenants.test.cases import TenantTestCase
+
+from apps.team_inbox.models import Conversation, ThreadKey
+from apps.team_inbox.services.thread_index import index_messages, resolve_conversation
+
+
+class ThreadIndexTest(TenantTestCase):
+    """Test thread key indexing and the shared resolver"""
+
+    def make_conversation(self, thread_id):
+        return Conversation.objects.create(
+            thread_id=thread_id, subject="Hello", last_activity=timezone.now()
+        )
+
+    def test_index_records_message_reference_and_thread_keys(self):
+        """Test a stored message claims its Message-ID, References and thread id"""
+        conversation = self.make_conversation("gmail-1")
+
+        index_messages(
+            [
+                (
+                    conversation,
+                    {
+                        "message_id": "<m2@x>",
+                        "thread_id": "gmail-1",
+                        "references": ["<m0@x>", "<m1@x>"],
+                    },
+                )
+            ]
+        )
+
+        self.assertEqual(
+            set(ThreadKey.objects.values_list("kind", "key")),
+            {
+                ("thread", "gmail-1"),
+                ("message_id", "<m2@x>"),
+                ("message_id", "<m0@x>"),
+                ("message_id", "<m1@x>"),
+            },
+        )
+
+    def test_resolves_by_thread_then_reply_then_references(self):
+        """Test candidates are tried in priority order across providers"""
+        gmail = self.make_conversation("gmail-1")
+        smtp = self.make_conversation("smtp-1")
+        index_messages(
+            [
+                (gmail, {"message_id": "<g@x>", "thread_id": "gmail-1"}),
+                (
+                    smtp,
+                    {
+                        "message_id": "<s@x>",
+                        "thread_id": "smtp-1",
+                        "references": ["<root@x>"],
+                    },
+                ),
+            ]
+        )
+
+        self.assertEqual(
+            resolve_conversation(thread_id="gmail-1", in_reply_to="<s@x>"), gmail
+        )
+        self.assertEqual(
+            resolve_conversation(thread_id="outlook-9", in_reply_to="<s@x>"), smtp
+        )
+        # Only ever seen in a References header, never stored as a message
+        self.assertEqual(resolve_conversation(references="<other@x> <root@x>"), smtp)
+        self.assertIsNone(
+            resolve_conversation(thread_id="unknown", in_reply_to="<nope@x>")
+        )
+
+    def test_first_conversation_keeps_a_key(self):
+        """Test a key already claimed is not moved to another conversation"""
+        first = self.make_conversation("t1")
+        second = self.make_conversation("t2")
+
+        index_messages([(first, {"message_id": "<shared@x>"})])
+        index_messages([(second, {"message_id": "<shared@x>"})])
+
+        self.assertEqual(resolve_conversation(in_reply_to="<shared@x>"), first)
@@ -0,0 +1,242 @@
+"""
+Local stand-in for the Gmail REST API, used by tests and benchmarks
+
+Serves users/me/messages (paged), users/me/messages/{id} (format full, metadata
+or raw) and users/me/history from an in-memory mailbox on a background thread. Per-request latency and
+injected 429s let the fetcher's concurrency and retry paths be exercised
+without touching Google.
+
+    with FakeGmailServer(latency=0.05) as server:
+        server.add_messages(200)
+        fetcher = GmailFetcher("token", "user", base_url=server.base_url)
+"""
+
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def make_gmail_message(
+    message_id,
+    thread_id=None,
+    subject=None,
+    body=None,
+    sender="Customer <customer@example.com>",
+    to="support@example.com",
+    internal_date=None,
+    headers=None,
+):
+    """Build a Gmail API message resource (format=full)."""
+    body = body or f"Body of message {message_id}"
+    all_headers = {
+        "Message-ID": f"<{message_id}@mail.example.com>",
+        "Subject": subject or f"Subject {message_id}",
+        "From": sender,
+        "To": to,
+        **(headers or {}),
+    }
+    return {
+        "id": message_id,
+        "threadId": thread_id or message_id,
+        "snippet": body[:100],
+        "internalDate": str(internal_date or int(time.time() * 1000)),
+        "labelIds": ["INBOX", "UNREAD"],
+        "payload": {
+            "mimeType": "text/plain",
+            "headers": [
+                {"name": name, "value": value} for name, value in all_headers.items()
+            ],
+            "body": {"data": base64.urlsafe_b64encode(body.encode()).decode()},
+        },
+    }
+
+
+def render_format(message, fmt):
+    """Shape a format=full message resource as the API returns it for fmt."""
+    if fmt == "metadata":
+        payload = {
+            key: value
+            for key, value in message["payload"].items()
+            if key not in ("body", "parts")
+        }
+        return {**message, "payload": payload}
+    if fmt == "raw":
+        headers = "".join(
+            f"{h['name']}: {h['value']}\r\n" for h in message["payload"]["headers"]
+        )
+        data = message["payload"].get("body", {}).get("data", "")
+        body = base64.urlsafe_b64decode(data + "=" * (-len(data) % 4)) if data else b""
+        raw = (
+            headers.encode()
+            + b"Content-Type: text/plain; charset=utf-8\r\n\r\n"
+            + body
+            + b"\r\n"
+        )
+        resource = {key: value for key, value in message.items() if key != "payload"}
+        return {**resource, "raw": base64.urlsafe_b64encode(raw).decode()}
+    return message
+
+
+class FakeGmailServer:
+    def __init__(self, latency=0.0, history_page_size=100):
+        self.latency = latency
+        self.history_page_size = history_page_size
+        self.messages = {}
+        self.history = []
+        self.history_id = 1000
+        self.expired_before = None
+        self.fail_next = {}
+        self.requests = []
+        self.max_concurrent = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/gmail/v1"
+
+    def add_message(self, message):
+        """Add a message to the mailbox and record a messageAdded history entry."""
+        with self._lock:
+            self.history_id += 1
+            self.messages[message["id"]] = message
+            self.history.append(
+                {
+                    "id": str(self.history_id),
+                    "messagesAdded": [
+                        {
+                            "message": {
+                                "id": message["id"],
+                                "threadId": message["threadId"],
+                            }
+                        }
+                    ],
+                }
+            )
+        return message
+
+    def add_messages(self, count, prefix="msg"):
+        start = len(self.messages)
+        return [
+            self.add_message(make_gmail_message(f"{prefix}{start + i}"))
+            for i in range(count)
+        ]
+
+    def fail_with(self, message_id, status=429, times=1):
+        """Answer the next `times` fetches of message_id with status."""
+        self.fail_next[message_id] = [status] * times
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _history_page(self, params):
+        start = int(params["startHistoryId"][0])
+        if self.expired_before and start < self.expired_before:
+            return 404, {
+                "error": {"code": 404, "message": "Requested entity was not found."}
+            }
+
+        records = [record for record in self.history if int(record["id"]) > start]
+        offset = int(params.get("pageToken", ["0"])[0])
+        page = records[offset : offset + self.history_page_size]
+        body = {"historyId": str(self.history_id)}
+        if page:
+            body["history"] = page
+        if offset + self.history_page_size < len(records):
+            body["nextPageToken"] = str(offset + self.history_page_size)
+        return 200, body
+
+    def _route(self, path, params):
+        parts = path.strip("/").split("/")
+        if parts[:3] != ["gmail", "v1", "users"] or len(parts) < 5:
+            return 404, {"error": {"code": 404}}
+
+        resource = parts[4:]
+        if resource == ["profile"]:
+            return 200, {
+                "emailAddress": parts[3],
+                "messagesTotal": len(self.messages),
+                "historyId": str(self.history_id),
+            }
+        if resource == ["history"]:
+            return self._history_page(params)
+        if resource == ["messages"]:
+            limit = int(params.get("maxResults", ["100"])[0])
+            offset = int(params.get("pageToken", ["0"])[0])
+            newest_first = list(self.messages)[::-1]
+            ids = newest_first[offset : offset + limit]
+            body = {
+                "messages": [
+                    {"id": i, "threadId": self.messages[i]["threadId"]} for i in ids
+                ],
+                "resultSizeEstimate": len(newest_first),
+            }
+            if offset + limit < len(newest_first):
+                body["nextPageToken"] = str(offset + limit)
+            return 200, body
+        if len(resource) == 2 and resource[0] == "messages":
+            message_id = resource[1]
+            failures = self.fail_next.get(message_id)
+            if failures:
+                status = failures.pop(0)
+                return status, {
+                    "error": {"code": status, "message": "Rate limit exceeded"}
+                }
+            message = self.messages.get(message_id)
+            if message is None:
+                return 404, {"error": {"code": 404}}
+            return 200, render_format(message, params.get("format", ["full"])[0])
+        return 404, {"error": {"code": 404}}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server._lock:
+                    server._active += 1
+                    server.max_concurrent = max(server.max_concurrent, server._active)
+                    server.requests.append(self.path)
+                try:
+                    if server.latency:
+                        time.sleep(server.latency)
+                    url = urlparse(self.path)
+                    status, body = server._route(url.path, parse_qs(url.query))
+                finally:
+                    with server._lock:
+                        server._active -= 1
+
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                if status in (429, 503):
+                    self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
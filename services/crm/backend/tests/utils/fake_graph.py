@@ -0,0 +1,295 @@
+"""
+Local stand-in for Microsoft Graph mail, used by tests and benchmarks
+
+Serves the Inbox message listing and delta query, JSON $batch,
+messages/{id}/$value and subscriptions from an in-memory mailbox on a
+background thread. Delta and skip tokens are positions in the mailbox's
+change log, so paging, resuming from a stored link and expired sync state
+(410) can all be exercised without touching Microsoft.
+
+    with FakeGraphServer() as server, override_settings(OUTLOOK_GRAPH_BASE_URL=server.base_url):
+        server.add_messages(45)
+        sync_outlook_mailbox(account, tenant)
+"""
+
+import json
+import re
+import threading
+import time
+import uuid
+from datetime import UTC, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+BATCH_LIMIT = 20
+
+
+def make_graph_message(
+    message_id,
+    conversation_id=None,
+    subject=None,
+    body=None,
+    sender="customer@example.com",
+    to="support@example.com",
+    received=None,
+):
+    """Build a Graph message resource with the fields the sync selects."""
+    body = body or f"Body of message {message_id}"
+    received = received or datetime.now(UTC)
+    return {
+        "id": message_id,
+        "internetMessageId": f"<{message_id}@outlook.example.com>",
+        "conversationId": conversation_id or f"conv-{message_id}",
+        "subject": subject or f"Subject {message_id}",
+        "from": {"emailAddress": {"address": sender, "name": "Customer"}},
+        "toRecipients": [{"emailAddress": {"address": to, "name": ""}}],
+        "ccRecipients": [],
+        "bccRecipients": [],
+        "replyTo": [],
+        "bodyPreview": body[:100],
+        "body": {"contentType": "text", "content": body},
+        "receivedDateTime": received.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "internetMessageHeaders": [],
+    }
+
+
+class FakeGraphServer:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.messages = {}
+        self.changes = []  # message ids in the order they were created
+        self.expired_before = None  # delta/skip tokens below this answer 410
+        self.fail_next = {}
+        self.subscriptions = {}
+        self.requests = []
+        self.batch_sizes = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1.0"
+
+    def add_message(self, message):
+        with self._lock:
+            self.messages[message["id"]] = message
+            self.changes.append(message["id"])
+        return message
+
+    def add_messages(self, count, prefix="msg"):
+        start = len(self.messages)
+        return [
+            self.add_message(make_graph_message(f"{prefix}{start + i}"))
+            for i in range(count)
+        ]
+
+    def fail_with(self, message_id, status=429, times=1):
+        """Answer the next `times` $batch fetches of message_id with status."""
+        self.fail_next[message_id] = [status] * times
+
+    def add_subscription(self, minutes=60):
+        subscription_id = str(uuid.uuid4())
+        self.subscriptions[subscription_id] = self._expiry(minutes)
+        return subscription_id
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @staticmethod
+    def _expiry(minutes):
+        expires = datetime.now(UTC) + timedelta(minutes=minutes)
+        return expires.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def _delta(self, path, params, headers):
+        token = params.get("$skiptoken", params.get("$deltatoken", ["0"]))[0]
+        position = int(token)
+        if (
+            self.expired_before is not None
+            and ("$deltatoken" in params or "$skiptoken" in params)
+            and position < self.expired_before
+        ):
+            return 410, {
+                "error": {"code": "SyncStateNotFound", "message": "Sync state expired"}
+            }
+
+        match = re.search(r"odata\.maxpagesize=(\d+)", headers.get("Prefer", ""))
+        page_size = int(match.group(1)) if match else 10
+        with self._lock:
+            ids = self.changes[position : position + page_size]
+            total = len(self.changes)
+        items = [
+            {"id": i, "internetMessageId": self.messages[i]["internetMessageId"]}
+            for i in ids
+        ]
+
+        link = f"{self.base_url}/me/mailFolders('inbox')/messages/delta?"
+        body = {"value": items}
+        if position + page_size < total:
+            body["@odata.nextLink"] = link + urlencode(
+                {"$skiptoken": position + page_size}
+            )
+        else:
+            body["@odata.deltaLink"] = link + urlencode({"$deltatoken": total})
+        return 200, body
+
+    def _list(self, params):
+        top = int(params.get("$top", ["10"])[0])
+        skip = int(params.get("$skip", ["0"])[0])
+        with self._lock:
+            newest_first = self.changes[::-1]
+        ids = newest_first[skip : skip + top]
+        body = {
+            "value": [
+                {"id": i, "internetMessageId": self.messages[i]["internetMessageId"]}
+                for i in ids
+            ]
+        }
+        if skip + top < len(newest_first):
+            query = urlencode({"$top": top, "$skip": skip + top})
+            body["@odata.nextLink"] = (
+                f"{self.base_url}/me/mailFolders('inbox')/messages?{query}"
+            )
+        return 200, body
+
+    def _batch_item(self, request):
+        match = re.match(r"^/me/messages/([^/?]+)", request.get("url", ""))
+        if request.get("method") != "GET" or not match:
+            return {
+                "id": request["id"],
+                "status": 400,
+                "body": {"error": {"code": "BadRequest"}},
+            }
+
+        message_id = match.group(1)
+        failures = self.fail_next.get(message_id)
+        if failures:
+            status = failures.pop(0)
+            return {
+                "id": request["id"],
+                "status": status,
+                "headers": {"Retry-After": "0"},
+                "body": {"error": {"code": "TooManyRequests"}},
+            }
+        message = self.messages.get(message_id)
+        if message is None:
+            return {
+                "id": request["id"],
+                "status": 404,
+                "body": {"error": {"code": "ErrorItemNotFound"}},
+            }
+        selected = parse_qs(urlparse(request["url"]).query).get("$select")
+        if selected:
+            message = {
+                key: value
+                for key, value in message.items()
+                if key == "id" or key in selected[0].split(",")
+            }
+        return {"id": request["id"], "status": 200, "body": message}
+
+    def _route(self, method, path, params, headers, body):
+        path = path.split("/v1.0", 1)[-1]
+        if method == "GET" and path.endswith("/messages/delta"):
+            return self._delta(path, params, headers)
+        if method == "GET" and path.endswith("/messages") and "mailFolders" in path:
+            return self._list(params)
+        if method == "POST" and path == "/$batch":
+            requests = body.get("requests", [])
+            if len(requests) > BATCH_LIMIT:
+                return 400, {
+                    "error": {
+                        "code": "BadRequest",
+                        "message": "Too many requests in batch",
+                    }
+                }
+            self.batch_sizes.append(len(requests))
+            return 200, {"responses": [self._batch_item(r) for r in requests]}
+        if (
+            method == "GET"
+            and path.startswith("/me/messages/")
+            and path.endswith("/$value")
+        ):
+            message = self.messages.get(path.split("/")[3])
+            if message is None:
+                return 404, {"error": {"code": "ErrorItemNotFound"}}
+            raw = (
+                f"Message-ID: {message['internetMessageId']}\r\nSubject: {message['subject']}\r\n"
+                f"\r\n{message['body']['content']}\r\n"
+            )
+            return 200, raw.encode()
+        if method == "POST" and path == "/subscriptions":
+            subscription_id = self.add_subscription(0)
+            self.subscriptions[subscription_id] = body.get("expirationDateTime")
+            return 201, {
+                "id": subscription_id,
+                "expirationDateTime": self.subscriptions[subscription_id],
+            }
+        if method == "PATCH" and path.startswith("/subscriptions/"):
+            subscription_id = path.split("/")[2]
+            if subscription_id not in self.subscriptions:
+                return 404, {"error": {"code": "ResourceNotFound"}}
+            self.subscriptions[subscription_id] = body.get("expirationDateTime")
+            return 200, {
+                "id": subscription_id,
+                "expirationDateTime": self.subscriptions[subscription_id],
+            }
+        return 404, {"error": {"code": "ResourceNotFound"}}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _dispatch(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+                with server._lock:
+                    server.requests.append((method, self.path))
+                if server.latency:
+                    time.sleep(server.latency)
+                url = urlparse(self.path)
+                status, payload = server._route(
+                    method, url.path, parse_qs(url.query), self.headers, body
+                )
+
+                if isinstance(payload, bytes):
+                    content_type = "message/rfc822"
+                else:
+                    content_type, payload = (
+                        "application/json",
+                        json.dumps(payload).encode(),
+                    )
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_PATCH(self):
+                self._dispatch("PATCH")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,78 @@
+"""
+Generated MBOX archives for import tests and benchmarks
+
+    with open(path, "wb") as archive:
+        write_mbox(archive, count=10_000, thread_size=4, attachment_bytes=20_000)
+
+Every thread_size consecutive messages form one thread: the first starts it
+and the rest reply with In-Reply-To/References. Bodies that contain a
+"From " line are escaped the mboxrd way, as real exporters do.
+"""
+
+import os
+from datetime import UTC, datetime, timedelta
+from email.message import EmailMessage
+from email.utils import format_datetime
+
+START = datetime(2024, 1, 1, tzinfo=UTC)
+
+
+def make_mime(
+    index, thread_size=1, attachment_bytes=0, html=False, domain="import.example.com"
+):
+    """Build message number index of a generated archive as RFC 822 bytes."""
+    thread = index // thread_size
+    position = index % thread_size
+    msg = EmailMessage()
+    msg["Message-ID"] = f"<m{index}@{domain}>"
+    msg["From"] = f"Customer {thread} <customer{thread}@example.com>"
+    msg["To"] = "support@example.com"
+    msg["Subject"] = f"{'Re: ' if position else ''}Order {thread}"
+    msg["Date"] = format_datetime(START + timedelta(minutes=index))
+    if position:
+        first = thread * thread_size
+        msg["In-Reply-To"] = f"<m{index - 1}@{domain}>"
+        msg["References"] = " ".join(f"<m{i}@{domain}>" for i in range(first, index))
+
+    body = (
+        f"Message {index} about order {thread}.\n\nFrom the desk of customer {thread}.\n"
+        * 20
+    )
+    msg.set_content(body)
+    if html:
+        msg.add_alternative(
+            f"<p>Message {index} about <b>order {thread}</b>.</p>", subtype="html"
+        )
+    if attachment_bytes:
+        payload = os.urandom(attachment_bytes)
+        msg.add_attachment(
+            payload,
+            maintype="application",
+            subtype="octet-stream",
+            filename=f"file{index}.bin",
+        )
+    return msg.as_bytes()
+
+
+def mbox_entry(raw, sender="customer@example.com"):
+    """One mboxrd entry: the From_ line, the message with '>From ' escapes, a blank line."""
+    lines = []
+    for line in raw.splitlines(keepends=True):
+        stripped = line.lstrip(b">")
+        if stripped.startswith(b"From "):
+            line = b">" + line
+        lines.append(line)
+    body = b"".join(lines)
+    if not body.endswith(b"\n"):
+        body += b"\n"
+    return b"From " + sender.encode() + b" Mon Jan  1 00:00:00 2024\n" + body + b"\n"
+
+
+def write_mbox(fileobj, count, thread_size=1, attachment_bytes=0, html=False, start=0):
+    """Write count generated messages to a binary file object. Returns bytes written."""
+    written = 0
+    for index in range(start, start + count):
+        entry = mbox_entry(make_mime(index, thread_size, attachment_bytes, html))
+        fileobj.write(entry)
+        written += len(entry)
+    return written
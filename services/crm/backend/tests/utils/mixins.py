@@ -1,7 +1,10 @@
 """
 Test mixins for common functionality
 """
+from contextlib import contextmanager
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django_tenants.test.cases import TenantTestCase
 from django_tenants.test.client import TenantClient
 from rest_framework.test import APIClient, APITestCase
@@ -41,6 +44,15 @@ class TenantTestMixin:
             cls.tenant.delete()
         super().tearDownClass()
 
+    @contextmanager
+    def set_tenant(self, tenant):
+        """Run the block in the tenant's schema, switching back to public after"""
+        connection.set_tenant(tenant)
+        try:
+            yield tenant
+        finally:
+            connection.set_schema_to_public()
+
 
 class RoleTestMixin:
     """Mixin for tests that need role setup"""
@@ -0,0 +1,102 @@
+"""
+Local SMTP sink, used by tests and for running the outbox workers locally
+
+Speaks enough plain SMTP (EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT)
+for smtplib, on a background thread, and records every accepted message
+and every connection. Replies can be scripted to exercise retries.
+
+    with SMTPSink() as sink, override_settings(**sink.settings()):
+        ...
+        sink.messages  # [(mail_from, [rcpt, ...], data_bytes), ...]
+
+Point a development worker at it with SMTP_SERVER=127.0.0.1,
+SMTP_PORT=<port>, SMTP_USE_TLS=false and SMTP_PASS="".
+"""
+
+import socketserver
+import threading
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        sink = self.server.sink
+        with sink.lock:
+            sink.connections += 1
+        self.reply("220 sink ESMTP")
+        mail_from, rcpts = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("latin-1").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.reply("250-sink")
+                self.reply("250 8BITMIME")
+            elif verb == "HELO":
+                self.reply("250 sink")
+            elif verb == "MAIL":
+                mail_from, rcpts = command.split(":", 1)[1].strip().strip("<>"), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                rcpt = command.split(":", 1)[1].strip().strip("<>")
+                response = sink.rcpt_responses.get(rcpt, "250 OK")
+                if response.startswith("250"):
+                    rcpts.append(rcpt)
+                self.reply(response)
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = bytearray()
+                while True:
+                    chunk = self.rfile.readline()
+                    if chunk in (b".\r\n", b""):
+                        break
+                    data += chunk[1:] if chunk.startswith(b"..") else chunk
+                with sink.lock:
+                    sink.messages.append((mail_from, rcpts, bytes(data)))
+                self.reply("250 Queued")
+            elif verb in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Not implemented")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    def __init__(self, host="127.0.0.1", port=0):
+        self.server = _Server((host, port), _Handler)
+        self.server.sink = self
+        self.host, self.port = self.server.server_address
+        self.lock = threading.Lock()
+        self.messages = []
+        self.connections = 0
+        self.rcpt_responses = {}  # recipient -> reply line, e.g. "451 Try later"
+        self.thread = None
+
+    def settings(self):
+        return {
+            "SMTP_SERVER": self.host,
+            "SMTP_PORT": self.port,
+            "SMTP_USE_TLS": False,
+            "SMTP_PASS": "",
+            "SMTP_USER": "teams@example.com",
+        }
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
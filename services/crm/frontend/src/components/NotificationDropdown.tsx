@@ -36,6 +36,8 @@ const getNotificationIcon = (type: Notification['type']) => {
 export const NotificationDropdown: React.FC = () => {
   const [isOpen, setIsOpen] = useState(false)
   const [notifications, setNotifications] = useState<Notification[]>([])
+  // Server-side unread total (the list is only the first page)
+  const [unreadCount, setUnreadCount] = useState(0)
   const { addListener } = useWS()
   const { user, tokens, tenant } = useAuth()
 
@@ -56,6 +58,12 @@ export const NotificationDropdown: React.FC = () => {
         )
         if (!res.ok) throw new Error('Failed to fetch notifications')
         const data = await res.json()
+
+        const countRes = await fetch(`${getApiBaseUrl()}/api/inbox/notifications/unread_count/`, {
+          headers: { Authorization: `Bearer ${tokens.access_token}` }
+        })
+        if (countRes.ok) setUnreadCount((await countRes.json()).unread_count)
+
         setNotifications(
           Array.isArray(data.results)
             ? data.results.map((n: any) => ({
@@ -98,14 +106,16 @@ export const NotificationDropdown: React.FC = () => {
         }
         toast(`🔔 ${newNotification.title}: ${newNotification.message}`, { duration: 5000 })
         setNotifications(prev => [newNotification, ...prev])
+        if (!newNotification.read) setUnreadCount(count => count + 1)
       }
     })
     return unsubscribe
   }, [addListener])
 
-  const unreadCount = notifications.filter(n => !n.read).length
-
   const markAsRead = async (id: string) => {
+    if (notifications.some(n => n.id === id && !n.read)) {
+      setUnreadCount(count => Math.max(0, count - 1))
+    }
     setNotifications(prev => prev.map(n => n.id === id ? { ...n, read: true } : n))
     try {
       await fetch(`${getApiBaseUrl()}/api/inbox/notifications/${id}/mark_read/`, {
@@ -123,8 +133,9 @@ export const NotificationDropdown: React.FC = () => {
   const markAllAsRead = async () => {
     const unreadIds = notifications.filter(n => !n.read).map(n => n.id)
     setNotifications(prev => prev.map(n => ({ ...n, read: true })))
+    setUnreadCount(0)
     try {
-      await fetch(`${getApiBaseUrl()}/api/inbox/notifications/mark-all-read/`, {
+      await fetch(`${getApiBaseUrl()}/api/inbox/notifications/mark_all_read/`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -45,27 +45,55 @@ export function InboxView() {
   const { addListener } = useWS();
 
   useEffect(() => {
-    const unsubscribe = addListener((data) => {
-      if (data.type === "new_conversation" && data.message?.conversation) {
-        const conv = data.message.conversation;
-
-        setConversations((prev) => {
-          const exists = prev.find((c) => c.id === conv.id);
-          if (exists) return prev;
+    // Message deltas carry ids and a snippet; the full conversation is
+    // fetched on demand, once per conversation per frame
+    const get = (path: string) =>
+      fetch(`${getApiBaseUrl()}${path}`, {
+        headers: {
+          Authorization: `Bearer ${tokens?.access_token}`,
+          'Content-Type': 'application/json',
+        },
+      });
 
-          toast.success(`🆕 New conversation: ${conv.subject}`, { duration: 5000 });
-          return [conv, ...prev];
-        });
-      } else if (data.type === "new_message" && data.message?.message) {
-        const msg = data.message.message;
+    const fetchConversation = async (id: string) => {
+      const res = await get(`/api/inbox/conversations/${id}/`);
+      if (!res.ok) return;
+      const conv: Conversation = await res.json();
+      setConversations((prev) => [conv, ...prev.filter((c) => c.id !== conv.id)]);
+      setSelectedConversation((current) => (current?.id === conv.id ? conv : current));
+    };
 
-        handleReplys?.(data);
-        toast.success(`✉️ New message from ${msg.from?.email || "someone"}`);
+    const unsubscribe = addListener((data) => {
+      if (!["inbox_events", "inbox_replay", "resync_required"].includes(data.type)) return;
+      if (data.overflow || data.type === "resync_required") {
+        // Too many events to apply, or a gap replay can't cover: reload the list
+        get(`/api/inbox/conversations/?tenantId=${tenant?.id}`)
+          .then((res) => (res.ok ? res.json() : null))
+          .then((body) => body && setConversations(Array.isArray(body.results) ? body.results : []))
+          .catch((err) => console.error(err));
+        return;
       }
+
+      const events: any[] = data.events || [];
+      const ids = Array.from(new Set(events.map((e) => e.conversationId)));
+      ids.forEach((id) => fetchConversation(id).catch((err) => console.error(err)));
+
+      events.forEach((e) => {
+        if (data.type === "inbox_replay") return;
+        if (e.event === "message.delivery") {
+          if (e.status === "failed") toast.error(`Message could not be sent: ${e.error || "delivery failed"}`);
+          return;
+        }
+        if (e.conversationCreated) {
+          toast.success(`🆕 New conversation: ${e.subject}`, { duration: 5000 });
+        } else if (e.source === "incoming") {
+          toast.success(`✉️ New message from ${e.from?.email || "someone"}`);
+        }
+      });
     });
 
     return unsubscribe;
-  }, [addListener]);
+  }, [addListener, tokens, tenant?.id]);
 
   // useEffect(() => {
   //   if (!tenant?.id || !tokens) return;
@@ -309,24 +337,6 @@ useEffect(() => {
   };
 
 
-  const handleReplys = (data: any) => {
-
-    // Update this conversation in the UI
-    setConversations(prev =>
-      prev.map(conv =>
-        conv.threadId === data.message.threadId
-          ? {
-            ...conv,
-            messages: [...conv.messages, data.message],
-            lastMessage: data.message,
-            lastActivity: new Date(data.message.timestamp),
-            updatedAt: new Date(data.message.timestamp),
-          }
-          : conv
-      )
-    );
-  };
-
   const handleCreateSharedInbox = (inboxData: Partial<SharedInbox>) => {
     // Add shared inbox creation logic here
   };
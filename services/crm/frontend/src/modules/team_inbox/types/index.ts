@@ -93,6 +93,7 @@ export interface Message {
   labels: string[];
   priority: 'low' | 'normal' | 'high' | 'urgent';
   source: 'incoming' | 'outgoing';
+  deliveryStatus?: 'queued' | 'sent' | 'failed' | null;
   inReplyTo?: string;
 
 }
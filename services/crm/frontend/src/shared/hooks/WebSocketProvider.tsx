@@ -18,51 +18,86 @@ const WSContext = createContext<WSContextType | undefined>(undefined);
 export const WebSocketProvider: React.FC<{ children: React.ReactNode }> = ({
   children,
 }) => {
-  const { tenant, user } = useAuth();
+  const { tenant, user, tokens, refreshToken } = useAuth();
   const ws = useRef<WebSocket | null>(null);
+  // Read at connect time, so a reconnect picks up a refreshed token
+  const accessToken = useRef<string | undefined>(tokens?.access_token);
+  accessToken.current = tokens?.access_token;
   const listeners = useRef<((data: any) => void)[]>([]);
   const [ready, setReady] = useState(false);
 
   useEffect(() => {
     if (!tenant?.id || !user?.id) return;
 
-const protocol = window.location.protocol === "https:" ? "wss" : "ws";
-const backendHost = window.location.host; // ? always use current host
-
-console.log("?? window.location", window.location);
-console.log("?? Backend host:", backendHost);
-
-const wsUrl = `${protocol}://${backendHost}/ws/inbox/?tenant=${tenant.id}&user_id=${user.id}`;
-console.log("?? Connecting WebSocket to:", wsUrl);
-
-ws.current = new WebSocket(wsUrl);
-
-    ws.current.onopen = () => {
-      setReady(true);
-      console.log("? WebSocket connected");
-    };
-
-    ws.current.onclose = (event) => {
-      console.warn(`? WebSocket disconnected (code: ${event.code})`);
-      setReady(false);
+    const protocol = window.location.protocol === "https:" ? "wss" : "ws";
+    const backendHost = window.location.host; // ? always use current host
+
+    // Last event sequence seen; sent back as resume_from so a reconnect
+    // replays what was missed instead of reloading everything
+    let lastSeq: number | null = null;
+    let attempt = 0;
+    let reconnectTimer: ReturnType<typeof setTimeout> | undefined;
+    let closed = false;
+
+    const connect = () => {
+      const resume = lastSeq !== null ? `&resume_from=${lastSeq}` : "";
+      // The server resolves the tenant from the host and the user from the token
+      const token = encodeURIComponent(accessToken.current ?? "");
+      const wsUrl = `${protocol}://${backendHost}/ws/inbox/?token=${token}${resume}`;
+      console.log("?? Connecting WebSocket to:", `${protocol}://${backendHost}/ws/inbox/`);
+
+      const socket = new WebSocket(wsUrl);
+      ws.current = socket;
+
+      socket.onopen = () => {
+        attempt = 0;
+        setReady(true);
+        console.log("? WebSocket connected");
+      };
+
+      socket.onclose = (event) => {
+        console.warn(`? WebSocket disconnected (code: ${event.code})`);
+        setReady(false);
+        if (closed) return;
+        if (event.code === 4401) {
+          // Token expired or rejected: refresh it before reconnecting
+          refreshToken().catch((err: unknown) => console.error("?? Token refresh failed:", err));
+        } else if (event.code === 4403) {
+          // Access revoked; don't keep retrying
+          return;
+        }
+        // Jittered backoff so a deploy doesn't reconnect every client at once
+        const delay = Math.min(30000, 1000 * 2 ** attempt) * (0.5 + Math.random());
+        attempt += 1;
+        reconnectTimer = setTimeout(connect, delay);
+      };
+
+      socket.onerror = (error) => {
+        console.error("?? WebSocket error:", error);
+      };
+
+      socket.onmessage = (event) => {
+        try {
+          const data = JSON.parse(event.data);
+          if (typeof data.seq === "number") {
+            // The connect acknowledgment only sets a starting point
+            if (data.type !== "system" || lastSeq === null) {
+              lastSeq = Math.max(lastSeq ?? 0, data.seq);
+            }
+          }
+          listeners.current.forEach((cb) => cb(data));
+        } catch (err) {
+          console.error("? Failed to parse WS:", err, event.data);
+        }
+      };
     };
 
-    ws.current.onerror = (error) => {
-      console.error("?? WebSocket error:", error);
-    };
-
-    ws.current.onmessage = (event) => {
-      try {
-        const data = JSON.parse(event.data);
-        console.log("?? Incoming WS message:", data);
-        listeners.current.forEach((cb) => cb(data));
-      } catch (err) {
-        console.error("? Failed to parse WS:", err, event.data);
-      }
-    };
+    connect();
 
     return () => {
       console.log("?? Closing WebSocket connection");
+      closed = true;
+      clearTimeout(reconnectTimer);
       ws.current?.close();
       ws.current = null;
       setReady(false);